@@ -9,7 +9,8 @@ User.assert_can...
 """
 from django.db import transaction
 from django.utils import timezone
-from askbot.models import Repute
+from askbot.models import DailyReputationGain, Repute
+from askbot.models.repute import get_reputation_day
 # from askbot.models import Answer
 from askbot import signals
 from askbot.conf import settings as askbot_settings
@@ -276,12 +277,14 @@ def onUpVoted(vote, post, user, timestamp=None):
 
     if not (post.wiki or post.is_anonymous):
         author = post.author
-        todays_rep_gain = Repute.objects.get_reputation_by_upvoted_today(author)
+        day = get_reputation_day(timestamp)
+        todays_rep_gain = DailyReputationGain.objects.get_gain(author, day)
         if todays_rep_gain < askbot_settings.MAX_REP_GAIN_PER_USER_PER_DAY:
             author.receive_reputation(
                 askbot_settings.REP_GAIN_FOR_RECEIVING_UPVOTE,
                 post.language_code)
-            author.save()
+            DailyReputationGain.objects.add_gain(
+                author, day, askbot_settings.REP_GAIN_FOR_RECEIVING_UPVOTE)
 
             # TODO: this is suboptimal if post is already a question
             question = post.thread._question_post()
@@ -319,7 +322,9 @@ def onUpVotedCanceled(vote, post, user, timestamp=None):
         author.receive_reputation(
             -askbot_settings.REP_GAIN_FOR_RECEIVING_UPVOTE,
             post.language_code)
-        author.save()
+        DailyReputationGain.objects.add_gain(
+            author, get_reputation_day(timestamp),
+            -askbot_settings.REP_GAIN_FOR_RECEIVING_UPVOTE)
 
         # TODO: this is suboptimal if post is already a question
         question = post.thread._question_post()
@@ -349,7 +354,6 @@ def onDownVoted(vote, post, user, timestamp=None):
         author.receive_reputation(
             askbot_settings.REP_LOSS_FOR_RECEIVING_DOWNVOTE,
             post.language_code)
-        author.save()
 
         # TODO: this is suboptimal if post is already a question
         question = post.thread._question_post()
@@ -366,7 +370,6 @@ def onDownVoted(vote, post, user, timestamp=None):
         user.receive_reputation(
             askbot_settings.REP_LOSS_FOR_DOWNVOTING,
             post.language_code)
-        user.save()
 
         reputation = Repute(
             user=user,
@@ -395,7 +398,6 @@ def onDownVotedCanceled(vote, post, user, timestamp=None):
         author.receive_reputation(
             -askbot_settings.REP_LOSS_FOR_RECEIVING_DOWNVOTE,
             post.language_code)
-        author.save()
 
         # TODO: this is suboptimal if post is already a question
         question = post.thread._question_post()
@@ -412,7 +414,6 @@ def onDownVotedCanceled(vote, post, user, timestamp=None):
         user.receive_reputation(
             -askbot_settings.REP_LOSS_FOR_DOWNVOTING,
             post.language_code)
-        user.save()
 
         reputation = Repute(
             user=user,
@@ -19,11 +19,16 @@ for the most part, so actual values are reliably available only
 at run time
 
 askbot.deps.livesettings is a module developed for satchmo project
+
+Values read via the wrapper are kept in the process memory
+per site and language, see :class:`SettingsSnapshot`.
 """
 import logging
+import time
 
 from django.conf import settings as django_settings
 from django.core.cache import cache
+from django.core.signals import request_started
 from django.contrib.sites.models import Site
 from django.utils.encoding import force_unicode
 from django.utils.functional import lazy
@@ -36,6 +41,69 @@ from askbot.deps.livesettings import SortedDotDict, config_register
 from askbot.deps.livesettings.functions import config_get
 from askbot.deps.livesettings import signals
 from askbot.utils.functions import format_setting_name
+from askbot.utils.functions import generate_random_key
+
+
+class SettingsSnapshot(object):
+    """Process local copy of the setting values
+    per site and language, which saves the cache round trips
+    of the ``askbot_settings.SOME_SETTING`` lookups.
+
+    Values are added to the snapshot when read for the first time.
+    The snapshot is valid while the "settings generation" token
+    in the shared cache stays the same - the token is replaced
+    upon each change of the settings, see :meth:`invalidate`.
+    Token is checked at the start of each request and,
+    outside of the requests, at most once per ``check_interval``
+    seconds.
+    """
+    generation_key = 'askbot-settings-generation'
+    check_interval = 1
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """drops the local values"""
+        #(site id, language) -> dictionary setting name -> value
+        self.values = dict()
+        self.generation = None
+        self.checked_at = 0
+
+    def expire(self):
+        """makes the next read check the generation token"""
+        self.checked_at = 0
+
+    def is_enabled(self):
+        return getattr(django_settings, 'ASKBOT_SETTINGS_SNAPSHOT_ENABLED', True)
+
+    def validate(self):
+        now = time.time()
+        if now - self.checked_at < self.check_interval:
+            return
+        self.checked_at = now
+        generation = cache.get(self.generation_key)
+        if generation is None:
+            cache.add(self.generation_key, generate_random_key(length=8), None)
+            generation = cache.get(self.generation_key)
+        if generation != self.generation:
+            self.values = dict()
+            self.generation = generation
+
+    def get_values(self):
+        """returns dictionary of the setting values
+        for the current site and language"""
+        self.validate()
+        language = get_language() or django_settings.LANGUAGE_CODE
+        return self.values.setdefault((django_settings.SITE_ID, language), dict())
+
+    def invalidate(self):
+        """outdates snapshots in all processes"""
+        cache.set(self.generation_key, generate_random_key(length=8), None)
+        self.clear()
+
+
+snapshot = SettingsSnapshot()
 
 
 def assert_setting_info_correct(info):
@@ -75,7 +143,23 @@ class ConfigSettings(object):
         settings_key = 'ASKBOT_' + key
         if hasattr(django_settings, settings_key):
             return getattr(django_settings, settings_key)
-        return cls.__instance[key].value
+        if not snapshot.is_enabled():
+            return cls.__instance[key].value
+
+        values = snapshot.get_values()
+        try:
+            return values[key]
+        except KeyError:
+            value = cls.__instance[key].value
+            values[key] = value
+            return value
+
+    @classmethod
+    def load_snapshot(cls):
+        """reads all settings into the snapshot
+        for the current language"""
+        for key in cls.__instance.keys():
+            cls.get_value(key)
 
     def get_default(self, key):
         """return the defalut value for the setting"""
@@ -109,6 +193,7 @@ class ConfigSettings(object):
 
             setting.value = value
             setting.save()
+            snapshot.invalidate()
         # self.prime_cache()
 
     def register(self, value):
@@ -265,6 +350,7 @@ def update_cached_value(key, value, language_code=None):
 
 def cached_value_update_handler(setting=None, new_value=None,
                                 language_code=None, *args, **kwargs):
+    snapshot.invalidate()
     key = setting.key
     if not setting.localized and askbot.is_multilingual():
         languages = dict(django_settings.LANGUAGES).keys()
@@ -277,5 +363,14 @@ signals.configuration_value_changed.connect(
     cached_value_update_handler,
     dispatch_uid='update_cached_value_upon_config_change'
 )
+
+
+def expire_snapshot_handler(*args, **kwargs):
+    snapshot.expire()
+
+request_started.connect(
+    expire_snapshot_handler,
+    dispatch_uid='expire_settings_snapshot_upon_request'
+)
 # settings instance to be used elsewhere in the project
 settings = ConfigSettings()
@@ -10,15 +10,31 @@ class AskbotStaticSettings(AppConf):
     CAS_USER_FILTER_DENIED_MSG = None
     CAS_GET_USERNAME = None # python path to function
     CAS_GET_EMAIL = None # python path to function
+    CURSOR_PAGINATION_ENABLED = False # paginate main page with "next" cursors
+                                      # instead of the numbered pages
     CUSTOM_BADGES = None # python path to module with badges
     CUSTOM_USER_PROFILE_TAB = None # dict(NAME, SLUG, CONTEXT_GENERATOR
                                    # the latter is path to func with 
                                    # variables (request, user)
     DEBUG_INCOMING_EMAIL = False
     EXTRA_SKINS_DIR = None #None or path to directory with skins
+    HTML_SANITIZER = 'askbot.utils.html.sanitize_html_stream' # function
+                            # cleaning html of posts, the other built-in
+                            # one is askbot.utils.html.sanitize_html_tree
     IP_MODERATION_ENABLED = False
     LANGUAGE_MODE = 'single-lang' # 'single-lang', 'url-lang' or 'user-lang'
+    LAST_SEEN_UPDATE_INTERVAL = 0 # seconds, save user's last_seen at most
+                                  # this often, within the same day
+    MAIL_QUEUE_BATCH_SIZE = 50 # messages sent over a connection per batch
+    MAIL_QUEUE_CONNECTIONS = 2 # smtp connections sending the queue
+    MAIL_QUEUE_DOMAIN_RATE = 0 # max messages per minute to one
+                               # recipient domain, 0 - no limit
+    MAIL_QUEUE_ENABLED = False # queue outgoing email, the queue is sent
+                               # by the command send_queued_email
+                               # or the celery task, run periodically
     MAIN_PAGE_BASE_URL = pgettext('urls', 'questions') + '/'
+    MARKUP_CACHE_TIMEOUT = 604800 # seconds to cache html converted from
+                                  # markdown by the source text, 0 - no cache
     MAX_UPLOAD_FILE_SIZE = 1024 * 1024 #result in bytes
     NEW_ANSWER_FORM = None # path to custom form class
     POST_RENDERERS = { # generators of html from source content
@@ -28,9 +44,34 @@ class AskbotStaticSettings(AppConf):
         }
 
     QUESTION_PAGE_BASE_URL = pgettext('urls', 'question') + '/'
+    QUESTIONS_COUNT_CACHE_TIMEOUT = 300 # seconds to cache question counts
     SERVICE_URL_PREFIX = 's/' # prefix for non-UI urls
     SELF_TEST = True # if true - run startup self-test
+    SETTINGS_SNAPSHOT_ENABLED = True # keep livesettings values in the
+                                     # process memory between the requests
+    SIMILAR_THREADS_INDEX_ENABLED = False # read related questions from the
+                                          # askbot_similar_thread table, run
+                                          # build_similar_threads before enabling
+    TAG_DICTIONARY_TIMEOUT = 3600 # seconds to keep the tag names
+                                  # in the process memory
+    TAG_PREFERENCES_TIMEOUT = 3600 # seconds to cache marked tags
+                                   # and tag filters of a user
+    TAG_SUBSCRIBERS_INDEX_TIMEOUT = 3600 # seconds to cache the index of
+                                         # instant notification subscribers
+                                         # by tags, 0 - do not use the index
+    THREAD_LISTING_ENABLED = False # serve question lists from the
+                                   # askbot_thread_listing table, run
+                                   # build_thread_listing before enabling
+    THREAD_SUMMARY_REBUILD_ASYNC = False # render thread summaries outside
+                                         # of requests, rebuild_thread_summaries
+                                         # must run periodically
     TRANSLATE_URL = True # set true to localize urls
+    USER_STATS_MAX_AGE = 0 # seconds, keep statistics of the user profile
+                           # in askbot_user_stats_snapshot at most this long,
+                           # refresh_user_stats must run periodically,
+                           # 0 - compute the statistics in each request
+    VIEW_BUFFER_ENABLED = False # accumulate question view counts in cache,
+                                # flush_question_views must run periodically
     WHITELISTED_IPS = tuple() # a tuple of whitelisted ips for moderation
 
     class Meta:
@@ -1,11 +1,19 @@
 from django.core.management.base import NoArgsCommand
 from askbot.models import User
 from askbot.utils.console import ProgressBar
+from askbot.deps.group_messaging.models import InboxState
+from askbot.deps.group_messaging.models import Message
 from askbot.deps.group_messaging.models import get_unread_inbox_counter
 
 class Command(NoArgsCommand):
 
     def handle_noargs(self, *args, **kwargs):
+        threads = Message.objects.filter(root=None, message_type=Message.STORED)
+        count = threads.count()
+        message = 'Rebuilding inbox states of the threads'
+        for thread in ProgressBar(threads.iterator(), count, message):
+            InboxState.objects.rebuild_thread(thread)
+
         users = User.objects.all()
         count = users.count()
         message = 'Fixing inbox counts for the users'
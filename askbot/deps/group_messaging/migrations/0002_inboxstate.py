@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.conf import settings
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('group_messaging', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InboxState',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('last_message_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_read_at', models.DateTimeField(null=True, blank=True)),
+                ('thread', models.ForeignKey(related_name='inbox_states', to='group_messaging.Message')),
+                ('user', models.ForeignKey(to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='inboxstate',
+            unique_together=set([('user', 'thread')]),
+        ),
+    ]
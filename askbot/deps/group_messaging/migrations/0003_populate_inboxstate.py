@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from __future__ import print_function
+
+from django.db import migrations
+from askbot.utils.console import ProgressBar
+
+STORED = 0 #Message.STORED
+SEEN = 0 #MessageMemo.SEEN
+
+
+def populate_inbox_states(apps, schema_editor):
+    """creates inbox states of the participants of the
+    existing threads, the same way as
+    :meth:`InboxStateManager.rebuild_thread` - from the
+    recipients and senders of the messages and the last visit times,
+    otherwise all old threads are counted as unread;
+    then recalculates the unread inbox counters of the users"""
+    Message = apps.get_model('group_messaging', 'Message')
+    InboxState = apps.get_model('group_messaging', 'InboxState')
+    LastVisitTime = apps.get_model('group_messaging', 'LastVisitTime')
+    MessageMemo = apps.get_model('group_messaging', 'MessageMemo')
+    UnreadInboxCounter = apps.get_model('group_messaging', 'UnreadInboxCounter')
+    GroupMembership = apps.get_model('askbot', 'GroupMembership')
+    #states added since the table was created may miss older threads
+    InboxState.objects.all().delete()
+
+    threads = Message.objects.filter(root=None, message_type=STORED)
+    message = 'Creating inbox states of the threads'
+    print('')
+    states = list()
+    unread_counts = dict()
+    for thread in ProgressBar(threads.iterator(), threads.count(), message):
+        group_ids = thread.recipients.values_list('id', flat=True)
+        user_ids = set(GroupMembership.objects.filter(
+                                        group__id__in=list(group_ids)
+                                    ).values_list('user_id', flat=True))
+        user_ids.add(thread.sender_id)
+        user_ids.update(Message.objects.filter(
+                                        root=thread
+                                    ).values_list('sender_id', flat=True))
+        visits = dict(LastVisitTime.objects.filter(
+                                        message=thread
+                                    ).values_list('user_id', 'at'))
+        hidden_ids = set(MessageMemo.objects.filter(
+                                        message=thread, status__gt=SEEN
+                                    ).values_list('user_id', flat=True))
+        for user_id in user_ids:
+            last_read_at = visits.get(user_id)
+            states.append(InboxState(user_id=user_id, thread_id=thread.id,
+                                     last_message_at=thread.last_active_at,
+                                     last_read_at=last_read_at))
+            if user_id in hidden_ids:
+                continue
+            if last_read_at is None or thread.last_active_at > last_read_at:
+                unread_counts[user_id] = unread_counts.get(user_id, 0) + 1
+        if len(states) > 500:
+            InboxState.objects.bulk_create(states)
+            states = list()
+
+    InboxState.objects.bulk_create(states)
+
+    #group users by the count to update the counters in bulk
+    users_by_count = dict()
+    for user_id, count in unread_counts.items():
+        users_by_count.setdefault(count, set()).add(user_id)
+
+    UnreadInboxCounter.objects.update(count=0)
+    for count, user_ids in users_by_count.items():
+        user_ids = list(user_ids)
+        #keep the number of query parameters small
+        for start in range(0, len(user_ids), 500):
+            chunk = set(user_ids[start:start + 500])
+            counters = UnreadInboxCounter.objects.filter(user__id__in=chunk)
+            counters.update(count=count)
+            existing_ids = set(counters.values_list('user_id', flat=True))
+            UnreadInboxCounter.objects.bulk_create([
+                UnreadInboxCounter(user_id=user_id, count=count) \
+                                    for user_id in chunk - existing_ids
+            ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('askbot', '0001_initial'),
+        ('group_messaging', '0002_inboxstate'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_inbox_states, migrations.RunPython.noop),
+    ]
@@ -6,7 +6,7 @@ from django.conf import settings as django_settings
 from django.contrib.auth.models import Group
 from django.contrib.auth.models import User
 from django.contrib.sites.models import Site
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.db.models import signals
 from django.template import Context
 from django.template.loader import get_template
@@ -15,12 +15,15 @@ from django.utils.importlib import import_module
 from django.utils.translation import ugettext as _
 from askbot.deps.group_messaging.signals import response_created
 from askbot.deps.group_messaging.signals import thread_created
+from askbot.utils.transaction import defer_celery_task
 import copy
 import datetime
 import urllib
 
 MAX_HEADLINE_LENGTH = 80
 MAX_SUBJECT_LINE_LENGTH = 30
+#number of recipients of email alerts per background task
+EMAIL_ALERT_BATCH_SIZE = 100
 
 #dummy parse message function
 parse_message = lambda v: v
@@ -60,6 +63,14 @@ def get_unread_inbox_counter(user):
     return counter
 
 
+def update_unread_inbox_counter(user):
+    """sets the unread inbox counter of the user
+    to the number of unread threads in the inbox"""
+    counter = get_unread_inbox_counter(user)
+    counter.recalculate()
+    counter.save()
+
+
 def create_personal_group(user):
     """creates a personal group for the user"""
     group = Group(name=GROUP_NAME_TPL % user.id)
@@ -136,6 +147,146 @@ class MessageMemo(models.Model):
         app_label = 'group_messaging'
 
 
+class InboxStateManager(models.Manager):
+    """model manager for the :class:`InboxState`"""
+
+    def get_unread_filter(self):
+        return models.Q(last_read_at=None) \
+            | models.Q(last_message_at__gt=models.F('last_read_at'))
+
+    def get_unread_count(self, user):
+        """returns number of unread threads in the inbox
+        of the user, archived and deleted threads are not counted"""
+        hidden = MessageMemo.objects.filter(
+                                user=user,
+                                status__gt=MessageMemo.SEEN
+                            ).values('message')
+        states = self.filter(user=user).filter(self.get_unread_filter())
+        return states.exclude(thread__in=hidden).count()
+
+    def mark_read(self, user, thread):
+        """records that user has read the thread"""
+        now = timezone.now()
+        if self.filter(user=user, thread=thread).update(last_read_at=now):
+            return
+        try:
+            with transaction.atomic():
+                self.create(user=user, thread=thread,
+                            last_message_at=thread.last_active_at,
+                            last_read_at=now)
+        except IntegrityError:
+            #created by a concurrent request
+            self.filter(user=user, thread=thread).update(last_read_at=now)
+
+    def add_message(self, message):
+        """records the new message in the inbox states
+        of the recipients and the sender of the message, with
+        a fixed number of queries, independent of the number
+        of recipients.
+
+        Returns tuple of sets of user ids:
+        (users whose thread became unread, users who read it),
+        the first - for the recipients, whose thread was read,
+        archived or deleted before the message, the second -
+        for the sender, if the thread was unread before.
+        """
+        root = message.get_root_message()
+        sent_at = message.sent_at
+        recipient_ids = set(message.get_recipients_users().values_list('id', flat=True))
+        sender_id = message.sender_id
+
+        states = self.filter(thread=root).values_list(
+                                'user_id', 'last_message_at', 'last_read_at'
+                            )
+        state_ids = set()
+        unread_ids = set()
+        for user_id, last_message_at, last_read_at in states:
+            state_ids.add(user_id)
+            if last_read_at is None or last_message_at > last_read_at:
+                unread_ids.add(user_id)
+        hidden_ids = set(MessageMemo.objects.filter(
+                                message=root,
+                                status__gt=MessageMemo.SEEN
+                            ).values_list('user_id', flat=True))
+        counted_ids = unread_ids - hidden_ids
+
+        self.filter(
+                thread=root, user__id__in=recipient_ids
+            ).update(last_message_at=sent_at)
+        self.create_missing(root, recipient_ids - state_ids, sent_at)
+
+        if sender_id in state_ids:
+            self.filter(thread=root, user__id=sender_id).update(
+                                last_message_at=sent_at, last_read_at=sent_at
+                            )
+        else:
+            self.create_missing(root, [sender_id], sent_at, last_read_at=sent_at)
+
+        read_ids = set([sender_id]) & counted_ids
+        return recipient_ids - counted_ids, read_ids
+
+    def create_missing(self, thread, user_ids, last_message_at, last_read_at=None):
+        states = [
+            self.model(user_id=user_id, thread=thread,
+                       last_message_at=last_message_at,
+                       last_read_at=last_read_at) for user_id in user_ids
+        ]
+        if len(states) == 0:
+            return
+        try:
+            with transaction.atomic():
+                self.bulk_create(states)
+        except IntegrityError:
+            #some states were created by a concurrent request
+            for state in states:
+                self.get_or_create(user_id=state.user_id, thread=thread,
+                                   defaults={'last_message_at': last_message_at,
+                                             'last_read_at': last_read_at})
+
+    def rebuild_thread(self, thread):
+        """recreates inbox states of the participants
+        of the thread from the recipients of the messages
+        and the last visit times"""
+        user_ids = set(thread.get_recipients_users().values_list('id', flat=True))
+        user_ids.add(thread.sender_id)
+        user_ids.update(thread.descendants.values_list('sender_id', flat=True))
+        visits = dict(LastVisitTime.objects.filter(
+                                message=thread
+                            ).values_list('user_id', 'at'))
+        self.filter(thread=thread).delete()
+        self.bulk_create([
+            self.model(user_id=user_id, thread=thread,
+                       last_message_at=thread.last_active_at,
+                       last_read_at=visits.get(user_id)) for user_id in user_ids
+        ])
+
+
+class InboxState(models.Model):
+    """State of a thread in the inbox of one user -
+    times of the last message in the thread and of the
+    last read by the user, so that unread threads of the user
+    are counted with one query, see
+    :meth:`InboxStateManager.get_unread_count`.
+
+    Records are created for the recipients and the sender
+    of each message by :meth:`InboxStateManager.add_message`.
+    """
+    user = models.ForeignKey(User)
+    thread = models.ForeignKey('Message', related_name='inbox_states')
+    last_message_at = models.DateTimeField(default=timezone.now)
+    last_read_at = models.DateTimeField(null=True, blank=True)
+
+    objects = InboxStateManager()
+
+    class Meta:
+        unique_together = ('user', 'thread')
+        app_label = 'group_messaging'
+
+    def is_unread(self):
+        return self.last_read_at is None \
+            or self.last_message_at > self.last_read_at
+
+
 class MessageManager(models.Manager):
     """model manager for the :class:`Message`"""
 
@@ -189,21 +340,14 @@ class MessageManager(models.Manager):
             )
             return self.filter(message_filter & deleted_filter)
         else:
-            #rather a tricky query (may need to change the idea to get rid of this)
-            #select threads that have a memo for the user, but the memo is not ARCHIVED
-            #in addition, select threads that have zero memos for the user
-            marked_as_non_deleted_filter = models.Q(
-                                            memos__status=MessageMemo.SEEN,
-                                            memos__user=recipient
-                                        )
-            #part1 - marked as non-archived
-            part1 = self.filter(message_filter & marked_as_non_deleted_filter)
-            #part2 - messages for the user without an attached memo
-            part2 = self.filter(message_filter & ~models.Q(memos__user=recipient))
-            #strange that (part1 | part2).distinct() sometimes gives wrong result
-            threads = list(set(part1) | set(part2))
-            thread_ids = [thread.id for thread in threads]
-            return Message.objects.filter(id__in=thread_ids).distinct()
+            #threads without a memo of the user and threads
+            #with the memo in the "seen" status, i.e. not archived or deleted
+            hidden = MessageMemo.objects.filter(
+                                    user=recipient,
+                                    status__gt=MessageMemo.SEEN
+                                ).values('message')
+            threads = self.filter(message_filter).exclude(id__in=hidden)
+            return threads.distinct()
 
     def create(self, **kwargs):
         """creates a message"""
@@ -419,38 +563,39 @@ class Message(models.Model):
         return bool(memos.count())
 
 
-    def is_unread_by_user(self, user, ignore_message=None):
-        """True, if there is no "last visit timestamp"
-        or if there are new child messages created after
-        the last visit timestamp"""
+    def is_unread_by_user(self, user):
+        """True, if there is no inbox state of the thread for
+        the user, or if there are new messages since the user
+        has read the thread"""
+        root = self.get_root_message()
         try:
-            timer = LastVisitTime.objects.get(user=user, message=self)
-        except LastVisitTime.DoesNotExist:
-            #no last visit timestamp, so indeed unread
+            state = InboxState.objects.get(user=user, thread=root)
+        except InboxState.DoesNotExist:
             return True
-        else:
-            #see if there are new messages after the last visit
-            last_visit_timestamp = timer.at
-            descendants_filter = models.Q(sent_at__gt=last_visit_timestamp)
-            if ignore_message:
-                #ignore message used for the newly posted message
-                #in the same request cycle. The idea is that
-                #this way we avoid multiple-counting of the unread
-                #threads
-                descendants_filter &= ~models.Q(id=ignore_message.id)
-            follow_up_messages = self.descendants.filter(descendants_filter)
-            #unread, if we have new followup messages
-            return bool(follow_up_messages.count())
+        return state.is_unread()
 
 
     def send_email_alert(self):
-        """signal handler for the message post-save"""
+        """schedules email alerts to the recipients
+        of the message in batches, in the background"""
+        from askbot.tasks import send_group_messaging_email_alerts
+        user_ids = list(self.get_recipients_users().values_list('id', flat=True))
+        for start in range(0, len(user_ids), EMAIL_ALERT_BATCH_SIZE):
+            batch = user_ids[start:start + EMAIL_ALERT_BATCH_SIZE]
+            defer_celery_task(
+                send_group_messaging_email_alerts,
+                args=(self.id, batch)
+            )
+
+
+    def send_email_alert_to_users(self, users):
+        """sends email alerts about the message to the users"""
         root_message = self.get_root_message()
         data = {
-            'messages': self.get_timeline(),
+            'messages': list(self.get_timeline()),
             'message': self
         }
-        for user in self.get_recipients_users():
+        for user in users:
             #todo change url scheme so that all users have the same
             #urls within their personal areas of the user profile
             #so that we don't need to have loops like this one
@@ -503,17 +648,41 @@ class Message(models.Model):
 
     def mark_as_seen(self, user):
         """mark message as seen"""
-        is_first_time = self.set_status_for_user(MessageMemo.SEEN, user)
-        root = self.get_root_message()
-        if is_first_time or root.is_unread_by_user(user):
-            inbox_counter = get_unread_inbox_counter(user)
-            inbox_counter.decrement()
-            inbox_counter.save()
+        self.set_status_for_user(MessageMemo.SEEN, user)
+        InboxState.objects.mark_read(user, self.get_root_message())
+        update_unread_inbox_counter(user)
 
     class Meta:
         app_label = 'group_messaging'
 
 
+class UnreadInboxCounterManager(models.Manager):
+    """model manager for the :class:`UnreadInboxCounter`"""
+
+    def increment(self, user_ids):
+        """increments counters of the users with two queries,
+        plus one, if some of the counters are missing"""
+        user_ids = set(user_ids)
+        if len(user_ids) == 0:
+            return
+        counters = self.filter(user__id__in=user_ids)
+        existing_ids = set(counters.values_list('user_id', flat=True))
+        counters.update(count=models.F('count') + 1)
+        missing = [
+            self.model(user_id=user_id, count=1) \
+                                for user_id in user_ids - existing_ids
+        ]
+        if missing:
+            self.bulk_create(missing)
+
+    def decrement(self, user_ids):
+        """decrements positive counters of the users"""
+        if user_ids:
+            self.filter(
+                user__id__in=user_ids, count__gt=0
+            ).update(count=models.F('count') - 1)
+
+
 class UnreadInboxCounter(models.Model):
     """Stores number of unread messages
     per recipient group.
@@ -528,6 +697,8 @@ class UnreadInboxCounter(models.Model):
     user = models.ForeignKey(User)
     count = models.PositiveIntegerField(default=0)
 
+    objects = UnreadInboxCounterManager()
+
     def decrement(self):
         """decrements count if > 1
         does not save the object"""
@@ -544,33 +715,26 @@ class UnreadInboxCounter(models.Model):
         """recalculates count of unread messages
         for the user and sets the updated value.
         Does not call .save()"""
-        self.reset()
-        for thread in Message.objects.get_threads(recipient=self.user):
-            if thread.is_unread_by_user(self.user):
-                self.increment()
+        self.count = InboxState.objects.get_unread_count(self.user)
 
     class Meta:
         app_label = 'group_messaging'
 
 
 def increment_unread_inbox_counters(sender, message, **kwargs):
-    root_message = message.get_root_message()
-    for user in message.get_recipients_users():
-        if message == root_message \
-            or not root_message.is_unread_by_user(user, ignore_message=message) \
-            or root_message.is_archived_or_deleted(user):
-
-            # 1) if message is root - we have new thread,
-            # so it's safe to increment the inbox counter
-            # 2) if the message is a reply - the counter might
-            # have already been incremented. Therefore - we check
-            # whether the message was unread by the user,
-            # excluding the current message, which is obviously unread
-            # 3) if root message is deleted or archived then increment
-
-            counter = get_unread_inbox_counter(user)
-            counter.increment()
-            counter.save()
+    """updates inbox states of the thread and the unread
+    inbox counters of the recipients in bulk:
+
+    * counters of the recipients, whose thread was read,
+      archived or deleted, are incremented, threads
+      with the new message are moved to the inbox
+      of all recipients
+    * counter of the sender is decremented,
+      if the thread was unread by the sender
+    """
+    unread_ids, read_ids = InboxState.objects.add_message(message)
+    UnreadInboxCounter.objects.increment(unread_ids)
+    UnreadInboxCounter.objects.decrement(read_ids)
 
 
 def send_email(sender, message, **kwargs):
@@ -1,3 +1,4 @@
+from askbot.deps.group_messaging.models import InboxState
 from askbot.deps.group_messaging.models import LastVisitTime
 from askbot.deps.group_messaging.models import Message
 from askbot.deps.group_messaging.models import MessageMemo
@@ -5,11 +6,14 @@ from askbot.deps.group_messaging.models import SenderList
 from askbot.deps.group_messaging.models import create_personal_group
 from askbot.deps.group_messaging.models import get_personal_group
 from askbot.deps.group_messaging.models import get_unread_inbox_counter
+from askbot.deps.group_messaging.models import increment_unread_inbox_counters
 from askbot.deps.group_messaging.views import ThreadsList
 from askbot.tests.utils import with_settings
 from bs4 import BeautifulSoup
 from django.contrib.auth.models import User, Group
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from mock import Mock
 import time
@@ -395,3 +399,67 @@ class ModelsTests(GroupMessagingTests):
         time.sleep(1.5)
         last_visits = LastVisitTime.objects.filter(message=root, user=self.sender)
         self.assertEqual(last_visits.count(), 1)
+
+    def create_group_thread(self, name, member_count):
+        group = Group.objects.create(name=name)
+        members = list()
+        for num in range(member_count):
+            member = create_user('%s-member%d' % (name, num))
+            member.groups.add(group)
+            members.append(member)
+        return self.create_thread(self.sender, [group]), members
+
+    def get_unread_counts(self, users):
+        return [get_unread_inbox_counter(user).count for user in users]
+
+    def test_unread_counters_follow_replies(self):
+        root, members = self.create_group_thread('group', 3)
+        self.assertEqual(self.get_unread_counts(members), [1, 1, 1])
+
+        root.mark_as_seen(members[0])
+        self.assertEqual(self.get_unread_counts(members), [0, 1, 1])
+
+        Message.objects.create_response(
+                                sender=members[1],
+                                text='some response',
+                                parent=root
+                            )
+        #thread is unread again by the first member, read by the responder
+        self.assertEqual(self.get_unread_counts(members), [1, 0, 1])
+        self.assertEqual(get_unread_inbox_counter(self.sender).count, 1)
+        self.assertTrue(root.is_unread_by_user(members[0]))
+        self.assertFalse(root.is_unread_by_user(members[1]))
+
+        for user in members + [self.sender]:
+            counter = get_unread_inbox_counter(user)
+            count = counter.count
+            counter.recalculate()
+            self.assertEqual(counter.count, count)
+
+    def test_archived_thread_is_not_counted(self):
+        root = self.create_thread_for_user(self.sender, self.recipient)
+        root.archive(self.recipient)
+        self.assertEqual(InboxState.objects.get_unread_count(self.recipient), 0)
+        Message.objects.create_response(
+                                sender=self.sender,
+                                text='some response',
+                                parent=root
+                            )
+        #reply moves the thread back to the inbox
+        self.assertEqual(InboxState.objects.get_unread_count(self.recipient), 1)
+
+    def get_counter_update_query_count(self, name, member_count):
+        root, members = self.create_group_thread(name, member_count)
+        response = Message.objects.create_response(
+                                sender=members[0],
+                                text='some response',
+                                parent=root
+                            )
+        with CaptureQueriesContext(connection) as context:
+            increment_unread_inbox_counters(None, message=response)
+        return len(context.captured_queries)
+
+    def test_counter_update_query_count_does_not_depend_on_recipients(self):
+        small_group_count = self.get_counter_update_query_count('small', 2)
+        large_group_count = self.get_counter_update_query_count('large', 10)
+        self.assertEqual(small_group_count, large_group_count)
@@ -27,7 +27,7 @@ from askbot.deps.group_messaging.models import SenderList
 from askbot.deps.group_messaging.models import LastVisitTime
 from askbot.deps.group_messaging.models import get_personal_group_by_user_id
 from askbot.deps.group_messaging.models import get_personal_groups_for_users
-from askbot.deps.group_messaging.models import get_unread_inbox_counter
+from askbot.deps.group_messaging.models import update_unread_inbox_counter
 
 
 class NewThread(PjaxView):
@@ -204,12 +204,6 @@ class DeleteOrRestoreThread(ThreadsList):
                                     message=thread
                                 )
 
-        if created and action == 'archive':
-            #unfortunately we lose "unseen" status when archiving
-            counter = get_unread_inbox_counter(request.user)
-            counter.decrement()
-            counter.save()
-
         if action == 'archive':
             memo.status = MessageMemo.ARCHIVED
         elif action == 'restore':
@@ -217,6 +211,8 @@ class DeleteOrRestoreThread(ThreadsList):
         else:
             memo.status = MessageMemo.DELETED
         memo.save()
+        #archived and deleted threads are not counted as unread
+        update_unread_inbox_counter(request.user)
 
         context = self.get_context(request)
         return self.render_to_response(Context(context))
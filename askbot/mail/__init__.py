@@ -13,6 +13,7 @@ from askbot import exceptions
 from askbot import const
 from askbot.conf import settings as askbot_settings
 from askbot.mail import parsing
+from askbot.mail import send_queue
 from askbot.utils import url_utils
 from askbot.utils.file_utils import store_file
 from askbot.utils.html import absolutize_urls
@@ -49,15 +50,9 @@ def extract_first_email_address(text):
     else:
         return None
 
-def _send_mail(subject_line, body_text, sender_email, recipient_list, headers=None, attachments=None):
-    """base send_mail function, which will attach email in html format
-    if html email is enabled"""
-    html_enabled = askbot_settings.HTML_EMAIL_ENABLED
-    if html_enabled:
-        message_class = mail.EmailMultiAlternatives
-    else:
-        message_class = mail.EmailMessage
-
+def get_email_list(recipient_list):
+    """returns list of email addresses of the recipients,
+    which may be users or email addresses"""
     from askbot.models import User
     from askbot.models.user import InvitedModerator
     email_list = list()
@@ -66,6 +61,16 @@ def _send_mail(subject_line, body_text, sender_email, recipient_list, headers=No
             email_list.append(recipient.email)
         else:
             email_list.append(recipient)
+    return email_list
+
+def build_message(subject_line, body_text, sender_email, email_list, headers=None, attachments=None):
+    """returns email message object, with the alternative
+    html part, if html email is enabled"""
+    html_enabled = askbot_settings.HTML_EMAIL_ENABLED
+    if html_enabled:
+        message_class = mail.EmailMultiAlternatives
+    else:
+        message_class = mail.EmailMessage
 
     msg = message_class(
                 subject_line,
@@ -77,7 +82,27 @@ def _send_mail(subject_line, body_text, sender_email, recipient_list, headers=No
             )
     if html_enabled:
         msg.attach_alternative(body_text, "text/html")
+    return msg
 
+def _send_mail(subject_line, body_text, sender_email, recipient_list, headers=None, attachments=None):
+    """base send_mail function, which will attach email in html format
+    if html email is enabled. With the mail queue enabled
+    messages without attachments are queued for sending,
+    see :mod:`askbot.mail.send_queue`"""
+    email_list = get_email_list(recipient_list)
+    if send_queue.is_enabled() and not attachments:
+        send_queue.enqueue(subject_line, body_text, sender_email,
+                           email_list, headers=headers)
+        return
+
+    msg = build_message(
+                subject_line,
+                body_text,
+                sender_email,
+                email_list,
+                headers=headers,
+                attachments=attachments
+            )
     msg.send()
 
 def send_mail(
@@ -0,0 +1,742 @@
+"""Daily and weekly email digests of the updated questions,
+sent by the management command ``send_email_alerts``.
+
+The digests are built for chunks of users, see :func:`send_digests`:
+
+* recipients are selected with one query - users having
+  daily or weekly subscriptions (``EmailFeedSetting``) due for the report
+* for each chunk of users, their subscriptions, followed questions,
+  own questions and answers, question views and comment responses
+  are loaded in bulk (:class:`DigestChunk`), instead of
+  running the same queries for every user
+* news about the collected questions (edits, answers and
+  the record of the previous email) are loaded with a few
+  queries per user, rather than per question
+
+Chunks are independent of each other, so they can be processed
+in a pool of processes or as celery tasks.
+"""
+from __future__ import print_function
+import askbot
+import datetime
+import traceback
+from collections import defaultdict, OrderedDict
+
+from django.conf import settings as django_settings
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sites.models import Site
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.translation import ugettext as _
+from django.utils.translation import activate as activate_language
+
+from askbot import const
+from askbot.conf import settings as askbot_settings
+from askbot.deps.django_authopenid.util import email_is_blacklisted
+from askbot.mail import send_mail
+from askbot.mail.messages import BatchEmailAlert
+from askbot.models import Activity, EmailFeedSetting
+from askbot.models import Post, PostRevision, QuestionView, Thread, User
+from askbot.models import tag_subscribers
+from askbot.utils.html import site_url
+
+DEBUG_DIGESTS = False
+DIGEST_FREQUENCIES = ('d', 'w')
+CHUNK_SIZE = 200
+EMAIL_UPDATE_ACTIVITY = const.TYPE_ACTIVITY_EMAIL_UPDATE_SENT
+
+
+def get_all_origin_posts(mentions):
+    origin_posts = set()
+    for mention in mentions:
+        post = mention.content_object
+        origin_posts.add(post.get_origin_post())
+    return list(origin_posts)
+
+
+#todo: refactor this as class
+def extend_question_list(
+                    src, dst, cutoff_time = None,
+                    limit=False, add_mention=False,
+                    add_comment = False,
+                    languages=None
+                ):
+    """src is a query set or a list with questions
+    or None
+    dst - is an ordered dictionary
+    update reporting cutoff time for each question
+    to the latest value to be more permissive about updates
+    """
+    if src is None:#is not QuerySet
+        return #will not do anything if subscription of this type is not used
+    if limit and len(dst.keys()) >= askbot_settings.MAX_ALERTS_PER_EMAIL:
+        return
+    if cutoff_time is None:
+        if hasattr(src, 'cutoff_time'):
+            cutoff_time = src.cutoff_time
+        else:
+            raise ValueError('cutoff_time is a mandatory parameter')
+
+    for q in src:
+        if languages and q.language_code not in languages:
+            continue
+        if q in dst:
+            meta_data = dst[q]
+        else:
+            meta_data = {'cutoff_time': cutoff_time}
+            dst[q] = meta_data
+
+        if cutoff_time > meta_data['cutoff_time']:
+            #the latest cutoff time wins for a given question
+            #if the question falls into several subscription groups
+            #this makes mailer more eager in sending email
+            meta_data['cutoff_time'] = cutoff_time
+        if add_mention:
+            if 'mentions' in meta_data:
+                meta_data['mentions'] += 1
+            else:
+                meta_data['mentions'] = 1
+        if add_comment:
+            if 'comments' in meta_data:
+                meta_data['comments'] += 1
+            else:
+                meta_data['comments'] = 1
+
+
+class QuestionList(list):
+    """list of questions, carrying the cutoff time
+    like the query sets passed to :func:`extend_question_list`"""
+    def __init__(self, questions, cutoff_time):
+        super(QuestionList, self).__init__(questions)
+        self.cutoff_time = cutoff_time
+
+
+def format_action_count(string, number, output):
+    if number > 0:
+        output.append(_(string) % {'num':number})
+
+
+def get_due_feeds_filter(now=None):
+    """``Q`` object selecting digest subscriptions,
+    which are due for the report, same as
+    ``EmailFeedSetting.should_send_now()``"""
+    now = now or timezone.now()
+    due = Q(reported_at__isnull=True)
+    for frequency in DIGEST_FREQUENCIES:
+        cutoff_time = now - EmailFeedSetting.DELTA_TABLE[frequency]
+        due |= Q(frequency=frequency, reported_at__lte=cutoff_time)
+    return Q(frequency__in=DIGEST_FREQUENCIES) & due
+
+
+def add_missing_subscriptions():
+    """adds default subscriptions to the users who miss some,
+    same as ``User.add_missing_askbot_subscriptions()``
+    for all users at once"""
+    from askbot import forms#need to avoid circular dependency
+    form = forms.EditUserEmailFeedsForm()
+    users = User.objects.exclude(askbot_profile__status='b')
+    for feed_type in form.get_db_model_subscription_type_names():
+        attr_key = 'DEFAULT_NOTIFICATION_DELIVERY_SCHEDULE_%s' % feed_type.upper()
+        frequency = getattr(askbot_settings, attr_key)
+        user_ids = users.exclude(
+                        notification_subscriptions__feed_type=feed_type
+                    ).values_list('id', flat=True)
+        feeds = [
+            EmailFeedSetting(
+                subscriber_id=user_id,
+                feed_type=feed_type,
+                frequency=frequency
+            ) for user_id in user_ids.iterator()
+        ]
+        EmailFeedSetting.objects.bulk_create(feeds, batch_size=500)
+        if feeds and feed_type == 'q_all' and frequency == 'i' \
+            and tag_subscribers.is_enabled():
+            tag_subscribers.invalidate()#bulk_create does not send signals
+
+
+def get_recipient_ids():
+    """returns sorted list of ids of users,
+    who have digest subscriptions due for the report"""
+    feeds = EmailFeedSetting.objects.filter(get_due_feeds_filter()).exclude(
+                                        subscriber__askbot_profile__status='b')
+    return sorted(set(feeds.values_list('subscriber_id', flat=True)))
+
+
+def get_chunks(user_ids, chunk_size=CHUNK_SIZE):
+    for start in range(0, len(user_ids), chunk_size):
+        yield user_ids[start:start + chunk_size]
+
+
+def format_debug_msg(user, content):
+    msg = u"%s site_id=%d user=%s: %s" % (
+        timezone.now().strftime('%y-%m-%d %h:%m:%s'),
+        Site.objects.get_current().id,
+        repr(user.username),
+        content
+    )
+    return msg.encode('utf-8')
+
+
+def report_exception(user):
+    """reports exception that happened during sending email alert to user"""
+    message = format_debug_msg(user, traceback.format_exc())
+    print(message)
+    admin_email = askbot_settings.ADMIN_EMAIL
+    site_id = Site.objects.get_current().id
+    try:
+        subject_line = u"Error processing daily/weekly notification for User '%s' for Site '%s'" % (user.username, site_id)
+        send_mail(
+            subject_line=subject_line.encode('utf-8'),
+            body_text=message,
+            recipient_list=[admin_email,]
+        )
+    except:
+        message = u"ERROR: was unable to report this exception to %s: %s" % (admin_email, traceback.format_exc())
+        print(format_debug_msg(user, message))
+    else:
+        message = u"Sent email reporting this exception to %s" % admin_email
+        print(format_debug_msg(user, message))
+
+
+class DigestChunk(object):
+    """Subscription data of a chunk of users, loaded in bulk.
+
+    Questions of the individually selected (``q_sel``),
+    asked (``q_ask``) and answered (``q_ans``) subscriptions
+    and the comment responses (part of ``m_and_c``) are
+    loaded here for all users of the chunk, the tag filtered
+    "entire forum" subscriptions (``q_all``) and the mentions
+    are queried per user.
+    """
+    def __init__(self, users, now=None):
+        self.users = users
+        self.now = now or timezone.now()
+        #parts of the digests shared by the users of the chunk
+        self.email_fragments = dict()
+        user_ids = [user.id for user in users]
+
+        #user id -> list of digest feeds (daily or weekly)
+        self.feeds = defaultdict(list)
+        #user id -> set of feed types due for the report
+        self.due_feed_types = defaultdict(set)
+        due_filter = get_due_feeds_filter(self.now)
+        feeds = EmailFeedSetting.objects.filter(
+                                subscriber__id__in=user_ids,
+                                frequency__in=DIGEST_FREQUENCIES
+                            )
+        due_ids = set(feeds.filter(due_filter).values_list('id', flat=True))
+        for feed in feeds:
+            self.feeds[feed.subscriber_id].append(feed)
+            if feed.id in due_ids:
+                self.due_feed_types[feed.subscriber_id].add(feed.feed_type)
+
+        self.followed_threads = self.load_thread_ids(
+            'q_sel', Thread.followed_by.through.objects, 'user_id', 'thread_id'
+        )
+        self.asked_threads = self.load_thread_ids(
+            'q_ask', Post.objects.filter(post_type='question'), 'author_id', 'thread_id'
+        )
+        self.answered_threads = self.load_thread_ids(
+            'q_ans', Post.objects.filter(post_type='answer'), 'author_id', 'thread_id'
+        )
+        thread_ids = set()
+        for threads in (self.followed_threads, self.asked_threads, self.answered_threads):
+            for ids in threads.values():
+                thread_ids.update(ids)
+
+        self.questions = self.load_questions(thread_ids)
+        self.views = self.load_views()
+        self.comment_responses = self.load_comment_responses()
+
+    def get_users_with_due_feed(self, feed_type):
+        return [user_id for user_id, feed_types in self.due_feed_types.items() \
+                                                    if feed_type in feed_types]
+
+    def load_thread_ids(self, feed_type, queryset, user_field, thread_field):
+        """returns dictionary user id -> set of thread ids
+        for the users with due subscription of the ``feed_type``"""
+        user_ids = self.get_users_with_due_feed(feed_type)
+        result = defaultdict(set)
+        if user_ids:
+            rows = queryset.filter(**{user_field + '__in': user_ids}).values_list(
+                                                    user_field, thread_field)
+            for user_id, thread_id in rows.distinct():
+                result[user_id].add(thread_id)
+        return result
+
+    def load_questions(self, thread_ids):
+        """returns dictionary thread id -> question post,
+        questions are filtered by the conditions common
+        to all users, see :meth:`get_base_questions`"""
+        if not thread_ids:
+            return dict()
+        questions = Post.objects.get_questions().filter(
+                                            thread__id__in=thread_ids,
+                                            deleted=False,
+                                            thread__closed=False
+                                        ).select_related('thread')
+        if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation':
+            questions = questions.filter(approved=True)
+        return dict((question.thread_id, question) for question in questions)
+
+    def load_views(self):
+        """returns dictionary (user id, question id) -> time of the last visit"""
+        question_ids = [question.id for question in self.questions.values()]
+        if not question_ids:
+            return dict()
+        views = QuestionView.objects.filter(
+                            who__id__in=[user.id for user in self.users],
+                            question__id__in=question_ids
+                        ).values_list('who_id', 'question_id', 'when')
+        return dict(((user_id, question_id), when) \
+                        for user_id, question_id, when in views)
+
+    def load_comment_responses(self):
+        """returns dictionary user id -> list of (comment time, question)
+        for comments by other users to the posts of the user"""
+        user_ids = self.get_users_with_due_feed('m_and_c')
+        responses = defaultdict(list)
+        if not user_ids:
+            return responses
+
+        latest_cutoff_time = self.now - min(
+            EmailFeedSetting.DELTA_TABLE[frequency] for frequency in DIGEST_FREQUENCIES
+        )
+        comments = Post.objects.get_comments().filter(
+                                    parent__author__id__in=user_ids,
+                                    added_at__lt=latest_cutoff_time
+                                ).values_list(
+                                    'parent__author_id', 'author_id',
+                                    'added_at', 'parent__thread_id'
+                                )
+        comments = [row for row in comments if row[0] != row[1] and row[3]]
+        thread_ids = set(row[3] for row in comments)
+        questions = Post.objects.filter(
+                                post_type='question', thread__id__in=thread_ids
+                            ).select_related('thread')
+        questions = dict((question.thread_id, question) for question in questions)
+        for user_id, author_id, added_at, thread_id in comments:
+            if thread_id in questions:
+                responses[user_id].append((added_at, questions[thread_id]))
+        return responses
+
+    def get_base_questions(self, user, thread_ids):
+        """returns questions of the threads as two lists:
+        questions not seen by the user and questions seen
+        before the last modification, both ordered by the
+        last activity, like the ``Q_set_A`` and ``Q_set_B``
+        query sets of :func:`get_updated_questions_for_user`"""
+        questions = [self.questions[thread_id] for thread_id in thread_ids \
+                                                if thread_id in self.questions]
+        questions.sort(key=lambda q: q.thread.last_activity_at, reverse=True)
+        not_seen = list()
+        seen_before_last_mod = list()
+        for question in questions:
+            thread = question.thread
+            if thread.last_activity_by_id == user.id:
+                continue
+            if thread.last_activity_at < user.date_joined:
+                continue
+            seen_at = self.views.get((user.id, question.id))
+            if seen_at is None:
+                not_seen.append(question)
+            elif seen_at < thread.last_activity_at:
+                seen_before_last_mod.append(question)
+        return not_seen, seen_before_last_mod
+
+
+def get_base_question_querysets(user):
+    """returns query sets of questions not seen by the user
+    and seen before the last modification"""
+    #base question query set for this user
+    #basic things - not deleted, not closed, not too old
+    #not last edited by the same user
+    base_qs = Post.objects.get_questions().exclude(
+        thread__last_activity_by=user
+    ).exclude(
+        thread__last_activity_at__lt=user.date_joined#exclude old stuff
+    ).exclude(
+        deleted=True
+    ).exclude(
+        thread__closed=True
+    ).order_by('-thread__last_activity_at')
+
+    if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation':
+        base_qs = base_qs.filter(approved = True)
+    #todo: for some reason filter on did not work as expected ~Q(viewed__who=user) |
+    #      Q(viewed__who=user,viewed__when__lt=F('thread__last_activity_at'))
+    #returns way more questions than you might think it should
+    #so because of that I've created separate query sets Q_set2 and Q_set3
+    #plus two separate queries run faster!
+
+    #questions that are not seen by the user at all
+    not_seen_qs = base_qs.filter(~Q(viewed__who=user))
+    #questions that were seen, but before last modification
+    seen_before_last_mod_qs = base_qs.filter(
+        Q(viewed__who=user, viewed__when__lt=F('thread__last_activity_at'))
+    )
+    return not_seen_qs, seen_before_last_mod_qs
+
+
+def get_updated_questions_for_user(user, chunk):
+    """
+    retreive relevant question updates for the user
+    according to their subscriptions and recorded question
+    views
+    """
+    user_feeds = chunk.feeds[user.id]
+    due_feeds = [feed for feed in user_feeds \
+                    if feed.feed_type in chunk.due_feed_types[user.id]]
+
+    #shortcircuit - if there is no ripe feed to work on for this user
+    if len(due_feeds) == 0:
+        return {}
+
+    #these are placeholders for separate question lists per question group
+    #there are four groups - one for each EmailFeedSetting.feed_type
+    #and each group has subtypes A and B - not seen and
+    #seen before the last modification
+    q_sel_A = q_sel_B = None
+    q_ask_A = q_ask_B = None
+    q_ans_A = q_ans_B = None
+    q_all_A = q_all_B = None
+    m_and_c_feed = None
+
+    if askbot.is_multilingual():
+        languages = user.languages.split()
+    else:
+        languages = None
+
+    max_alerts = askbot_settings.MAX_ALERTS_PER_EMAIL
+    reported_feed_ids = list()
+    for feed in due_feeds:
+        if feed.feed_type == 'm_and_c':
+            #alerts on mentions and comments are processed separately
+            #because comments to questions do not trigger change of last_updated
+            #this may be changed in the future though, see
+            #http://askbot.org/en/question/96/
+            m_and_c_feed = feed
+            continue
+
+        #each group of updates has it's own cutoff time
+        #that cutoff time is computed for each user individually
+
+        #we won't send email for a given question if an email has been
+        #sent after that cutoff_time
+        reported_feed_ids.append(feed.id)
+        cutoff_time = feed.get_previous_report_cutoff_time()
+
+        if feed.feed_type == 'q_sel':
+            thread_ids = chunk.followed_threads[user.id]
+            q_sel_A, q_sel_B = chunk.get_base_questions(user, thread_ids)
+            q_sel_A = QuestionList(q_sel_A, cutoff_time)
+            q_sel_B = QuestionList(q_sel_B, cutoff_time)
+
+        elif feed.feed_type == 'q_ask':
+            thread_ids = chunk.asked_threads[user.id]
+            q_ask_A, q_ask_B = chunk.get_base_questions(user, thread_ids)
+            q_ask_A = QuestionList(q_ask_A, cutoff_time)
+            q_ask_B = QuestionList(q_ask_B, cutoff_time)
+
+        elif feed.feed_type == 'q_ans':
+            thread_ids = chunk.answered_threads[user.id]
+            q_ans_A, q_ans_B = chunk.get_base_questions(user, thread_ids)
+            q_ans_A = QuestionList(q_ans_A[:max_alerts], cutoff_time)
+            q_ans_B = QuestionList(q_ans_B[:max_alerts], cutoff_time)
+
+        elif feed.feed_type == 'q_all':
+            Q_set_A, Q_set_B = get_base_question_querysets(user)
+            q_all_A = user.get_tag_filtered_questions(Q_set_A)
+            q_all_B = user.get_tag_filtered_questions(Q_set_B)
+
+            q_all_A = q_all_A[:max_alerts]
+            q_all_B = q_all_B[:max_alerts]
+            q_all_A.cutoff_time = cutoff_time
+            q_all_B.cutoff_time = cutoff_time
+
+    if reported_feed_ids and DEBUG_DIGESTS == False:
+        EmailFeedSetting.objects.filter(
+                                id__in=reported_feed_ids
+                            ).update(reported_at=timezone.now())
+
+    #build ordered list questions for the email report
+    q_list = OrderedDict()
+
+    #todo: refactor q_list into a separate class?
+    extend_question_list(q_sel_A, q_list, languages=languages)
+    extend_question_list(q_sel_B, q_list, languages=languages)
+
+    #build list of comment and mention responses here
+    #it is separate because posts are not marked as changed
+    #when people add comments
+    #mention responses could be collected in the loop above, but
+    #it is inconvenient, because feed_type m_and_c bundles the two
+    #also we collect metadata for these here
+    if m_and_c_feed:
+        cutoff_time = m_and_c_feed.get_previous_report_cutoff_time()
+        q_commented = [question for added_at, question \
+                            in chunk.comment_responses[user.id] \
+                            if added_at < cutoff_time]
+        extend_question_list(
+            q_commented,
+            q_list,
+            cutoff_time=cutoff_time,
+            add_comment=True,
+            languages=languages
+        )
+
+        mentions = Activity.objects.get_mentions(
+            mentioned_at__lt=cutoff_time,
+            mentioned_whom=user
+        )
+        mention_posts = get_all_origin_posts(mentions)
+        q_mentions_id = [q.id for q in mention_posts]
+        if q_mentions_id:
+            Q_set_A, Q_set_B = get_base_question_querysets(user)
+            q_mentions_A = Q_set_A.filter(id__in = q_mentions_id)
+            q_mentions_A.cutoff_time = cutoff_time
+            extend_question_list(
+                q_mentions_A,
+                q_list,
+                add_mention=True,
+                languages=languages
+            )
+
+            q_mentions_B = Q_set_B.filter(id__in = q_mentions_id)
+            q_mentions_B.cutoff_time = cutoff_time
+            extend_question_list(
+                q_mentions_B,
+                q_list,
+                add_mention=True,
+                languages=languages
+            )
+
+    if user.email_tag_filter_strategy != const.EXCLUDE_IGNORED:
+        extend_question_list(q_all_A, q_list, languages=languages)
+        extend_question_list(q_all_B, q_list, languages=languages)
+
+    extend_question_list(q_ask_A, q_list, limit=True, languages=languages)
+    extend_question_list(q_ask_B, q_list, limit=True, languages=languages)
+
+    extend_question_list(q_ans_A, q_list, limit=True, languages=languages)
+    extend_question_list(q_ans_B, q_list, limit=True, languages=languages)
+
+    if user.email_tag_filter_strategy == const.EXCLUDE_IGNORED:
+        extend_question_list(q_all_A, q_list, limit=True, languages=languages)
+        extend_question_list(q_all_B, q_list, limit=True, languages=languages)
+
+    add_news_to_question_list(user, q_list)
+    return q_list
+
+
+def add_news_to_question_list(user, q_list):
+    """counts new edits and answers to the collected questions
+    since the previous email to the user about each question,
+    marks questions without news with ``meta_data['skip'] = True``
+    and records the time of the email for the others
+    """
+    if len(q_list) == 0:
+        return
+
+    ctype = ContentType.objects.get_for_model(Post)
+    question_ids = [q.id for q in q_list.keys()]
+    #records of the latest email activity per question per user
+    update_infos = dict()
+    emailed = Activity.objects.filter(
+                                user=user,
+                                content_type=ctype,
+                                object_id__in=question_ids,
+                                activity_type=EMAIL_UPDATE_ACTIVITY
+                            )
+    for update_info in emailed:
+        if update_info.object_id in update_infos:
+            raise Exception(
+                            'server error - multiple question email activities '
+                            'found per user-question pair'
+                            )
+        update_infos[update_info.object_id] = update_info
+
+    long_time_ago = datetime.datetime(1970, 1, 1)
+    if django_settings.USE_TZ:
+        long_time_ago = timezone.make_aware(long_time_ago, timezone.utc)
+
+    #skip question if we need to wait longer because
+    #the delay before the next email has not yet elapsed
+    #or if last email was sent after the most recent modification
+    emailed_at = dict()
+    for q, meta_data in q_list.items():
+        update_info = update_infos.get(q.id)
+        q_emailed_at = update_info.active_at if update_info else long_time_ago
+        cutoff_time = meta_data['cutoff_time']#cutoff time for the question
+        if q_emailed_at > cutoff_time or q_emailed_at > q.thread.last_activity_at:
+            meta_data['skip'] = True
+        else:
+            emailed_at[q.id] = q_emailed_at
+
+    if len(emailed_at) == 0:
+        return
+
+    #collect info on all sorts of news that happened after
+    #the most recent emailing to the user about each question
+    questions = [q for q in q_list.keys() if q.id in emailed_at]
+    since = min(emailed_at.values())
+
+    #revisions are ordered by revision number, the latest first
+    q_revs = defaultdict(list)
+    revisions = PostRevision.objects.filter(
+                                post__id__in=emailed_at.keys(),
+                                revised_at__gt=since
+                            ).exclude(
+                                author=user
+                            ).values_list('post_id', 'revised_at')
+    for post_id, revised_at in revisions:
+        if revised_at > emailed_at[post_id]:
+            q_revs[post_id].append(revised_at)
+
+    thread_questions = dict((q.thread_id, q) for q in questions)
+    answers = Post.objects.get_answers(user).filter(
+                                thread__id__in=thread_questions.keys(),
+                                added_at__gt=since,
+                                deleted=False
+                            ).values_list('id', 'thread_id', 'author_id', 'added_at')
+    new_answers = defaultdict(int)
+    answer_questions = dict()
+    for answer_id, thread_id, author_id, added_at in answers:
+        q = thread_questions[thread_id]
+        if added_at > emailed_at[q.id]:
+            answer_questions[answer_id] = q.id
+            if author_id != user.id:
+                new_answers[q.id] += 1
+
+    answer_revs = defaultdict(int)
+    if answer_questions:
+        revisions = PostRevision.objects.filter(
+                                post__id__in=answer_questions.keys()
+                            ).exclude(
+                                author=user
+                            ).values_list('id', 'post_id').distinct()
+        for revision_id, post_id in revisions:
+            answer_revs[answer_questions[post_id]] += 1
+
+    now = timezone.now()
+    emailed_question_ids = list()
+    for q in questions:
+        meta_data = q_list[q]
+        q_rev = q_revs[q.id]
+        #now update all sorts of metadata per question
+        meta_data['q_rev'] = len(q_rev)
+        if len(q_rev) > 0 and q.added_at == q_rev[0]:
+            meta_data['q_rev'] = 0
+            meta_data['new_q'] = True
+        else:
+            meta_data['new_q'] = False
+
+        meta_data['new_ans'] = new_answers[q.id]
+        meta_data['ans_rev'] = answer_revs[q.id]
+
+        comments = meta_data.get('comments', 0)
+        mentions = meta_data.get('mentions', 0)
+
+        #finally skip question if there are no news indeed
+        news_count = len(q_rev) + meta_data['new_ans'] + meta_data['ans_rev']
+        if news_count + comments + mentions == 0:
+            meta_data['skip'] = True
+        else:
+            meta_data['skip'] = False
+            emailed_question_ids.append(q.id)
+
+    if DEBUG_DIGESTS == False:
+        #save question email update activities
+        updated_ids = [update_infos[q_id].id for q_id in emailed_question_ids \
+                                                    if q_id in update_infos]
+        Activity.objects.filter(id__in=updated_ids).update(active_at=now)
+        Activity.objects.bulk_create([
+            Activity(
+                user=user,
+                content_type=ctype,
+                object_id=q_id,
+                activity_type=EMAIL_UPDATE_ACTIVITY,
+                active_at=now
+            ) for q_id in emailed_question_ids if q_id not in update_infos
+        ])
+
+
+def send_digest(user, chunk):
+    """sends the email digest to the user, if there is any news"""
+    #todo: q_list is a dictionary, not a list
+    q_list = get_updated_questions_for_user(user, chunk)
+
+    if len(q_list.keys()) == 0:
+        return
+
+    num_q = 0
+
+    for question, meta_data in q_list.items():
+        if meta_data['skip']:
+            del q_list[question]
+        else:
+            num_q += 1
+    if num_q > 0:
+        threads = Thread.objects.filter(id__in=[qq.thread_id for qq in q_list.keys()])
+        tag_summary = Thread.objects.get_tag_summary_from_threads(threads)
+
+        question_count = len(q_list.keys())
+
+        items_added = 0
+        items_unreported = 0
+        questions_data = list()
+        for q, meta_data in q_list.items():
+            act_list = []
+            if meta_data['skip']:
+                continue
+            if items_added >= askbot_settings.MAX_ALERTS_PER_EMAIL:
+                items_unreported = num_q - items_added #may be inaccurate actually, but it's ok
+                break
+            else:
+                items_added += 1
+                if meta_data['new_q']:
+                    act_list.append(_('new question'))
+                format_action_count('%(num)d rev', meta_data['q_rev'], act_list)
+                format_action_count('%(num)d ans', meta_data['new_ans'], act_list)
+                format_action_count('%(num)d ans rev', meta_data['ans_rev'], act_list)
+                questions_data.append({
+                    'url': site_url(q.get_absolute_url()),
+                    'info': ', '.join(act_list),
+                    'title': q.thread.title
+                })
+
+        activate_language(user.primary_language)
+        email = BatchEmailAlert({
+            'questions': questions_data,
+            'question_count': question_count,
+            'tag_summary': tag_summary,
+            'user': user
+        }, fragment_cache=chunk.email_fragments)
+
+        if DEBUG_DIGESTS == True:
+            recipient_email = askbot_settings.ADMIN_EMAIL
+        else:
+            recipient_email = user.email
+
+        if recipient_email:
+            email.send([recipient_email])
+
+
+def send_digests(user_ids):
+    """sends email digests to the users with the given ids,
+    returns number of processed users"""
+    users = User.objects.filter(id__in=user_ids).exclude(
+                                            askbot_profile__status='b')
+    users = list(users.order_by('id'))
+    if askbot_settings.BLACKLISTED_EMAIL_PATTERNS_MODE == 'strict':
+        users = [user for user in users if not email_is_blacklisted(user.email)]
+
+    chunk = DigestChunk(users)
+    for user in users:
+        try:
+            #tag filters use the language of the request
+            activate_language(django_settings.LANGUAGE_CODE)
+            send_digest(user, chunk)
+        except Exception:
+            report_exception(user)
+    return len(users)
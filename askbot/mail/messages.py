@@ -19,6 +19,7 @@ from askbot.utils import html as html_utils
 from askbot.utils.diff import textDiff as htmldiff
 from askbot.utils.html import (absolutize_urls, sanitize_html, site_link, site_url)
 from askbot.utils.slug import slugify
+from askbot.utils.translation import get_language
 
 LOG = logging.getLogger(__name__)
 
@@ -49,18 +50,29 @@ class BaseEmail(object):
     * `mock_contexts` - optional, may be replaced with custom methods
     like get_mock_context1, etc.
 
+    * `shared_template_name` - optional, name of the template
+      in the `template_path` directory with the part of the body
+      common to many recipients, available in `body.html`
+      as `shared_body`, see `get_shared_body()`
+
     plain text version of the email is calculated from body.html
     by stripping tags
+
+    `fragment_cache` - optional dictionary, shared by the emails
+    of the same kind sent to many recipients, where the shared
+    parts of the emails are kept, so that they are rendered once.
     """
 
     template_path = 'path/to/email/dir' #override in subclass
     title = 'A brief title for this email'
     description = 'In subclass, explain when/why this email might be sent'
     mock_contexts = ({},)
+    shared_template_name = None
 
-    def __init__(self, context=None):
+    def __init__(self, context=None, fragment_cache=None):
         self.context = context
         self._context_cache = dict()
+        self.fragment_cache = fragment_cache
 
     @classmethod
     def get_cache_key(cls, key):
@@ -132,9 +144,41 @@ class BaseEmail(object):
 
         return ' '.join(template.render(Context(context)).split())
 
+    def get_shared_value(self, key, func):
+        """returns value from the fragment cache,
+        calculated by ``func`` once per fragment cache"""
+        if self.fragment_cache is None:
+            return func()
+        key = (self.template_path, get_language()) + tuple(key)
+        if key not in self.fragment_cache:
+            self.fragment_cache[key] = func()
+        return self.fragment_cache[key]
+
+    def get_shared_key(self, context):
+        """override to share the fragment rendered from
+        `shared_template_name` - must return tuple, equal
+        for the contexts, in which the fragment is the same,
+        or `None` if the fragment must be rendered for the context"""
+        return None
+
+    def render_shared_body(self, context):
+        template = get_template(self.template_path + '/' + self.shared_template_name)
+        return template.render(Context(context))
+
+    def get_shared_body(self, context):
+        key = self.get_shared_key(context)
+        if key is None:
+            return self.render_shared_body(context)
+        func = functools.partial(self.render_shared_body, context)
+        return self.get_shared_value(('shared_body',) + key, func)
+
     def render_body(self, context=None):
+        context = self.get_context(context)
+        if self.shared_template_name:
+            context = copy(context)
+            context['shared_body'] = mark_safe(self.get_shared_body(context))
         template = get_template(self.template_path + '/body.html')
-        body = template.render(Context(self.get_context(context)))
+        body = template.render(Context(context))
         return absolutize_urls(body)
 
     def send(self, recipient_list, raise_on_failure=False, headers=None, attachments=None):
@@ -158,6 +202,7 @@ class BaseEmail(object):
 
 class InstantEmailAlert(BaseEmail):
     template_path = 'email/instant_notification'
+    shared_template_name = 'post.html'
     title = _('Instant email notification')
     description = _('Sent to relevant users when a post is made or edited')
     preview_error_message = _(
@@ -349,7 +394,8 @@ class InstantEmailAlert(BaseEmail):
         #unhandled update_type 'post_shared' 
         #user_action = _('%(user)s shared a %(post_link)s.')
 
-        origin_post = post.get_origin_post()
+        origin_post = self.get_shared_value(('origin_post', post.id),
+                                            post.get_origin_post)
         post_url = site_url(post.get_absolute_url())
 
         can_reply = to_user.can_post_by_email()
@@ -379,6 +425,34 @@ class InstantEmailAlert(BaseEmail):
         }
 
 
+    def get_author_ids(self, post):
+        """ids of the users whose names are shown in the post html"""
+        posts = [post] + post.get_parent_post_chain()
+        author_ids = set([item.author_id for item in posts])
+        author_ids.add(post.last_edited_by_id)
+        return author_ids
+
+    def get_shared_key(self, context):
+        """post html is shared by the recipients who see no private
+        data of the authors (see filter `can_see_private_user_data`)"""
+        from askbot.models import User
+        recipient = context['recipient_user']
+        if not isinstance(recipient, User):
+            return None
+        if askbot_settings.SHOW_ADMINS_PRIVATE_USER_DATA \
+            and recipient.is_administrator_or_moderator():
+            return None
+
+        post = context['post']
+        author_ids = self.get_shared_value(
+                                ('author_ids', post.id),
+                                functools.partial(self.get_author_ids, post)
+                            )
+        if recipient.id in author_ids:
+            return None
+        return (post.id, context['update_activity'].id)
+
+
 class ReplyByEmailError(BaseEmail):
     template_path = 'email/reply_by_email_error'
     title = _('Error processing post sent by email')
@@ -589,6 +663,7 @@ class ModerationQueueNotification(BaseEmail):
 
 class BatchEmailAlert(BaseEmail):
     template_path = 'email/batch_email_alert'
+    shared_template_name = 'questions.html'
     title = _('Batch email alert')
     description = _('Contains daily of weekly batches of email updates')
     preview_error_message = _(
@@ -612,9 +687,15 @@ class BatchEmailAlert(BaseEmail):
         })
         return context
 
+    def get_shared_key(self, context):
+        """list of the questions is shared by the users
+        with the same updates"""
+        return tuple([(question['url'], question['info'], question['title']) \
+                                        for question in context['questions']])
+
     def get_mock_context(self):
         from askbot.models import Post, Thread
-        from askbot.management.commands.send_email_alerts import format_action_count
+        from askbot.mail.digests import format_action_count
 
         qdata = list()
         qq = Post.objects.filter(post_type='question')[:2]
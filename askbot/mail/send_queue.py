@@ -0,0 +1,222 @@
+"""Outgoing email queue.
+
+With ``ASKBOT_MAIL_QUEUE_ENABLED = True`` function
+:func:`askbot.mail.send_mail` stores the rendered messages in the
+``askbot_queued_email`` table instead of opening an smtp connection
+for each of them. Function :func:`send_queued` sends the queued
+messages over ``ASKBOT_MAIL_QUEUE_CONNECTIONS`` smtp connections,
+kept open for the whole run, each connection sends its batches
+of ``ASKBOT_MAIL_QUEUE_BATCH_SIZE`` messages in a separate thread.
+It must be run periodically, either by the celery task
+``askbot.tasks.send_queued_email`` or by the management command
+``send_queued_email``.
+
+Each run claims the messages it sends in the database, so concurrent
+runs, e.g. of the command and of the celery task, send different
+messages. Messages which could not be sent are retried with exponential
+backoff, at most ``MAX_ATTEMPTS`` times. With
+``ASKBOT_MAIL_QUEUE_DOMAIN_RATE`` greater than zero at most that many
+messages per minute are sent to each recipient domain, messages over
+the limit wait for the next run, while messages to other domains
+are sent.
+
+Messages with attachments are not queued.
+"""
+import datetime
+import logging
+import Queue
+import threading
+import time
+
+from django.conf import settings as django_settings
+from django.core import mail as django_mail
+from django.utils import timezone
+
+from askbot.utils.cache_queue import incr_counter
+from askbot.utils.functions import generate_random_key
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 60 # seconds before the first retry, doubled after each attempt
+MAX_MESSAGES = 10000 # messages sent per run
+CLAIM_SIZE = 1000 # messages claimed by the run at once
+CLAIM_TIMEOUT = 600 # seconds the claimed messages are reserved for the run
+BATCH_SIZE = 500 # ids per database query
+
+LOG = logging.getLogger(__name__)
+
+
+def is_enabled():
+    return django_settings.ASKBOT_MAIL_QUEUE_ENABLED
+
+
+def get_domain(email):
+    return email.rsplit('@', 1)[-1].strip().lower()
+
+
+def get_retry_delay(attempts):
+    """delay after the given number of failed attempts"""
+    return datetime.timedelta(seconds=RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def enqueue(subject_line, body_text, from_email, email_list, headers=None):
+    from askbot.models import QueuedEmail
+    return QueuedEmail.objects.enqueue(
+                subject_line, body_text, from_email, email_list, headers=headers
+            )
+
+
+class DomainThrottle(object):
+    """Counts messages sent to each recipient domain
+    within the current minute, the counters are kept in cache,
+    so the limit is shared by the processes sending the queue.
+    """
+    def __init__(self, rate):
+        self.rate = rate
+
+    def get_key(self, domain):
+        minute = int(time.time() // 60)
+        return 'mail-queue-domain-%s-%d' % (domain, minute)
+
+    def acquire(self, domain):
+        """True, if one more message may be sent to the domain now"""
+        if self.rate <= 0:
+            return True
+        return incr_counter(self.get_key(domain), timeout=120) <= self.rate
+
+
+class ConnectionPool(object):
+    """Email backend connections, one per thread, opened once
+    and reused for all the batches sent by :meth:`send`.
+
+    ``backend`` and ``backend_kwargs`` are passed to
+    ``django.core.mail.get_connection()``.
+    """
+    def __init__(self, size, backend=None, **backend_kwargs):
+        self.size = max(size, 1)
+        self.backend = backend
+        self.backend_kwargs = backend_kwargs
+
+    def send(self, batches):
+        """sends the batches - lists of (message id, message),
+        returns tuple (list of ids of the sent messages,
+        dictionary id -> error text of the failed messages)"""
+        pending = Queue.Queue()
+        for batch in batches:
+            pending.put(batch)
+
+        sent = list()
+        failed = dict()
+        lock = threading.Lock()
+
+        def work():
+            connection = django_mail.get_connection(self.backend, **self.backend_kwargs)
+            try:
+                while True:
+                    try:
+                        batch = pending.get_nowait()
+                    except Queue.Empty:
+                        return
+                    batch_sent, batch_failed = self.send_batch(connection, batch)
+                    with lock:
+                        sent.extend(batch_sent)
+                        failed.update(batch_failed)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work) \
+                            for num in range(min(self.size, len(batches)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sent, failed
+
+    def send_batch(self, connection, batch):
+        """sends messages over the open connection,
+        one ``send_messages()`` call per message, so that
+        the error of one message does not fail, or resend,
+        the rest of the batch"""
+        sent = list()
+        failed = dict()
+        for message_id, message in batch:
+            try:
+                connection.open()
+                connection.send_messages([message])
+            except Exception as error:
+                LOG.warning('email %d not sent: %s', message_id, error)
+                failed[message_id] = unicode(error)
+                #the connection may be broken, it is reopened
+                #for the next message
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+            else:
+                sent.append(message_id)
+        return sent, failed
+
+
+def claim_messages(token, throttle, throttled_domains, count):
+    """claims at most ``count`` due messages for the run,
+    skipping messages to the domains over the rate limit,
+    which are added to the set ``throttled_domains``.
+    Returns list of the claimed ``QueuedEmail`` objects."""
+    from askbot.models import QueuedEmail
+    now = timezone.now()
+    selected = list()
+    last_id = 0
+    while len(selected) < count:
+        due = QueuedEmail.objects.get_due(now).filter(id__gt=last_id)
+        if throttled_domains:
+            due = due.exclude(domain__in=throttled_domains)
+        rows = list(due.values_list('id', 'domain')[:count])
+        if len(rows) == 0:
+            break
+        for email_id, domain in rows:
+            last_id = email_id
+            if domain in throttled_domains:
+                continue
+            if throttle.acquire(domain):
+                selected.append(email_id)
+                if len(selected) == count:
+                    break
+            else:
+                throttled_domains.add(domain)
+
+    until = now + datetime.timedelta(seconds=CLAIM_TIMEOUT)
+    return QueuedEmail.objects.claim(selected, token, until, now=now)
+
+
+def send_queued(connection_count=None, batch_size=None,
+                backend=None, **backend_kwargs):
+    """sends the due messages of the queue,
+    returns tuple (number of sent messages, number of failures).
+
+    Messages are claimed in the database in chunks, so that
+    concurrent runs do not send the same messages."""
+    from askbot.models import QueuedEmail
+    connection_count = connection_count or django_settings.ASKBOT_MAIL_QUEUE_CONNECTIONS
+    batch_size = batch_size or django_settings.ASKBOT_MAIL_QUEUE_BATCH_SIZE
+
+    token = generate_random_key(length=16)
+    throttle = DomainThrottle(django_settings.ASKBOT_MAIL_QUEUE_DOMAIN_RATE)
+    throttled_domains = set()
+    pool = ConnectionPool(connection_count, backend, **backend_kwargs)
+    sent = failed = 0
+    while sent + failed < MAX_MESSAGES:
+        count = min(CLAIM_SIZE, MAX_MESSAGES - sent - failed)
+        claimed = claim_messages(token, throttle, throttled_domains, count)
+        if len(claimed) == 0:
+            break
+
+        messages = [(queued_email.id, queued_email.get_message()) \
+                                        for queued_email in claimed]
+        batches = [messages[start:start + batch_size] \
+                            for start in range(0, len(messages), batch_size)]
+        sent_ids, errors = pool.send(batches)
+
+        QueuedEmail.objects.delete_sent(sent_ids, token)
+        QueuedEmail.objects.record_failures(errors, token)
+        sent += len(sent_ids)
+        failed += len(errors)
+    return sent, failed
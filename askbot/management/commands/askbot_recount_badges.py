@@ -1,19 +1,24 @@
-"""Recounts user's badges"""
-from askbot import const
+"""Recounts user's badges
+
+python manage.py askbot_recount_badges [--workers 4]
+"""
+from askbot.management.commands.base import BaseBatchCommand
 from askbot.models import User
-from askbot.utils.console import ProgressBar
 from django.conf import settings as django_settings
-from django.core.management.base import NoArgsCommand
-from django.db import transaction
 from django.utils import translation
 
-class Command(NoArgsCommand):
+class Command(BaseBatchCommand):
+    message = 'Counting user badges'
+    item_name = 'users'
+
+    def get_queryset(self):
+        return User.objects.all()
 
-    def handle_noargs(self, *args, **kwargs):
+    def process_id_range(self, first_id, last_id):
         translation.activate(django_settings.LANGUAGE_CODE)
-        users = User.objects.all()
-        count = users.count()
-        msg = 'Counting user badges'
-        for user in ProgressBar(users.iterator(), count, msg):
+        users = User.objects.filter(id__range=(first_id, last_id))
+        count = 0
+        for user in users.iterator():
             user.recount_badges()
-            transaction.commit()
+            count += 1
+        return count
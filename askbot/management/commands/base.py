@@ -3,15 +3,22 @@ from askbot.models import Message
 from askbot.models import User
 from askbot.models import ImportedObjectInfo
 from askbot.models import ImportRun
+from askbot.utils import console
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings as django_settings
+from django.db import connection, transaction
+from django.db.models import Max, Min
 from bs4 import BeautifulSoup
 from collections import defaultdict
 from django.core import serializers
 from django.utils.encoding import smart_str
 from django.utils.translation import activate as activate_language
+import itertools
+import multiprocessing
 import os
 import sys
+import tempfile
+import time
 from tempfile import mkstemp
 
 class BaseImportXMLCommand(BaseCommand):
@@ -238,3 +245,133 @@ class BaseImportXMLCommand(BaseCommand):
         else:
             raise ValueError('unsupported operator "%s"' % operator)
         setattr(to_obj, to_param_name, value)
+
+
+#command run by the pool of worker processes,
+#inherited by the forked workers, see BaseBatchCommand
+_batch_command = None
+
+
+def _process_id_range(id_range):
+    return _batch_command.run_id_range(*id_range)
+
+
+class BaseBatchCommand(BaseCommand):
+    """Base command for processing all rows of a table
+    in ranges of consecutive ids:
+
+    * ranges are processed each in its own transaction,
+      optionally by a pool of processes (``--workers N``)
+    * upper id of the processed ranges is saved in a checkpoint
+      file, in the temporary directory or in ``--checkpoint-dir``,
+      so that an interrupted command continues from there,
+      unless it is started with ``--restart``
+    * progress is printed together with the number of rows per second
+
+    Subclasses define ``get_queryset()`` and
+    ``process_id_range(first_id, last_id)``, the latter
+    returns number of the processed rows. Preferably, ranges
+    are processed with set-based queries instead of row by row.
+    """
+    batch_size = 1000
+    message = 'Processing'
+    item_name = 'rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=self.batch_size,
+                            dest='batch_size', help='Number of ids per range')
+        parser.add_argument('--workers', type=int, default=1, dest='workers',
+                            help='Number of processes')
+        parser.add_argument('--restart', action='store_true', default=False,
+                            dest='restart',
+                            help='Ignore the saved progress, start from the first row')
+        parser.add_argument('--checkpoint-dir', default=tempfile.gettempdir(),
+                            dest='checkpoint_dir',
+                            help='Directory of the file with the saved progress')
+
+    def get_queryset(self):
+        raise NotImplementedError('Return query set of the processed rows')
+
+    def process_id_range(self, first_id, last_id):
+        raise NotImplementedError('Process rows with ids from first_id to last_id')
+
+    def run_id_range(self, first_id, last_id):
+        with transaction.atomic():
+            return self.process_id_range(first_id, last_id)
+
+    def get_checkpoint_path(self):
+        """path of the file with the id of the last processed row,
+        distinct per command and database"""
+        command_name = self.__module__.split('.')[-1]
+        db_name = os.path.basename(str(connection.settings_dict['NAME']))
+        file_name = 'askbot-%s-%s.checkpoint' % (command_name, db_name)
+        return os.path.join(self.options['checkpoint_dir'], file_name)
+
+    def get_checkpoint(self):
+        try:
+            with open(self.get_checkpoint_path()) as checkpoint_file:
+                return int(checkpoint_file.read().strip() or 0)
+        except (IOError, ValueError):
+            return 0
+
+    def save_checkpoint(self, last_id):
+        path = self.get_checkpoint_path()
+        #rename replaces the file at once, so it is never half written
+        with open(path + '.tmp', 'w') as checkpoint_file:
+            checkpoint_file.write(str(last_id))
+        os.rename(path + '.tmp', path)
+
+    def delete_checkpoint(self):
+        try:
+            os.remove(self.get_checkpoint_path())
+        except OSError:
+            pass
+
+    def get_id_ranges(self, after_id, batch_size):
+        """returns list of (first id, last id) tuples, covering
+        the rows with ids greater than ``after_id``"""
+        ids = self.get_queryset().filter(pk__gt=after_id).aggregate(
+                                        min_id=Min('pk'), max_id=Max('pk')
+                                    )
+        if ids['min_id'] is None:
+            return list()
+        return [(first_id, first_id + batch_size - 1) \
+                for first_id in range(ids['min_id'], ids['max_id'] + 1, batch_size)]
+
+    def handle(self, *args, **options):
+        self.options = options
+        if options['restart']:
+            self.delete_checkpoint()
+        checkpoint = self.get_checkpoint()
+        if checkpoint:
+            print('Continuing after id %d, use --restart to start over' % checkpoint)
+
+        total = self.get_queryset().filter(pk__gt=checkpoint).count()
+        ranges = self.get_id_ranges(checkpoint, options['batch_size'])
+        pool = None
+        if options['workers'] > 1 and len(ranges) > 1:
+            global _batch_command
+            _batch_command = self
+            #forked processes must open their own connections
+            connection.close()
+            pool = multiprocessing.Pool(options['workers'])
+            #results come in the order of ranges
+            results = pool.imap(_process_id_range, ranges)
+        else:
+            results = itertools.starmap(self.run_id_range, ranges)
+
+        print(self.message)
+        done = 0
+        start = time.time()
+        for (first_id, last_id), count in itertools.izip(ranges, results):
+            done += count
+            self.save_checkpoint(last_id)
+            console.print_rate_progress(done, total, time.time() - start,
+                                        self.item_name)
+        if pool:
+            pool.close()
+            pool.join()
+
+        self.delete_checkpoint()
+        console.print_rate_progress(done, total, time.time() - start,
+                                    self.item_name, nowipe=True)
@@ -0,0 +1,69 @@
+"""Measures throughput of the email digest pipeline
+of the ``send_email_alerts`` command, in users per second.
+
+python manage.py benchmark_email_alerts [--users 1000] [--chunk-size 200]
+
+Fill the database with synthetic data first, e.g. with
+``askbot_add_test_content``. The command makes daily digest
+subscriptions of the users due for the report and forgets
+the previously sent digests, so run it on a copy of the database.
+Emails are not sent, they are kept in the local memory outbox.
+"""
+from __future__ import print_function
+import time
+
+from django.core import mail
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.utils import translation
+
+from askbot import const
+from askbot.models import Activity, EmailFeedSetting, User
+from askbot.mail import digests
+from askbot.utils import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks building and sending of the email digests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, dest='users')
+        parser.add_argument('--chunk-size', type=int, default=digests.CHUNK_SIZE,
+                            dest='chunk_size')
+
+    def reset_subscriptions(self, user_ids):
+        """makes daily digests of the users due for the report"""
+        EmailFeedSetting.objects.filter(
+                                subscriber__id__in=user_ids,
+                                feed_type__in=('q_all', 'q_ask', 'q_ans', 'm_and_c')
+                            ).update(frequency='d', reported_at=None)
+        Activity.objects.filter(
+                        user__id__in=user_ids,
+                        activity_type=const.TYPE_ACTIVITY_EMAIL_UPDATE_SENT
+                    ).delete()
+
+    def handle(self, **options):
+        user_ids = list(User.objects.exclude(
+                                askbot_profile__status='b'
+                            ).values_list('id', flat=True)[:options['users']])
+        if not user_ids:
+            print('Add some users and questions first, e.g. with askbot_add_test_content')
+            return
+
+        digests.add_missing_subscriptions()
+        self.reset_subscriptions(user_ids)
+
+        backend = 'django.core.mail.backends.locmem.EmailBackend'
+        with override_settings(EMAIL_BACKEND=backend):
+            translation.activate('en')
+            mail.outbox = list()
+            chunks = list(digests.get_chunks(user_ids, options['chunk_size']))
+            start = time.time()
+            queries = benchmark.count_queries(
+                        lambda: [digests.send_digests(chunk) for chunk in chunks]
+                    )
+            seconds = time.time() - start
+
+        benchmark.print_rate('digests', len(user_ids), seconds, 'users')
+        print('%d emails sent, %.1f queries per user' % (
+                        len(mail.outbox), float(queries) / len(user_ids)))
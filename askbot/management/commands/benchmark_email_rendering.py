@@ -0,0 +1,89 @@
+"""Compares cost per recipient of rendering the instant email
+alert about a new answer, with the post html rendered for each
+recipient, as before, and rendered once and shared by the recipients.
+
+python manage.py benchmark_email_rendering [--recipients 200] [--depth 3]
+
+The question, the chain of ``depth`` answer and comments
+and the recipients are created in a transaction,
+which is rolled back at the end. No email is sent.
+"""
+from __future__ import print_function
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from askbot import const
+from askbot.mail.messages import InstantEmailAlert
+from askbot.models import Activity
+from askbot.utils import benchmark
+
+BODY_TEXT = 'Benchmark paragraph with *markdown* and a [link](http://example.com).\n\n'
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks rendering of instant email alerts for many recipients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=200, dest='recipients')
+        parser.add_argument('--depth', type=int, default=3, dest='depth',
+                            help='Number of the parent posts quoted in the alert')
+
+    def create_thread(self, author, depth):
+        """returns the deepest post of the thread"""
+        post = author.post_question(title='Benchmark email rendering question',
+                                    body_text=BODY_TEXT * 20,
+                                    tags='benchmark')
+        if depth > 0:
+            post = author.post_answer(question=post, body_text=BODY_TEXT * 20)
+        for num in range(depth - 1):
+            post = author.post_comment(parent_post=post, body_text='comment %d' % num)
+        return post
+
+    def render(self, post, activity, recipients, fragment_cache):
+        for recipient in recipients:
+            email = InstantEmailAlert({
+                'to_user': recipient,
+                'from_user': post.author,
+                'post': post,
+                'update_activity': activity
+            }, fragment_cache=fragment_cache)
+            email.render_subject()
+            email.render_body()
+
+    def handle(self, **options):
+        with transaction.atomic():
+            author = User.objects.create_user('benchmark-email-author',
+                                              'author@example.com')
+            post = self.create_thread(author, options['depth'])
+            recipients = [User.objects.create_user('benchmark-email-%d' % num,
+                                                   'user%d@example.com' % num) \
+                                        for num in range(options['recipients'])]
+            if post.is_comment():
+                activity_type = const.TYPE_ACTIVITY_COMMENT_ANSWER
+            elif post.is_answer():
+                activity_type = const.TYPE_ACTIVITY_ANSWER
+            else:
+                activity_type = const.TYPE_ACTIVITY_ASK_QUESTION
+            activity = Activity(
+                            user=author,
+                            content_object=post,
+                            activity_type=activity_type,
+                            question=post.get_origin_post()
+                        )
+            #loads the templates
+            self.render(post, activity, recipients[:1], None)
+
+            for label, fragment_cache in (('full render per recipient', None),
+                                          ('shared post html', dict())):
+                start = time.time()
+                self.render(post, activity, recipients, fragment_cache)
+                seconds = time.time() - start
+                benchmark.print_rate(label, len(recipients), seconds,
+                                     item_name='emails')
+                print('%-40s %.2fms per recipient' % ('',
+                                                     seconds * 1000 / len(recipients)))
+
+            transaction.set_rollback(True)
@@ -0,0 +1,96 @@
+"""Compares throughput of sending email with a new smtp connection
+for each message, as ``askbot.mail.send_mail`` does without the queue,
+and of sending the same messages through the mail queue over
+persistent pooled connections.
+
+python manage.py benchmark_mail_queue [--messages 500] [--connections 2]
+
+Messages are sent to a local smtp server started by the command,
+which only counts them. Queued messages are saved in a transaction,
+which is rolled back at the end.
+"""
+from __future__ import print_function
+import asyncore
+import smtpd
+import threading
+import time
+
+from django.core import mail as django_mail
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from askbot.mail import build_message
+from askbot.mail import send_queue
+from askbot.utils import benchmark
+
+SMTP_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+
+class CountingSMTPServer(smtpd.SMTPServer):
+    """smtp server, which discards the received messages"""
+    def __init__(self, *args, **kwargs):
+        smtpd.SMTPServer.__init__(self, *args, **kwargs)
+        self.count = 0
+
+    def process_message(self, peer, mailfrom, rcpttos, data):
+        self.count += 1
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks sending email through the mail queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500, dest='messages')
+        parser.add_argument('--connections', type=int, default=2, dest='connections')
+
+    def start_server(self):
+        server = CountingSMTPServer(('127.0.0.1', 0), None)
+        thread = threading.Thread(target=asyncore.loop, kwargs={'timeout': 0.1})
+        thread.daemon = True
+        thread.start()
+        return server
+
+    def get_backend_kwargs(self, server):
+        host, port = server.socket.getsockname()
+        return {'host': host, 'port': port, 'username': '', 'password': '',
+                'use_tls': False, 'use_ssl': False}
+
+    def get_messages(self, count):
+        return [('Benchmark message %d' % num,
+                 '<p>Message body %d</p>' % num,
+                 'noreply@example.com',
+                 ['user%d@example.com' % num]) for num in range(count)]
+
+    def handle(self, **options):
+        server = self.start_server()
+        backend_kwargs = self.get_backend_kwargs(server)
+        messages = self.get_messages(options['messages'])
+
+        #a new connection per message
+        start = time.time()
+        for subject, body, from_email, email_list in messages:
+            connection = django_mail.get_connection(SMTP_BACKEND, **backend_kwargs)
+            message = build_message(subject, body, from_email, email_list)
+            connection.send_messages([message])
+        benchmark.print_rate('connection per message', len(messages),
+                             time.time() - start, item_name='messages')
+
+        with transaction.atomic():
+            for subject, body, from_email, email_list in messages:
+                send_queue.enqueue(subject, body, from_email, email_list)
+            start = time.time()
+            sent, failed = send_queue.send_queued(
+                                connection_count=options['connections'],
+                                backend=SMTP_BACKEND,
+                                **backend_kwargs
+                            )
+            label = 'queue, %d connections' % options['connections']
+            benchmark.print_rate(label, sent, time.time() - start,
+                                 item_name='messages')
+            if failed:
+                print('%d messages failed' % failed)
+            transaction.set_rollback(True)
+
+        print('%d messages received by the server' % server.count)
+        server.close()
+
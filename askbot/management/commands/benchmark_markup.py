@@ -0,0 +1,58 @@
+"""Measures markdown to html conversions per second
+on the texts of the latest posts.
+
+python manage.py benchmark_markup [--posts 500]
+
+Compares conversion with a new parser for each text,
+with the cached parser and with the html cache,
+read after the first pass over the texts.
+"""
+from __future__ import print_function
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from askbot.models import Post
+from askbot.utils import benchmark
+from askbot.utils import markup
+from askbot.utils.html import sanitize_html, urlize_html
+
+
+def convert_with_new_parser(text):
+    """conversion as it was done without the parser cache"""
+    parser = markup.make_parser(markup.get_parser_config())
+    html = sanitize_html(parser.convert(text))
+    return sanitize_html(urlize_html(html))
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks conversion of markdown to html'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=500, dest='posts')
+
+    def time_conversions(self, label, texts, convert):
+        start = time.time()
+        for text in texts:
+            convert(text)
+        benchmark.print_rate(label, len(texts), time.time() - start,
+                             'conversions')
+
+    def handle(self, **options):
+        posts = Post.objects.exclude(text='').order_by('-id')
+        texts = list(posts.values_list('text', flat=True)[:options['posts']])
+        if len(texts) == 0:
+            print('Add some posts first')
+            return
+
+        self.time_conversions('new parser per text', texts, convert_with_new_parser)
+        with override_settings(ASKBOT_MARKUP_CACHE_TIMEOUT=0):
+            self.time_conversions('cached parser', texts,
+                                  markup.markdown_input_converter)
+        with override_settings(ASKBOT_MARKUP_CACHE_TIMEOUT=3600):
+            #first pass fills the html cache
+            self.time_conversions('cached parser, cold html cache', texts,
+                                  markup.markdown_input_converter)
+            self.time_conversions('cached parser, warm html cache', texts,
+                                  markup.markdown_input_converter)
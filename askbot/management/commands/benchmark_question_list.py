@@ -0,0 +1,54 @@
+"""Measures rendering of the thread summaries of a question
+list page with the warm cache - one cache request and one
+regex scan per summary as before, compared to the page of
+summaries read with one cache request and the tag urls
+substituted in one pass.
+
+python manage.py benchmark_question_list [--threads 50] [--repeat 5]
+"""
+from __future__ import print_function
+from django.conf import settings as django_settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.utils import translation
+
+from askbot.models import Thread
+from askbot.search.state_manager import SearchState
+from askbot.utils import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks rendering of the thread summaries of a question list page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=50, dest='threads',
+                            help='Number of threads on the page')
+        parser.add_argument('--repeat', type=int, default=5, dest='repeat')
+
+    def render_one_by_one(self, threads, search_state, visitor):
+        for thread in threads:
+            thread.get_summary_html(search_state=search_state, visitor=visitor)
+
+    def render_page(self, threads, search_state, visitor):
+        Thread.objects.get_summaries_html(threads, search_state=search_state,
+                                          visitor=visitor)
+
+    def handle(self, **options):
+        translation.activate(django_settings.LANGUAGE_CODE)
+        threads = list(Thread.objects.filter(
+                                deleted=False
+                            ).order_by('-last_activity_at')[:options['threads']])
+        if len(threads) == 0:
+            print('Add some questions first')
+            return
+
+        search_state = SearchState.get_empty()
+        visitor = AnonymousUser()
+        #warm up the cache
+        self.render_page(threads, search_state, visitor)
+
+        print('%d threads per page' % len(threads))
+        for label, render in (('one by one', self.render_one_by_one),
+                              ('page', self.render_page)):
+            run = lambda: render(threads, search_state, visitor)
+            benchmark.print_timing(label, benchmark.time_call(run, options['repeat']))
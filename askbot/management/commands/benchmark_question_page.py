@@ -0,0 +1,59 @@
+"""Counts database queries and time spent loading
+the post data and the summary of question threads,
+with the cache cold and warm, with groups enabled and disabled.
+
+python manage.py benchmark_question_page [--limit 20] [--username someone]
+
+With ``--username`` data is loaded as seen by that user,
+otherwise as seen by an anonymous visitor.
+"""
+from __future__ import print_function
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand
+
+from askbot.conf import settings as askbot_settings
+from askbot.models import Thread
+from askbot.utils import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks loading of the question page data with and without groups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, dest='limit',
+                            help='Number of the most active threads to load')
+        parser.add_argument('--username', default=None, dest='username',
+                            help='Load data as seen by this user')
+
+    def load_threads(self, threads, user):
+        for thread in threads:
+            thread.get_post_data_for_question_view(user=user)
+            thread.get_summary_html(visitor=user)
+
+    def handle(self, **options):
+        if options['username']:
+            user = User.objects.get(username=options['username'])
+        else:
+            user = AnonymousUser()
+
+        threads = list(Thread.objects.order_by('-last_activity_at')[:options['limit']])
+        if not threads:
+            print('No threads to load')
+            return
+
+        groups_enabled_backup = askbot_settings.GROUPS_ENABLED
+        try:
+            for groups_enabled in (False, True):
+                askbot_settings.update('GROUPS_ENABLED', groups_enabled)
+                print('groups enabled: %s' % groups_enabled)
+                for thread in threads:
+                    thread.clear_cached_data()
+
+                load = lambda: self.load_threads(threads, user)
+                cold = benchmark.count_queries(load)
+                warm = benchmark.count_queries(load)
+                print('  queries per thread, cold cache: %.1f' % (float(cold) / len(threads)))
+                print('  queries per thread, warm cache: %.1f' % (float(warm) / len(threads)))
+                benchmark.print_timing('  load, warm cache', benchmark.time_call(load))
+        finally:
+            askbot_settings.update('GROUPS_ENABLED', groups_enabled_backup)
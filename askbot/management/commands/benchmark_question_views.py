@@ -0,0 +1,75 @@
+"""Compares number of database writes caused by question
+visits with and without the write-behind view buffer.
+
+python manage.py benchmark_question_views [--visits 500] [--threads 10]
+
+Visits are simulated by sending the ``question_visited`` signal
+for the most active questions, on behalf of existing users.
+The view counts are really updated, so run it on a copy of the database.
+"""
+from __future__ import print_function
+import itertools
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from askbot import signals
+from askbot.models import Post, view_buffer
+from askbot.utils import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks database writes of question visits with and without buffering'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--visits', type=int, default=500, dest='visits')
+        parser.add_argument('--threads', type=int, default=10, dest='threads',
+                            help='Number of questions to visit')
+
+    def visit(self, questions, users, count):
+        factory = RequestFactory(
+                        HTTP_ACCEPT_LANGUAGE='en',
+                        HTTP_USER_AGENT='Mozilla/5.0 (benchmark)'
+                    )
+        pairs = itertools.cycle(itertools.product(questions, users))
+        for question, user in itertools.islice(pairs, count):
+            request = factory.get(question.get_absolute_url())
+            request.user = user
+            request.session = {}
+            signals.question_visited.send(None, request=request, question=question)
+
+    def handle(self, **options):
+        questions = list(Post.objects.filter(
+                                post_type='question', deleted=False
+                            ).select_related('thread').order_by(
+                                '-thread__last_activity_at'
+                            )[:options['threads']])
+        users = list(User.objects.all()[:20])
+        if not questions or not users:
+            print('Add some users and questions first')
+            return
+
+        count = options['visits']
+        for enabled in (False, True):
+            settings = {
+                'ASKBOT_VIEW_BUFFER_ENABLED': enabled,
+                'CELERY_ALWAYS_EAGER': True
+            }
+            with override_settings(**settings):
+                label = 'buffered' if enabled else 'direct'
+                start = time.time()
+                writes = benchmark.count_queries(
+                        lambda: self.visit(questions, users, count),
+                        writes_only=True
+                    )
+                if enabled:
+                    writes += benchmark.count_queries(
+                        lambda: view_buffer.flush(include_recent=True),
+                        writes_only=True
+                    )
+                seconds = time.time() - start
+                benchmark.print_rate(label + ', visits', count, seconds, 'visits')
+                benchmark.print_rate(label + ', db writes', writes, seconds, 'writes')
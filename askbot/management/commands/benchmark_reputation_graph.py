@@ -0,0 +1,84 @@
+"""Compares latency and number of queries of the data of the
+reputation graph on the user profile, sampled from the full
+reputation history with one query per point, as before, and
+read from the daily reputation buckets.
+
+python manage.py benchmark_reputation_graph [--reputes 200000] [--days 1500]
+
+A temporary user with the given number of ``Repute`` records,
+spread over the given number of days, is created
+in a transaction, which is rolled back at the end.
+"""
+from __future__ import print_function
+import datetime
+import math
+import random
+
+from django.conf import settings as django_settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from askbot.models import Repute, ReputationBucket
+from askbot.models.repute import REPUTATION_GRAPH_POINT_COUNT
+from askbot.utils import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the reputation graph data of a user with long history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reputes', type=int, default=200000, dest='reputes')
+        parser.add_argument('--days', type=int, default=1500, dest='days')
+        parser.add_argument('--repeat', type=int, default=3, dest='repeat')
+
+    def create_history(self, user, count, days):
+        start = timezone.now() - datetime.timedelta(days)
+        step = datetime.timedelta(days) / count
+        reputation = 1
+        reputes = list()
+        for num in range(count):
+            change = random.choice((10, 10, 5, 2, -2))
+            reputation = max(1, reputation + change)
+            reputes.append(Repute(user=user,
+                                  positive=max(change, 0),
+                                  negative=min(change, 0),
+                                  language_code=django_settings.LANGUAGE_CODE,
+                                  reputed_at=start + step * num,
+                                  reputation_type=1,
+                                  reputation=reputation))
+        Repute.objects.bulk_create(reputes, batch_size=1000)
+
+    def get_sampled_points(self, user):
+        """the sampling of the history used before the buckets"""
+        reputes = Repute.objects.filter(
+                                user=user,
+                                language_code=django_settings.LANGUAGE_CODE
+                            ).order_by('-reputed_at')
+        count = reputes.count()
+        step = count / float(REPUTATION_GRAPH_POINT_COUNT)
+        return [reputes[int(math.ceil(idx * step))].reputation \
+                                for idx in range(REPUTATION_GRAPH_POINT_COUNT)]
+
+    def get_bucket_points(self, user):
+        return ReputationBucket.objects.get_graph_points(
+                                user, django_settings.LANGUAGE_CODE
+                            )
+
+    def handle(self, **options):
+        with transaction.atomic():
+            user = User.objects.create_user('benchmark-reputation-graph',
+                                            'benchmark@example.com')
+            print('creating %d reputation records' % options['reputes'])
+            self.create_history(user, options['reputes'], options['days'])
+            bucket_count = ReputationBucket.objects.rebuild([user.id])
+            print('%d daily buckets' % bucket_count)
+
+            for label, get_points in (('sampled history', self.get_sampled_points),
+                                      ('daily buckets + lttb', self.get_bucket_points)):
+                run = lambda: get_points(user)
+                benchmark.print_timing(label, benchmark.time_call(run, options['repeat']))
+                print('%-40s %d queries' % ('', benchmark.count_queries(run)))
+
+            transaction.set_rollback(True)
@@ -0,0 +1,62 @@
+"""Measures html sanitizations per second
+on the html of the latest posts.
+
+python manage.py benchmark_sanitizer [--posts 500]
+
+Compares the tree building and the streaming sanitizers,
+prints share of the posts, which the streaming sanitizer
+passed to the tree builder, and the posts, for which
+the outputs of the two sanitizers differ.
+"""
+from __future__ import print_function
+import time
+
+from django.core.management.base import BaseCommand
+
+from askbot.models import Post
+from askbot.utils import benchmark
+from askbot.utils import html as html_utils
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks sanitization of the html of posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=500, dest='posts')
+
+    def time_sanitizer(self, label, texts, sanitize):
+        start = time.time()
+        for text in texts:
+            sanitize(text)
+        benchmark.print_rate(label, len(texts), time.time() - start,
+                             'sanitizations')
+
+    def count_tree_required(self, texts):
+        count = 0
+        for text in texts:
+            try:
+                list(html_utils.iter_sanitized_tokens(text))
+            except html_utils.TreeRequired:
+                count += 1
+        return count
+
+    def handle(self, **options):
+        posts = Post.objects.exclude(html='').order_by('-id')
+        texts = list(posts.values_list('html', flat=True)[:options['posts']])
+        if len(texts) == 0:
+            print('Add some posts first')
+            return
+
+        self.time_sanitizer('tree', texts, html_utils.sanitize_html_tree)
+        self.time_sanitizer('stream', texts, html_utils.sanitize_html_stream)
+
+        tree_required = self.count_tree_required(texts)
+        print('%d of %d posts sanitized via the tree builder' \
+                                            % (tree_required, len(texts)))
+
+        mismatches = 0
+        for text in texts:
+            if html_utils.sanitize_html_tree(text) != \
+                                html_utils.sanitize_html_stream(text):
+                mismatches += 1
+        print('%d posts with different output' % mismatches)
@@ -0,0 +1,45 @@
+"""Times reading of the livesettings values via
+``askbot_settings`` with and without the in-process
+settings snapshot.
+
+python manage.py benchmark_settings_reads [--reads 100] [--repeat 5]
+
+Each round reads ``--reads`` settings, about as many as
+a questions page render does, starting a new "request"
+before each round, so that the snapshot checks the
+settings generation token once per round.
+"""
+from __future__ import print_function
+from django.core.management.base import BaseCommand
+from django.core.signals import request_started
+from django.test.utils import override_settings
+
+from askbot.conf import settings as askbot_settings
+from askbot.utils import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks reading of the livesettings values'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reads', type=int, default=100, dest='reads',
+                            help='Number of settings read per round')
+        parser.add_argument('--repeat', type=int, default=5, dest='repeat')
+
+    def handle(self, **options):
+        keys = sorted(askbot_settings._ConfigSettings__instance.keys())
+        keys = (keys * (options['reads'] // len(keys) + 1))[:options['reads']]
+        #fill the shared cache
+        askbot_settings.load_snapshot()
+
+        def read_settings():
+            request_started.send(sender=self.__class__)
+            for key in keys:
+                getattr(askbot_settings, key)
+
+        print('%d settings reads per round' % len(keys))
+        for enabled in (False, True):
+            with override_settings(ASKBOT_SETTINGS_SNAPSHOT_ENABLED=enabled):
+                label = 'with snapshot' if enabled else 'without snapshot'
+                timing = benchmark.time_call(read_settings, options['repeat'])
+                benchmark.print_timing(label, timing)
@@ -0,0 +1,46 @@
+"""Compares latency and number of queries of the related
+questions on the question page, found by the tag overlap
+of up to 100 threads and read from the similar threads index.
+
+python manage.py benchmark_similar_threads [--threads 100]
+
+Run ``build_similar_threads`` first.
+"""
+from __future__ import print_function
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from askbot.models import Thread
+from askbot.models import similar_threads
+from askbot.utils import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the related questions with and without the index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=100, dest='threads')
+
+    def get_data(self, threads):
+        """reads the related questions as the
+        question page does on the cache miss"""
+        similar_threads.invalidate_cached_data([thread.id for thread in threads])
+        for thread in threads:
+            thread.get_similar_threads().data()
+
+    def handle(self, **options):
+        threads = list(Thread.objects.filter(deleted=False).order_by('-id')[:options['threads']])
+        if len(threads) == 0:
+            print('Add some questions first')
+            return
+
+        for enabled in (False, True):
+            label = 'index' if enabled else 'tag overlap'
+            with override_settings(ASKBOT_SIMILAR_THREADS_INDEX_ENABLED=enabled):
+                run = lambda: self.get_data(threads)
+                best, average = benchmark.time_call(run, 3)
+                per_thread = (best / len(threads), average / len(threads))
+                benchmark.print_timing(label + ' per question page', per_thread)
+                queries = benchmark.count_queries(run)
+                print('%-40s %.1f queries per question page' % (
+                                    '', float(queries) / len(threads)))
@@ -0,0 +1,75 @@
+"""Compares latency and number of queries of the question
+lists filtered by 1, 3 and 5 of the most used tags, with
+one join to the tags table per tag, as the search worked before,
+and with the tag names resolved by the tag dictionary and
+the threads selected by a single grouped subquery.
+
+python manage.py benchmark_tag_search [--repeat 5] [--explain]
+"""
+from __future__ import print_function
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.conf import settings as django_settings
+from django.utils import translation
+
+from askbot.models import Tag
+from askbot.models import Thread
+from askbot.search.state_manager import SearchState
+from askbot.utils import benchmark
+
+TAG_COUNTS = (1, 3, 5)
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks question lists filtered by several tags'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, dest='repeat')
+        parser.add_argument('--explain', action='store_true', default=False,
+                            dest='explain', help='Print the query plans')
+
+    def get_joined(self, tag_names):
+        threads = Thread.objects.filter(deleted=False)
+        for tag_name in tag_names:
+            threads = threads.filter(tags__name=tag_name)
+        return threads.order_by('-last_activity_at')
+
+    def get_grouped(self, tag_names):
+        search_state = SearchState(scope='all', sort='activity-desc',
+                                   tags=','.join(tag_names))
+        threads, meta_data = Thread.objects.run_advanced_search(
+                                        request_user=AnonymousUser(),
+                                        search_state=search_state
+                                    )
+        return threads
+
+    def run_page(self, get_threads, tag_names):
+        threads = get_threads(tag_names)
+        list(threads[:SearchState.get_empty().page_size])
+        threads.count()
+        return threads
+
+    def handle(self, **options):
+        translation.activate(django_settings.LANGUAGE_CODE)
+        tags = Tag.objects.filter(
+                        language_code=django_settings.LANGUAGE_CODE,
+                        deleted=False
+                    ).order_by('-used_count')
+        top_names = list(tags.values_list('name', flat=True)[:max(TAG_COUNTS)])
+        if len(top_names) == 0:
+            print('Add some tagged questions first')
+            return
+
+        for count in TAG_COUNTS:
+            tag_names = top_names[:count]
+            print('tags: %s' % ' '.join(tag_names))
+            for label, get_threads in (('  join per tag', self.get_joined),
+                                       ('  grouped subquery', self.get_grouped)):
+                run = lambda: self.run_page(get_threads, tag_names)
+                benchmark.print_timing(label, benchmark.time_call(run, options['repeat']))
+                print('%-40s %d queries' % ('', benchmark.count_queries(run)))
+                if options['explain']:
+                    threads = get_threads(tag_names)
+                    queryset = getattr(threads, 'listing_qs', threads)
+                    for line in benchmark.explain(queryset):
+                        print('    ' + line)
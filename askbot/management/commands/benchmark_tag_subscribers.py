@@ -0,0 +1,81 @@
+"""Compares time of matching tags against wildcard tag
+selections of many users - by looping through the users,
+as ``Post.get_global_tag_based_subscribers`` does, and with
+the prefix tree of the tag subscribers index.
+
+python manage.py benchmark_tag_subscribers [--users 100000] [--wildcards 3] [--repeat 5]
+
+Wildcards and tags are generated randomly, the database is not used.
+When there are questions in the database, resolution of the
+instant notification subscribers of the latest question
+is timed as well, with and without the cached index.
+"""
+from __future__ import print_function
+import random
+import string
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from askbot.models import Post
+from askbot.models import tag_subscribers
+from askbot.models.tag import tags_match_some_wildcard
+from askbot.utils import benchmark
+
+
+def random_word(min_length, max_length):
+    length = random.randint(min_length, max_length)
+    return ''.join(random.choice(string.ascii_lowercase[:8]) for _ in range(length))
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks matching of tags to wildcard tag subscriptions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, dest='users')
+        parser.add_argument('--wildcards', type=int, default=3, dest='wildcards',
+                            help='Number of wildcards per user')
+        parser.add_argument('--repeat', type=int, default=5, dest='repeat')
+
+    def handle(self, **options):
+        random.seed(1)
+        wildcards = dict()
+        for user_id in range(options['users']):
+            wildcards[user_id] = [random_word(2, 5) + '*' \
+                                    for _ in range(options['wildcards'])]
+        tag_names = [random_word(4, 10) for _ in range(5)]
+
+        def loop_users():
+            return set(user_id for user_id, user_wildcards in wildcards.items() \
+                        if tags_match_some_wildcard(tag_names, user_wildcards))
+
+        tree = tag_subscribers.WildcardTree()
+        for user_id, user_wildcards in wildcards.items():
+            for wildcard in user_wildcards:
+                tree.add(wildcard, user_id)
+
+        def match_tree():
+            user_ids = set()
+            for tag_name in tag_names:
+                user_ids.update(tree.match(tag_name))
+            return user_ids
+
+        assert(loop_users() == match_tree())
+        print('%d users, %d wildcards each, %d tags per post' % (
+                options['users'], options['wildcards'], len(tag_names)))
+        benchmark.print_timing('loop through users',
+                               benchmark.time_call(loop_users, options['repeat']))
+        benchmark.print_timing('prefix tree',
+                               benchmark.time_call(match_tree, options['repeat']))
+
+        questions = Post.objects.filter(post_type='question').order_by('-id')
+        question = questions.first()
+        if question is None:
+            return
+        print('subscribers of question %d:' % question.id)
+        for timeout in (0, 3600):
+            with override_settings(ASKBOT_TAG_SUBSCRIBERS_INDEX_TIMEOUT=timeout):
+                label = '  cached index' if timeout else '  database queries'
+                func = question.get_global_instant_notification_subscribers
+                benchmark.print_timing(label,
+                                benchmark.time_call(func, options['repeat']))
@@ -0,0 +1,59 @@
+"""Compares query plans and latency of the question list
+queries run against the joined thread/post/tag tables
+and against the denormalized thread listing table.
+
+python manage.py benchmark_thread_listing [--repeat 5] [--tag sometag]
+
+Run ``build_thread_listing`` first.
+"""
+from __future__ import print_function
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.conf import settings as django_settings
+from django.test.utils import override_settings
+from django.utils import translation
+
+from askbot.models import Thread
+from askbot.models.listing import LISTING_ORDER_BY_MAP
+from askbot.search.state_manager import SearchState
+from askbot.utils import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks question list queries with and without the listing table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, dest='repeat')
+        parser.add_argument('--tag', action='append', dest='tags', default=[],
+                            help='Add tag to the search, may be repeated')
+        parser.add_argument('--explain', action='store_true', default=False,
+                            dest='explain', help='Print the query plans')
+
+    def run_page(self, search_state, page_size):
+        threads, meta_data = Thread.objects.run_advanced_search(
+                                        request_user=AnonymousUser(),
+                                        search_state=search_state
+                                    )
+        list(threads[:page_size])
+        threads.count()
+        return threads
+
+    def handle(self, **options):
+        translation.activate(django_settings.LANGUAGE_CODE)
+        tags = ','.join(options['tags']) or None
+        for scope in ('all', 'unanswered'):
+            for sort in sorted(LISTING_ORDER_BY_MAP.keys()):
+                search_state = SearchState(scope=scope, sort=sort, tags=tags)
+                page_size = search_state.page_size
+                print('scope:%s sort:%s' % (scope, sort))
+                for enabled in (False, True):
+                    label = '  listing table' if enabled else '  joined tables'
+                    with override_settings(ASKBOT_THREAD_LISTING_ENABLED=enabled):
+                        run = lambda: self.run_page(search_state, page_size)
+                        timing = benchmark.time_call(run, options['repeat'])
+                        benchmark.print_timing(label, timing)
+                        if options['explain']:
+                            threads = run()
+                            queryset = getattr(threads, 'listing_qs', threads)
+                            for line in benchmark.explain(queryset[:page_size]):
+                                print('    ' + line)
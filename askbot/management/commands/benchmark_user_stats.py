@@ -0,0 +1,68 @@
+"""Compares latency and number of queries of the statistics
+on the overview tab of the user profile, aggregated from the votes,
+tags and awards of the user, as in each request before,
+and read from the saved ``UserStatsSnapshot``. Also measures
+the snapshots of a page of users read in bulk for the users list.
+
+python manage.py benchmark_user_stats [--user-id 1] [--repeat 5]
+
+By default the user with the most posts is measured. Snapshots
+are saved in a transaction, which is rolled back at the end.
+"""
+from __future__ import print_function
+from django.conf import settings as django_settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.test.utils import override_settings
+
+from askbot.conf import settings as askbot_settings
+from askbot.models import UserStatsSnapshot
+from askbot.utils import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks statistics of the user profile of a power user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, default=None, dest='user_id',
+                            help='Id of the user, by default - the most active one')
+        parser.add_argument('--repeat', type=int, default=5, dest='repeat')
+
+    def get_user(self, user_id):
+        if user_id:
+            return User.objects.get(id=user_id)
+        users = User.objects.annotate(
+                            post_count=Count('posts')
+                        ).order_by('-post_count')
+        return users[0] if users.exists() else None
+
+    def handle(self, **options):
+        user = self.get_user(options['user_id'])
+        if user is None:
+            print('Add some users first')
+            return
+
+        lang = django_settings.LANGUAGE_CODE
+        print('user %s, %d posts, %d votes' % (user.username,
+                                               user.posts.count(),
+                                               user.askbot_votes.count()))
+        with transaction.atomic():
+            with override_settings(ASKBOT_USER_STATS_MAX_AGE=3600):
+                UserStatsSnapshot.objects.refresh_snapshot(user, lang)
+                users = list(User.objects.order_by('-id')[:askbot_settings.USERS_PAGE_SIZE])
+                for listed_user in users:
+                    UserStatsSnapshot.objects.refresh_snapshot(listed_user, lang)
+
+                measured = (
+                    ('aggregated', lambda: UserStatsSnapshot.objects.compute(user, lang)),
+                    ('snapshot', lambda: UserStatsSnapshot.objects.get_for_user(user, lang)),
+                    ('users page, %d users' % len(users),
+                        lambda: UserStatsSnapshot.objects.get_for_users(users, lang)),
+                )
+                for label, run in measured:
+                    benchmark.print_timing(label, benchmark.time_call(run, options['repeat']))
+                    print('%-40s %d queries' % ('', benchmark.count_queries(run)))
+
+            transaction.set_rollback(True)
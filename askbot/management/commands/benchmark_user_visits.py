@@ -0,0 +1,63 @@
+"""Compares number of database queries per page view
+of a logged in user, caused by the ``ViewLogMiddleware``,
+with and without coalescing of the ``last_seen`` updates.
+
+python manage.py benchmark_user_visits [--requests 200] [--pause 20] [--interval 300]
+
+Browsing is simulated by requests of the same user,
+``--pause`` seconds apart. Visit times of the user are
+really updated, so run it on a copy of the database.
+"""
+from __future__ import print_function
+import datetime
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from askbot import signals
+from askbot.models import site_visits
+from askbot.utils import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks database queries of the page views by a logged in user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, dest='requests')
+        parser.add_argument('--pause', type=int, default=20, dest='pause',
+                            help='Seconds between the simulated requests')
+        parser.add_argument('--interval', type=int, default=300, dest='interval',
+                            help='Value of ASKBOT_LAST_SEEN_UPDATE_INTERVAL to test')
+
+    def browse(self, user, count, pause):
+        """sends the ``site_visited`` signal, as the
+        ``ViewLogMiddleware`` does on each request"""
+        start = timezone.now()
+        for num in range(count):
+            timestamp = start + datetime.timedelta(seconds=num * pause)
+            signals.site_visited.send(None, user=user, timestamp=timestamp)
+
+    def handle(self, **options):
+        user = User.objects.filter(is_active=True).first()
+        if user is None:
+            print('Add some users first')
+            return
+
+        count = options['requests']
+        for interval in (0, options['interval']):
+            with override_settings(ASKBOT_LAST_SEEN_UPDATE_INTERVAL=interval):
+                start = time.time()
+                queries = benchmark.count_queries(
+                            lambda: self.browse(user, count, options['pause'])
+                        )
+                if interval:
+                    queries += benchmark.count_queries(
+                            lambda: site_visits.flush(include_recent=True)
+                        )
+                seconds = time.time() - start
+                label = 'interval %ds' % interval
+                print('%s: %.2f queries per request' % (label, float(queries) / count))
+                benchmark.print_rate(label + ', requests', count, seconds, 'requests')
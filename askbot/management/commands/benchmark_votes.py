@@ -0,0 +1,57 @@
+"""Measures throughput of voting and the number of
+database queries per vote.
+
+python manage.py benchmark_votes [--voters 50] [--rounds 3]
+
+Active users vote up and then cancel their votes on
+the latest answer (or question) not authored by them.
+Votes and reputation are really changed,
+so run it on a copy of the database.
+"""
+from __future__ import print_function
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from askbot.models import Post
+from askbot.utils import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks processing of the votes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=50, dest='voters')
+        parser.add_argument('--rounds', type=int, default=3, dest='rounds')
+
+    def handle(self, **options):
+        posts = Post.objects.filter(post_type__in=('question', 'answer'),
+                                    deleted=False)
+        post = posts.order_by('-id').first()
+        if post is None:
+            print('Add some questions first')
+            return
+
+        voters = User.objects.filter(is_active=True).exclude(id=post.author_id)
+        voters = list(voters.order_by('id')[:options['voters']])
+        if len(voters) == 0:
+            print('Add some users first')
+            return
+
+        def vote(cancel):
+            for voter in voters:
+                voter.upvote(post, cancel=cancel)
+
+        count = 0
+        queries = 0
+        start = time.time()
+        for _ in range(options['rounds']):
+            for cancel in (False, True):
+                queries += benchmark.count_queries(lambda: vote(cancel))
+                count += len(voters)
+        seconds = time.time() - start
+
+        print('%s %d: %.1f queries per vote' % (
+                            post.post_type, post.id, float(queries) / count))
+        benchmark.print_rate('votes and cancellations', count, seconds, 'votes')
@@ -11,6 +11,6 @@ class Command(NoArgsCommand):
         translation.activate(django_settings.LANGUAGE_CODE)
         from askbot.conf import settings as askbot_settings
         #Just loads all the settings that way they will be in the cache
-        for key, value in askbot_settings._ConfigSettings__instance.items():
-            empty1 = getattr(askbot_settings, key)
+        #and in the settings snapshot of this process
+        askbot_settings.load_snapshot()
         print('cache pre-loaded')
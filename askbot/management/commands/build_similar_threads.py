@@ -0,0 +1,37 @@
+"""Rebuilds the index of the similar threads
+(``askbot_similar_thread``), which backs the related questions
+on the question page when ``ASKBOT_SIMILAR_THREADS_INDEX_ENABLED = True``.
+
+python manage.py build_similar_threads [--language en]
+"""
+from __future__ import print_function
+import time
+
+from django.core.management.base import BaseCommand
+
+from askbot.models import SimilarThread, Thread
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the index of the similar threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--language',
+            action='append',
+            dest='languages',
+            default=[],
+            help='Rebuild only the threads in the language, may be repeated.'
+        )
+
+    def handle(self, **options):
+        languages = options['languages']
+        if not languages:
+            languages = Thread.objects.values_list(
+                                    'language_code', flat=True
+                                ).distinct().order_by('language_code')
+        for language_code in languages:
+            start = time.time()
+            count = SimilarThread.objects.rebuild(language_code)
+            print('%s: %d threads indexed in %.1fs' % (
+                                language_code, count, time.time() - start))
@@ -0,0 +1,34 @@
+"""Rebuilds the denormalized thread listing table
+(``askbot_thread_listing``), which backs the question lists
+when ``ASKBOT_THREAD_LISTING_ENABLED = True``.
+
+python manage.py build_thread_listing
+"""
+from django.core.management.base import BaseCommand
+
+from askbot.models import Thread, ThreadListing
+from askbot.utils.console import ProgressBar
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the denormalized thread listing table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete-stale',
+            action='store_true',
+            dest='delete_stale',
+            default=False,
+            help='Delete listing rows of the threads that no longer exist.'
+        )
+
+    def handle(self, **options):
+        if options['delete_stale']:
+            thread_ids = Thread.objects.values('id')
+            ThreadListing.objects.exclude(thread_id__in=thread_ids).delete()
+
+        threads = Thread.objects.all()
+        count = threads.count()
+        message = 'Rebuilding thread listing'
+        for thread in ProgressBar(threads.iterator(), count, message):
+            ThreadListing.objects.refresh_thread(thread)
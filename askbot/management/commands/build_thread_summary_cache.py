@@ -1,14 +1,24 @@
-from django.core.management.base import BaseCommand
+"""Renders cached summary html of all threads.
+
+python manage.py build_thread_summary_cache [-l en -l de] [--workers 4]
+
+See ``askbot.management.commands.base.BaseBatchCommand``
+for the other options.
+"""
 from django.conf import settings as django_settings
 from django.utils import translation
 
+from askbot.management.commands.base import BaseBatchCommand
 from askbot.models import Thread
-from askbot.utils.console import ProgressBar
 
 
-class Command(BaseCommand):
+class Command(BaseBatchCommand):
+    batch_size = 100
+    message = 'Rebuilding thread summary cache'
+    item_name = 'threads'
 
     def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
         parser.add_argument(
             '-l',
             '--language',
@@ -16,12 +26,14 @@ class Command(BaseCommand):
             help='Specify the languages for which the cache has to be rebuilt.'
         )
 
-    def handle(self, **options):
-        languages = options['language'] or (django_settings.LANGUAGE_CODE,)
-        for l in languages:
-            translation.activate(l)
-            message = 'Rebuilding {0} thread summary cache'.format(l.upper())
-            count = Thread.objects.count()
-            for thread in ProgressBar(Thread.objects.iterator(),
-                                      count, message):
-                thread.update_summary_html()
+    def get_queryset(self):
+        return Thread.objects.all()
+
+    def process_id_range(self, first_id, last_id):
+        languages = self.options['language'] or (django_settings.LANGUAGE_CODE,)
+        threads = list(Thread.objects.filter(id__range=(first_id, last_id)))
+        for lang in languages:
+            with translation.override(lang):
+                for thread in threads:
+                    thread.update_summary_html()
+        return len(threads)
@@ -1,31 +1,49 @@
 """fix_answer_counts management command
 to run type (on the command line:)
 
-python manage.py fix_answer_counts
+python manage.py fix_answer_counts [--workers 4]
+
+Answers are counted for ranges of threads with one
+aggregate query, only the wrong counts are updated.
 """
-from django.core.management.base import NoArgsCommand
-from django.db.models import signals
+from django.db.models import Case, Count, IntegerField, Value, When
 from askbot import models
-from askbot.utils.console import ProgressBar
+from askbot.management.commands.base import BaseBatchCommand
 
-class Command(NoArgsCommand):
+class Command(BaseBatchCommand):
     """Command class for "fix_answer_counts"
     """
+    message = 'Fixing answer counts'
+    item_name = 'threads'
+
+    def get_queryset(self):
+        return models.Thread.objects.all()
+
+    def process_id_range(self, first_id, last_id):
+        """counts answers as ``Thread.update_answer_count()`` does"""
+        threads = models.Thread.objects.filter(id__range=(first_id, last_id))
+        answers = models.Post.objects.get_answers().filter(
+                                    deleted=False,
+                                    thread__id__range=(first_id, last_id)
+                                )
+        counts = dict(answers.values_list('thread_id').annotate(
+                                    count=Count('id', distinct=True)
+                                ).order_by())
 
-    def remove_save_signals(self):
-        """removes signals on model pre-save and
-        post-save, so that there are no side-effects
-        besides actually updating the answer counts
-        """
-        signals.pre_save.receivers = []
-        signals.post_save.receivers = []
+        old_counts = threads.values_list('id', 'answer_count')
+        wrong = dict()
+        for thread_id, answer_count in old_counts:
+            if counts.get(thread_id, 0) != answer_count:
+                wrong[thread_id] = counts.get(thread_id, 0)
 
-    def handle(self, *arguments, **options):
-        """function that handles the command job
-        """
-        self.remove_save_signals()
-        threads = models.Thread.objects.all()
-        count = threads.count()
-        message = 'Fixing answer counts'
-        for thread in ProgressBar(threads.iterator(), count, message):
-            thread.update_answer_count()
+        if wrong:
+            whens = [When(pk=thread_id, then=Value(count)) \
+                                    for thread_id, count in wrong.items()]
+            answer_count = Case(*whens, output_field=IntegerField())
+            models.Thread.objects.filter(id__in=wrong.keys()).update(
+                                                    answer_count=answer_count
+                                                )
+            models.ThreadListing.objects.filter(thread_id__in=wrong.keys()).update(
+                                                    answer_count=answer_count
+                                                )
+        return len(old_counts)
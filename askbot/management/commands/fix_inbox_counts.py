@@ -1,33 +1,43 @@
+from __future__ import print_function
+import sys
+from django.db import transaction
 from askbot.management import NoArgsJob
 from askbot import models
+from askbot.utils import console
 
-def fix_inbox_counts(user):
-    """a unit of job - returns True if change was made
-    and False otherwise
-    """
-    old_new_count = user.new_response_count
-    old_seen_count = user.seen_response_count
-
-    user.update_response_counts()
-
-    (changed1, changed2) = (False, False)
-    if user.new_response_count != old_new_count:
-        changed1 = True
-    if user.seen_response_count != old_seen_count:
-        changed2 = True
-
-    return (changed1 or changed2)
+BATCH_SIZE = 500
 
 class Command(NoArgsJob):
     """definition of the job that fixes response counts
     destined for the user inboxes
+
+    Users are recounted in batches with grouped queries,
+    see ``askbot.models.recount_response_counts()``
     """
     def __init__(self, *args, **kwargs):
         self.batches = ({
             'title': 'Checking inbox item counts for all users: ',
             'query_set': models.User.objects.all(),
-            'function': fix_inbox_counts,
             'changed_count_message': 'Corrected records for %d users',
             'nothing_changed_message': 'No problems found'
         },)
         super(Command, self).__init__(*args, **kwargs)
+
+    def run_batch(self, batch):
+        sys.stdout.write(batch['title'].encode('utf-8'))
+        user_ids = list(batch['query_set'].order_by('id').values_list('id', flat=True))
+        total_count = len(user_ids)
+        if total_count == 0:
+            return
+
+        changed_count = 0
+        for start in range(0, total_count, BATCH_SIZE):
+            chunk = user_ids[start:start + BATCH_SIZE]
+            with transaction.atomic():
+                changed_count += len(models.recount_response_counts(chunk))
+            console.print_progress(start + len(chunk), total_count)
+
+        if changed_count:
+            print(batch['changed_count_message'] % changed_count)
+        else:
+            print(batch['nothing_changed_message'])
@@ -1,25 +1,39 @@
-from django.core.management.base import NoArgsCommand
-from django.db.models import F
-from django.utils.translation import override
+"""Fixes incorrectly denormalized thread points
+by copying the value from the question of the thread.
 
-from askbot.models import Post
+python manage.py fix_thread_points [--workers 4]
+"""
+from django.db.models import Case, F, IntegerField, Value, When
 
+from askbot.management.commands.base import BaseBatchCommand
+from askbot.models import Post, Thread, ThreadListing
 
-class Command(NoArgsCommand):
+
+class Command(BaseBatchCommand):
     """
     Fix incorrectly denormalized thread points by copying the value from
     its question.
     """
-    def handle_noargs(self, *args, **kwargs):
-        questions = (Post.objects
-                     .filter(post_type='question')
-                     .exclude(points=F('thread__points'))
-                     .select_related('thread'))
+    message = 'Fixing thread points'
+    item_name = 'threads'
 
-        self.stdout.write('Fixing {0} threads...'.format(questions.count()))
+    def get_queryset(self):
+        return Thread.objects.all()
 
-        for post in questions:
-            with override(post.thread.language_code):
-                post.thread.points = post.points
-                post.thread.save()
-                post.thread.invalidate_cached_data()
+    def process_id_range(self, first_id, last_id):
+        questions = Post.objects.filter(
+                                post_type='question',
+                                thread__id__range=(first_id, last_id)
+                            ).exclude(points=F('thread__points'))
+        points = dict(questions.values_list('thread_id', 'points'))
+        if points:
+            whens = [When(pk=thread_id, then=Value(value)) \
+                                    for thread_id, value in points.items()]
+            new_points = Case(*whens, output_field=IntegerField())
+            Thread.objects.filter(id__in=points.keys()).update(points=new_points)
+            ThreadListing.objects.filter(thread_id__in=points.keys()).update(
+                                                            points=new_points
+                                                        )
+            for thread in Thread.objects.filter(id__in=points.keys()):
+                thread.clear_cached_data()
+        return Thread.objects.filter(id__range=(first_id, last_id)).count()
@@ -0,0 +1,20 @@
+"""Saves times of the user visits which were kept in cache,
+when ``ASKBOT_LAST_SEEN_UPDATE_INTERVAL`` is greater than zero.
+
+python manage.py flush_last_seen
+
+Run it every few minutes from cron, unless the celery task
+``askbot.tasks.flush_last_seen`` is scheduled instead.
+"""
+from django.core.management.base import BaseCommand
+
+from askbot.models import site_visits
+
+
+class Command(BaseCommand):
+    help = 'Saves times of the user visits kept in cache'
+
+    def handle(self, **options):
+        user_count = site_visits.flush()
+        if int(options.get('verbosity', 1)) > 0:
+            self.stdout.write('Updated last visit times of %d users' % user_count)
@@ -0,0 +1,23 @@
+"""Saves question view counts and visit times
+accumulated in cache, when ``ASKBOT_VIEW_BUFFER_ENABLED = True``.
+
+python manage.py flush_question_views
+
+Run it every minute or so from cron, unless the celery task
+``askbot.tasks.flush_question_views`` is scheduled instead.
+"""
+from django.core.management.base import BaseCommand
+
+from askbot.models import view_buffer
+
+
+class Command(BaseCommand):
+    help = 'Saves buffered question view counts and visit times'
+
+    def handle(self, **options):
+        thread_count, visit_count = view_buffer.flush()
+        if int(options.get('verbosity', 1)) > 0:
+            self.stdout.write(
+                'Updated view counts of %d threads, saved %d visits' \
+                                            % (thread_count, visit_count)
+            )
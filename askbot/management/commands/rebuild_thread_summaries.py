@@ -0,0 +1,39 @@
+"""Renders summaries of the threads changed since the
+previous run, when ``ASKBOT_THREAD_SUMMARY_REBUILD_ASYNC = True``.
+
+python manage.py rebuild_thread_summaries [--all-languages] [--stats]
+
+Run it every minute or so from cron, unless the celery task
+``askbot.tasks.rebuild_thread_summaries`` is scheduled instead.
+With ``--stats`` prints the counts of the threads marked for
+the rebuild and of the rebuilds avoided by coalescing.
+"""
+from django.core.management.base import BaseCommand
+
+from askbot.models import thread_cache
+
+
+class Command(BaseCommand):
+    help = 'Renders summaries of the recently changed threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all-languages', action='store_true',
+                            dest='all_languages', default=False,
+                            help='Render summaries in all languages of the site')
+        parser.add_argument('--stats', action='store_true', dest='stats',
+                            default=False,
+                            help='Print counts of marked and rebuilt threads')
+
+    def handle(self, **options):
+        count = thread_cache.rebuild(all_languages=options['all_languages'])
+        if int(options.get('verbosity', 1)) > 0:
+            self.stdout.write('Rebuilt summaries of %d threads' % count)
+
+        if options['stats']:
+            stats = thread_cache.get_stats()
+            avoided = stats['coalesced'] + stats['skipped']
+            self.stdout.write(
+                'marked: %(marked)d, coalesced: %(coalesced)d, '
+                'rendered: %(rebuilt)d, already rendered: %(skipped)d' % stats
+            )
+            self.stdout.write('rebuilds avoided: %d' % avoided)
@@ -0,0 +1,20 @@
+"""Recalculates the cached numbers of questions
+per language, scope and tag, which are otherwise adjusted
+incrementally and may drift over time.
+
+python manage.py reconcile_question_counts
+
+Run it periodically, e.g. from cron.
+"""
+from django.core.management.base import BaseCommand
+
+from askbot.search import question_counts
+
+
+class Command(BaseCommand):
+    help = 'Recalculates the cached question counts'
+
+    def handle(self, **options):
+        count = question_counts.reconcile_counts()
+        if int(options.get('verbosity', 1)) > 0:
+            self.stdout.write('Updated %d question counts' % count)
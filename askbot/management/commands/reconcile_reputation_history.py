@@ -0,0 +1,28 @@
+"""Recalculates the daily reputation buckets used
+by the reputation graph from the reputation history,
+which are otherwise updated as ``Repute`` records are saved.
+
+python manage.py reconcile_reputation_history [--workers 4]
+
+The buckets are filled on upgrade by the migration
+``0019_populate_reputation_buckets``, run the command
+periodically, e.g. from cron, to fix the drifted buckets.
+"""
+from askbot.management.commands.base import BaseBatchCommand
+from askbot.models import ReputationBucket
+from askbot.models import User
+
+
+class Command(BaseBatchCommand):
+    message = 'Recalculating reputation history'
+    item_name = 'users'
+
+    def get_queryset(self):
+        return User.objects.all()
+
+    def process_id_range(self, first_id, last_id):
+        user_ids = list(User.objects.filter(
+                                id__range=(first_id, last_id)
+                            ).values_list('id', flat=True))
+        ReputationBucket.objects.rebuild(user_ids)
+        return len(user_ids)
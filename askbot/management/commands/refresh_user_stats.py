@@ -0,0 +1,20 @@
+"""Refreshes statistics of the user profiles changed since the
+previous run, when ``ASKBOT_USER_STATS_MAX_AGE`` is not zero.
+
+python manage.py refresh_user_stats
+
+Run it every minute or so from cron, unless the celery task
+``askbot.tasks.refresh_user_stats`` is scheduled instead.
+"""
+from django.core.management.base import BaseCommand
+
+from askbot.models import user_stats
+
+
+class Command(BaseCommand):
+    help = 'Refreshes statistics of the recently active users'
+
+    def handle(self, **options):
+        count = user_stats.refresh()
+        if int(options.get('verbosity', 1)) > 0:
+            self.stdout.write('Refreshed %d snapshots of user statistics' % count)
@@ -0,0 +1,20 @@
+"""Sends the outgoing email queue, when
+``ASKBOT_MAIL_QUEUE_ENABLED`` is ``True``.
+
+python manage.py send_queued_email
+
+Run it every minute or so from cron, unless the celery task
+``askbot.tasks.send_queued_email`` is scheduled instead.
+"""
+from django.core.management.base import BaseCommand
+
+from askbot.mail import send_queue
+
+
+class Command(BaseCommand):
+    help = 'Sends the queued email messages'
+
+    def handle(self, **options):
+        sent, failed = send_queue.send_queued()
+        if int(options.get('verbosity', 1)) > 0:
+            self.stdout.write('Sent %d queued emails, %d failed' % (sent, failed))
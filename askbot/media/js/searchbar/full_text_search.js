@@ -242,6 +242,9 @@ FullTextSearch.prototype.renderFullTextSearchResult = function (data) {
     var old_list = $('#' + this._q_list_sel);
     var new_list = $('<div></div>').hide().html(data.questions);
     new_list.find('.timeago').timeago();
+    if (typeof markSummaryTags === 'function') {
+        markSummaryTags(new_list);
+    }
 
     var q_list_sel = this._q_list_sel;
     old_list.stop(true).after(new_list).fadeOut(200, function () {
@@ -104,6 +104,46 @@ TagDetailBox.prototype.renderFor = function (wildcard) {
     );
 };
 
+/**
+ * Adds classes "interesting" and "ignored" to the tags
+ * of the question summaries within the container,
+ * matching the tags marked in the sidebar.
+ * Summaries are cached and shared by all visitors,
+ * so the marks of the visitor are applied here.
+ */
+var markSummaryTags = function (container) {
+    var getMarkedNames = function (section) {
+        var names = [];
+        $('.' + section + '.tags.marked-tags .js-tag-name').each(
+            function (i, item) {
+                names.push($(item).attr('data-tag-name'));
+            }
+        );
+        return names;
+    };
+    var isMarked = function (tagName, markedNames) {
+        for (var i = 0; i < markedNames.length; i++) {
+            var name = markedNames[i];
+            if (/\*$/.test(name)) {
+                if (tagName.indexOf(name.slice(0, -1)) === 0) {
+                    return true;
+                }
+            } else if (tagName === name) {
+                return true;
+            }
+        }
+        return false;
+    };
+    var interestingNames = getMarkedNames('interesting');
+    var ignoredNames = getMarkedNames('ignored');
+    container.find('.short-summary .js-tag').each(function (i, item) {
+        var tag = $(item);
+        var tagName = tag.find('.js-tag-name').attr('data-tag-name') || '';
+        tag.toggleClass('interesting', isMarked(tagName, interestingNames));
+        tag.toggleClass('ignored', isMarked(tagName, ignoredNames));
+    });
+};
+
 function pickedTags() {
 
     var interestingTags = {};
@@ -405,6 +445,7 @@ function pickedTags() {
             collectPickedTags('interesting');
             collectPickedTags('ignored');
             collectPickedTags('subscribed');
+            markSummaryTags($('#question-list'));
             setupTagFilterControl('display');
             setupTagFilterControl('email');
             var ac = new AutoCompleter({
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('askbot', '0012_rename_related_name_to_auth_user_from_Vote'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThreadListing',
+            fields=[
+                ('thread', models.OneToOneField(related_name='listing', primary_key=True, serialize=False, to='askbot.Thread')),
+                ('question_post_id', models.IntegerField(null=True, blank=True)),
+                ('author_id', models.IntegerField(db_index=True, null=True, blank=True)),
+                ('language_code', models.CharField(default=settings.LANGUAGE_CODE, max_length=16, choices=settings.LANGUAGES)),
+                ('deleted', models.BooleanField(default=False)),
+                ('approved', models.BooleanField(default=True)),
+                ('closed', models.BooleanField(default=False)),
+                ('accepted_answer_id', models.IntegerField(null=True, blank=True)),
+                ('added_at', models.DateTimeField()),
+                ('last_activity_at', models.DateTimeField()),
+                ('answer_count', models.PositiveIntegerField(default=0)),
+                ('points', models.IntegerField(default=0)),
+                ('tag_ids', models.TextField(default='', blank=True)),
+                ('group_ids', models.TextField(default='', blank=True)),
+            ],
+            options={
+                'db_table': 'askbot_thread_listing',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterIndexTogether(
+            name='threadlisting',
+            index_together=set([
+                ('language_code', 'deleted', 'added_at'),
+                ('language_code', 'deleted', 'last_activity_at'),
+                ('language_code', 'deleted', 'answer_count'),
+                ('language_code', 'deleted', 'points'),
+            ]),
+        ),
+    ]
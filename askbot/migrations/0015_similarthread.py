@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('askbot', '0014_dailyreputationgain'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarThread',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('score', models.FloatField()),
+                ('similar_thread', models.ForeignKey(related_name='similar_to', to='askbot.Thread')),
+                ('thread', models.ForeignKey(related_name='similar_thread_links', to='askbot.Thread')),
+            ],
+            options={
+                'db_table': 'askbot_similar_thread',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='similarthread',
+            unique_together=set([('thread', 'similar_thread')]),
+        ),
+    ]
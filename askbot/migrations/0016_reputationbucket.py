@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('askbot', '0015_similarthread'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReputationBucket',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('language_code', models.CharField(default=settings.LANGUAGE_CODE, max_length=16, choices=settings.LANGUAGES)),
+                ('day', models.DateField()),
+                ('reputation', models.IntegerField()),
+                ('reputed_at', models.DateTimeField()),
+                ('repute_count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(related_name='reputation_buckets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'askbot_reputation_bucket',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='reputationbucket',
+            unique_together=set([('user', 'language_code', 'day')]),
+        ),
+    ]
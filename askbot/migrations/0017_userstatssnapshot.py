@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.conf import settings
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('askbot', '0016_reputationbucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStatsSnapshot',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('language_code', models.CharField(default=settings.LANGUAGE_CODE, max_length=16, choices=settings.LANGUAGES)),
+                ('up_votes', models.PositiveIntegerField(default=0)),
+                ('down_votes', models.PositiveIntegerField(default=0)),
+                ('tag_usage', models.TextField(default='[]')),
+                ('awards', models.TextField(default='[]')),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(related_name='stats_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'askbot_user_stats_snapshot',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='userstatssnapshot',
+            unique_together=set([('user', 'language_code')]),
+        ),
+    ]
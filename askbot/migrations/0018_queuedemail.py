@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('askbot', '0017_userstatssnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedEmail',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('subject', models.TextField()),
+                ('body', models.TextField()),
+                ('from_email', models.CharField(max_length=254)),
+                ('recipients', models.TextField()),
+                ('headers', models.TextField(default='{}')),
+                ('domain', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, db_index=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(default='', blank=True)),
+            ],
+            options={
+                'db_table': 'askbot_queued_email',
+            },
+            bases=(models.Model,),
+        ),
+    ]
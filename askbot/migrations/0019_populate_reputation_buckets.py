@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from __future__ import print_function
+
+from django.db import migrations
+from askbot.models.repute import get_reputation_day
+from askbot.utils.console import ProgressBar
+
+
+def populate_reputation_buckets(apps, schema_editor):
+    """fills the daily reputation buckets, used by the
+    reputation graph, from the reputation history"""
+    Repute = apps.get_model('askbot', 'Repute')
+    ReputationBucket = apps.get_model('askbot', 'ReputationBucket')
+    #buckets added since the table was created may miss older records
+    ReputationBucket.objects.all().delete()
+
+    reputes = Repute.objects.order_by(
+                            'user', 'language_code', 'reputed_at', 'id'
+                        ).values_list(
+                            'user_id', 'language_code', 'reputed_at', 'reputation'
+                        )
+    message = 'Calculating daily reputation buckets'
+    print('')
+    buckets = list()
+    bucket = None
+    for user_id, language_code, reputed_at, reputation in \
+            ProgressBar(reputes.iterator(), reputes.count(), message):
+        day = get_reputation_day(reputed_at)
+        if bucket is None or (bucket.user_id, bucket.language_code, bucket.day) \
+                                    != (user_id, language_code, day):
+            bucket = ReputationBucket(user_id=user_id,
+                                      language_code=language_code,
+                                      day=day, repute_count=0)
+            buckets.append(bucket)
+        bucket.reputation = reputation
+        bucket.reputed_at = reputed_at
+        bucket.repute_count += 1
+        #the last bucket may still change
+        if len(buckets) > 500:
+            ReputationBucket.objects.bulk_create(buckets[:-1])
+            buckets = buckets[-1:]
+
+    ReputationBucket.objects.bulk_create(buckets)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('askbot', '0018_queuedemail'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_reputation_buckets, migrations.RunPython.noop),
+    ]
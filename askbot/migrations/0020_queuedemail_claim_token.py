@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('askbot', '0019_populate_reputation_buckets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queuedemail',
+            name='claim_token',
+            field=models.CharField(default='', max_length=16, blank=True),
+        ),
+    ]
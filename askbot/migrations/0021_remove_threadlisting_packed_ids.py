@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('askbot', '0020_queuedemail_claim_token'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='threadlisting',
+            name='group_ids',
+        ),
+        migrations.RemoveField(
+            model_name='threadlisting',
+            name='tag_ids',
+        ),
+    ]
@@ -26,7 +26,7 @@ from django.utils.translation import ungettext, override
 from django.utils.safestring import mark_safe
 from django.utils.html import escape
 from django.db import models
-from django.db.models import Count, Q
+from django.db.models import Case, Count, F, IntegerField, Q, Value, When
 from django.conf import settings as django_settings
 from django.contrib.contenttypes.models import ContentType
 from django.core.cache import cache
@@ -36,12 +36,23 @@ from askbot import exceptions as askbot_exceptions
 from askbot import const
 from askbot.const import message_keys
 from askbot.conf import settings as askbot_settings
-from askbot.models.question import Thread
+from askbot.models.question import Thread, ThreadToGroup
 from askbot.skins import utils as skin_utils
 from askbot.mail.messages import WelcomeEmail, WelcomeEmailRespondable
 from askbot.models.question import QuestionView, AnonymousQuestion
 from askbot.models.question import DraftQuestion
 from askbot.models.question import FavoriteQuestion
+from askbot.models.listing import ThreadListing
+from askbot.models import listing as thread_listing
+from askbot.models.similar_threads import SimilarThread
+from askbot.models import similar_threads
+from askbot.models import site_visits
+from askbot.models import tag_dictionary
+from askbot.models import tag_preferences
+from askbot.models import tag_subscribers
+from askbot.models import user_stats
+from askbot.models import view_buffer
+from askbot.search import question_counts
 from askbot.models.message import Message
 from askbot.models.tag import Tag, MarkedTag, TagSynonym
 from askbot.models.tag import format_personal_group_name
@@ -57,11 +68,18 @@ from askbot.models.user_profile import (
                                 add_profile_properties,
                                 UserProfile,
                                 LocalizedUserProfile,
-                                get_localized_profile_cache_key
+                                get_localized_profile_cache_key,
+                                get_profile,
+                                get_profile_cache_key,
+                                get_profile_cache_key_by_id
                             )
 from askbot.models.reply_by_email import ReplyAddress
 from askbot.models.badges import award_badges_signal, get_badge
 from askbot.models.repute import Award, Repute, Vote, BadgeData
+from askbot.models.repute import DailyReputationGain
+from askbot.models.repute import ReputationBucket
+from askbot.models.user_stats import UserStatsSnapshot
+from askbot.models.mail_queue import QueuedEmail
 from askbot.models.widgets import AskWidget, QuestionWidget
 from askbot.models.meta import ImportRun, ImportedObjectInfo
 from askbot import auth
@@ -385,6 +403,26 @@ def user_get_old_vote_for_post(self, post):
     except Vote.MultipleObjectsReturned:
         raise AssertionError
 
+def user_get_tag_preferences(self, language_code=None):
+    """returns cached tag selections and tag filter strategies
+    of the user, see ``askbot.models.tag_preferences``,
+    the value is memoized on the user object"""
+    language_code = language_code or get_language()
+    preferences_cache = getattr(self, '_tag_preferences_cache', None)
+    if preferences_cache is None:
+        preferences_cache = dict()
+        self._tag_preferences_cache = preferences_cache
+    preferences = preferences_cache.get(language_code)
+    if preferences is None:
+        preferences = tag_preferences.get_tag_preferences(self, language_code)
+        preferences_cache[language_code] = preferences
+    return preferences
+
+def user_invalidate_tag_preferences(self):
+    """forgets memoized and cached tag preferences"""
+    self._tag_preferences_cache = None
+    tag_preferences.invalidate(self.id)
+
 def user_get_marked_tags(self, reason):
     """reason is a type of mark: good, bad or subscribed"""
     assert(reason in ('good', 'bad', 'subscribed'))
@@ -392,11 +430,8 @@ def user_get_marked_tags(self, reason):
         if askbot_settings.SUBSCRIBED_TAG_SELECTOR_ENABLED == False:
             return Tag.objects.none()
 
-    return Tag.objects.filter(
-        user_selections__user=self,
-        user_selections__reason=reason,
-        language_code=get_language()
-    )
+    tag_ids = self.get_tag_preferences().get_tag_ids(reason)
+    return Tag.objects.filter(id__in=tag_ids)
 
 MARKED_TAG_PROPERTY_MAP = {
     'good': 'interesting_tags',
@@ -412,13 +447,11 @@ def user_get_marked_tag_names(self, reason):
         if askbot_settings.SUBSCRIBED_TAG_SELECTOR_ENABLED == False:
             return list()
 
-    tags = self.get_marked_tags(reason)
-    tag_names = list(tags.values_list('name', flat = True))
+    preferences = self.get_tag_preferences()
+    tag_names = preferences.get_tag_names(reason)
 
     if askbot_settings.USE_WILDCARD_TAGS:
-        attr_name = MARKED_TAG_PROPERTY_MAP[reason]
-        wildcard_tags = getattr(self, attr_name).split()
-        tag_names.extend(wildcard_tags)
+        tag_names.extend(preferences.get_wildcards(reason))
 
     return tag_names
 
@@ -430,28 +463,26 @@ def user_has_affinity_to_question(self, question = None, affinity_type = None):
     if affinity_type == 'like':
         if askbot_settings.SUBSCRIBED_TAG_SELECTOR_ENABLED:
             tag_selection_type = 'subscribed'
-            wildcards = self.subscribed_tags.split()
         else:
             tag_selection_type = 'good'
-            wildcards = self.interesting_tags.split()
     elif affinity_type == 'dislike':
         tag_selection_type = 'bad'
-        wildcards = self.ignored_tags.split()
     else:
         raise ValueError('unexpected affinity type %s' % str(affinity_type))
 
-    question_tags = question.thread.tags.all()
-    intersecting_tag_selections = self.tag_selections.filter(
-                                                tag__in = question_tags,
-                                                reason = tag_selection_type
-                                            )
+    thread = question.thread
+    preferences = self.get_tag_preferences(thread.language_code)
+    question_tags = thread.tags.all()
     #count number of overlapping tags
-    if intersecting_tag_selections.count() > 0:
-        return True
-    elif askbot_settings.USE_WILDCARD_TAGS == False:
+    marked_ids = set(preferences.get_tag_ids(tag_selection_type))
+    for tag in question_tags:
+        if tag.id in marked_ids:
+            return True
+    if askbot_settings.USE_WILDCARD_TAGS == False:
         return False
 
     #match question tags against wildcards
+    wildcards = preferences.get_wildcards(tag_selection_type)
     for tag in question_tags:
         for wildcard in wildcards:
             if tag.name.startswith(wildcard[:-1]):
@@ -1577,6 +1608,11 @@ def user_mark_tags(
                 marked_ts.update(reason=reason)
             cleaned_tagnames = tagnames
 
+    if tag_subscribers.is_enabled():
+        #marks changed with update() and delete() queries send no signals
+        tags = [(name, language_code) for name in tagnames]
+        tag_subscribers.update_user_tags(self.id, tags)
+    self.invalidate_tag_preferences()
     return cleaned_tagnames, cleaned_wildcards
 
 def user_merge_duplicate_questions(self, from_q, to_q):
@@ -2358,29 +2394,34 @@ def user_post_answer(
     )
     return answer_post
 
-def user_visit_question(self, question = None, timestamp = None):
+def user_visit_question(self, question = None, timestamp = None,
+                        update_view_record = True):
     """create a QuestionView record
     on behalf of the user represented by the self object
     and mark it as taking place at timestamp time
 
     and remove pending on-screen notifications about anything in
     the post - question, answer or comments
+
+    ``update_view_record = False`` skips the QuestionView record,
+    when it is saved via the view buffer, see askbot.models.view_buffer
     """
     if timestamp is None:
         timestamp = timezone.now()
 
-    try:
-        QuestionView.objects.filter(
-            who=self, question=question
-        ).update(
-            when = timestamp
-        )
-    except QuestionView.DoesNotExist:
-        QuestionView(
-            who=self,
-            question=question,
-            when = timestamp
-        ).save()
+    if update_view_record:
+        try:
+            QuestionView.objects.filter(
+                who=self, question=question
+            ).update(
+                when = timestamp
+            )
+        except QuestionView.DoesNotExist:
+            QuestionView(
+                who=self,
+                question=question,
+                when = timestamp
+            ).save()
 
     #filter memo objects on response activities directed to the qurrent user
     #that refer to the children of the currently
@@ -2650,44 +2691,20 @@ def user_get_tag_filtered_questions(self, questions = None):
     if questions is None:
         questions = Post.objects.get_questions()
 
-    language_code = get_language()
-
-    if self.email_tag_filter_strategy == const.EXCLUDE_IGNORED:
-
-        ignored_tags = Tag.objects.filter(
-                                user_selections__reason = 'bad',
-                                user_selections__user = self,
-                                language_code=language_code
-                            )
-
-        wk = self.ignored_tags.strip().split()
-        ignored_by_wildcards = Tag.objects.get_by_wildcards(wk)
+    preferences = self.get_tag_preferences()
 
+    if preferences.email_tag_filter_strategy == const.EXCLUDE_IGNORED:
+        ignored_ids = preferences.get_selected_tag_ids('bad')
         return questions.exclude(
-                        thread__tags__in = ignored_tags
-                    ).exclude(
-                        thread__tags__in = ignored_by_wildcards
+                        thread__tags__in=ignored_ids
                     ).distinct()
-    elif self.email_tag_filter_strategy == const.INCLUDE_INTERESTING:
+    elif preferences.email_tag_filter_strategy == const.INCLUDE_INTERESTING:
         if askbot_settings.SUBSCRIBED_TAG_SELECTOR_ENABLED:
             reason = 'subscribed'
-            wk = self.subscribed_tags.strip().split()
         else:
             reason = 'good'
-            wk = self.interesting_tags.strip().split()
-
-        selected_tags = Tag.objects.filter(
-                                user_selections__reason = reason,
-                                user_selections__user = self,
-                                language_code=language_code
-                            )
-
-        selected_by_wildcards = Tag.objects.get_by_wildcards(wk)
-
-        tag_filter = models.Q(thread__tags__in = list(selected_tags)) \
-                    | models.Q(thread__tags__in = list(selected_by_wildcards))
-
-        return questions.filter( tag_filter ).distinct()
+        selected_ids = preferences.get_selected_tag_ids(reason)
+        return questions.filter(thread__tags__in=selected_ids).distinct()
     else:
         return questions
 
@@ -2757,6 +2774,18 @@ def user_get_groups(self, private=False):
     #todo: maybe cache this query
     return Group.objects.get_for_user(self, private=private)
 
+def user_get_group_ids(self):
+    """returns frozenset of ids of groups to which user belongs,
+    the value is memoized on the user object"""
+    group_ids = getattr(self, '_group_ids_cache', None)
+    if group_ids is None:
+        group_ids = GroupMembership.objects.filter(
+                            user=self
+                        ).values_list('group_id', flat=True)
+        group_ids = frozenset(group_ids)
+        self._group_ids_cache = group_ids
+    return group_ids
+
 def user_join_default_groups(self):
     """adds user to "global" and "personal" groups"""
     #needs to be run when Askbot is added to pre-existing site
@@ -3006,7 +3035,8 @@ def _process_vote(user, post, timestamp=None, cancel=False, vote_type=None):
         else:
             auth.onDownVoted(vote, post, user, timestamp)
 
-    post.thread.reset_cached_data()
+    # summary html is rendered again on the next view of a question list
+    post.thread.clear_cached_data()
 
     if post.post_type == 'question':
         #denormalize the question post score on the thread
@@ -3225,25 +3255,91 @@ def user_update_response_counts(user):
     user.save()
 
 
+def recount_response_counts(user_ids, batch_size=500):
+    """Recounts numbers of the new and seen responses
+    for many users with grouped queries, same as
+    ``User.update_response_counts()``. Only the profiles with
+    wrong counts are updated, returns set of their user ids.
+    """
+    activity_types = const.RESPONSE_ACTIVITY_TYPES_FOR_DISPLAY
+    activity_types += (const.TYPE_ACTIVITY_MENTION,)
+    status_fields = {
+        ActivityAuditStatus.STATUS_NEW: 'new_response_count',
+        ActivityAuditStatus.STATUS_SEEN: 'seen_response_count'
+    }
+    user_ids = list(user_ids)
+    corrected_ids = set()
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        counts = dict((user_id, {'new_response_count': 0,
+                                 'seen_response_count': 0}) for user_id in batch)
+        groups = ActivityAuditStatus.objects.filter(
+                                user__id__in=batch,
+                                activity__activity_type__in=activity_types
+                            ).values('user_id', 'status').annotate(
+                                count=Count('id')
+                            ).order_by()
+        for group in groups:
+            counts[group['user_id']][status_fields[group['status']]] = group['count']
+
+        profiles = UserProfile.objects.filter(auth_user_ptr__id__in=batch)
+        profiles = profiles.values_list('auth_user_ptr_id', 'new_response_count',
+                                        'seen_response_count')
+        for user_id, new_count, seen_count in profiles:
+            correct = counts[user_id]
+            if correct == {'new_response_count': new_count,
+                           'seen_response_count': seen_count}:
+                continue
+            UserProfile.objects.filter(auth_user_ptr__id=user_id).update(**correct)
+            corrected_ids.add(user_id)
+
+    cache.delete_many([get_profile_cache_key_by_id(pk) for pk in corrected_ids])
+    return corrected_ids
+
+
+def get_reputation_update(num_points, min_points):
+    """returns expression for the ``update()`` query, which
+    adds points to the reputation, but not below the ``min_points``"""
+    return Case(
+                When(reputation__lt=min_points - num_points,
+                     then=Value(min_points)),
+                default=F('reputation') + num_points,
+                output_field=IntegerField()
+            )
+
+
 def user_receive_reputation(self, num_points, language_code=None):
+    """changes reputation with the atomic ``UPDATE`` queries,
+    so the concurrent changes are not lost,
+    there is no need to save the user afterwards"""
     language_code = language_code or get_language()
-    old_points = self.reputation
-    new_points = old_points + num_points
-    self.reputation = max(const.MIN_REPUTATION, new_points)
+    profile = get_profile(self)
+    old_points = profile.reputation
+    UserProfile.objects.filter(pk=profile.pk).update(
+            reputation=get_reputation_update(num_points, const.MIN_REPUTATION)
+        )
+    #concurrent changes may have been applied too, so the cached
+    #profile is dropped and the stored value is read back
+    cache.delete(profile.get_cache_key())
+    profile.reputation = UserProfile.objects.filter(
+                                pk=profile.pk
+                            ).values_list('reputation', flat=True)[0]
 
     #record localized user reputation - this starts with 0
-    try:
-        profile = LocalizedUserProfile.objects.get(
-                                            auth_user=self,
-                                            language_code=language_code
-                                        )
-    except LocalizedUserProfile.DoesNotExist:
-        profile = LocalizedUserProfile(
-                                    auth_user=self,
-                                    language_code=language_code
-                                )
-    profile.reputation = max(0, profile.reputation + num_points)
-    profile.save()
+    updated = LocalizedUserProfile.objects.filter(
+                                auth_user=self,
+                                language_code=language_code
+                            ).update(
+                                reputation=get_reputation_update(num_points, 0)
+                            )
+    if updated:
+        cache.delete(get_localized_profile_cache_key(self, language_code))
+    else:
+        LocalizedUserProfile.objects.create(
+                                auth_user=self,
+                                language_code=language_code,
+                                reputation=max(0, num_points)
+                            )
 
     signals.reputation_received.send(None, user=self, reputation_before=old_points)
 
@@ -3291,6 +3387,13 @@ def user_update_wildcard_tag_selections(
     self.ignored_tags = ' '.join(ignored)
     self.subscribed_tags = ' '.join(subscribed)
     self.save()
+    self.invalidate_tag_preferences()
+    if tag_subscribers.is_enabled():
+        if reason in ('good', 'bad'):
+            reasons = ('good', 'bad')
+        else:
+            reasons = (reason,)
+        tag_subscribers.update_user_wildcards(self.id, reasons)
     return new_tags
 
 
@@ -3308,6 +3411,8 @@ def user_edit_group_membership(self, user=None, group=None,
     returns instance of GroupMembership (if action is "add") or None
     """
     self.assert_can_join_or_leave_group()
+    #forget memoized group ids, see user_get_group_ids
+    user._group_ids_cache = None
     if action == 'add':
         #calculate new level
         openness = group.get_openness_level_for_user(user)
@@ -3386,9 +3491,12 @@ User.add_to_class('init_avatar_urls', user_init_avatar_urls)
 User.add_to_class('get_default_avatar_url', user_get_default_avatar_url)
 User.add_to_class('get_gravatar_url', user_get_gravatar_url)
 User.add_to_class('get_or_create_fake_user', user_get_or_create_fake_user)
+User.add_to_class('get_tag_preferences', user_get_tag_preferences)
+User.add_to_class('invalidate_tag_preferences', user_invalidate_tag_preferences)
 User.add_to_class('get_marked_tags', user_get_marked_tags)
 User.add_to_class('get_marked_tag_names', user_get_marked_tag_names)
 User.add_to_class('get_groups', user_get_groups)
+User.add_to_class('get_group_ids', user_get_group_ids)
 User.add_to_class('get_foreign_groups', user_get_foreign_groups)
 User.add_to_class('get_group_membership', user_get_group_membership)
 User.add_to_class('get_personal_group', user_get_personal_group)
@@ -3737,27 +3845,38 @@ def record_user_visit(user, timestamp, **kwargs):
     """
     when user visits any pages, we update the last_seen and
     consecutive_days_visit_count
+
+    visits shortly after the previously saved one are only
+    remembered in cache, see ``askbot.models.site_visits``
     """
-    prev_last_seen = user.last_seen or timezone.now()
-    user.last_seen = timestamp
-    consecutive_days = user.consecutive_days_visit_count
-    if (user.last_seen.date() - prev_last_seen.date()).days == 1:
-        user.consecutive_days_visit_count += 1
-        consecutive_days = user.consecutive_days_visit_count
+    profile = get_profile(user)
+    prev_last_seen = profile.last_seen or timezone.now()
+    if not site_visits.needs_update(profile.last_seen, timestamp):
+        site_visits.record_visit(user.pk, timestamp)
+        return
+
+    profile.last_seen = timestamp
+    new_day = (timestamp.date() - prev_last_seen.date()).days == 1
+    if new_day:
+        profile.consecutive_days_visit_count += 1
+
+    #somehow it saves on the query as compared to user.save()
+    update_data = {
+        'last_seen': timestamp,
+        'consecutive_days_visit_count': profile.consecutive_days_visit_count
+    }
+    UserProfile.objects.filter(pk=user.pk).update(**update_data)
+    #the cached profile may be outdated in other fields, it is not saved
+    cache.delete(get_profile_cache_key(user))
+    site_visits.forget_visit(user.pk)
+
+    if new_day:
         award_badges_signal.send(None,
             event = 'site_visit',
             actor = user,
             context_object = user,
             timestamp = timestamp
         )
-    #somehow it saves on the query as compared to user.save()
-    update_data = {
-        'last_seen': timestamp,
-        'consecutive_days_visit_count': consecutive_days
-    }
-    UserProfile.objects.filter(pk=user.pk).update(**update_data)
-    profile = UserProfile.objects.get(pk=user.pk)
-    profile.update_cache()
 
 
 def record_question_visit(request, question, **kwargs):
@@ -3783,6 +3902,17 @@ def record_question_visit(request, question, **kwargs):
                 update_view_count = True
 
         request.session['question_view_times'][question.id] = timezone.now()
+
+        views_buffered = view_buffer.is_enabled()
+        if views_buffered:
+            #view count and visit time are saved by the view_buffer.flush()
+            if update_view_count:
+                view_buffer.record_view(question.thread_id)
+            if request.user.is_anonymous():
+                return
+            view_buffer.record_visit(request.user.id, question.id, timezone.now())
+            update_view_count = False
+
         #2) run the slower jobs in a celery task
         from askbot import tasks
         defer_celery_task(
@@ -3791,7 +3921,8 @@ def record_question_visit(request, question, **kwargs):
                 'question_post_id': question.id,
                 'user_id': request.user.id,
                 'update_view_count': update_view_count,
-                'language_code': get_language()
+                'language_code': get_language(),
+                'views_buffered': views_buffered
             }
         )
 
@@ -4318,6 +4449,125 @@ signals.tags_updated.connect(
     record_update_tags,
     dispatch_uid='record_tag_update'
 )
+#keep the denormalized thread listing table in sync
+django_signals.post_save.connect(
+    thread_listing.update_listing_on_thread_save,
+    sender=Thread,
+    dispatch_uid='update_thread_listing_on_thread_save'
+)
+django_signals.post_save.connect(
+    thread_listing.update_listing_on_question_save,
+    sender=Post,
+    dispatch_uid='update_thread_listing_on_question_save'
+)
+signals.after_post_removed.connect(
+    thread_listing.update_listing_on_post_removed,
+    sender=Post,
+    dispatch_uid='update_thread_listing_on_post_removed'
+)
+#keep the index of the similar threads in sync
+signals.tags_updated.connect(
+    similar_threads.update_similar_threads,
+    dispatch_uid='update_similar_threads_on_tags_update'
+)
+#adjust the cached question counts
+django_signals.post_save.connect(
+    question_counts.update_counts_on_thread_save,
+    sender=Thread,
+    dispatch_uid='update_question_counts_on_thread_save'
+)
+django_signals.post_delete.connect(
+    question_counts.update_counts_on_thread_delete,
+    sender=Thread,
+    dispatch_uid='update_question_counts_on_thread_delete'
+)
+django_signals.post_save.connect(
+    question_counts.update_counts_on_question_save,
+    sender=Post,
+    dispatch_uid='update_question_counts_on_question_save'
+)
+signals.after_post_removed.connect(
+    question_counts.update_counts_on_post_removed,
+    sender=Post,
+    dispatch_uid='update_question_counts_on_post_removed'
+)
+signals.tags_updated.connect(
+    question_counts.update_counts_on_tags_updated,
+    dispatch_uid='update_question_counts_on_tags_updated'
+)
+#keep the cached index of the tag based subscribers up to date
+django_signals.post_save.connect(
+    tag_subscribers.update_on_marked_tag_change,
+    sender=MarkedTag,
+    dispatch_uid='update_tag_subscribers_on_marked_tag_save'
+)
+django_signals.post_delete.connect(
+    tag_subscribers.update_on_marked_tag_change,
+    sender=MarkedTag,
+    dispatch_uid='update_tag_subscribers_on_marked_tag_delete'
+)
+django_signals.post_save.connect(
+    tag_subscribers.update_on_feed_change,
+    sender=EmailFeedSetting,
+    dispatch_uid='update_tag_subscribers_on_feed_save'
+)
+django_signals.post_delete.connect(
+    tag_subscribers.update_on_feed_change,
+    sender=EmailFeedSetting,
+    dispatch_uid='update_tag_subscribers_on_feed_delete'
+)
+django_signals.post_save.connect(
+    tag_preferences.invalidate_on_marked_tag_change,
+    sender=MarkedTag,
+    dispatch_uid='invalidate_tag_preferences_on_marked_tag_save'
+)
+django_signals.post_delete.connect(
+    tag_preferences.invalidate_on_marked_tag_change,
+    sender=MarkedTag,
+    dispatch_uid='invalidate_tag_preferences_on_marked_tag_delete'
+)
+#reload the tag dictionaries on tag creation, rename and deletion
+django_signals.pre_save.connect(
+    tag_dictionary.find_tag_change,
+    sender=Tag,
+    dispatch_uid='find_tag_dictionary_change_on_tag_save'
+)
+django_signals.post_save.connect(
+    tag_dictionary.invalidate_on_tag_save,
+    sender=Tag,
+    dispatch_uid='invalidate_tag_dictionary_on_tag_save'
+)
+django_signals.post_delete.connect(
+    tag_dictionary.invalidate_on_tag_delete,
+    sender=Tag,
+    dispatch_uid='invalidate_tag_dictionary_on_tag_delete'
+)
+#queue refresh of the user statistics shown on the profile
+django_signals.post_save.connect(
+    user_stats.mark_stale_on_vote_change,
+    sender=Vote,
+    dispatch_uid='mark_user_stats_stale_on_vote_save'
+)
+django_signals.post_delete.connect(
+    user_stats.mark_stale_on_vote_change,
+    sender=Vote,
+    dispatch_uid='mark_user_stats_stale_on_vote_delete'
+)
+django_signals.post_save.connect(
+    user_stats.mark_stale_on_award_change,
+    sender=Award,
+    dispatch_uid='mark_user_stats_stale_on_award_save'
+)
+django_signals.post_delete.connect(
+    user_stats.mark_stale_on_award_change,
+    sender=Award,
+    dispatch_uid='mark_user_stats_stale_on_award_delete'
+)
+django_signals.post_save.connect(
+    user_stats.mark_stale_on_post_save,
+    sender=Post,
+    dispatch_uid='mark_user_stats_stale_on_post_save'
+)
 signals.user_registered.connect(
     greet_new_user,
     dispatch_uid='greet_user_upon_registration'
@@ -4401,6 +4651,8 @@ signals.question_visited.connect(
 __all__ = [
         'signals',
         'Thread',
+        'ThreadListing',
+        'SimilarThread',
 
         'QuestionView',
         'FavoriteQuestion',
@@ -4423,6 +4675,10 @@ __all__ = [
         'BadgeData',
         'Award',
         'Repute',
+        'DailyReputationGain',
+        'ReputationBucket',
+        'UserStatsSnapshot',
+        'QueuedEmail',
 
         'Activity',
         'ActivityAuditStatus',
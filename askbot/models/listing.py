@@ -0,0 +1,373 @@
+"""Denormalized projection of the threads used to build
+the question lists on the main page and in the API.
+
+Each :class:`ThreadListing` row holds everything that
+:meth:`~askbot.models.question.ThreadManager.run_advanced_search`
+needs to filter and sort threads, so that the listing query
+is a scan over an index of one table - no joins to the posts
+table and no ``DISTINCT``. Tags and groups are matched
+with subqueries over the thread-tag and thread-group relation
+tables, which are indexed by the tag and the group.
+
+Rows are kept in sync by the signal handlers below
+(connected in ``askbot.models``) and can be rebuilt with
+``python manage.py build_thread_listing``.
+"""
+from django.conf import settings as django_settings
+from django.db import models
+from django.utils.translation import get_language
+
+import askbot
+from askbot import const
+from askbot.conf import settings as askbot_settings
+from askbot.models.base import BaseQuerySetManager
+from askbot.models import tag_dictionary
+from askbot.models import tag_preferences
+from askbot.models.fields import LanguageCodeField
+from askbot.models.question import QUESTION_ORDER_BY_MAP
+
+#sort keys of the listing table - all thread sort keys,
+#except the relevance, which is calculated by the text search
+LISTING_ORDER_BY_MAP = dict(
+    [(key, value) for key, value in QUESTION_ORDER_BY_MAP.items()
+        if key != 'relevance-desc']
+)
+
+def get_tagged_filter(tag_ids):
+    """returns Q object matching listing rows of the
+    threads tagged with at least one of the ``tag_ids``"""
+    from askbot.models.question import Thread
+    thread_ids = Thread.tags.through.objects.filter(
+                                    tag_id__in=tag_ids
+                                ).values('thread_id')
+    return models.Q(thread_id__in=thread_ids)
+
+
+def get_shared_filter(group_ids):
+    """returns Q object matching listing rows of the
+    threads shared with at least one of the ``group_ids``"""
+    from askbot.models.question import ThreadToGroup
+    thread_ids = ThreadToGroup.objects.filter(
+                                    group_id__in=group_ids
+                                ).values('thread_id')
+    return models.Q(thread_id__in=thread_ids)
+
+
+class ThreadListingResults(object):
+    """Sequence of threads backed by the listing query set.
+
+    Supports the protocol used by the ``django.core.paginator.Paginator``:
+    ``count()``, ``len()`` and slicing. Slices are loaded as
+    lists of thread ids from the listing table and then
+    the threads are fetched by primary key.
+    """
+    def __init__(self, listing_qs, thread_fields=None):
+        self.listing_qs = listing_qs
+        self.thread_fields = thread_fields
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.listing_qs.count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def get_threads(self, thread_ids):
+        """returns list of threads in the order of ``thread_ids``"""
+        from askbot.models.question import Thread
+        threads = Thread.objects.filter(id__in=thread_ids)
+        if self.thread_fields:
+            threads = threads.only(*self.thread_fields)
+        thread_map = dict([(thread.id, thread) for thread in threads])
+        return [thread_map[tid] for tid in thread_ids if tid in thread_map]
+
+    def __getitem__(self, key):
+        thread_ids = self.listing_qs.values_list('thread_id', flat=True)
+        if isinstance(key, slice):
+            return self.get_threads(list(thread_ids[key]))
+        return self.get_threads([thread_ids[key]])[0]
+
+    def __iter__(self):
+        thread_ids = list(self.listing_qs.values_list('thread_id', flat=True))
+        return iter(self.get_threads(thread_ids))
+
+
+class ThreadListingQuerySet(models.query.QuerySet):
+
+    def get_visible(self, user):
+        """filters out threads not shared with the user groups"""
+        from askbot.models.user import Group
+        if user.is_authenticated():
+            group_ids = user.get_groups().values_list('id', flat=True)
+        else:
+            group_ids = [Group.objects.get_global_group().id]
+        return self.filter(get_shared_filter(list(group_ids)))
+
+    def filter_by_all_tags(self, tag_ids_per_name):
+        """``tag_ids_per_name`` is a list of lists of tag ids,
+        where each inner list holds ids of the tags with the same
+        name (in different languages). Tags are AND-ed.
+        """
+        qs = self
+        for tag_ids in tag_ids_per_name:
+            qs = qs.filter(get_tagged_filter(tag_ids))
+        return qs
+
+    def filter_by_any_tag(self, tag_ids):
+        return self.filter(get_tagged_filter(tag_ids))
+
+    def exclude_tags(self, tag_ids):
+        if len(tag_ids) == 0:
+            return self
+        return self.exclude(get_tagged_filter(tag_ids))
+
+
+class ThreadListingManager(BaseQuerySetManager):
+
+    def get_queryset(self):
+        return ThreadListingQuerySet(self.model)
+
+    def get_listing_data(self, thread, question=None):
+        """returns dictionary of denormalized values for the thread"""
+        data = {
+            'language_code': thread.language_code,
+            'approved': thread.approved,
+            'closed': thread.closed,
+            'added_at': thread.added_at,
+            'last_activity_at': thread.last_activity_at,
+            'answer_count': thread.answer_count,
+            'points': thread.points,
+            'accepted_answer_id': thread.accepted_answer_id,
+        }
+        if question:
+            data['question_post_id'] = question.id
+            data['author_id'] = question.author_id
+            data['deleted'] = question.deleted
+        return data
+
+    def update_thread(self, thread, question=None):
+        """updates values of the listing row,
+        creates the row if it does not exist"""
+        data = self.get_listing_data(thread, question=question)
+        updated = self.filter(thread_id=thread.id).update(**data)
+        if updated == 0:
+            self.refresh_thread(thread)
+
+    def refresh_thread(self, thread):
+        """recalculates all values of the listing row for the thread"""
+        from askbot.models.post import Post
+        try:
+            question = Post.objects.only(
+                                'id', 'author', 'deleted'
+                            ).get(post_type='question', thread=thread)
+        except (Post.DoesNotExist, Post.MultipleObjectsReturned):
+            question = None
+
+        data = self.get_listing_data(thread, question=question)
+        self.update_or_create(thread_id=thread.id, defaults=data)
+
+    def get_order_by(self, sort_method):
+        """returns tuple of order_by arguments, with thread id
+        appended as a tie breaker, so that the order is stable"""
+        order_by = LISTING_ORDER_BY_MAP[sort_method]
+        if order_by.startswith('-'):
+            return (order_by, '-thread_id')
+        return (order_by, 'thread_id')
+
+    def can_run_search(self, search_state):
+        """True if listing table can serve the search state.
+        Text search and sorting by relevance
+        require the full text search indexes on the
+        posts and threads"""
+        if not django_settings.ASKBOT_THREAD_LISTING_ENABLED:
+            return False
+        if search_state.stripped_query or search_state.query_title:
+            return False
+        return search_state.sort in LISTING_ORDER_BY_MAP
+
+    def run_search(self, request_user, search_state):
+        """Equivalent of the ``ThreadManager.run_advanced_search``
+        for the search states accepted by the ``can_run_search``.
+        Returns a tuple: listing query set, meta data.
+        """
+        from django.contrib.auth.models import User
+        from askbot.models.post import Post
+        from askbot.models.question import FavoriteQuestion
+
+        qs = self.filter(question_post_id__isnull=False, deleted=False)
+
+        lang_mode = askbot.get_lang_mode()
+        if lang_mode == 'url-lang':
+            qs = qs.filter(language_code=get_language())
+        elif lang_mode == 'user-lang':
+            if request_user.is_authenticated():
+                language_codes = request_user.get_languages()
+            else:
+                language_codes = dict(django_settings.LANGUAGES).keys()
+            qs = qs.filter(language_code__in=language_codes)
+
+        if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation':
+            qs = qs.filter(approved=True)
+
+        if askbot_settings.GROUPS_ENABLED:
+            qs = qs.get_visible(user=request_user)
+
+        if search_state.query_users:
+            query_users = User.objects.filter(username__in=search_state.query_users)
+            query_user_ids = list(query_users.values_list('id', flat=True))
+            if query_user_ids:
+                qs = qs.filter(author_id__in=query_user_ids)
+
+        meta_data = {'non_existing_tags': list()}
+        tags = search_state.unified_tags()
+        if len(tags) > 0:
+            tag_ids_per_name, non_existing_tags = \
+                tag_dictionary.get_tag_ids_per_name(
+                    tags, get_language(),
+                    case_sensitive=not askbot_settings.TAG_SEARCH_INPUT_ENABLED
+                )
+            if askbot_settings.TAG_SEARCH_INPUT_ENABLED:
+                meta_data['non_existing_tags'] = non_existing_tags
+            else:
+                #unknown tag and no dropping - nothing can match
+                tag_ids_per_name.extend([[] for tag in non_existing_tags])
+
+            qs = qs.filter_by_all_tags(tag_ids_per_name)
+
+        if search_state.scope == 'unanswered':
+            qs = qs.filter(closed=False)
+            if askbot_settings.UNANSWERED_QUESTION_MEANING == 'NO_ANSWERS':
+                qs = qs.filter(answer_count=0)
+            elif askbot_settings.UNANSWERED_QUESTION_MEANING == 'NO_ACCEPTED_ANSWERS':
+                qs = qs.filter(accepted_answer_id__isnull=True)
+            elif askbot_settings.UNANSWERED_QUESTION_MEANING == 'NO_UPVOTED_ANSWERS':
+                raise NotImplementedError()
+            else:
+                raise Exception('UNANSWERED_QUESTION_MEANING setting is wrong')
+
+        elif search_state.scope == 'followed':
+            faved_thread_ids = FavoriteQuestion.objects.filter(
+                                                user=request_user
+                                            ).values('thread_id')
+            followed_filter = models.Q(thread_id__in=faved_thread_ids)
+            if 'followit' in django_settings.INSTALLED_APPS:
+                followed_users = request_user.get_followed_users()
+                followed_thread_ids = Post.objects.filter(
+                                post_type__in=('question', 'answer'),
+                                author__in=followed_users
+                            ).values('thread_id')
+                followed_filter |= models.Q(thread_id__in=followed_thread_ids)
+
+            if askbot_settings.ALL_SCOPE_ENABLED == askbot_settings.UNANSWERED_SCOPE_ENABLED == False:
+                if qs.filter(followed_filter).count() < 30:
+                    followed_filter = models.Q()
+
+            qs = qs.filter(followed_filter)
+
+        if search_state.author:
+            try:
+                author = User.objects.get(id=int(search_state.author))
+            except User.DoesNotExist:
+                meta_data['author_name'] = None
+            else:
+                qs = qs.filter(author_id=author.id)
+                meta_data['author_name'] = author.username
+
+        if request_user and request_user.is_authenticated():
+            preferences = request_user.get_tag_preferences()
+            tag_ids = dict(
+                (reason, preferences.get_tag_ids(reason)) \
+                                    for reason in tag_preferences.REASONS
+            )
+            tag_names = dict(
+                (reason, preferences.get_tag_names(reason)) \
+                                    for reason in tag_preferences.REASONS
+            )
+
+            meta_data['interesting_tag_names'] = tag_names['good']
+            meta_data['ignored_tag_names'] = tag_names['bad']
+            if askbot_settings.SUBSCRIBED_TAG_SELECTOR_ENABLED:
+                meta_data['subscribed_tag_names'] = tag_names['subscribed']
+            else:
+                tag_ids['subscribed'] = list()
+
+            strategy = preferences.display_tag_filter_strategy
+            if strategy == const.INCLUDE_INTERESTING:
+                interesting_ids = list(tag_ids['good'])
+                if request_user.has_interesting_wildcard_tags():
+                    interesting_ids.extend(preferences.get_wildcard_tag_ids('good'))
+                if tag_ids['good'] or request_user.has_interesting_wildcard_tags():
+                    qs = qs.filter_by_any_tag(interesting_ids)
+
+            if strategy == const.EXCLUDE_IGNORED:
+                ignored_ids = list(tag_ids['bad'])
+                if request_user.has_ignored_wildcard_tags():
+                    ignored_ids.extend(preferences.get_wildcard_tag_ids('bad'))
+                qs = qs.exclude_tags(ignored_ids)
+
+            if strategy == const.INCLUDE_SUBSCRIBED and tag_ids['subscribed']:
+                qs = qs.filter_by_any_tag(tag_ids['subscribed'])
+
+            if askbot_settings.USE_WILDCARD_TAGS:
+                meta_data['interesting_tag_names'].extend(preferences.get_wildcards('good'))
+                meta_data['ignored_tag_names'].extend(preferences.get_wildcards('bad'))
+
+        qs = qs.order_by(*self.get_order_by(search_state.sort))
+        return qs, meta_data
+
+
+class ThreadListing(models.Model):
+    """one row per thread, all values are denormalized
+    from the thread and its question post"""
+    thread = models.OneToOneField('Thread', primary_key=True,
+                                  related_name='listing')
+    question_post_id = models.IntegerField(null=True, blank=True)
+    author_id = models.IntegerField(null=True, blank=True, db_index=True)
+    language_code = LanguageCodeField()
+    deleted = models.BooleanField(default=False)
+    approved = models.BooleanField(default=True)
+    closed = models.BooleanField(default=False)
+    accepted_answer_id = models.IntegerField(null=True, blank=True)
+
+    #sort keys
+    added_at = models.DateTimeField()
+    last_activity_at = models.DateTimeField()
+    answer_count = models.PositiveIntegerField(default=0)
+    points = models.IntegerField(default=0)
+
+    objects = ThreadListingManager()
+
+    class Meta:
+        app_label = 'askbot'
+        db_table = 'askbot_thread_listing'
+        index_together = (
+            ('language_code', 'deleted', 'added_at'),
+            ('language_code', 'deleted', 'last_activity_at'),
+            ('language_code', 'deleted', 'answer_count'),
+            ('language_code', 'deleted', 'points'),
+        )
+
+
+def update_listing_on_thread_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        ThreadListing.objects.refresh_thread(instance)
+    else:
+        ThreadListing.objects.update_thread(instance)
+
+
+def update_listing_on_question_save(sender, instance, created, raw=False, **kwargs):
+    if raw or instance.post_type != 'question' or instance.thread_id is None:
+        return
+    ThreadListing.objects.filter(thread_id=instance.thread_id).update(
+                                        question_post_id=instance.id,
+                                        author_id=instance.author_id,
+                                        deleted=instance.deleted
+                                    )
+
+
+def update_listing_on_post_removed(sender, instance, **kwargs):
+    update_listing_on_question_save(sender, instance, created=False)
@@ -0,0 +1,112 @@
+"""Outgoing email queue - rendered messages waiting to be sent
+by :func:`askbot.mail.send_queue.send_queued`, when
+``ASKBOT_MAIL_QUEUE_ENABLED = True``.
+"""
+from django.db import models
+from django.utils import timezone
+import simplejson
+
+from askbot.mail import send_queue
+
+
+class QueuedEmailManager(models.Manager):
+
+    def enqueue(self, subject_line, body_text, from_email, email_list, headers=None):
+        """stores the message for sending, returns the saved
+        :class:`QueuedEmail` or ``None``, if there are no recipients"""
+        email_list = list(email_list)
+        if len(email_list) == 0:
+            return None
+        return self.create(
+                    subject=subject_line,
+                    body=body_text,
+                    from_email=from_email,
+                    recipients='\n'.join(email_list),
+                    headers=simplejson.dumps(headers or {}),
+                    domain=send_queue.get_domain(email_list[0])
+                )
+
+    def get_due(self, now=None):
+        """messages to be sent now, oldest first"""
+        now = now or timezone.now()
+        return self.filter(
+                    attempts__lt=send_queue.MAX_ATTEMPTS,
+                    next_attempt_at__lte=now
+                ).order_by('id')
+
+    def claim(self, email_ids, token, until, now=None):
+        """reserves the due messages with given ids for the sending
+        run identified by ``token`` - until the given time they are
+        not due, so concurrent runs skip them. Returns list of
+        the messages claimed by this run."""
+        now = now or timezone.now()
+        email_ids = list(email_ids)
+        for start in range(0, len(email_ids), send_queue.BATCH_SIZE):
+            self.filter(
+                id__in=email_ids[start:start + send_queue.BATCH_SIZE],
+                attempts__lt=send_queue.MAX_ATTEMPTS,
+                next_attempt_at__lte=now
+            ).update(claim_token=token, next_attempt_at=until)
+        claimed = self.filter(claim_token=token, id__in=email_ids)
+        return list(claimed.order_by('id'))
+
+    def delete_sent(self, email_ids, token):
+        email_ids = list(email_ids)
+        for start in range(0, len(email_ids), send_queue.BATCH_SIZE):
+            self.filter(
+                id__in=email_ids[start:start + send_queue.BATCH_SIZE],
+                claim_token=token
+            ).delete()
+
+    def record_failures(self, errors, token):
+        """postpones the next attempts to send the messages,
+        ``errors`` - dictionary message id -> error text"""
+        now = timezone.now()
+        for queued_email in self.filter(id__in=errors.keys(), claim_token=token):
+            queued_email.attempts += 1
+            delay = send_queue.get_retry_delay(queued_email.attempts)
+            queued_email.next_attempt_at = now + delay
+            queued_email.last_error = errors[queued_email.id]
+            queued_email.claim_token = ''
+            queued_email.save()
+
+
+class QueuedEmail(models.Model):
+    """Rendered email message in the outgoing queue.
+    Messages are deleted once sent, messages which failed
+    ``MAX_ATTEMPTS`` times stay in the table with the last error.
+    A sending run claims the messages by moving ``next_attempt_at``
+    forward and setting its ``claim_token``, messages of an
+    interrupted run are due again after ``send_queue.CLAIM_TIMEOUT``.
+    """
+    subject = models.TextField()
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.TextField()# one email address per line
+    headers = models.TextField(default='{}')# json
+    domain = models.CharField(max_length=255)# of the first recipient
+    created_at = models.DateTimeField(default=timezone.now)
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    claim_token = models.CharField(max_length=16, blank=True, default='')# of the sending run
+
+    objects = QueuedEmailManager()
+
+    class Meta:
+        app_label = 'askbot'
+        db_table = 'askbot_queued_email'
+
+    def get_recipient_list(self):
+        return self.recipients.split('\n')
+
+    def get_message(self):
+        """returns the email message object, ready to send"""
+        from askbot.mail import build_message
+        return build_message(
+                    self.subject,
+                    self.body,
+                    self.from_email,
+                    self.get_recipient_list(),
+                    headers=simplejson.loads(self.headers)
+                )
@@ -31,6 +31,7 @@ from askbot import const
 from askbot.models.tag import Tag, MarkedTag
 from askbot.models.tag import tags_match_some_wildcard
 from askbot.models.fields import LanguageCodeField
+from askbot.models.user_profile import increment_new_response_counts
 from askbot.conf import settings as askbot_settings
 from askbot import exceptions
 from askbot.utils import markup
@@ -724,6 +725,8 @@ class Post(models.Model):
             for group in groups:
                 for comment in comments:
                     PostToGroup.objects.get_or_create(post=comment, group=group)
+        if self.thread_id:
+            self.thread.invalidate_cached_visibility()
 
     def remove_from_groups(self, groups):
         PostToGroup.objects.filter(post=self, group__in=groups).delete()
@@ -733,6 +736,8 @@ class Post(models.Model):
                         post__id__in=comment_ids,
                         group__in=groups
                     ).delete()
+        if self.thread_id:
+            self.thread.invalidate_cached_visibility()
 
     def issue_update_notifications(self, updated_by=None, notify_sets=None,
                                    activity_type=None, suppress_email=False,
@@ -766,17 +771,22 @@ class Post(models.Model):
         update_activity.add_recipients(notify_sets['for_inbox'])
 
         # create new mentions (barring the double-adds)
-        from askbot.models import Activity
-        for u in notify_sets['for_mentions'] - notify_sets['for_inbox']:
-            Activity.objects.create_new_mention(
-                                    mentioned_whom=u,
-                                    mentioned_in=self,
-                                    mentioned_by=updated_by,
-                                    mentioned_at=timestamp
-                                )
-
-        for user in (notify_sets['for_inbox'] | notify_sets['for_mentions']):
-            user.update_response_counts()
+        mentioned_users = notify_sets['for_mentions'] - notify_sets['for_inbox']
+        Activity.objects.create_new_mentions(
+                                mentioned_whom=mentioned_users,
+                                mentioned_in=self,
+                                mentioned_by=updated_by,
+                                mentioned_at=timestamp
+                            )
+
+        # each recipient has got one new response, counts
+        # are corrected by the fix_inbox_counts command if they drift
+        user_ids = set([user.id for user in mentioned_users])
+        counted_types = const.RESPONSE_ACTIVITY_TYPES_FOR_DISPLAY \
+                                        + (const.TYPE_ACTIVITY_MENTION,)
+        if activity_type in counted_types:
+            user_ids.update([user.id for user in notify_sets['for_inbox']])
+        increment_new_response_counts(user_ids)
 
         # shortcircuit if the email alerts are disabled
         if suppress_email or not askbot_settings.ENABLE_EMAIL_ALERTS:
@@ -1243,10 +1253,28 @@ class Post(models.Model):
         specific tags
 
         this method in turn calls several more specialized
-        subscriber retrieval functions
-        todo: retrieval of wildcard tag followers ignorers
-              won't scale at all
+        subscriber retrieval functions, unless the cached
+        subscribers index is enabled, see ``askbot.models.tag_subscribers``
         """
+        if askbot_settings.SUBSCRIBED_TAG_SELECTOR_ENABLED:
+            good_mark_reason = 'subscribed'
+        else:
+            good_mark_reason = 'good'
+
+        from askbot.models import tag_subscribers
+        if tag_subscribers.is_enabled():
+            tag_names = self.get_tag_names()
+            use_wildcards = askbot_settings.USE_WILDCARD_TAGS
+            subscriber_ids = set(tag_subscribers.get_segment(const.INCLUDE_ALL))
+            for reason in (good_mark_reason, 'bad'):
+                subscriber_ids.update(
+                    tag_subscribers.get_subscriber_ids(
+                                        tag_names, reason,
+                                        use_wildcards=use_wildcards
+                                    )
+                )
+            return tag_subscribers.get_users(subscriber_ids)
+
         subscriber_set = set()
 
         from askbot.models.user import EmailFeedSetting
@@ -1264,10 +1292,6 @@ class Post(models.Model):
         subscriber_set.update(global_subscribers)
 
         # segment of users who want emails on selected questions only
-        if askbot_settings.SUBSCRIBED_TAG_SELECTOR_ENABLED:
-            good_mark_reason = 'subscribed'
-        else:
-            good_mark_reason = 'good'
         subscriber_set.update(
             self.get_global_tag_based_subscribers(
                 subscription_records=global_subscriptions,
@@ -1502,11 +1526,14 @@ class Post(models.Model):
 #       # TODO: remove this method
 #       return self.current_revision
 
+    def cache_earliest_revision(self, rev):
+        setattr(self, '_first_rev_cache', rev)
+
     def get_earliest_revision(self):
         if hasattr(self, '_first_rev_cache'):
             return self._first_rev_cache
         rev = self.revisions.order_by('revision')[0]
-        setattr(self, '_first_rev_cache', rev)
+        self.cache_earliest_revision(rev)
         return rev
 
     def get_latest_revision_number(self):
@@ -2087,6 +2114,46 @@ class Post(models.Model):
 
 
 class PostRevisionManager(models.Manager):
+
+    def get_first_and_last(self, post_ids):
+        """returns dictionary mapping post id to a tuple
+        (earliest revision, latest revision), the same as given by
+        ``Post.get_earliest_revision()`` and ``Post.get_latest_revision()``,
+        loaded with two queries regardless of the number of posts
+        """
+        post_ids = list(post_ids)
+        if len(post_ids) == 0:
+            return dict()
+
+        # order_by() drops the default ordering, which would
+        # be otherwise added to the GROUP BY clause
+        bounds = self.filter(post__id__in=post_ids).values('post_id').annotate(
+                                            first=models.Min('revision'),
+                                            last=models.Max('revision')
+                                        ).order_by()
+        bounds = dict([(row['post_id'], (row['first'], row['last'])) for row in bounds])
+        revision_numbers = set()
+        for first, last in bounds.values():
+            revision_numbers.update((first, last))
+
+        revisions = self.filter(
+                            post__id__in=bounds.keys(),
+                            revision__in=revision_numbers
+                        ).select_related('author')
+        first_revs = dict()
+        last_revs = dict()
+        for rev in revisions:
+            first, last = bounds[rev.post_id]
+            if rev.revision == first:
+                first_revs[rev.post_id] = rev
+            if rev.revision == last:
+                last_revs[rev.post_id] = rev
+
+        data = dict()
+        for post_id in bounds:
+            data[post_id] = (first_revs[post_id], last_revs[post_id])
+        return data
+
     def create(self, *args, **kwargs):
         # clean the "summary" field
         kwargs.setdefault('summary', '')
@@ -2331,8 +2398,7 @@ class PostRevision(models.Model):
 
     @property
     def html(self, **kwargs):
-        markdowner = markup.get_parser()
-        sanitized_html = sanitize_html(markdowner.convert(self.text))
+        sanitized_html = markup.convert_markdown(self.text, urlize_links=False)
 
         if self.post.is_question():
             return sanitize_html(self.QUESTION_REVISION_TEMPLATE_NO_TAGS % {
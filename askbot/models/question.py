@@ -1,4 +1,5 @@
 import datetime
+import hashlib
 import logging
 import operator
 import regex as re
@@ -25,12 +26,15 @@ from askbot.models.tag import Tag, TagSynonym
 from askbot.models.tag import get_tags_by_names
 from askbot.models.tag import filter_accepted_tags, filter_suggested_tags
 from askbot.models.tag import separate_unused_tags
+from askbot.models import tag_dictionary
+from askbot.models import tag_preferences
 from askbot.models.base import BaseQuerySetManager
 from askbot.models.base import DraftContent, AnonymousContent
 from askbot.models.user import Group, PERSONAL_GROUP_NAME_PREFIX
 from askbot.models.fields import LanguageCodeField
 from askbot import signals
 from askbot import const
+from askbot.utils.functions import generate_random_key
 from askbot.utils.lists import LazyList
 from askbot.utils.loading import load_plugin
 from askbot.search import mysql
@@ -40,6 +44,52 @@ from askbot.search.state_manager import DummySearchState
 
 LOG = logging.getLogger(__name__)
 
+QUESTION_ORDER_BY_MAP = {
+    'age-desc': '-added_at',
+    'age-asc': 'added_at',
+    'activity-desc': '-last_activity_at',
+    'activity-asc': 'last_activity_at',
+    'answers-desc': '-answer_count',
+    'answers-asc': 'answer_count',
+    'votes-desc': '-points',
+    'votes-asc': 'points',
+
+    'relevance-desc': '-relevance', # special Postgresql-specific ordering, 'relevance' quaso-column is added by get_for_query()
+}
+
+# placeholders of the tag urls in the cached thread summaries,
+# rendered with DummySearchState, e.g. "<<<my-tag>>>"
+# use `<<<` and `>>>` because they cannot be confused with user input
+# - if user accidentialy types <<<tag-name>>> into question title or body,
+# then in html it'll become escaped like this: &lt;&lt;&lt;tag-name&gt;&gt;&gt;
+SUMMARY_TAG_URL_RE = re.compile(
+    r'<<<(%s)>>>' % const.TAG_REGEX_BARE,
+    re.UNICODE
+)
+
+
+def add_summary_tag_urls(html, search_state=None, tag_urls=None):
+    """replaces the tag url placeholders in the summary html
+    with urls of the search state with the tag added, in one pass.
+
+    ``tag_urls`` - optional dictionary tag name -> url,
+    to share the urls between the summaries of a page
+    """
+    if search_state is None:
+        search_state = DummySearchState()
+    if tag_urls is None:
+        tag_urls = dict()
+
+    def get_tag_url(match):
+        tag = match.group(1)
+        url = tag_urls.get(tag)
+        if url is None:
+            url = search_state.add_tag(tag).full_url()
+            tag_urls[tag] = url
+        return url
+
+    return SUMMARY_TAG_URL_RE.sub(get_tag_url, html)
+
 
 def clean_tagnames(tagnames):
     """Cleans tagnames string so that the field fits the constraint of the
@@ -119,9 +169,54 @@ class ThreadQuerySet(models.query.QuerySet):
 
             return self.filter(**filter_parameters)
 
+    def filter_by_all_tags(self, tag_ids_per_name):
+        """``tag_ids_per_name`` is a list of lists of tag ids,
+        where each inner list holds ids of the tags with the same
+        name (in different languages). Tags are AND-ed.
+
+        Instead of a join per tag, threads are matched with
+        one subquery counting the matching tags of each thread.
+        """
+        if not all(tag_ids_per_name):
+            return self.none()
+        tag_id_sets = list(set([frozenset(ids) for ids in tag_ids_per_name]))
+        if len(tag_id_sets) == 0:
+            return self
+
+        tag_ids = set()
+        for ids in tag_id_sets:
+            tag_ids.update(ids)
+        if len(tag_ids) == len(tag_id_sets):
+            tag_count = models.Count('tag_id')
+        else:
+            # count each name once, when the thread has
+            # more than one of the tags with the same name
+            whens = [models.When(tag_id__in=ids, then=models.Value(num)) \
+                                for num, ids in enumerate(tag_id_sets)]
+            name_number = models.Case(*whens, output_field=models.IntegerField())
+            tag_count = models.Count(name_number, distinct=True)
+
+        thread_ids = Thread.tags.through.objects.filter(
+                                tag_id__in=tag_ids
+                            ).values(
+                                'thread_id'
+                            ).annotate(
+                                tag_count=tag_count
+                            ).filter(
+                                tag_count=len(tag_id_sets)
+                            ).values('thread_id')
+        return self.filter(id__in=thread_ids)
+
 
 class ThreadManager(BaseQuerySetManager):
 
+    # thread fields loaded for the question lists
+    LISTING_FIELDS = (
+        'id', 'title', 'view_count', 'answer_count', 'last_activity_at',
+        'last_activity_by', 'closed', 'tagnames', 'accepted_answer',
+        'added_at', 'points'
+    )
+
     def get_queryset(self):
         return ThreadQuerySet(self.model)
 
@@ -277,6 +372,15 @@ class ThreadManager(BaseQuerySetManager):
 
         """
         from askbot.conf import settings as askbot_settings  # Avoid circular import
+        from askbot.models.listing import ThreadListing, ThreadListingResults
+
+        # serve the listing from the denormalized table, when possible
+        if ThreadListing.objects.can_run_search(search_state):
+            listing_qs, meta_data = ThreadListing.objects.run_search(
+                                                request_user, search_state)
+            threads = ThreadListingResults(listing_qs,
+                                           thread_fields=self.LISTING_FIELDS)
+            return threads, meta_data
 
         primary_filter = {
             'posts__post_type': 'question',
@@ -333,32 +437,22 @@ class ThreadManager(BaseQuerySetManager):
         meta_data = {}
         tags = search_state.unified_tags()
         if len(tags) > 0:
+            # TODO: this may be gone or disabled per option
+            # "tag_search_box_enabled"
+            tag_ids_per_name, non_existing_tags = \
+                tag_dictionary.get_tag_ids_per_name(
+                    tags, get_language(),
+                    case_sensitive=not askbot_settings.TAG_SEARCH_INPUT_ENABLED
+                )
             if askbot_settings.TAG_SEARCH_INPUT_ENABLED:
-                # TODO: this may be gone or disabled per option
-                # "tag_search_box_enabled"
-                existing_tags = set()
-                non_existing_tags = set()
-                # we're using a one-by-one tag retreival, b/c
-                # we want to take advantage of case-insensitive search indexes
-                # in postgresql, plus it is most likely that there will be
-                # only one or two search tags anyway
-                for tag in tags:
-                    try:
-                        tag_record = Tag.objects.get(
-                            name__iexact=tag, language_code=get_language())
-                        existing_tags.add(tag_record.name)
-                    except Tag.DoesNotExist:
-                        non_existing_tags.add(tag)
-
-                meta_data['non_existing_tags'] = list(non_existing_tags)
-                tags = existing_tags
+                meta_data['non_existing_tags'] = non_existing_tags
             else:
                 meta_data['non_existing_tags'] = list()
+                # unknown tag - nothing can match
+                tag_ids_per_name.extend([[] for tag in non_existing_tags])
 
-            # construct filter for the tag search
-            for tag in tags:
-                # Tags or AND-ed here, not OR-ed (i.e. we fetch only threads with all tags)
-                qs = qs.filter(tags__name=tag)
+            # Tags are AND-ed here, not OR-ed (i.e. we fetch only threads with all tags)
+            qs = qs.filter_by_all_tags(tag_ids_per_name)
         else:
             meta_data['non_existing_tags'] = list()
 
@@ -412,64 +506,45 @@ class ThreadManager(BaseQuerySetManager):
         if request_user and request_user.is_authenticated():
             # mark questions tagged with interesting tags
             # a kind of fancy annotation, would be nice to avoid it
-            lang = get_language()
-            interesting_tags = Tag.objects.filter(
-                user_selections__user=request_user,
-                user_selections__reason='good',
-                language_code=lang)
-            ignored_tags = Tag.objects.filter(
-                user_selections__user=request_user,
-                user_selections__reason='bad',
-                language_code=lang)
-            subscribed_tags = Tag.objects.none()
+            preferences = request_user.get_tag_preferences()
+            tag_ids = dict(
+                (reason, preferences.get_tag_ids(reason)) \
+                                    for reason in tag_preferences.REASONS
+            )
+            tag_names = dict(
+                (reason, preferences.get_tag_names(reason)) \
+                                    for reason in tag_preferences.REASONS
+            )
+
             if askbot_settings.SUBSCRIBED_TAG_SELECTOR_ENABLED:
-                subscribed_tags = Tag.objects.filter(
-                    user_selections__user=request_user,
-                    user_selections__reason='subscribed',
-                    language_code=lang)
-                meta_data['subscribed_tag_names'] = [tag.name for tag in subscribed_tags]
+                meta_data['subscribed_tag_names'] = tag_names['subscribed']
+            else:
+                tag_ids['subscribed'] = list()
 
-            meta_data['interesting_tag_names'] = [tag.name for tag in interesting_tags]
-            meta_data['ignored_tag_names'] = [tag.name for tag in ignored_tags]
+            meta_data['interesting_tag_names'] = tag_names['good']
+            meta_data['ignored_tag_names'] = tag_names['bad']
 
-            if request_user.display_tag_filter_strategy == const.INCLUDE_INTERESTING and (interesting_tags or request_user.has_interesting_wildcard_tags()):
+            strategy = preferences.display_tag_filter_strategy
+            if strategy == const.INCLUDE_INTERESTING and (tag_ids['good'] or request_user.has_interesting_wildcard_tags()):
                 # filter by interesting tags only
-                interesting_tag_filter = models.Q(tags__in=interesting_tags)
+                interesting_ids = set(tag_ids['good'])
                 if request_user.has_interesting_wildcard_tags():
-                    interesting_wildcards = request_user.interesting_tags.split()
-                    extra_interesting_tags = Tag.objects.get_by_wildcards(interesting_wildcards)
-                    interesting_tag_filter |= models.Q(tags__in=extra_interesting_tags)
-                qs = qs.filter(interesting_tag_filter)
+                    interesting_ids.update(preferences.get_wildcard_tag_ids('good'))
+                qs = qs.filter(tags__in=interesting_ids)
 
-            # get the list of interesting and ignored tags (interesting_tag_names, ignored_tag_names) = (None, None)
-            if request_user.display_tag_filter_strategy == const.EXCLUDE_IGNORED and (ignored_tags or request_user.has_ignored_wildcard_tags()):
+            if strategy == const.EXCLUDE_IGNORED and (tag_ids['bad'] or request_user.has_ignored_wildcard_tags()):
                 # exclude ignored tags if the user wants to
-                qs = qs.exclude(tags__in=ignored_tags)
+                ignored_ids = set(tag_ids['bad'])
                 if request_user.has_ignored_wildcard_tags():
-                    ignored_wildcards = request_user.ignored_tags.split()
-                    extra_ignored_tags = Tag.objects.get_by_wildcards(ignored_wildcards)
-                    qs = qs.exclude(tags__in=extra_ignored_tags)
+                    ignored_ids.update(preferences.get_wildcard_tag_ids('bad'))
+                qs = qs.exclude(tags__in=ignored_ids)
 
-            if request_user.display_tag_filter_strategy == const.INCLUDE_SUBSCRIBED \
-                    and subscribed_tags:
-                qs = qs.filter(tags__in=subscribed_tags)
+            if strategy == const.INCLUDE_SUBSCRIBED and tag_ids['subscribed']:
+                qs = qs.filter(tags__in=tag_ids['subscribed'])
 
             if askbot_settings.USE_WILDCARD_TAGS:
-                meta_data['interesting_tag_names'].extend(request_user.interesting_tags.split())
-                meta_data['ignored_tag_names'].extend(request_user.ignored_tags.split())
-
-        QUESTION_ORDER_BY_MAP = {
-            'age-desc': '-added_at',
-            'age-asc': 'added_at',
-            'activity-desc': '-last_activity_at',
-            'activity-asc': 'last_activity_at',
-            'answers-desc': '-answer_count',
-            'answers-asc': 'answer_count',
-            'votes-desc': '-points',
-            'votes-asc': 'points',
-
-            'relevance-desc': '-relevance', # special Postgresql-specific ordering, 'relevance' quaso-column is added by get_for_query()
-        }
+                meta_data['interesting_tag_names'].extend(preferences.get_wildcards('good'))
+                meta_data['ignored_tag_names'].extend(preferences.get_wildcards('bad'))
 
         orderby = QUESTION_ORDER_BY_MAP[search_state.sort]
 
@@ -483,12 +558,30 @@ class ThreadManager(BaseQuerySetManager):
         # UPDATE: Apparently we don't need distinct, the query don't duplicate Thread rows!
         # qs = qs.extra(select={'ordering_key': orderby.lstrip('-')}, order_by=['-ordering_key' if orderby.startswith('-') else 'ordering_key'])
         # qs = qs.distinct()
-        qs = qs.only(
-            'id', 'title', 'view_count', 'answer_count', 'last_activity_at',
-            'last_activity_by', 'closed', 'tagnames', 'accepted_answer'
-        )
+        qs = qs.only(*self.LISTING_FIELDS)
         return qs.distinct(), meta_data
 
+    def get_summaries_html(self, threads, search_state=None, visitor=None):
+        """returns list of the summary html of the threads,
+        the cached summaries are read with one cache request,
+        the missing ones are rendered and cached"""
+        keys = list()
+        for thread in threads:
+            signature = thread.get_visibility_signature(visitor)
+            keys.append(thread.get_summary_cache_key(signature=signature))
+        cached = cache.cache.get_many(keys)
+
+        missing = [thread for thread, key in zip(threads, keys) if key not in cached]
+        if missing:
+            self.precache_view_data_hack(threads=missing)
+
+        tag_urls = dict()
+        summaries = list()
+        for thread, key in zip(threads, keys):
+            html = cached.get(key) or thread.update_summary_html(visitor)
+            summaries.append(add_summary_tag_urls(html, search_state, tag_urls))
+        return summaries
+
     def precache_view_data_hack(self, threads):
         # TODO: Re-enable this when we have a good test cases to verify that it works properly.
         #
@@ -833,7 +926,10 @@ class Thread(models.Model):
 
         ####################################################################
         self.invalidate_cached_summary_html()
-        if not django_settings.CELERY_ALWAYS_EAGER:
+        from askbot.models import thread_cache
+        if thread_cache.is_enabled():
+            thread_cache.mark_dirty(self.id)
+        elif not django_settings.CELERY_ALWAYS_EAGER:
             self.update_summary_html()  # proactively regenerate thread summary html
         ####################################################################
 
@@ -1024,13 +1120,20 @@ class Thread(models.Model):
         langs = translation_utils.get_language_codes()
         keys = map(lambda v: self.get_summary_cache_key(v), langs)
         cache.cache.delete_many(keys)
+        self.invalidate_cached_visibility()
 
-    def get_summary_cache_key(self, lang=None):
+    def get_summary_cache_key(self, lang=None, signature=None):
         lang = lang or get_language()
-        return 'thread-question-summary-%d-%s' % (self.id, lang)
+        key = 'thread-question-summary-%d-%s' % (self.id, lang)
+        if signature:
+            key += '-' + signature
+        return key
 
-    def get_post_data_cache_key(self, sort_method=None):
-        return 'thread-data-%s-%s' % (self.id, sort_method)
+    def get_post_data_cache_key(self, sort_method=None, signature=None):
+        key = 'thread-data-%s-%s' % (self.id, sort_method)
+        if signature:
+            key += '-' + signature
+        return key
 
     def invalidate_cached_post_data(self):
         """needs to be called when anything notable
@@ -1040,14 +1143,71 @@ class Thread(models.Model):
         sort_methods = map(lambda v: v[0], const.ANSWER_SORT_METHODS)
         keys = map(lambda v: self.get_post_data_cache_key(v), sort_methods)
         cache.cache.delete_many(keys)
+        self.invalidate_cached_visibility()
+
+    def get_visibility_cache_key(self):
+        return 'thread-visibility-%d' % self.id
+
+    def get_visibility_info(self):
+        """returns tuple (generation, set of ids of groups
+        of the thread posts), cached.
+        Generation is a random string, it is a part of the
+        keys of the data cached per visibility signature, so
+        all such data is invalidated at once by dropping this info
+        """
+        key = self.get_visibility_cache_key()
+        info = cache.cache.get(key)
+        if info is None:
+            from askbot.models.post import PostToGroup
+            group_ids = PostToGroup.objects.filter(
+                                    post__thread=self
+                                ).values_list('group_id', flat=True)
+            generation = generate_random_key(length=8)
+            info = (generation, frozenset(group_ids))
+            cache.cache.set(key, info, const.LONG_TIME)
+        return info
+
+    def invalidate_cached_visibility(self):
+        """makes data cached per visibility signature unreachable,
+        must be called when posts of the thread are added to
+        or removed from groups"""
+        cache.cache.delete(self.get_visibility_cache_key())
+
+    def get_visibility_signature(self, user=None):
+        """returns string identifying the part of the thread
+        visible to the user, when groups are enabled, or ``None``.
+
+        Posts are shown to the members of the groups the posts
+        belong to, so users who share the same groups
+        among the groups of the posts of this thread see
+        the same content, regardless of the other groups they belong to.
+        Therefore the number of distinct signatures per thread is small
+        and the cached data is shared between the users.
+        """
+        if not askbot_settings.GROUPS_ENABLED:
+            return None
+        generation, thread_group_ids = self.get_visibility_info()
+        if user is None or user.is_anonymous():
+            return generation + '-anon'
+        visible_group_ids = thread_group_ids & user.get_group_ids()
+        group_ids_str = ','.join(map(str, sorted(visible_group_ids)))
+        return generation + '-' + hashlib.md5(group_ids_str).hexdigest()[:12]
 
     def reset_cached_data(self):
         self.clear_cached_data()
-        self.update_summary_html()
+        from askbot.models import thread_cache
+        if not thread_cache.is_enabled():
+            self.update_summary_html()
 
     def clear_cached_data(self):
+        """deletes the cached data, with
+        ``ASKBOT_THREAD_SUMMARY_REBUILD_ASYNC`` - also
+        queues the thread for the rebuild of the summary"""
         self.invalidate_cached_post_data()
         self.invalidate_cached_summary_html()
+        from askbot.models import thread_cache
+        if thread_cache.is_enabled():
+            thread_cache.mark_dirty(self.id)
 
     def get_post_data_for_question_view(self, user=None, sort_method=None):
         """loads post data for use in the question details view
@@ -1161,14 +1321,22 @@ class Thread(models.Model):
         the method get_post_data()"""
         sort_method = sort_method or askbot_settings.DEFAULT_ANSWER_SORT_METHOD
 
-        if askbot_settings.GROUPS_ENABLED:
-            # temporary plug: bypass cache where groups are enabled
-            return self.get_post_data(sort_method=sort_method, user=user)
-        key = self.get_post_data_cache_key(sort_method)
+        signature = self.get_visibility_signature(user)
+        key = self.get_post_data_cache_key(sort_method, signature)
         post_data = cache.cache.get(key)
         if not post_data:
-            post_data = self.get_post_data(sort_method)
+            if signature:
+                post_data = self.get_post_data(sort_method, user=user)
+            else:
+                post_data = self.get_post_data(sort_method)
             cache.cache.set(key, post_data, const.LONG_TIME)
+
+        if signature:
+            question_post = post_data[0]
+            if question_post and not question_post.is_approved():
+                # order of answers on the moderated thread
+                # depends on whether the user is the enquirer
+                return self.get_post_data(sort_method=sort_method, user=user)
         return post_data
 
     def get_public_posts(self):
@@ -1216,7 +1384,24 @@ class Thread(models.Model):
         else:
             order_by = (order_by,)
 
-        thread_posts = thread_posts.order_by(*order_by)
+        thread_posts = thread_posts.select_related('author')
+        thread_posts = list(thread_posts.order_by(*order_by))
+        # precache first and last revisions of all posts at once
+        from askbot.models.post import PostRevision
+        revisions = PostRevision.objects.get_first_and_last(
+                                        [post.id for post in thread_posts]
+                                    )
+        premoderation = askbot_settings.CONTENT_MODERATION_MODE == 'premoderation'
+        for post in thread_posts:
+            if post.id in revisions:
+                first_rev, last_rev = revisions[post.id]
+                post.cache_earliest_revision(first_rev)
+                post.cache_latest_revision(last_rev)
+                # revision 0 is the one waiting for moderation,
+                # same as checked by the Post.is_approved()
+                if premoderation and not post.approved and first_rev.revision == 0:
+                    post.set_runtime_needs_moderation()
+
         # 1) collect question, answer and comment posts and list of post id's
         answers = list()
         post_map = dict()
@@ -1317,10 +1502,19 @@ class Thread(models.Model):
         This function has a limitation that it will
         retrieve only 100 records then select 10 most similar
         from that list as querying entire database may
-        be very expensive - this function will benefit from
-        some sort of optimization
+        be very expensive - with ``ASKBOT_SIMILAR_THREADS_INDEX_ENABLED``
+        the similar threads are read from the pre-computed
+        index, see ``askbot.models.similar_threads``
         """
 
+        def get_indexed_data():
+            from askbot.models import similar_threads
+            questions = similar_threads.get_similar_questions(self)
+            return [
+                {'url': question.get_absolute_url(), 'title': question.thread.get_title()} \
+                for question in questions
+            ]
+
         def get_data():
             # TODO: code in this function would be simpler if
             # we had question post id denormalized on the thread
@@ -1367,10 +1561,14 @@ class Thread(models.Model):
             """similar thread data will expire
             with the default expiration delay
             """
-            key = 'similar-threads-%s' % self.id
+            from askbot.models import similar_threads
+            key = similar_threads.get_cache_key(self.id)
             data = cache.cache.get(key)
             if data is None:
-                data = get_data()
+                if similar_threads.is_enabled():
+                    data = get_indexed_data()
+                else:
+                    data = get_data()
                 cache.cache.set(key, data)
             return data
 
@@ -1424,6 +1622,7 @@ class Thread(models.Model):
         PostToGroup.objects\
             .filter(post__id__in=post_ids, tag__id__in=group_ids)\
             .delete()
+        self.invalidate_cached_visibility()
 
     def add_to_groups(self, groups,
                       visibility=ThreadToGroup.SHOW_ALL_RESPONSES,
@@ -1445,6 +1644,7 @@ class Thread(models.Model):
         if recursive:
             # comments are taken care of automatically
             self.add_child_posts_to_groups(groups)
+        self.invalidate_cached_visibility()
 
     def remove_from_groups(self, groups, recursive=False):
         thread_groups = ThreadToGroup.objects\
@@ -1452,6 +1652,7 @@ class Thread(models.Model):
         thread_groups.delete()
         if recursive:
             self.remove_child_posts_from_groups(groups)
+        self.invalidate_cached_visibility()
 
     def make_public(self, recursive=False):
         """adds the global group to the thread"""
@@ -1676,45 +1877,21 @@ class Thread(models.Model):
 
     def get_summary_html(self, search_state=None, visitor=None):
         html = self.get_cached_summary_html(visitor) or self.update_summary_html(visitor)
-        # TODO: this work may be pushed onto javascript we post-process tag names
-        # in the snippet so that tag urls match the search state
-        # use `<<<` and `>>>` because they cannot be confused with user input
-        # - if user accidentialy types <<<tag-name>>> into question title or body,
-        # then in html it'll become escaped like this: &lt;&lt;&lt;tag-name&gt;&gt;&gt;
-        regex = re.compile(
-            r'<<<(%s)>>>' % const.TAG_REGEX_BARE,
-            re.UNICODE
-        )
-
-        if search_state is None:
-            search_state = DummySearchState()
-
-        while True:
-            match = regex.search(html)
-            if not match:
-                break
-            seq = match.group(0)  # e.g "<<<my-tag>>>"
-            tag = match.group(1)  # e.g "my-tag"
-            full_url = search_state.add_tag(tag).full_url()
-            html = html.replace(seq, full_url)
-
-        return html
+        # tag urls in the cached summary are placeholders,
+        # post-process them so that tag urls match the search state,
+        # see Thread.objects.get_summaries_html() to render a page
+        return add_summary_tag_urls(html, search_state)
 
     def get_cached_summary_html(self, visitor=None):
-        # TODO: remove this plug by adding cached foreign user group
-        # parameter to the key. Now with groups on caching is turned off
-        # parameter visitor is there to get summary out by the user groups
-        if askbot_settings.GROUPS_ENABLED:
-            return None
-        return cache.cache.get(self.get_summary_cache_key())
+        # with groups enabled summary depends on the visitor groups,
+        # see get_visibility_signature()
+        signature = self.get_visibility_signature(visitor)
+        return cache.cache.get(self.get_summary_cache_key(signature=signature))
 
     def update_summary_html(self, visitor=None):
-        # TODO: it is quite wrong that visitor is an argument here
-        # because we do not include any visitor-related info in the cache key
-        # ideally cache should be shareable between users, so straight up
-        # using the user id for cache is wrong, we could use group
-        # memberships, but in that case we'd need to be more careful with
-        # cache invalidation
+        # summary is cached per visibility signature of the visitor,
+        # so the answer count and the latest revision shown
+        # are those visible to the visitor
         context = {
             'thread': self,
             # fetch new question post to make sure we're up-to-date
@@ -1731,12 +1908,14 @@ class Thread(models.Model):
         # * We probably don't need to pollute the cache with threads older than 30 days
         # * Additionally, Memcached treats timeouts > 30day as dates (https://code.djangoproject.com/browser/django/tags/releases/1.3/django/core/cache/backends/memcached.py#L36),
         #   which probably doesn't break anything but if we can stick to 30 days then let's stick to it
-        cache.cache.set(self.get_summary_cache_key(), html,
+        signature = self.get_visibility_signature(visitor)
+        cache.cache.set(self.get_summary_cache_key(signature=signature), html,
                         timeout=const.LONG_TIME)
         return html
 
-    def summary_html_cached(self):
-        return cache.cache.has_key(self.get_summary_cache_key())
+    def summary_html_cached(self, visitor=None):
+        signature = self.get_visibility_signature(visitor)
+        return cache.cache.has_key(self.get_summary_cache_key(signature=signature))
 
 
 class QuestionView(models.Model):
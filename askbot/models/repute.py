@@ -1,9 +1,10 @@
+import calendar
 import datetime
 
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes import generic
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.utils.translation import ugettext as _
 from django.utils.html import escape
 from django.utils import timezone
@@ -11,8 +12,12 @@ from django.core.urlresolvers import reverse
 
 from askbot import const
 from askbot.models.fields import LanguageCodeField
+from askbot.utils.timeseries import downsample_lttb
 from askbot.utils.translation import get_language
 
+#number of points of the reputation graph on the user profile
+REPUTATION_GRAPH_POINT_COUNT = 150
+
 
 class VoteManager(models.Manager):
     def get_up_vote_count_from_user(self, user):
@@ -171,17 +176,20 @@ class Award(models.Model):
 
 
 class ReputeManager(models.Manager):
-    def get_reputation_by_upvoted_today(self, user):
+    def get_reputation_by_upvoted_today(self, user, day=None):
         """
         For one user in one day, he can only earn rep till certain score
         (ep. +200) by upvoted(also subtracted from upvoted canceled). This is
         because we need to prohibit gaming system by upvoting/cancel again and
         again.
+
+        The vote handlers use the running total
+        kept in ``DailyReputationGain`` instead.
         """
         if user is None:
             return 0
         else:
-            today = datetime.date.today()
+            today = day or datetime.date.today()
             tomorrow = today + datetime.timedelta(1)
             rep_types = (1, -8)
             sums = self.filter(models.Q(reputation_type__in=rep_types),
@@ -200,6 +208,174 @@ class ReputeManager(models.Manager):
                 return 0
 
 
+def get_reputation_day(timestamp):
+    """returns date of the timestamp in the local time zone"""
+    if timezone.is_aware(timestamp):
+        timestamp = timezone.localtime(timestamp)
+    return timestamp.date()
+
+
+class DailyReputationGainManager(models.Manager):
+    def get_gain(self, user, day):
+        """returns reputation gained by the user from the upvotes
+        on the day, the missing record is created from
+        the ``Repute`` history of that day"""
+        try:
+            return self.get(user=user, day=day).points
+        except DailyReputationGain.DoesNotExist:
+            points = Repute.objects.get_reputation_by_upvoted_today(user, day)
+            try:
+                with transaction.atomic():
+                    self.create(user=user, day=day, points=points)
+            except IntegrityError:
+                # created by a concurrent vote
+                return self.get(user=user, day=day).points
+            return points
+
+    def add_gain(self, user, day, points):
+        """adds points to the daily gain of the user,
+        must be called before the matching ``Repute`` record is saved
+        """
+        updated = self.filter(user=user, day=day).update(
+                                            points=models.F('points') + points
+                                        )
+        if updated == 0:
+            self.get_gain(user, day)
+            self.filter(user=user, day=day).update(
+                                            points=models.F('points') + points
+                                        )
+
+
+class DailyReputationGain(models.Model):
+    """Running total of the reputation gained by the user
+    from the upvotes in one day, less the canceled upvotes -
+    same as the sum of ``Repute`` records of types 1 and -8,
+    used to cap the daily reputation gain without
+    aggregating the reputation history on each vote
+    """
+    user = models.ForeignKey(User)
+    day = models.DateField()
+    points = models.IntegerField(default=0)
+
+    objects = DailyReputationGainManager()
+
+    class Meta:
+        app_label = 'askbot'
+        unique_together = ('user', 'day')
+
+
+class ReputationBucketManager(models.Manager):
+
+    def update_bucket(self, repute):
+        """adds the ``Repute`` record to the existing
+        bucket of its day, returns ``False`` if there is none"""
+        buckets = self.filter(
+                        user_id=repute.user_id,
+                        language_code=repute.language_code,
+                        day=get_reputation_day(repute.reputed_at)
+                    )
+        count = models.F('repute_count') + 1
+        updated = buckets.filter(
+                        reputed_at__lte=repute.reputed_at
+                    ).update(
+                        reputation=repute.reputation,
+                        reputed_at=repute.reputed_at,
+                        repute_count=count
+                    )
+        if updated == 0:
+            #record older than the latest one of the day
+            updated = buckets.update(repute_count=count)
+        return updated > 0
+
+    def add_repute(self, repute):
+        """adds the newly saved ``Repute`` record
+        to the bucket of its day"""
+        for attempt in range(2):
+            if self.update_bucket(repute):
+                return
+            try:
+                with transaction.atomic():
+                    self.create(
+                        user_id=repute.user_id,
+                        language_code=repute.language_code,
+                        day=get_reputation_day(repute.reputed_at),
+                        reputation=repute.reputation,
+                        reputed_at=repute.reputed_at,
+                        repute_count=1
+                    )
+                return
+            except IntegrityError:
+                # created by a concurrent request
+                continue
+
+    def rebuild(self, user_ids):
+        """recalculates the buckets of the users from their
+        reputation history, returns number of the buckets"""
+        reputes = Repute.objects.filter(
+                                user_id__in=user_ids
+                            ).order_by(
+                                'user', 'language_code', 'reputed_at', 'id'
+                            ).values_list(
+                                'user_id', 'language_code',
+                                'reputed_at', 'reputation'
+                            )
+        buckets = dict()
+        for user_id, language_code, reputed_at, reputation in reputes.iterator():
+            day = get_reputation_day(reputed_at)
+            bucket = buckets.get((user_id, language_code, day))
+            if bucket is None:
+                bucket = self.model(user_id=user_id,
+                                    language_code=language_code,
+                                    day=day, repute_count=0)
+                buckets[(user_id, language_code, day)] = bucket
+            bucket.reputation = reputation
+            bucket.reputed_at = reputed_at
+            bucket.repute_count += 1
+
+        self.filter(user_id__in=user_ids).delete()
+        self.bulk_create(buckets.values(), batch_size=500)
+        return len(buckets)
+
+    def get_graph_points(self, user, language_code,
+                         count=REPUTATION_GRAPH_POINT_COUNT):
+        """returns list of at most ``count`` points
+        (timestamp in milliseconds, reputation) of the reputation
+        history of the user, sorted by time, read with one query"""
+        buckets = self.filter(
+                        user=user, language_code=language_code
+                    ).order_by('day').values_list('reputed_at', 'reputation')
+        points = [(calendar.timegm(reputed_at.timetuple()) * 1000, reputation) \
+                                        for reputed_at, reputation in buckets]
+        return downsample_lttb(points, count)
+
+
+class ReputationBucket(models.Model):
+    """Reputation of the user in one language at the end of
+    the day, after the latest ``Repute`` record of the day,
+    used to draw the reputation graph without reading the
+    whole reputation history. Changes per day are the
+    differences of the consecutive buckets.
+
+    Buckets are filled from the existing history by the migration
+    ``0019_populate_reputation_buckets``, are updated when ``Repute``
+    records are created and are recalculated by
+    ``python manage.py reconcile_reputation_history``
+    """
+    user = models.ForeignKey(User, related_name='reputation_buckets')
+    language_code = LanguageCodeField()
+    day = models.DateField()
+    reputation = models.IntegerField()
+    reputed_at = models.DateTimeField()
+    repute_count = models.PositiveIntegerField(default=0)
+
+    objects = ReputationBucketManager()
+
+    class Meta:
+        app_label = 'askbot'
+        db_table = 'askbot_reputation_bucket'
+        unique_together = ('user', 'language_code', 'day')
+
+
 class Repute(models.Model):
     """The reputation histories for user"""
     user = models.ForeignKey(User)
@@ -234,7 +410,10 @@ class Repute(models.Model):
             self.language_code = self.question.language_code
         else:
             self.language_code = get_language()
+        created = self.pk is None
         super(Repute, self).save(*args, **kwargs)
+        if created:
+            ReputationBucket.objects.add_repute(self)
 
     def get_explanation_snippet(self):
         """returns HTML snippet with a link to related question
@@ -0,0 +1,274 @@
+"""Index of the similar threads, shown as the "related
+questions" on the question page.
+
+For each thread :class:`SimilarThread` rows hold up to
+``SIMILAR_THREADS_COUNT`` most similar threads in the same
+language, by the weighted Jaccard similarity of the tag sets::
+
+    similarity(a, b) = weight of the common tags / weight of all tags of a and b
+
+where the weight of a tag is its inverse document frequency
+``log(1 + number of threads / Tag.used_count)``, so that
+a shared rare tag counts more than a shared popular one.
+
+The index is built with ``python manage.py build_similar_threads``
+and, while enabled, is updated in the background after the
+``tags_updated`` signal, by the celery task
+``askbot.tasks.update_similar_threads``. It is used by
+``Thread.get_similar_threads()`` when
+``ASKBOT_SIMILAR_THREADS_INDEX_ENABLED = True``.
+"""
+from collections import defaultdict
+import heapq
+import math
+
+from django.conf import settings as django_settings
+from django.core import cache
+from django.db import models, transaction
+
+from askbot.models.base import BaseQuerySetManager
+
+SIMILAR_THREADS_COUNT = 10
+#tags used on more threads than this are skipped when
+#looking for the candidate threads, they still count in the similarity
+MAX_TAG_THREADS = 1000
+BATCH_SIZE = 500
+
+
+def is_enabled():
+    return django_settings.ASKBOT_SIMILAR_THREADS_INDEX_ENABLED
+
+
+def get_cache_key(thread_id):
+    return 'similar-threads-%s' % thread_id
+
+
+def invalidate_cached_data(thread_ids):
+    cache.cache.delete_many([get_cache_key(thread_id) for thread_id in thread_ids])
+
+
+def get_batches(items):
+    items = list(items)
+    for start in range(0, len(items), BATCH_SIZE):
+        yield items[start:start + BATCH_SIZE]
+
+
+def get_thread_count(language_code):
+    from askbot.models.question import Thread
+    return Thread.objects.filter(language_code=language_code, deleted=False).count()
+
+
+def get_tag_weights(tag_ids, thread_count):
+    """returns dictionary tag id -> weight of the tag"""
+    from askbot.models.tag import Tag
+    weights = dict()
+    for batch in get_batches(tag_ids):
+        used_counts = Tag.objects.filter(id__in=batch).values_list('id', 'used_count')
+        for tag_id, used_count in used_counts:
+            weights[tag_id] = math.log(1.0 + float(thread_count) / max(used_count, 1))
+    return weights
+
+
+def get_thread_tags(thread_tag_pairs):
+    """returns dictionary thread id -> frozenset of tag ids"""
+    thread_tags = defaultdict(set)
+    for thread_id, tag_id in thread_tag_pairs:
+        thread_tags[thread_id].add(tag_id)
+    return dict((thread_id, frozenset(tags)) for thread_id, tags in thread_tags.items())
+
+
+class TagIndex(object):
+    """tags of the threads and the inverse - threads per tag"""
+
+    def __init__(self, thread_tags, weights):
+        self.thread_tags = thread_tags
+        self.weights = weights
+        self.tag_threads = defaultdict(list)
+        for thread_id, tags in thread_tags.items():
+            for tag_id in tags:
+                self.tag_threads[tag_id].append(thread_id)
+
+    def get_weight(self, tags):
+        return sum([self.weights.get(tag_id, 0) for tag_id in tags])
+
+    def get_similarity(self, tags, other_tags):
+        common = self.get_weight(tags & other_tags)
+        if common == 0:
+            return 0
+        return common / self.get_weight(tags | other_tags)
+
+    def get_candidates(self, tags):
+        """returns ids of the threads sharing any of
+        the tags used on at most ``MAX_TAG_THREADS`` threads"""
+        candidates = set()
+        for tag_id in tags:
+            thread_ids = self.tag_threads.get(tag_id, ())
+            if len(thread_ids) <= MAX_TAG_THREADS:
+                candidates.update(thread_ids)
+        return candidates
+
+    def get_scores(self, thread_id, tags=None):
+        """returns dictionary thread id -> similarity
+        to the thread, for the threads sharing tags with it"""
+        if tags is None:
+            tags = self.thread_tags[thread_id]
+        scores = dict()
+        for other_id in self.get_candidates(tags):
+            if other_id == thread_id:
+                continue
+            score = self.get_similarity(tags, self.thread_tags[other_id])
+            if score > 0:
+                scores[other_id] = score
+        return scores
+
+
+def get_top(scores, count=SIMILAR_THREADS_COUNT):
+    """returns list of (thread id, score) with the highest
+    scores, on equal scores newer threads go first"""
+    items = scores.items()
+    return heapq.nlargest(count, items, key=lambda item: (item[1], item[0]))
+
+
+class SimilarThreadManager(BaseQuerySetManager):
+
+    def rebuild(self, language_code):
+        """recalculates the similar threads of all threads
+        in the language, returns number of the threads"""
+        from askbot.models.question import Thread
+        thread_tag_pairs = Thread.tags.through.objects.filter(
+                                    thread__language_code=language_code,
+                                    thread__deleted=False
+                                ).values_list('thread_id', 'tag_id')
+        thread_tags = get_thread_tags(thread_tag_pairs.iterator())
+        tag_ids = set()
+        for tags in thread_tags.values():
+            tag_ids.update(tags)
+        weights = get_tag_weights(tag_ids, get_thread_count(language_code))
+        index = TagIndex(thread_tags, weights)
+
+        links = list()
+        for thread_id in thread_tags:
+            for similar_id, score in get_top(index.get_scores(thread_id)):
+                links.append(self.model(thread_id=thread_id,
+                                        similar_thread_id=similar_id,
+                                        score=score))
+
+        with transaction.atomic():
+            self.filter(thread__language_code=language_code).delete()
+            self.bulk_create(links, batch_size=BATCH_SIZE)
+
+        thread_ids = Thread.objects.filter(
+                            language_code=language_code
+                        ).values_list('id', flat=True)
+        for batch in get_batches(thread_ids):
+            invalidate_cached_data(batch)
+        return len(thread_tags)
+
+    def update_thread(self, thread):
+        """recalculates the similar threads of the thread
+        and its place among the similar threads of the threads
+        sharing tags with it.
+
+        Slots freed in the lists of other threads are filled
+        by the next rebuild."""
+        from askbot.models.question import Thread
+        from askbot.models.tag import Tag
+        Through = Thread.tags.through
+        tags = frozenset(thread.tags.values_list('id', flat=True))
+        lookup_tags = Tag.objects.filter(
+                                id__in=tags, used_count__lte=MAX_TAG_THREADS
+                            ).values_list('id', flat=True)
+        candidate_ids = Through.objects.filter(
+                                tag_id__in=list(lookup_tags)
+                            ).values('thread_id')
+        thread_tag_pairs = Through.objects.filter(
+                                thread_id__in=candidate_ids,
+                                thread__language_code=thread.language_code,
+                                thread__deleted=False
+                            ).values_list('thread_id', 'tag_id')
+        thread_tags = get_thread_tags(thread_tag_pairs)
+        thread_tags.pop(thread.id, None)
+
+        tag_ids = set(tags)
+        for other_tags in thread_tags.values():
+            tag_ids.update(other_tags)
+        weights = get_tag_weights(tag_ids, get_thread_count(thread.language_code))
+        index = TagIndex(thread_tags, weights)
+        scores = dict()
+        if not thread.deleted:
+            scores = index.get_scores(thread.id, tags=tags)
+
+        #current lists of the threads with the thread among the candidates
+        other_ids = set(scores.keys())
+        other_ids.update(self.filter(
+                            similar_thread=thread
+                        ).values_list('thread_id', flat=True))
+        other_scores = defaultdict(dict)
+        for batch in get_batches(other_ids):
+            links = self.filter(thread_id__in=batch)
+            for thread_id, similar_id, score in links.values_list(
+                                    'thread_id', 'similar_thread_id', 'score'):
+                other_scores[thread_id][similar_id] = score
+
+        new_links = list()
+        dropped = defaultdict(list)
+        for other_id in other_ids:
+            current = other_scores[other_id]
+            current.pop(thread.id, None)
+            if other_id in scores:
+                current[thread.id] = scores[other_id]
+            top_ids = set([item[0] for item in get_top(current)])
+            if thread.id in top_ids:
+                new_links.append(self.model(thread_id=other_id,
+                                            similar_thread_id=thread.id,
+                                            score=current[thread.id]))
+            for similar_id in set(current.keys()) - top_ids:
+                dropped[similar_id].append(other_id)
+
+        for similar_id, score in get_top(scores):
+            new_links.append(self.model(thread_id=thread.id,
+                                        similar_thread_id=similar_id,
+                                        score=score))
+
+        with transaction.atomic():
+            self.filter(models.Q(thread=thread) | models.Q(similar_thread=thread)).delete()
+            for similar_id, thread_ids in dropped.items():
+                self.filter(similar_thread_id=similar_id, thread_id__in=thread_ids).delete()
+            self.bulk_create(new_links, batch_size=BATCH_SIZE)
+
+        invalidate_cached_data(other_ids | set([thread.id]))
+
+
+class SimilarThread(models.Model):
+    """one of the threads most similar to the ``thread``"""
+    thread = models.ForeignKey('Thread', related_name='similar_thread_links')
+    similar_thread = models.ForeignKey('Thread', related_name='similar_to')
+    score = models.FloatField()
+
+    objects = SimilarThreadManager()
+
+    class Meta:
+        app_label = 'askbot'
+        db_table = 'askbot_similar_thread'
+        unique_together = ('thread', 'similar_thread')
+
+
+def get_similar_questions(thread):
+    """returns question posts of the similar threads
+    from the index, most similar first, with one query"""
+    from askbot.models.post import Post
+    questions = Post.objects.filter(
+                            post_type='question',
+                            deleted=False,
+                            thread__similar_to__thread_id=thread.id
+                        ).select_related('thread')
+    questions = questions.order_by('-thread__similar_to__score', '-thread_id')
+    return questions[:SIMILAR_THREADS_COUNT]
+
+
+def update_similar_threads(thread, **kwargs):
+    if not is_enabled():
+        return
+    from askbot import tasks
+    from askbot.utils.transaction import defer_celery_task
+    defer_celery_task(tasks.update_similar_threads, args=(thread.id,))
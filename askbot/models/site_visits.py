@@ -0,0 +1,99 @@
+"""Coalesced updates of the time of the last site visit
+(``UserProfile.last_seen``) of the authenticated users.
+
+Every page view by a logged in user sends the ``site_visited``
+signal, handled by ``askbot.models.record_user_visit``.
+When ``ASKBOT_LAST_SEEN_UPDATE_INTERVAL`` is greater than zero,
+the database is updated only when the visit is that many
+seconds later than the previously saved ``last_seen``
+or happens on another day - so that the consecutive
+days visit count and the related badges are still processed
+on the first visit of the day.
+
+Times of the skipped visits are kept in cache and saved
+in bulk by :func:`flush`, run periodically either by the celery task
+``askbot.tasks.flush_last_seen`` or the management command
+``flush_last_seen``. Without the flush ``last_seen`` lags
+by at most ``ASKBOT_LAST_SEEN_UPDATE_INTERVAL`` seconds.
+"""
+import datetime
+
+from django.conf import settings as django_settings
+from django.core import cache
+from django.db.models import Case, DateTimeField, F, Value, When
+
+from askbot import const
+from askbot.models.user_profile import UserProfile
+from askbot.models.view_buffer import get_batches
+from askbot.utils.cache_queue import CacheQueue
+
+#ids of users with the unsaved times of visits
+USER_QUEUE = CacheQueue('user-last-seen-users')
+
+
+def get_interval():
+    return django_settings.ASKBOT_LAST_SEEN_UPDATE_INTERVAL
+
+
+def get_pending_key(user_id):
+    return 'user-last-seen-%d' % user_id
+
+
+def needs_update(prev_last_seen, timestamp):
+    """True if the visit at ``timestamp`` must be
+    saved to the database right away"""
+    interval = get_interval()
+    if interval <= 0 or prev_last_seen is None:
+        return True
+    if prev_last_seen.date() != timestamp.date():
+        return True
+    delta = timestamp - prev_last_seen
+    return not (datetime.timedelta(0) <= delta < datetime.timedelta(seconds=interval))
+
+
+def record_visit(user_id, timestamp):
+    """remembers time of the visit, which was not saved"""
+    key = get_pending_key(user_id)
+    if cache.cache.add(key, timestamp, const.LONG_TIME):
+        USER_QUEUE.append(user_id)
+    else:
+        cache.cache.set(key, timestamp, const.LONG_TIME)
+
+
+def forget_visit(user_id):
+    """called when ``last_seen`` is saved directly"""
+    cache.cache.delete(get_pending_key(user_id))
+
+
+def update_last_seen(visits):
+    """saves times of the visits, ``visits`` is a dictionary
+    user id -> time of visit, later values already
+    in the database are kept"""
+    whens = [When(pk=user_id, last_seen__lt=timestamp, then=Value(timestamp)) \
+                                    for user_id, timestamp in visits.items()]
+    UserProfile.objects.filter(pk__in=visits.keys()).update(
+        last_seen=Case(*whens, default=F('last_seen'),
+                       output_field=DateTimeField())
+    )
+
+
+def flush(include_recent=False):
+    """writes times of the unsaved visits into the database,
+    returns number of updated users.
+
+    Cached profiles are not touched, so their ``last_seen``
+    may stay behind the database value for up to
+    ``ASKBOT_LAST_SEEN_UPDATE_INTERVAL`` seconds.
+    """
+    user_ids = set(USER_QUEUE.pop_all(include_recent=include_recent))
+    if len(user_ids) == 0:
+        return 0
+    keys = dict([(get_pending_key(user_id), user_id) for user_id in user_ids])
+    times = cache.cache.get_many(keys.keys())
+    # a visit recorded between the two calls is lost,
+    # the next visit by the same user will be saved
+    cache.cache.delete_many(times.keys())
+    visits = dict([(keys[key], timestamp) for key, timestamp in times.items()])
+    for batch in get_batches(visits.items()):
+        update_last_seen(dict(batch))
+    return len(visits)
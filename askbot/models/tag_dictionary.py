@@ -0,0 +1,198 @@
+"""Dictionary of the tag names of all languages, kept
+in the process memory, used to resolve tag names of the
+search state and the wildcard tag selections of the users
+to tag ids without queries.
+
+The dictionary is loaded with one query and is reloaded
+when the generation token in cache changes - on creation,
+rename or deletion of any tag, see :func:`invalidate_on_tag_save`,
+or when the token times out (``ASKBOT_TAG_DICTIONARY_TIMEOUT`` seconds),
+which picks up changes made with ``update()`` queries.
+Names missing in the dictionary are looked up in the database,
+so tags created by other processes are found right away.
+"""
+import bisect
+from collections import defaultdict
+
+from django.conf import settings as django_settings
+from django.core import cache
+
+from askbot.utils.functions import generate_random_key
+
+GENERATION_KEY = 'tag-dictionary-generation'
+
+#dictionary loaded by this process and its generation
+_local = {'generation': None, 'dictionary': None}
+
+
+def get_timeout():
+    return django_settings.ASKBOT_TAG_DICTIONARY_TIMEOUT
+
+
+def get_generation():
+    generation = cache.cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = generate_random_key(length=8)
+        cache.cache.set(GENERATION_KEY, generation, get_timeout())
+    return generation
+
+
+def invalidate():
+    """makes dictionaries of all processes outdated"""
+    cache.cache.delete(GENERATION_KEY)
+
+
+class TagDictionary(object):
+    """tag ids by name and language, with the
+    case insensitive and the prefix lookups of the names"""
+
+    def __init__(self, tags):
+        #name -> {language code -> tag id}
+        self.ids = defaultdict(dict)
+        #(language code, lowercased name) -> names
+        self.lowercase_names = defaultdict(list)
+        names = defaultdict(list)
+        for tag_id, name, language_code in tags:
+            self.ids[name][language_code] = tag_id
+            self.lowercase_names[(language_code, name.lower())].append(name)
+            names[language_code].append(name)
+        #language code -> sorted names, for the prefix lookups
+        self.sorted_names = dict(
+            (language_code, sorted(lang_names)) \
+                                for language_code, lang_names in names.items()
+        )
+
+    def get_id(self, name, language_code):
+        return self.ids.get(name, {}).get(language_code)
+
+    def get_ids(self, name):
+        """returns ids of the tags with the name in all languages"""
+        return self.ids.get(name, {}).values()
+
+    def get_names_iexact(self, name, language_code):
+        """returns names of the tags in the language,
+        equal to the name ignoring case"""
+        return self.lowercase_names.get((language_code, name.lower()), [])
+
+    def get_wildcard_ids(self, wildcards, language_code):
+        """returns set of ids of the tags in the language,
+        matching any of the wildcards like ``pyth*``"""
+        names = self.sorted_names.get(language_code, [])
+        tag_ids = set()
+        for wildcard in wildcards:
+            prefix = wildcard[:-1]
+            pos = bisect.bisect_left(names, prefix)
+            while pos < len(names) and names[pos].startswith(prefix):
+                tag_ids.add(self.ids[names[pos]][language_code])
+                pos += 1
+        return tag_ids
+
+
+def load_dictionary():
+    from askbot.models.tag import Tag
+    tags = Tag.objects.values_list('id', 'name', 'language_code')
+    return TagDictionary(tags.iterator())
+
+
+def get_dictionary():
+    generation = get_generation()
+    if _local['generation'] != generation:
+        _local['dictionary'] = load_dictionary()
+        _local['generation'] = generation
+    return _local['dictionary']
+
+
+def get_loaded_dictionary():
+    """returns the dictionary of this process,
+    if it is up to date, or ``None``"""
+    if _local['generation'] == cache.cache.get(GENERATION_KEY):
+        return _local['dictionary']
+    return None
+
+
+def get_tag_ids_per_name(tag_names, language_code, case_sensitive=True):
+    """returns tuple: list of lists of ids of the tags
+    in any language, one list per tag name and a list of the
+    names without tags.
+
+    With ``case_sensitive=False`` names are matched ignoring
+    case in the language first, as the tag search input does.
+    """
+    from askbot.models.tag import Tag
+    dictionary = get_dictionary()
+    tag_ids_per_name = list()
+    missing_names = list()
+    for tag_name in tag_names:
+        if case_sensitive:
+            names = [tag_name]
+        else:
+            names = dictionary.get_names_iexact(tag_name, language_code)
+        tag_ids = list()
+        for name in names:
+            tag_ids.extend(dictionary.get_ids(name))
+
+        if len(tag_ids) == 0:
+            #the dictionary may miss recently created tags
+            if case_sensitive:
+                tags = Tag.objects.filter(name=tag_name)
+            else:
+                tags = Tag.objects.filter(name__iexact=tag_name,
+                                          language_code=language_code)
+                tags = Tag.objects.filter(name__in=tags.values('name'))
+            tag_ids = list(tags.values_list('id', flat=True))
+            if tag_ids:
+                invalidate()
+
+        if tag_ids:
+            tag_ids_per_name.append(tag_ids)
+        else:
+            missing_names.append(tag_name)
+    return tag_ids_per_name, missing_names
+
+
+def get_wildcard_tag_ids(wildcards, language_code):
+    """returns set of ids of the tags matching the wildcards,
+    same as ``Tag.objects.get_by_wildcards()``"""
+    if not wildcards:
+        return set()
+    return get_dictionary().get_wildcard_ids(wildcards, language_code)
+
+
+def find_tag_change(sender, instance, raw=False, update_fields=None, **kwargs):
+    """remembers on the tag instance before the save, whether
+    it is new or its name or language differ from the ones
+    in the dictionary or in the database, so that saves of the
+    other fields, e.g. of the ``used_count``, keep the dictionary"""
+    if raw:
+        return
+    if update_fields is not None \
+        and not set(update_fields) & set(['name', 'language_code']):
+        changed = False
+    elif instance.pk is None:
+        changed = True
+    else:
+        dictionary = get_loaded_dictionary()
+        if dictionary is not None \
+            and dictionary.get_id(instance.name, instance.language_code) == instance.pk:
+            changed = False
+        else:
+            unchanged = sender.objects.filter(
+                                    pk=instance.pk,
+                                    name=instance.name,
+                                    language_code=instance.language_code
+                                )
+            changed = not unchanged.exists()
+    instance._tag_dictionary_changed = changed
+
+
+def invalidate_on_tag_save(sender, instance, created=False, raw=False, **kwargs):
+    """invalidates the dictionary, if the tag was created,
+    renamed or moved to another language"""
+    if raw:
+        return
+    if created or getattr(instance, '_tag_dictionary_changed', True):
+        invalidate()
+
+
+def invalidate_on_tag_delete(sender, instance, **kwargs):
+    invalidate()
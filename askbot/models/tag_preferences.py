@@ -0,0 +1,149 @@
+"""Tag preferences of a user - ids and names of the marked tags
+per reason ("good", "bad" and "subscribed"), the wildcard tag
+selections and the tag filter strategies, read with one query
+and cached per user and language.
+
+The cached data of a user shares a version token, which is
+replaced by :func:`invalidate` from ``User.mark_tags()``,
+``User.update_wildcard_tag_selections()``, when tag marks are saved
+or deleted and when the tag fields of the user profile change.
+Within a request the preferences are memoized on the user object,
+see ``User.get_tag_preferences()``.
+"""
+from django.conf import settings as django_settings
+from django.core import cache
+
+from askbot.models import tag_dictionary
+from askbot.utils.functions import generate_random_key
+from askbot.utils.translation import get_language
+
+REASONS = ('good', 'bad', 'subscribed')
+WILDCARD_FIELDS = {
+    'good': 'interesting_tags',
+    'bad': 'ignored_tags',
+    'subscribed': 'subscribed_tags',
+}
+#user profile fields, stored with the preferences
+PROFILE_FIELDS = (
+    'display_tag_filter_strategy',
+    'email_tag_filter_strategy',
+    'ignored_tags',
+    'interesting_tags',
+    'subscribed_tags',
+)
+
+
+def get_timeout():
+    return django_settings.ASKBOT_TAG_PREFERENCES_TIMEOUT
+
+
+def get_version_key(user_id):
+    return 'tag-preferences-version-%d' % user_id
+
+
+def get_version(user_id):
+    key = get_version_key(user_id)
+    version = cache.cache.get(key)
+    if version is None:
+        version = generate_random_key(length=8)
+        cache.cache.set(key, version, get_timeout())
+    return version
+
+
+def get_cache_key(user_id, language_code):
+    data = (user_id, language_code, get_version(user_id))
+    return 'tag-preferences-%d-%s-%s' % data
+
+
+def invalidate(user_id):
+    """makes cached preferences of the user outdated in all languages"""
+    cache.cache.delete(get_version_key(user_id))
+
+
+class TagPreferences(object):
+    """tag selections of one user in one language"""
+
+    def __init__(self, language_code, marked_tags, wildcards,
+                 display_tag_filter_strategy, email_tag_filter_strategy):
+        """``marked_tags`` - iterable of (tag id, tag name, reason),
+        ``wildcards`` - dictionary reason -> list of wildcards"""
+        self.language_code = language_code
+        self.tag_ids = dict((reason, list()) for reason in REASONS)
+        self.tag_names = dict((reason, list()) for reason in REASONS)
+        for tag_id, tag_name, reason in marked_tags:
+            if reason in self.tag_ids:
+                self.tag_ids[reason].append(tag_id)
+                self.tag_names[reason].append(tag_name)
+        self.wildcards = wildcards
+        self.display_tag_filter_strategy = display_tag_filter_strategy
+        self.email_tag_filter_strategy = email_tag_filter_strategy
+
+    def get_tag_ids(self, reason):
+        return list(self.tag_ids[reason])
+
+    def get_tag_names(self, reason):
+        """names of the marked tags, without the wildcards"""
+        return list(self.tag_names[reason])
+
+    def get_wildcards(self, reason):
+        return list(self.wildcards[reason])
+
+    def get_wildcard_tag_ids(self, reason):
+        """ids of the tags matching the wildcards of the user"""
+        return tag_dictionary.get_wildcard_tag_ids(
+                                self.wildcards[reason], self.language_code
+                            )
+
+    def get_selected_tag_ids(self, reason, use_wildcards=True):
+        """returns set of ids of the marked tags
+        and, optionally, of the tags matching the wildcards"""
+        tag_ids = set(self.tag_ids[reason])
+        if use_wildcards:
+            tag_ids.update(self.get_wildcard_tag_ids(reason))
+        return tag_ids
+
+
+def load_tag_preferences(user, language_code):
+    from askbot.models.tag import Tag
+    marked_tags = Tag.objects.filter(
+                        user_selections__user=user,
+                        language_code=language_code
+                    ).values_list('id', 'name', 'user_selections__reason')
+    wildcards = dict(
+        (reason, getattr(user, field).split()) \
+                                for reason, field in WILDCARD_FIELDS.items()
+    )
+    return TagPreferences(
+                language_code,
+                marked_tags,
+                wildcards,
+                user.display_tag_filter_strategy,
+                user.email_tag_filter_strategy
+            )
+
+
+def get_tag_preferences(user, language_code=None):
+    """returns :class:`TagPreferences` of the user, from cache if possible"""
+    language_code = language_code or get_language()
+    key = get_cache_key(user.id, language_code)
+    preferences = cache.cache.get(key)
+    if preferences is None:
+        preferences = load_tag_preferences(user, language_code)
+        cache.cache.set(key, preferences, get_timeout())
+    return preferences
+
+
+def invalidate_on_profile_update(profile, old_profile):
+    """invalidates preferences of the user if the fields
+    of the profile stored with the preferences were changed"""
+    if old_profile is None:
+        invalidate(profile.auth_user_ptr_id)
+        return
+    for field in PROFILE_FIELDS:
+        if getattr(profile, field) != getattr(old_profile, field):
+            invalidate(profile.auth_user_ptr_id)
+            return
+
+
+def invalidate_on_marked_tag_change(sender, instance, **kwargs):
+    invalidate(instance.user_id)
@@ -0,0 +1,305 @@
+"""Cached index of the users subscribed to instant
+notifications about the whole forum (``q_all`` feed with
+``i`` frequency), used to find recipients of the notifications
+about a new post by the post tags.
+
+The index is kept in cache and consists of:
+
+* ids of the subscribers per email tag filter strategy - "segments"
+* ids of the subscribers in a segment who marked the tag
+  as interesting, ignored or subscribed, per tag name and language
+* per tag mark reason - a prefix tree of the wildcard tag selections
+  of the subscribers, so that users with wildcards matching
+  a tag are found without looping through all users with wildcards
+
+All parts of the index share a generation token, the whole index
+is rebuilt lazily, when the token expires after
+``ASKBOT_TAG_SUBSCRIBERS_INDEX_TIMEOUT`` seconds or is dropped
+with :func:`invalidate`. Changes of the subscriptions, tag marks
+and tag filter settings of a user drop only the entries affected
+by the change, which are rebuilt from the database when read next -
+see :func:`update_user`, :func:`update_user_tags` and
+:func:`update_user_wildcards`. They are called by the code changing
+the settings and must also be called after ``update()`` queries
+changing ``EmailFeedSetting`` or ``MarkedTag`` rows,
+as these send no signals.
+"""
+import hashlib
+
+from django.conf import settings as django_settings
+from django.contrib.auth.models import User
+from django.core import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils.encoding import smart_str
+
+from askbot import const
+from askbot.models.tag import MarkedTag
+from askbot.models.user_profile import UserProfile
+from askbot.utils.functions import generate_random_key
+from askbot.utils.translation import get_language
+
+GENERATION_KEY = 'tag-subscribers-generation'
+WILDCARD_FIELDS = {
+    'good': 'interesting_tags',
+    'bad': 'ignored_tags',
+    'subscribed': 'subscribed_tags',
+}
+STRATEGIES = {
+    'good': const.INCLUDE_INTERESTING,
+    'bad': const.EXCLUDE_IGNORED,
+    'subscribed': const.INCLUDE_SUBSCRIBED,
+}
+SEGMENT_STRATEGIES = (
+    const.INCLUDE_ALL,
+    const.EXCLUDE_IGNORED,
+    const.INCLUDE_INTERESTING,
+    const.INCLUDE_SUBSCRIBED,
+)
+BATCH_SIZE = 500
+
+#reason -> (version, wildcard tree), unpickled from cache, per process
+_local_trees = dict()
+
+
+def is_enabled():
+    return django_settings.ASKBOT_TAG_SUBSCRIBERS_INDEX_TIMEOUT > 0
+
+
+def get_timeout():
+    return django_settings.ASKBOT_TAG_SUBSCRIBERS_INDEX_TIMEOUT
+
+
+def get_generation():
+    generation = cache.cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = generate_random_key(length=8)
+        cache.cache.set(GENERATION_KEY, generation, get_timeout())
+    return generation
+
+
+def invalidate():
+    """makes the whole index outdated"""
+    cache.cache.delete(GENERATION_KEY)
+
+
+def get_subscribed_users(strategy):
+    """query set of users subscribed to the instant
+    notifications about the whole forum, using the strategy"""
+    return User.objects.filter(
+        askbot_profile__email_tag_filter_strategy=strategy,
+        notification_subscriptions__feed_type='q_all',
+        notification_subscriptions__frequency='i'
+    )
+
+
+class WildcardTree(object):
+    """Prefix tree of the wildcard tags like ``pyth*``,
+    nodes store ids of the users who selected the wildcard
+    ending at the node"""
+    def __init__(self):
+        #node is a list [set of user ids, dictionary char -> node]
+        self.root = [set(), dict()]
+
+    def add(self, wildcard, user_id):
+        node = self.root
+        #same as tags_match_some_wildcard - the last char is a star
+        for char in wildcard[:-1]:
+            node = node[1].setdefault(char, [set(), dict()])
+        node[0].add(user_id)
+
+    def match(self, tag_name):
+        """returns set of ids of users with wildcards matching the tag"""
+        node = self.root
+        user_ids = set(node[0])
+        for char in tag_name:
+            node = node[1].get(char)
+            if node is None:
+                break
+            user_ids.update(node[0])
+        return user_ids
+
+
+def get_segment_key(strategy):
+    return 'tag-subscribers-segment-%s-%d' % (get_generation(), strategy)
+
+
+def get_segment(strategy):
+    """returns frozenset of ids of the subscribers using the strategy"""
+    key = get_segment_key(strategy)
+    user_ids = cache.cache.get(key)
+    if user_ids is None:
+        qs = get_subscribed_users(strategy).values_list('id', flat=True)
+        user_ids = frozenset(qs.distinct())
+        cache.cache.set(key, user_ids, get_timeout())
+    return user_ids
+
+
+def get_tag_key(reason, language, tag_name, generation=None):
+    digest = hashlib.md5(smart_str(tag_name)).hexdigest()
+    data = (generation or get_generation(), reason, language, digest)
+    return 'tag-subscribers-tag-%s-%s-%s-%s' % data
+
+
+def get_tag_markers(tag_names, reason, language):
+    """returns set of ids of the subscribers, who marked
+    any of the tags for the reason and use the matching strategy"""
+    keys = dict((get_tag_key(reason, language, name), name) for name in tag_names)
+    cached = cache.cache.get_many(keys.keys())
+    user_ids = set()
+    for ids in cached.values():
+        user_ids.update(ids)
+
+    missing = [keys[key] for key in keys if key not in cached]
+    if missing:
+        marks = MarkedTag.objects.filter(
+                    tag__name__in=missing,
+                    tag__language_code=language,
+                    reason=reason,
+                    user__in=get_subscribed_users(STRATEGIES[reason])
+                ).values_list('tag__name', 'user_id')
+        found = dict((name, set()) for name in missing)
+        for tag_name, user_id in marks:
+            found[tag_name].add(user_id)
+        data = dict(
+            (get_tag_key(reason, language, name), frozenset(ids)) \
+                                            for name, ids in found.items()
+        )
+        cache.cache.set_many(data, get_timeout())
+        for ids in found.values():
+            user_ids.update(ids)
+    return user_ids
+
+
+def build_wildcard_tree(reason):
+    field = WILDCARD_FIELDS[reason]
+    profiles = UserProfile.objects.filter(
+                    auth_user_ptr__in=get_subscribed_users(STRATEGIES[reason])
+                ).exclude(
+                    **{field + '__exact': ''}
+                ).values_list('auth_user_ptr_id', field)
+    tree = WildcardTree()
+    for user_id, wildcards in profiles.iterator():
+        for wildcard in wildcards.split():
+            tree.add(wildcard, user_id)
+    return tree
+
+
+def get_wildcard_tree_keys(reason):
+    """returns cache keys of the tree and of its version"""
+    key = 'tag-subscribers-wildcards-%s-%s' % (get_generation(), reason)
+    return key, key + '-version'
+
+
+def get_wildcard_tree(reason):
+    tree_key, version_key = get_wildcard_tree_keys(reason)
+    version = cache.cache.get(version_key)
+    local = _local_trees.get(reason)
+    if version and local and local[0] == version:
+        return local[1]
+
+    tree = cache.cache.get(tree_key)
+    if tree is None:
+        tree = build_wildcard_tree(reason)
+        cache.cache.set(tree_key, tree, get_timeout())
+    if version is None:
+        version = generate_random_key(length=8)
+        cache.cache.set(version_key, version, get_timeout())
+    _local_trees[reason] = (version, tree)
+    return tree
+
+
+def get_wildcard_markers(tag_names, reason):
+    tree = get_wildcard_tree(reason)
+    user_ids = set()
+    for tag_name in tag_names:
+        user_ids.update(tree.match(tag_name))
+    return user_ids
+
+
+def get_subscriber_ids(tag_names, reason, use_wildcards=False):
+    """returns set of ids of users who follow or
+    "do not ignore" the tags, depending on the ``reason``,
+    same as ``Post.get_global_tag_based_subscribers()``
+    for the instant notification subscribers"""
+    language = get_language()
+    user_ids = get_tag_markers(tag_names, reason, language)
+    if use_wildcards:
+        user_ids.update(get_wildcard_markers(tag_names, reason))
+    if reason == 'bad':
+        return set(get_segment(const.EXCLUDE_IGNORED)) - user_ids
+    return user_ids
+
+
+def get_users(user_ids):
+    """returns set of users with given ids"""
+    user_ids = list(user_ids)
+    users = set()
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        batch = user_ids[start:start + BATCH_SIZE]
+        users.update(User.objects.filter(id__in=batch))
+    return users
+
+
+def drop_segments():
+    """drops the cached ids of subscribers per strategy"""
+    cache.cache.delete_many([get_segment_key(strategy) \
+                                    for strategy in SEGMENT_STRATEGIES])
+
+
+def drop_tag_markers(tags):
+    """drops the cached ids of subscribers marking the tags,
+    ``tags`` - iterable of (tag name, language) tuples"""
+    generation = get_generation()
+    keys = list()
+    for tag_name, language in set(tags):
+        for reason in STRATEGIES:
+            keys.append(get_tag_key(reason, language, tag_name, generation))
+    for start in range(0, len(keys), BATCH_SIZE):
+        cache.cache.delete_many(keys[start:start + BATCH_SIZE])
+
+
+def drop_wildcard_trees(reasons=None):
+    """drops the wildcard trees, which are rebuilt when read next,
+    processes holding a tree in memory see the missing version"""
+    keys = list()
+    for reason in reasons or WILDCARD_FIELDS.keys():
+        keys.extend(get_wildcard_tree_keys(reason))
+    cache.cache.delete_many(keys)
+
+
+def update_user(user_id):
+    """drops the cached entries affected by the change of
+    the subscription or of the email tag filter strategy of the user,
+    the entries are rebuilt from the database when read next"""
+    drop_segments()
+    marked = MarkedTag.objects.filter(
+                        user__id=user_id
+                    ).values_list('tag__name', 'tag__language_code')
+    drop_tag_markers(marked)
+    drop_wildcard_trees()
+
+
+def update_user_tags(user_id, tags):
+    """drops the cached entries affected by the user marking
+    or unmarking the tags, ``tags`` - iterable of (tag name, language)"""
+    drop_tag_markers(tags)
+
+
+def update_user_wildcards(user_id, reasons):
+    """drops the trees of the wildcard selections of the user"""
+    drop_wildcard_trees(reasons)
+
+
+def update_on_marked_tag_change(sender, instance, **kwargs):
+    if not is_enabled():
+        return
+    try:
+        tag = instance.tag
+    except ObjectDoesNotExist:
+        return # tag is deleted with its marks
+    update_user_tags(instance.user_id, [(tag.name, tag.language_code)])
+
+
+def update_on_feed_change(sender, instance, **kwargs):
+    if is_enabled() and instance.feed_type == 'q_all':
+        update_user(instance.subscriber_id)
@@ -0,0 +1,114 @@
+"""Deferred rebuild of the cached thread summary html.
+
+When ``ASKBOT_THREAD_SUMMARY_REBUILD_ASYNC = True``,
+``Thread.reset_cached_data()`` only deletes the cached data
+and marks the thread "dirty", instead of rendering
+the summary html in the request.
+
+Dirty threads are kept in a queue, a thread marked again before
+it is rebuilt stays in the queue once, so repeated changes
+of a busy thread, e.g. a burst of votes, cause a single rebuild.
+Function :func:`rebuild` renders the summaries of the queued threads,
+it must be run periodically, either by the celery task
+``askbot.tasks.rebuild_thread_summaries`` or by the management
+command ``rebuild_thread_summaries``. Until then the summaries
+are rendered on demand, as without the queue.
+
+Counts of the marked, coalesced and rebuilt threads are
+kept in cache, see :func:`get_stats`.
+"""
+from django.conf import settings as django_settings
+from django.core import cache
+from django.utils import translation
+
+from askbot import const
+from askbot.utils.cache_queue import CacheQueue, incr_counter
+from askbot.utils.translation import get_language_codes
+
+#ids of threads waiting for the rebuild of summaries
+THREAD_QUEUE = CacheQueue('thread-summary-dirty-threads')
+STAT_NAMES = ('marked', 'coalesced', 'rebuilt', 'skipped')
+BATCH_SIZE = 100
+
+
+def is_enabled():
+    return django_settings.ASKBOT_THREAD_SUMMARY_REBUILD_ASYNC
+
+
+def get_dirty_key(thread_id):
+    return 'thread-summary-dirty-%d' % thread_id
+
+
+def get_stat_key(name):
+    return 'thread-summary-stats-' + name
+
+
+def mark_dirty(thread_id):
+    """queues the thread for the rebuild of the summary,
+    unless it is queued already"""
+    incr_counter(get_stat_key('marked'))
+    if cache.cache.add(get_dirty_key(thread_id), True, const.LONG_TIME):
+        THREAD_QUEUE.append(thread_id)
+    else:
+        incr_counter(get_stat_key('coalesced'))
+
+
+def get_stats():
+    """returns dictionary with numbers of threads:
+
+    * marked - times threads were marked dirty
+    * coalesced - marks of the threads, which were already queued
+    * rebuilt - summaries rendered by :func:`rebuild`
+    * skipped - summaries rendered on demand before :func:`rebuild`
+    """
+    keys = dict((get_stat_key(name), name) for name in STAT_NAMES)
+    values = cache.cache.get_many(keys.keys())
+    return dict((name, values.get(key, 0)) for key, name in keys.items())
+
+
+def reset_stats():
+    cache.cache.delete_many([get_stat_key(name) for name in STAT_NAMES])
+
+
+def rebuild_summaries(threads, languages=None):
+    """renders summaries of the threads for the languages,
+    by default - in the language of each thread,
+    returns tuple (number rendered, number skipped)"""
+    rendered = 0
+    skipped = 0
+    for thread in threads:
+        for lang in languages or (thread.language_code,):
+            with translation.override(lang):
+                if thread.get_cached_summary_html():
+                    skipped += 1
+                    continue
+                thread.update_summary_html()
+                rendered += 1
+    return rendered, skipped
+
+
+def rebuild(all_languages=False, include_recent=False):
+    """renders summaries of the dirty threads,
+    returns number of the threads.
+
+    With ``all_languages=True`` summaries are pre-rendered
+    for all the languages of the site, not only for
+    the language of the thread.
+    """
+    from askbot.models.question import Thread
+    thread_ids = sorted(set(THREAD_QUEUE.pop_all(include_recent=include_recent)))
+    if len(thread_ids) == 0:
+        return 0
+    # changes made from now on queue the threads again
+    cache.cache.delete_many([get_dirty_key(thread_id) for thread_id in thread_ids])
+
+    languages = get_language_codes() if all_languages else None
+    count = 0
+    for start in range(0, len(thread_ids), BATCH_SIZE):
+        batch = thread_ids[start:start + BATCH_SIZE]
+        threads = Thread.objects.filter(id__in=batch)
+        rendered, skipped = rebuild_summaries(threads, languages)
+        incr_counter(get_stat_key('rebuilt'), rendered)
+        incr_counter(get_stat_key('skipped'), skipped)
+        count += len(threads)
+    return count
@@ -220,6 +220,50 @@ class ActivityManager(BaseQuerySetManager):
 
         return mention_activity
 
+    def create_new_mentions(
+                self,
+                mentioned_by = None,
+                mentioned_whom = None,
+                mentioned_at = None,
+                mentioned_in = None
+            ):
+        """same as :meth:`create_new_mention` for each of the users
+        in ``mentioned_whom``, except that the mention activities
+        and their recipients are created with a fixed number of
+        queries and the response counts of the
+        users are not updated - it is up to the caller
+        """
+        users = list(mentioned_whom)
+        if len(users) == 0:
+            return list()
+
+        #all mentions must have the same time to be found below
+        mentioned_at = mentioned_at or timezone.now()
+        content_type = ContentType.objects.get_for_model(mentioned_in)
+        kwargs = {
+            'activity_type': const.TYPE_ACTIVITY_MENTION,
+            'active_at': mentioned_at,
+            'user': mentioned_by,
+            'content_type': content_type,
+            'object_id': mentioned_in.id,
+            'is_auditted': False
+        }
+        question = mentioned_in.get_origin_post()
+        self.bulk_create([
+            Activity(question=question, **kwargs) for user in users
+        ])
+
+        #bulk_create does not set the ids, so the new
+        #mentions are the ones that don't have recipients yet
+        mentions = list(
+            self.filter(recipients=None, **kwargs).order_by('-id')[:len(users)]
+        )
+        ActivityAuditStatus.objects.bulk_create([
+            ActivityAuditStatus(user=user, activity=mention) \
+                                for user, mention in zip(users, mentions)
+        ])
+        return mentions
+
     def get_mentions(
                 self,
                 mentioned_by = None,
@@ -324,10 +368,10 @@ class Activity(models.Model):
         """have to use a special method, because django does not allow
         auto-adding to M2M with "through" model
         """
-        for recipient in recipients:
-            #todo: may optimize for bulk addition
-            aas = ActivityAuditStatus(user=recipient, activity=self)
-            aas.save()
+        ActivityAuditStatus.objects.bulk_create([
+            ActivityAuditStatus(user=recipient, activity=self) \
+                                        for recipient in recipients
+        ])
 
     def get_mentioned_user(self):
         assert(self.activity_type == const.TYPE_ACTIVITY_MENTION)
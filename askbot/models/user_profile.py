@@ -5,13 +5,18 @@ from django.core.cache import cache
 from django.db.models.signals import post_save
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import F
 from django.utils import timezone
 from jsonfield import JSONField
 from django_countries.fields import CountryField
 
+def get_profile_cache_key_by_id(user_id):
+    return 'askbot-profile-{}'.format(user_id)
+
+
 def get_profile_cache_key(user):
     if user.pk:
-        return 'askbot-profile-{}'.format(user.pk)
+        return get_profile_cache_key_by_id(user.pk)
     raise ValueError('auth.models.User is not saved, cant make cache key')
 
 
@@ -40,6 +45,18 @@ def get_profile(user):
     return profile
 
 
+def increment_new_response_counts(user_ids, batch_size=500):
+    """adds one to the ``new_response_count`` of the users
+    with ``UPDATE`` queries and drops their cached profiles"""
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        UserProfile.objects.filter(pk__in=batch).update(
+                        new_response_count=F('new_response_count') + 1
+                    )
+        cache.delete_many([get_profile_cache_key_by_id(pk) for pk in batch])
+
+
 def user_profile_property(field_name):
     """returns property that will access Askbot UserProfile
     of auth_user by field name"""
@@ -185,6 +202,9 @@ class UserProfile(models.Model):
 
     def update_cache(self):
         key = self.get_cache_key()
+        from askbot.models import tag_preferences
+        old_profile = cache.get(key)
+        tag_preferences.invalidate_on_profile_update(self, old_profile)
         cache.set(key, self)
 
     def save(self, *args, **kwargs):
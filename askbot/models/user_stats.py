@@ -0,0 +1,284 @@
+"""Statistics of the user shown on the overview tab of the
+user profile - numbers of up and down votes, the most used tags
+and the awarded badges with the links to the awarded posts.
+
+With ``ASKBOT_USER_STATS_MAX_AGE`` greater than zero the statistics
+are kept in :class:`UserStatsSnapshot` rows, one per user and
+language, so that the tab reads them with one query instead of
+aggregating votes, tags and awards of the user in each request.
+
+Votes, posts and awards of a user mark the snapshots of the user
+stale and queue the user for the refresh, a user marked again before
+the refresh stays in the queue once. Function :func:`refresh` updates
+snapshots of the queued users, it must be run periodically, either
+by the celery task ``askbot.tasks.refresh_user_stats`` or by the
+management command ``refresh_user_stats``. Snapshots older than
+``ASKBOT_USER_STATS_MAX_AGE`` seconds are refreshed when read,
+so the statistics are never more outdated than that.
+"""
+import datetime
+
+from django.conf import settings as django_settings
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core import cache
+from django.db import models, transaction, IntegrityError
+from django.db.models import Case, Count, IntegerField, Sum, When
+from django.utils import timezone
+from django.utils import translation
+import simplejson
+
+from askbot import const
+from askbot.utils.cache_queue import CacheQueue
+from askbot.utils.translation import get_language
+
+#ids of users waiting for the refresh of the snapshots
+USER_QUEUE = CacheQueue('user-stats-stale-users')
+BATCH_SIZE = 100
+#number of the most used tags shown on the user cards
+USER_CARD_TAG_COUNT = 3
+
+
+def is_enabled():
+    return django_settings.ASKBOT_USER_STATS_MAX_AGE > 0
+
+
+def get_max_age():
+    return datetime.timedelta(seconds=django_settings.ASKBOT_USER_STATS_MAX_AGE)
+
+
+def get_stale_key(user_id, language_code=None):
+    return 'user-stats-stale-%d-%s' % (user_id, language_code or 'all')
+
+
+def mark_stale(user_id, language_code=None):
+    """queues the user for the refresh of the snapshot in the language,
+    by default - of all the saved snapshots of the user,
+    unless the user is queued already"""
+    key = get_stale_key(user_id, language_code)
+    if cache.cache.add(key, True, const.LONG_TIME):
+        USER_QUEUE.append((user_id, language_code))
+
+
+def get_vote_counts(user):
+    """returns tuple (up votes, down votes) given by the user"""
+    from askbot.models.repute import Vote
+    counts = Vote.objects.filter(user=user).aggregate(
+        up_votes=Sum(Case(When(vote=Vote.VOTE_UP, then=1),
+                          default=0, output_field=IntegerField())),
+        down_votes=Sum(Case(When(vote=Vote.VOTE_DOWN, then=1),
+                            default=0, output_field=IntegerField()))
+    )
+    return counts['up_votes'] or 0, counts['down_votes'] or 0
+
+
+def get_tag_usage(user, language_code):
+    """returns list of [tag name, number of threads]
+    of the most used tags in the threads with posts of the user"""
+    from askbot.models.tag import Tag
+    tags = Tag.objects.filter(
+                        threads__posts__author=user,
+                        language_code=language_code
+                    ).distinct().annotate(
+                        usage_count=Count('threads')
+                    ).order_by('-usage_count')
+    tags = tags.values_list('name', 'usage_count')
+    return [list(tag) for tag in tags[:const.USER_VIEW_DATA_SIZE]]
+
+
+def get_award_summary(user):
+    """returns list of [badge id, number of awards, awarded posts],
+    where the awarded posts are lists [url, thread title, post type]"""
+    from askbot.models.post import Post
+    from askbot.models.repute import Award
+    post_type = ContentType.objects.get_for_model(Post)
+    awards = Award.objects.filter(user=user).values_list(
+                                'badge_id', 'content_type_id', 'object_id'
+                            ).order_by('awarded_at')
+    awards = list(awards)
+
+    post_ids = [object_id for badge_id, type_id, object_id in awards \
+                                            if type_id == post_type.id]
+    #awards may have lost the posts, if posts were deleted
+    posts = Post.objects.filter(id__in=post_ids).select_related('thread')
+    post_links = dict()
+    for post in posts:
+        post_links[post.id] = [post.get_absolute_url(),
+                               post.thread.title,
+                               post.post_type]
+
+    summary = dict()
+    for badge_id, type_id, object_id in awards:
+        badge_summary = summary.setdefault(badge_id, [badge_id, 0, list()])
+        badge_summary[1] += 1
+        if type_id == post_type.id and object_id in post_links:
+            badge_summary[2].append(post_links[object_id])
+
+    return sorted(summary.values(), key=lambda item: item[1], reverse=True)
+
+
+class UserStatsSnapshotManager(models.Manager):
+
+    def compute(self, user, language_code):
+        """returns unsaved snapshot with current statistics of the user"""
+        with translation.override(language_code):
+            up_votes, down_votes = get_vote_counts(user)
+            return self.model(
+                    user=user,
+                    language_code=language_code,
+                    up_votes=up_votes,
+                    down_votes=down_votes,
+                    tag_usage=simplejson.dumps(get_tag_usage(user, language_code)),
+                    awards=simplejson.dumps(get_award_summary(user)),
+                    refreshed_at=timezone.now()
+                )
+
+    def refresh_snapshot(self, user, language_code):
+        """computes and saves snapshot of the user"""
+        snapshot = self.compute(user, language_code)
+        try:
+            snapshot.id = self.get(user=user, language_code=language_code).id
+        except self.model.DoesNotExist:
+            pass
+        try:
+            with transaction.atomic():
+                snapshot.save()
+        except IntegrityError:
+            #snapshot was saved by a concurrent request
+            pass
+        return snapshot
+
+    def get_for_user(self, user, language_code=None):
+        """returns snapshot of the user, saved snapshot is
+        refreshed when it is older than the allowed age.
+        When the snapshots are disabled, the returned snapshot
+        is computed and is not saved.
+        """
+        language_code = language_code or get_language()
+        if not is_enabled():
+            return self.compute(user, language_code)
+
+        try:
+            snapshot = self.get(user=user, language_code=language_code)
+        except self.model.DoesNotExist:
+            return self.refresh_snapshot(user, language_code)
+
+        if snapshot.is_expired():
+            return self.refresh_snapshot(user, language_code)
+        return snapshot
+
+    def get_for_users(self, users, language_code=None):
+        """returns dictionary user id -> snapshot, read with one query,
+        for the users list pages. Users without the snapshot or with
+        the expired snapshot are queued for the refresh, snapshots
+        of these users are missing in the dictionary.
+        """
+        language_code = language_code or get_language()
+        user_ids = [user.id for user in users]
+        snapshots = dict()
+        if not is_enabled() or len(user_ids) == 0:
+            return snapshots
+
+        for snapshot in self.filter(user__id__in=user_ids,
+                                    language_code=language_code):
+            if not snapshot.is_expired():
+                snapshots[snapshot.user_id] = snapshot
+
+        for user_id in user_ids:
+            if user_id not in snapshots:
+                mark_stale(user_id, language_code)
+        return snapshots
+
+
+class UserStatsSnapshot(models.Model):
+    """Statistics of one user in one language, updated by
+    :func:`refresh` after the votes, posts and awards of the user.
+    The lists are stored as json, see :func:`get_tag_usage`
+    and :func:`get_award_summary`.
+    """
+    user = models.ForeignKey(User, related_name='stats_snapshots')
+    language_code = models.CharField(max_length=16,
+                                     choices=django_settings.LANGUAGES,
+                                     default=django_settings.LANGUAGE_CODE)
+    up_votes = models.PositiveIntegerField(default=0)
+    down_votes = models.PositiveIntegerField(default=0)
+    tag_usage = models.TextField(default='[]')
+    awards = models.TextField(default='[]')
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    objects = UserStatsSnapshotManager()
+
+    class Meta:
+        app_label = 'askbot'
+        db_table = 'askbot_user_stats_snapshot'
+        unique_together = ('user', 'language_code')
+
+    def is_expired(self):
+        return self.refreshed_at < timezone.now() - get_max_age()
+
+    def get_tag_usage(self):
+        """returns list of (tag name, number of threads)"""
+        return [tuple(tag) for tag in simplejson.loads(self.tag_usage)]
+
+    def get_award_summary(self):
+        """returns list of (badge id, number of awards, awarded posts),
+        the awarded posts are dictionaries with keys
+        ``url``, ``title`` and ``post_type``
+        """
+        summary = list()
+        for badge_id, count, posts in simplejson.loads(self.awards):
+            posts = [dict(url=url, title=title, post_type=post_type) \
+                                            for url, title, post_type in posts]
+            summary.append((badge_id, count, posts))
+        return summary
+
+    def get_top_tag_names(self, count):
+        return [name for name, usage_count in self.get_tag_usage()[:count]]
+
+
+def refresh(include_recent=False):
+    """refreshes snapshots of the queued users,
+    returns number of the refreshed snapshots"""
+    items = sorted(set(USER_QUEUE.pop_all(include_recent=include_recent)))
+    if len(items) == 0:
+        return 0
+    # changes made from now on queue the users again
+    cache.cache.delete_many([get_stale_key(*item) for item in items])
+
+    languages = dict()
+    for user_id, language_code in items:
+        languages.setdefault(user_id, set()).add(language_code)
+    user_ids = sorted(languages.keys())
+
+    count = 0
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        batch = user_ids[start:start + BATCH_SIZE]
+        #users marked without the language are refreshed
+        #in the languages of their saved snapshots
+        saved = UserStatsSnapshot.objects.filter(
+                        user__id__in=batch
+                    ).values_list('user_id', 'language_code')
+        for user_id, language_code in saved:
+            if None in languages[user_id]:
+                languages[user_id].add(language_code)
+
+        for user in User.objects.filter(id__in=batch):
+            for language_code in languages[user.id] - set([None]):
+                UserStatsSnapshot.objects.refresh_snapshot(user, language_code)
+                count += 1
+    return count
+
+
+def mark_stale_on_vote_change(sender, instance, **kwargs):
+    if is_enabled():
+        mark_stale(instance.user_id)
+
+
+def mark_stale_on_award_change(sender, instance, **kwargs):
+    if is_enabled():
+        mark_stale(instance.user_id)
+
+
+def mark_stale_on_post_save(sender, instance, **kwargs):
+    if is_enabled() and instance.author_id:
+        mark_stale(instance.author_id)
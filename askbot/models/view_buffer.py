@@ -0,0 +1,187 @@
+"""Write-behind buffer for the question view counts
+and the times of the question visits by users
+(the ``QuestionView`` records).
+
+When ``ASKBOT_VIEW_BUFFER_ENABLED = True``, question visits
+do not update the database right away:
+
+* view count increments are accumulated in cache per thread,
+* time of the latest visit is kept in cache per user and question.
+
+Function :func:`flush` writes the accumulated values in bulk
+- one ``UPDATE ... CASE`` statement per batch of threads -
+and runs the question view badge checks on the updated totals.
+It must be run periodically, either by the celery task
+``askbot.tasks.flush_question_views`` (e.g. from celerybeat)
+or by the management command ``flush_question_views`` (from cron).
+"""
+from django.conf import settings as django_settings
+from django.core import cache
+from django.db.models import Case, DateTimeField, F, IntegerField, Value, When
+
+from askbot import const
+from askbot.models.badges import award_badges_signal
+from askbot.models.question import QuestionView, Thread
+from askbot.utils.cache_queue import CacheQueue, incr_counter
+
+#ids of threads with buffered view count increments
+THREAD_QUEUE = CacheQueue('question-view-threads')
+#(user id, question post id) tuples of buffered visits
+VISIT_QUEUE = CacheQueue('question-view-visits')
+BATCH_SIZE = 500
+
+
+def is_enabled():
+    return django_settings.ASKBOT_VIEW_BUFFER_ENABLED
+
+
+def get_view_count_key(thread_id):
+    return 'question-view-count-%d' % thread_id
+
+
+def get_visit_key(user_id, question_id):
+    return 'question-visit-%d-%d' % (user_id, question_id)
+
+
+def record_view(thread_id):
+    """adds one view to the buffered view count of the thread"""
+    # thread is queued for the flush when its counter
+    # becomes positive, see flush_view_counts()
+    if incr_counter(get_view_count_key(thread_id)) == 1:
+        THREAD_QUEUE.append(thread_id)
+
+
+def record_visit(user_id, question_id, timestamp):
+    """remembers time of the question visit by the user"""
+    key = get_visit_key(user_id, question_id)
+    if cache.cache.add(key, timestamp, const.LONG_TIME):
+        VISIT_QUEUE.append((user_id, question_id))
+    else:
+        cache.cache.set(key, timestamp, const.LONG_TIME)
+
+
+def get_batches(items):
+    items = list(items)
+    for start in range(0, len(items), BATCH_SIZE):
+        yield items[start:start + BATCH_SIZE]
+
+
+def update_view_counts(increments):
+    """adds view counts to the threads with one query,
+    ``increments`` is a dictionary thread id -> number of views
+    """
+    whens = [When(id=thread_id, then=Value(count)) \
+                        for thread_id, count in increments.items()]
+    Thread.objects.filter(id__in=increments.keys()).update(
+        view_count=F('view_count') + Case(
+                                *whens, default=Value(0),
+                                output_field=IntegerField()
+                            )
+    )
+
+
+def award_view_badges(thread_ids):
+    """considers the question view badges for the questions
+    of the threads, using their current view counts"""
+    from askbot.models.post import Post
+    questions = Post.objects.filter(
+                            thread__id__in=thread_ids, post_type='question'
+                        ).select_related('thread', 'author')
+    for question in questions:
+        question.thread.invalidate_cached_summary_html()
+        award_badges_signal.send(None,
+                        event='view_question',
+                        actor=question.author,
+                        context_object=question
+                    )
+
+
+def flush_view_counts(include_recent=False):
+    """writes buffered view counts into the database,
+    returns dictionary thread id -> added number of views"""
+    thread_ids = set(THREAD_QUEUE.pop_all(include_recent=include_recent))
+    if len(thread_ids) == 0:
+        return dict()
+
+    keys = dict([(get_view_count_key(thread_id), thread_id) for thread_id in thread_ids])
+    counts = cache.cache.get_many(keys.keys())
+    increments = dict()
+    for key, count in counts.items():
+        if count > 0:
+            increments[keys[key]] = count
+
+    for batch in get_batches(sorted(increments.items())):
+        update_view_counts(dict(batch))
+
+    for thread_id, count in increments.items():
+        key = get_view_count_key(thread_id)
+        remaining = incr_counter(key, -count)
+        if remaining > 0:
+            # views recorded while flushing
+            THREAD_QUEUE.append(thread_id)
+        elif remaining < 0:
+            cache.cache.set(key, 0, const.LONG_TIME)
+
+    for batch in get_batches(increments.keys()):
+        award_view_badges(batch)
+    return increments
+
+
+def update_visit_times(visits):
+    """saves times of question visits, ``visits`` is a dictionary
+    (user id, question id) -> time of visit"""
+    user_ids = set([user_id for user_id, _ in visits])
+    question_ids = set([question_id for _, question_id in visits])
+    existing = QuestionView.objects.filter(
+                                who__id__in=user_ids,
+                                question__id__in=question_ids
+                            ).values_list('id', 'who_id', 'question_id')
+    updates = dict()
+    for view_id, user_id, question_id in existing:
+        timestamp = visits.get((user_id, question_id))
+        if timestamp:
+            updates[view_id] = timestamp
+
+    if updates:
+        whens = [When(id=view_id, then=Value(timestamp)) \
+                            for view_id, timestamp in updates.items()]
+        QuestionView.objects.filter(id__in=updates.keys()).update(
+            when=Case(*whens, output_field=DateTimeField())
+        )
+
+    seen = set([(user_id, question_id) for _, user_id, question_id in existing])
+    new_views = [
+        QuestionView(who_id=user_id, question_id=question_id, when=timestamp) \
+        for (user_id, question_id), timestamp in visits.items() \
+        if (user_id, question_id) not in seen
+    ]
+    QuestionView.objects.bulk_create(new_views)
+
+
+def flush_visits(include_recent=False):
+    """writes buffered visit times into the database,
+    returns number of the saved visits"""
+    pairs = set(VISIT_QUEUE.pop_all(include_recent=include_recent))
+    if len(pairs) == 0:
+        return 0
+    keys = dict([(get_visit_key(*pair), pair) for pair in pairs])
+    times = cache.cache.get_many(keys.keys())
+    # a visit recorded between the two calls is lost,
+    # the next visit of the same question will be saved
+    cache.cache.delete_many(times.keys())
+    visits = dict([(keys[key], timestamp) for key, timestamp in times.items()])
+    for batch in get_batches(visits.items()):
+        update_visit_times(dict(batch))
+    return len(visits)
+
+
+def flush(include_recent=False):
+    """writes all buffered data into the database,
+    returns tuple (number of threads, number of visits)
+
+    Values recorded shortly before the call are
+    left for the next flush, unless ``include_recent`` is ``True``
+    """
+    increments = flush_view_counts(include_recent=include_recent)
+    visit_count = flush_visits(include_recent=include_recent)
+    return len(increments), visit_count
@@ -0,0 +1,217 @@
+"""Pagination of the question lists.
+
+Two modes are supported:
+
+* numbered pages - :class:`CachedCountPaginator`, the regular
+  django paginator, which caches the total count of the
+  matching questions, instead of running ``COUNT(DISTINCT ...)``
+  on every request
+* cursor (keyset) pagination - :class:`CursorPaginator`, which
+  continues the list after the last seen item, using the
+  sort key of the list plus the thread id as a tie breaker.
+  Cost of loading a page does not depend on how deep
+  into the list the page is.
+
+Cursors are opaque strings like ``1476789123000000_1234``
+- the sort key value (epoch microseconds for the dates)
+and the thread id, separated by an underscore.
+"""
+import datetime
+import hashlib
+
+from django.conf import settings as django_settings
+from django.core import cache
+from django.core.paginator import Paginator
+from django.db import models
+from django.utils import timezone
+from django.utils.encoding import smart_str
+
+from askbot.models.question import QUESTION_ORDER_BY_MAP
+
+EPOCH = datetime.datetime(1970, 1, 1)
+DATE_SORT_FIELDS = ('added_at', 'last_activity_at')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def supports_cursor(sort_method):
+    """True if list with a given sort method
+    can be paginated with cursors"""
+    return sort_method in QUESTION_ORDER_BY_MAP \
+        and sort_method != 'relevance-desc'
+
+
+def use_cursor_pagination(search_state):
+    """True if the question list for the search state
+    is to be paginated with cursors"""
+    if not supports_cursor(search_state.sort):
+        return False
+    if search_state.cursor:
+        return True
+    return django_settings.ASKBOT_CURSOR_PAGINATION_ENABLED
+
+
+def get_sort_field(sort_method):
+    """returns tuple (field name, True if descending)"""
+    order_by = QUESTION_ORDER_BY_MAP[sort_method]
+    return order_by.lstrip('-'), order_by.startswith('-')
+
+
+def encode_cursor(sort_method, thread):
+    """returns cursor pointing right after the ``thread``"""
+    field, _ = get_sort_field(sort_method)
+    value = getattr(thread, field)
+    if field in DATE_SORT_FIELDS:
+        if timezone.is_aware(value):
+            value = timezone.make_naive(value, timezone.utc)
+        delta = value - EPOCH
+        value = (delta.days * 86400 + delta.seconds) * 1000000 \
+                                            + delta.microseconds
+    return '%d_%d' % (value, thread.id)
+
+
+def decode_cursor(sort_method, cursor):
+    """returns tuple (sort key value, thread id)
+    or raises ``InvalidCursor``"""
+    try:
+        value, thread_id = cursor.rsplit('_', 1)
+        value = int(value)
+        thread_id = int(thread_id)
+    except (AttributeError, ValueError):
+        raise InvalidCursor(cursor)
+
+    field, _ = get_sort_field(sort_method)
+    if field in DATE_SORT_FIELDS:
+        value = EPOCH + datetime.timedelta(microseconds=value)
+        if getattr(django_settings, 'USE_TZ', False):
+            value = timezone.make_aware(value, timezone.utc)
+    return value, thread_id
+
+
+def get_keyset_filter(sort_method, cursor, id_field):
+    """returns Q object selecting items that follow the cursor"""
+    field, descending = get_sort_field(sort_method)
+    value, thread_id = decode_cursor(sort_method, cursor)
+    op = descending and 'lt' or 'gt'
+    after_value = models.Q(**{field + '__' + op: value})
+    same_value = models.Q(**{field: value, id_field + '__' + op: thread_id})
+    return after_value | same_value
+
+
+def get_object_list_queryset(object_list):
+    """returns query set underlying the search results"""
+    return getattr(object_list, 'listing_qs', object_list)
+
+
+def get_count_cache_key(object_list):
+    """cache key for the count of items in the result set,
+    derived from the sql of the query"""
+    query = get_object_list_queryset(object_list).query
+    sql, params = query.sql_with_params()
+    digest = hashlib.md5(smart_str(repr((sql, params)))).hexdigest()
+    return 'questions-count-' + digest
+
+
+def get_cached_count(object_list):
+    """returns number of items in the result set,
+    cached for ``ASKBOT_QUESTIONS_COUNT_CACHE_TIMEOUT`` seconds,
+    so the value may be slightly out of date"""
+    key = get_count_cache_key(object_list)
+    count = cache.cache.get(key)
+    if count is None:
+        count = object_list.count()
+        timeout = django_settings.ASKBOT_QUESTIONS_COUNT_CACHE_TIMEOUT
+        cache.cache.set(key, count, timeout)
+    return count
+
+
+class CachedCountPaginator(Paginator):
+    """paginator that uses the cached total count,
+    or the ``count``, if it is known in advance"""
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super(CachedCountPaginator, self).__init__(object_list, per_page, **kwargs)
+        self._count = count
+
+    def _get_count(self):
+        if self._count is None:
+            self._count = get_cached_count(self.object_list)
+        return self._count
+    count = property(_get_count)
+
+
+class CursorPage(object):
+    """page of items loaded by the :class:`CursorPaginator`,
+    mimics the interface of the ``django.core.paginator.Page``
+    """
+    def __init__(self, object_list, next_cursor, cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.cursor is not None
+
+
+class CursorPaginator(object):
+    """Keyset paginator for the results
+    of the ``Thread.objects.run_advanced_search``.
+    Items are filtered to those following the cursor
+    and ordered by the sort key and the thread id.
+    """
+    def __init__(self, object_list, sort_method, per_page, count=None):
+        if not supports_cursor(sort_method):
+            raise ValueError('cannot paginate by %s with cursors' % sort_method)
+        self.object_list = object_list
+        self.sort_method = sort_method
+        self.per_page = per_page
+        self._count = count
+
+    def get_ordered(self, cursor):
+        from askbot.models.listing import ThreadListingResults
+        field, descending = get_sort_field(self.sort_method)
+        object_list = self.object_list
+        if isinstance(object_list, ThreadListingResults):
+            listing_qs = object_list.listing_qs
+            if cursor:
+                keyset = get_keyset_filter(self.sort_method, cursor, 'thread_id')
+                listing_qs = listing_qs.filter(keyset)
+            return ThreadListingResults(listing_qs,
+                                        thread_fields=object_list.thread_fields)
+
+        order_by = descending and ('-' + field, '-id') or (field, 'id')
+        qs = object_list.order_by(*order_by)
+        if cursor:
+            qs = qs.filter(get_keyset_filter(self.sort_method, cursor, 'id'))
+        return qs
+
+    def page(self, cursor=None):
+        """returns :class:`CursorPage` starting after the cursor,
+        ``None`` cursor means the first page"""
+        items = list(self.get_ordered(cursor)[:self.per_page + 1])
+        if len(items) > self.per_page:
+            items = items[:self.per_page]
+            next_cursor = encode_cursor(self.sort_method, items[-1])
+        else:
+            next_cursor = None
+        return CursorPage(items, next_cursor, cursor)
+
+    @property
+    def count(self):
+        if self._count is None:
+            self._count = get_cached_count(self.object_list)
+        return self._count
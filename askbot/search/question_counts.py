@@ -0,0 +1,290 @@
+"""Cached numbers of questions per language, scope and tag.
+
+Question lists print the total number of matching questions,
+which otherwise requires a ``COUNT`` over the full search query.
+For the unfiltered lists and for the lists filtered by one tag
+the counts are kept in cache and maintained incrementally:
+
+* each count is stored under a key derived from
+  (language, scope, tag) - a "bucket"
+* for each thread the list of buckets it belongs to
+  is remembered in cache as well, when the thread,
+  its question or tags change, the buckets are recalculated
+  and the counts are adjusted by the difference
+* missing counts are calculated with a query on first use
+
+Counts may drift, e.g. when the cache drops the list of buckets
+of a thread or when a transaction is rolled back after the
+counts were adjusted. Command ``reconcile_question_counts``
+recalculates the exact values and should be run periodically.
+"""
+import hashlib
+from collections import defaultdict
+
+from django.conf import settings as django_settings
+from django.core import cache
+from django.db.models import Count
+from django.utils.encoding import smart_str
+
+import askbot
+from askbot import const
+from askbot.conf import settings as askbot_settings
+from askbot.models.question import Thread
+from askbot.utils.translation import get_language
+
+#language "code" of the buckets counting questions in all languages
+ANY_LANGUAGE = '*'
+COUNTED_SCOPES = ('all', 'unanswered')
+UNANSWERED_MEANINGS = ('NO_ANSWERS', 'NO_ACCEPTED_ANSWERS')
+
+
+def get_settings_signature():
+    """settings affecting the counts are mixed
+    into the cache keys, so that counts made with different
+    settings are never used"""
+    return (
+        askbot_settings.CONTENT_MODERATION_MODE == 'premoderation',
+        askbot_settings.UNANSWERED_QUESTION_MEANING,
+        askbot_settings.TAG_SEARCH_INPUT_ENABLED
+    )
+
+
+def normalize_tag_name(tag_name):
+    """tag search is case insensitive when the tag search
+    input is enabled, see ``Thread.objects.run_advanced_search``"""
+    if askbot_settings.TAG_SEARCH_INPUT_ENABLED:
+        return tag_name.lower()
+    return tag_name
+
+
+def get_count_key(language, scope, tag_name=''):
+    """cache key of the count for the bucket"""
+    bucket = (get_settings_signature(), language, scope, tag_name)
+    return 'questions-count-' + hashlib.md5(smart_str(repr(bucket))).hexdigest()
+
+
+def get_buckets_key(thread_id):
+    """cache key of the list of counts including the thread"""
+    return 'questions-count-buckets-%d' % thread_id
+
+
+def get_languages(request_user):
+    """languages of questions shown to the user,
+    mirrors the language filter of the question search"""
+    lang_mode = askbot.get_lang_mode()
+    if lang_mode == 'url-lang':
+        return [get_language()]
+    elif lang_mode == 'user-lang':
+        if request_user.is_authenticated():
+            return request_user.get_languages()
+        return dict(django_settings.LANGUAGES).keys()
+    return [ANY_LANGUAGE]
+
+
+def can_use_counts(request_user, search_state):
+    """True if number of questions matching the search
+    can be taken from the cached counts"""
+    if askbot_settings.GROUPS_ENABLED:
+        return False #visibility depends on the user
+    if askbot_settings.UNANSWERED_QUESTION_MEANING not in UNANSWERED_MEANINGS:
+        return False
+    if search_state.scope not in COUNTED_SCOPES:
+        return False
+    if search_state.stripped_query or search_state.query_title:
+        return False
+    if search_state.query_users or search_state.author:
+        return False
+    if len(search_state.unified_tags()) > 1:
+        return False
+    if request_user and request_user.is_authenticated():
+        return request_user.display_tag_filter_strategy == const.INCLUDE_ALL
+    return True
+
+
+def get_bucket_queryset(language, scope, tag_name=''):
+    """query set of threads counted in the bucket"""
+    qs = Thread.objects.filter(posts__post_type='question', posts__deleted=False)
+    if language != ANY_LANGUAGE:
+        qs = qs.filter(language_code=language)
+    if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation':
+        qs = qs.filter(approved=True)
+    if tag_name:
+        if askbot_settings.TAG_SEARCH_INPUT_ENABLED:
+            qs = qs.filter(tags__name__iexact=tag_name)
+        else:
+            qs = qs.filter(tags__name=tag_name)
+    if scope == 'unanswered':
+        qs = qs.filter(closed=False)
+        if askbot_settings.UNANSWERED_QUESTION_MEANING == 'NO_ANSWERS':
+            qs = qs.filter(answer_count=0)
+        else:
+            qs = qs.filter(accepted_answer__isnull=True)
+    return qs
+
+
+def get_bucket_count(language, scope, tag_name=''):
+    """returns cached count for the bucket,
+    calculates the count if it is not in the cache"""
+    key = get_count_key(language, scope, tag_name)
+    count = cache.cache.get(key)
+    if count is None:
+        qs = get_bucket_queryset(language, scope, tag_name)
+        count = qs.values('id').distinct().count()
+        cache.cache.set(key, count, const.LONG_TIME)
+    return count
+
+
+def get_count(request_user, search_state):
+    """returns number of questions matching the search state
+    or ``None`` if the number must be calculated
+    with the search query itself"""
+    if not can_use_counts(request_user, search_state):
+        return None
+    tags = search_state.unified_tags()
+    tag_name = normalize_tag_name(tags[0]) if tags else ''
+    count = 0
+    for language in get_languages(request_user):
+        count += get_bucket_count(language, search_state.scope, tag_name)
+    return count
+
+
+def is_unanswered(thread):
+    if thread.closed:
+        return False
+    if askbot_settings.UNANSWERED_QUESTION_MEANING == 'NO_ANSWERS':
+        return thread.answer_count == 0
+    return thread.accepted_answer_id is None
+
+
+def get_thread_count_keys(thread, question_deleted):
+    """returns set of keys of the counts, which include the thread"""
+    if question_deleted:
+        return set()
+    if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation' \
+        and not thread.approved:
+        return set()
+
+    scopes = ['all']
+    if is_unanswered(thread):
+        scopes.append('unanswered')
+    tag_names = [''] + [normalize_tag_name(name) for name in thread.get_tag_names()]
+    languages = (thread.language_code, ANY_LANGUAGE)
+
+    keys = set()
+    for language in languages:
+        for scope in scopes:
+            for tag_name in tag_names:
+                keys.add(get_count_key(language, scope, tag_name))
+    return keys
+
+
+def adjust_count(key, delta):
+    try:
+        cache.cache.incr(key, delta)
+    except ValueError:
+        pass #count is not cached, will be calculated when needed
+
+
+def update_thread_counts(thread, question_deleted=None, created=False):
+    """adjusts the counts after the change of the thread"""
+    if question_deleted is None:
+        from askbot.models.post import Post
+        deleted = Post.objects.filter(
+                            thread_id=thread.id, post_type='question'
+                        ).values_list('deleted', flat=True)
+        #thread without the question post yet is not counted
+        question_deleted = deleted[0] if deleted else True
+
+    new_keys = get_thread_count_keys(thread, question_deleted)
+    buckets_key = get_buckets_key(thread.id)
+    old_keys = cache.cache.get(buckets_key)
+    if old_keys is None and not created:
+        #previous state is unknown, drop the counts
+        #so that they are calculated again
+        cache.cache.delete_many(list(new_keys))
+    else:
+        old_keys = set(old_keys or ())
+        for key in new_keys - old_keys:
+            adjust_count(key, 1)
+        for key in old_keys - new_keys:
+            adjust_count(key, -1)
+    cache.cache.set(buckets_key, list(new_keys), const.LONG_TIME)
+
+
+def remove_thread_counts(thread):
+    """adjusts the counts after the thread is deleted"""
+    buckets_key = get_buckets_key(thread.id)
+    old_keys = cache.cache.get(buckets_key)
+    if old_keys is None:
+        return
+    for key in old_keys:
+        adjust_count(key, -1)
+    cache.cache.delete(buckets_key)
+
+
+def reconcile_counts():
+    """recalculates all counts, returns number of the counts"""
+    from askbot.models.tag import Tag
+    languages = dict(django_settings.LANGUAGES).keys()
+    all_tags = set(
+        (normalize_tag_name(name), language) for name, language in \
+                    Tag.objects.values_list('name', 'language_code')
+    )
+    counts = dict()
+    for scope in COUNTED_SCOPES:
+        qs = get_bucket_queryset(ANY_LANGUAGE, scope)
+        #whole scope, per language
+        per_language = qs.values('language_code').annotate(
+                                                count=Count('id', distinct=True))
+        per_language = dict(
+            (row['language_code'], row['count']) for row in per_language
+        )
+        for language in languages:
+            counts[(language, scope, '')] = per_language.get(language, 0)
+        counts[(ANY_LANGUAGE, scope, '')] = qs.values('id').distinct().count()
+
+        #per tag and language
+        per_tag = qs.values('language_code', 'tags__name').annotate(
+                                                count=Count('id', distinct=True))
+        #tags without questions in the scope are counted as zero
+        tag_counts = defaultdict(int)
+        for tag_name, language in all_tags:
+            tag_counts[(language, scope, tag_name)] = 0
+            tag_counts[(ANY_LANGUAGE, scope, tag_name)] = 0
+        for row in per_tag:
+            if not row['tags__name']:
+                continue
+            tag_name = normalize_tag_name(row['tags__name'])
+            tag_counts[(row['language_code'], scope, tag_name)] += row['count']
+            tag_counts[(ANY_LANGUAGE, scope, tag_name)] += row['count']
+        counts.update(tag_counts)
+
+    data = dict(
+        (get_count_key(*bucket), count) for bucket, count in counts.items()
+    )
+    cache.cache.set_many(data, const.LONG_TIME)
+    return len(data)
+
+
+def update_counts_on_thread_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    update_thread_counts(instance, created=created)
+
+
+def update_counts_on_thread_delete(sender, instance, **kwargs):
+    remove_thread_counts(instance)
+
+
+def update_counts_on_question_save(sender, instance, created, raw=False, **kwargs):
+    if raw or instance.post_type != 'question' or instance.thread_id is None:
+        return
+    update_thread_counts(instance.thread, question_deleted=instance.deleted)
+
+
+def update_counts_on_post_removed(sender, instance, **kwargs):
+    update_counts_on_question_save(sender, instance, created=False)
+
+
+def update_counts_on_tags_updated(thread, **kwargs):
+    update_thread_counts(thread)
@@ -86,11 +86,12 @@ class SearchState(object):
 
     @classmethod
     def get_empty(cls):
-        return cls(scope=None, sort=None, query=None, tags=None, author=None, page=None, page_size=None, user_logged_in=None)
+        return cls(scope=None, sort=None, query=None, tags=None, author=None, page=None, page_size=None, user_logged_in=None, cursor=None)
 
     def __init__(self,
         scope=None, sort=None, query=None, tags=None,
-        author=None, page=None, page_size=None, user_logged_in=False
+        author=None, page=None, page_size=None, user_logged_in=False,
+        cursor=None
     ):
         # INFO: zip(*[('a', 1), ('b', 2)])[0] == ('a', 'b')
         if (scope not in zip(*const.POST_SCOPE_LIST)[0]) or (scope == 'followed' and not user_logged_in):
@@ -139,6 +140,9 @@ class SearchState(object):
         if self.page == 0:  # in case someone likes jokes :)
             self.page = 1
 
+        #cursor of the keyset pagination, see askbot.search.pagination
+        self.cursor = cursor or None
+
         default_page_size = int(askbot_settings.DEFAULT_QUESTIONS_PAGE_SIZE)
         self.page_size = int(page_size) if page_size else default_page_size
 
@@ -196,6 +200,7 @@ class SearchState(object):
             r'(%s)?' % r'/tags:(?P<tags>[\w+.#,-]+)' + # Should match: const.TAG_CHARS + ','; TODO: Is `#` char decoded by the time URLs are processed ??
             r'(%s)?' % r'/author:(?P<author>\d+)' +
             r'(%s)?' % r'/page:(?P<page>\d+)' +
+            r'(%s)?' % r'/cursor:(?P<cursor>[\w\-]+)' +
             r'(%s)?' % r'/query:(?P<query>.+)' +  # INFO: query is last, b/c it can contain slash!!!
         """
 
@@ -204,7 +209,9 @@ class SearchState(object):
             lst.append('tags:' + urllib.quote(smart_str(const.TAG_SEP.join(self.tags)), safe=self.SAFE_CHARS))
         if self.author:
             lst.append('author:' + str(self.author))
-        if self.page:
+        if self.cursor:
+            lst.append('cursor:' + self.cursor)
+        elif self.page:
             lst.append('page:' + str(self.page))
         if self.query:
             lst.append('query:' + urllib.quote(smart_str(self.query), safe=self.SAFE_CHARS))
@@ -238,12 +245,14 @@ class SearchState(object):
         if tag not in ss.tags:
             ss.tags.append(tag)
             ss.page = 1 # state change causes page reset
+            ss.cursor = None
         return ss
 
     def remove_author(self):
         ss = self.deepcopy()
         ss.author = None
         ss.page = 1
+        ss.cursor = None
         return ss
 
     def remove_tags(self, tags = None):
@@ -255,23 +264,33 @@ class SearchState(object):
         else:
             ss.tags = []
         ss.page = 1
+        ss.cursor = None
         return ss
 
     def change_scope(self, new_scope):
         ss = self.deepcopy()
         ss.scope = new_scope
         ss.page = 1
+        ss.cursor = None
         return ss
 
     def change_sort(self, new_sort):
         ss = self.deepcopy()
         ss.sort = new_sort
         ss.page = 1
+        ss.cursor = None
         return ss
 
     def change_page(self, new_page):
         ss = self.deepcopy()
         ss.page = new_page
+        ss.cursor = None
+        return ss
+
+    def change_cursor(self, new_cursor):
+        ss = self.deepcopy()
+        ss.cursor = new_cursor
+        ss.page = 1
         return ss
 
 
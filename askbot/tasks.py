@@ -196,11 +196,14 @@ def record_post_update_celery_task(
 @task(ignore_result=True)
 def record_question_visit(
         language_code=None, question_post_id=None, update_view_count=False,
-        user_id=None):
+        user_id=None, views_buffered=False):
     """celery task which records question visit by a person
     updates view counter, if necessary,
     and awards the badges associated with the
     question visit
+
+    With ``views_buffered=True`` the QuestionView record and the
+    badges are taken care of by the ``askbot.models.view_buffer.flush()``
     """
     activate_language(language_code)
     # 1) maybe update the view count
@@ -222,7 +225,11 @@ def record_question_visit(
     # 2) question view count per user and clear response displays
     if user.is_authenticated():
         # get response notifications
-        user.visit_question(question_post)
+        user.visit_question(
+            question_post, update_view_record=not views_buffered)
+
+    if views_buffered:
+        return
 
     # 3) send award badges signal for any badges
     # that are awarded for question views
@@ -231,6 +238,89 @@ def record_question_visit(
         context_object=question_post)
 
 
+@task(ignore_result=True)
+def flush_question_views():
+    """celery task which saves the buffered question
+    view counts and visit times, to be run periodically,
+    when ``ASKBOT_VIEW_BUFFER_ENABLED = True``
+    """
+    from askbot.models import view_buffer
+    view_buffer.flush()
+
+
+@task(ignore_result=True)
+def flush_last_seen():
+    """celery task which saves the times of the
+    user visits, which were not saved right away,
+    to be run periodically, when
+    ``ASKBOT_LAST_SEEN_UPDATE_INTERVAL`` is not zero
+    """
+    from askbot.models import site_visits
+    site_visits.flush()
+
+
+@task(ignore_result=True)
+def rebuild_thread_summaries(all_languages=False):
+    """celery task which renders summaries of the
+    threads changed since the previous run, to be run
+    periodically, when ``ASKBOT_THREAD_SUMMARY_REBUILD_ASYNC = True``
+    """
+    from askbot.models import thread_cache
+    thread_cache.rebuild(all_languages=all_languages)
+
+
+@task(ignore_result=True)
+def update_similar_threads(thread_id):
+    """recalculates similar threads of the retagged thread"""
+    from askbot.models import SimilarThread, Thread
+    try:
+        thread = Thread.objects.get(id=thread_id)
+    except Thread.DoesNotExist:
+        return
+    SimilarThread.objects.update_thread(thread)
+
+
+@task(ignore_result=True)
+def refresh_user_stats():
+    """celery task which refreshes statistics of the users
+    changed since the previous run, to be run periodically,
+    when ``ASKBOT_USER_STATS_MAX_AGE`` is not zero
+    """
+    from askbot.models import user_stats
+    user_stats.refresh()
+
+
+@task(ignore_result=True)
+def send_queued_email():
+    """celery task which sends the outgoing email queue,
+    to be run periodically, when ``ASKBOT_MAIL_QUEUE_ENABLED``
+    is ``True``
+    """
+    from askbot.mail import send_queue
+    send_queue.send_queued()
+
+
+@task(ignore_result=True)
+def send_group_messaging_email_alerts(message_id, user_ids):
+    """sends email alerts about a private message
+    to a batch of the recipients"""
+    from askbot.deps.group_messaging.models import Message
+    try:
+        message = Message.objects.get(id=message_id)
+    except Message.DoesNotExist:
+        return
+    users = User.objects.filter(id__in=user_ids)
+    message.send_email_alert_to_users(users)
+
+
+@task(ignore_result=True)
+def send_email_digests(user_ids):
+    """sends email digests to a chunk of users,
+    see the ``send_email_alerts`` management command"""
+    from askbot.mail import digests
+    digests.send_digests(user_ids)
+
+
 @task()
 def send_instant_notifications_about_activity_in_post(
         activity_id=None, post_id=None, recipients=None):
@@ -268,6 +358,8 @@ def send_instant_notifications_about_activity_in_post(
     else:
         log_id = None
 
+    #post html is rendered once for the recipients sharing it
+    fragment_cache = dict()
     for user in recipients:
         if user.is_blocked():
             continue
@@ -279,7 +371,7 @@ def send_instant_notifications_about_activity_in_post(
             'from_user': update_activity.user,
             'post': post,
             'update_activity': update_activity
-        })
+        }, fragment_cache=fragment_cache)
         try:
             email.send([user.email])
         except askbot_exceptions.EmailNotSent as error:
@@ -1,4 +1,4 @@
-from askbot.tests.utils import AskbotTestCase
+from askbot.tests.utils import AskbotTestCase, with_settings
 from django.core.urlresolvers import reverse
 import simplejson
 
@@ -53,3 +53,22 @@ class ApiV1Tests(AskbotTestCase):
         last_act_info = response_data['questions'][0]['last_activity_by']
         self.assertEqual(set(last_act_info.keys()), set(['id', 'username']))
         self.assertEqual(set(last_act_info.values()), set([user.id, user.username]))
+
+    @with_settings(DEFAULT_QUESTIONS_PAGE_SIZE=2)
+    def test_api_v1_questions_cursor(self):
+        user = self.create_user('user')
+        for i in range(3):
+            self.post_question(user=user, title='question %d' % i)
+        question_ids = list()
+        #empty cursor asks for the first page
+        params = {'sort': 'age-asc', 'cursor': ''}
+        while True:
+            response = self.client.get(reverse('api_v1_questions'), params)
+            response_data = simplejson.loads(response.content)
+            self.assertEqual(response_data['count'], 3)
+            question_ids.extend([q['id'] for q in response_data['questions']])
+            if response_data['next_cursor'] is None:
+                break
+            params['cursor'] = response_data['next_cursor']
+        self.assertEqual(len(question_ids), 3)
+        self.assertEqual(question_ids, sorted(question_ids))
@@ -1,12 +1,15 @@
 import datetime
 from django.conf import settings as django_settings
+from django.core import cache
 from django.core.urlresolvers import reverse
 from django.test.client import Client
+from django.test.utils import override_settings
 from django.utils import timezone
 from askbot.tests.utils import AskbotTestCase
 from askbot.conf import settings
 from askbot import models
 from askbot.models import badges
+from askbot.models import view_buffer
 
 
 class BadgeTests(AskbotTestCase):
@@ -193,6 +196,34 @@ class BadgeTests(AskbotTestCase):
         self.client.get(question2.get_absolute_url())
         self.assert_have_badge('popular-question', recipient=self.u1, expected_count=2)
 
+    @override_settings(ASKBOT_VIEW_BUFFER_ENABLED=True)
+    def test_popular_question_badge_with_view_buffer(self):
+        cache.cache.clear()
+        question = self.post_question(user = self.u1)
+        min_views = settings.POPULAR_QUESTION_BADGE_MIN_VIEWS
+        question.thread.view_count = min_views - 1
+        question.thread.save()
+
+        from askbot.utils import functions
+        functions.not_a_robot_request = lambda v: True
+
+        self.client.login(method='force', user_id=self.u2.id)
+        self.client.get(question.get_absolute_url())
+        #nothing is written until the buffer is flushed
+        thread = models.Thread.objects.get(id=question.thread_id)
+        self.assertEqual(thread.view_count, min_views - 1)
+        self.assert_have_badge('popular-question', recipient=self.u1, expected_count=0)
+
+        view_buffer.flush(include_recent=True)
+        thread = models.Thread.objects.get(id=question.thread_id)
+        self.assertEqual(thread.view_count, min_views)
+        self.assert_have_badge('popular-question', recipient=self.u1)
+        views = models.QuestionView.objects.filter(who=self.u2, question=question)
+        self.assertEqual(views.count(), 1)
+
+        #second flush has nothing to write
+        self.assertEqual(view_buffer.flush(include_recent=True), (0, 0))
+
     def test_student_badge(self):
         question = self.post_question(user = self.u1)
         self.u2.upvote(question)
@@ -3,11 +3,15 @@ functions that happen on behalf of users
 
 e.g. ``some_user.do_something(...)``
 """
+import datetime
 from bs4 import BeautifulSoup
 from django.core import exceptions
 from django.core.urlresolvers import reverse
 from django.test.client import Client
 from django.conf import settings
+from django.core import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test.utils import override_settings
 from django.contrib.auth.models import AnonymousUser
 from django import forms
 from django.utils import timezone
@@ -15,6 +19,7 @@ from askbot import exceptions as askbot_exceptions
 from askbot.tests.utils import AskbotTestCase
 from askbot.tests.utils import with_settings
 from askbot import models
+from askbot.models import tag_subscribers
 from askbot import const
 from askbot.conf import settings as askbot_settings
 
@@ -409,6 +414,75 @@ class GlobalTagSubscriberGetterTests(AskbotTestCase):
             reason = 'bad'
         )
 
+class TagSubscribersIndexTests(AskbotTestCase):
+    """tests for the cached index of the instant notification
+    subscribers by tags, see :mod:`askbot.models.tag_subscribers`
+    """
+    def setUp(self):
+        cache.cache.clear()
+        schedule = {'q_all': 'i'}
+        self.fan = self.create_user('fan', notification_schedule=schedule)
+        self.hater = self.create_user('hater', notification_schedule=schedule)
+        self.reader = self.create_user('reader', notification_schedule=schedule)
+        self.fan.email_tag_filter_strategy = const.INCLUDE_INTERESTING
+        self.hater.email_tag_filter_strategy = const.EXCLUDE_IGNORED
+        self.reader.email_tag_filter_strategy = const.INCLUDE_ALL
+        self.question = self.post_question(user=self.reader, tags='good day')
+
+    def get_subscribers(self, use_index):
+        timeout = 3600 if use_index else 0
+        with override_settings(ASKBOT_TAG_SUBSCRIBERS_INDEX_TIMEOUT=timeout):
+            return self.question.get_global_instant_notification_subscribers()
+
+    def assert_subscribers_are(self, expected):
+        self.assertEqual(self.get_subscribers(False), expected)
+        self.assertEqual(self.get_subscribers(True), expected)
+
+    @with_settings(USE_WILDCARD_TAGS=True, SUBSCRIBED_TAG_SELECTOR_ENABLED=False)
+    def test_index_follows_tag_selections(self):
+        self.assert_subscribers_are(set([self.hater, self.reader]))
+
+        self.fan.mark_tags(wildcards=('da*',), reason='good', action='add')
+        self.assert_subscribers_are(set([self.fan, self.hater, self.reader]))
+
+        self.hater.mark_tags(tagnames=('good',), reason='bad', action='add')
+        self.assert_subscribers_are(set([self.fan, self.reader]))
+
+        self.fan.mark_tags(wildcards=('da*',), reason='good', action='remove')
+        self.hater.mark_tags(tagnames=('good',), reason='bad', action='remove')
+        self.hater.mark_tags(wildcards=('goo*',), reason='bad', action='add')
+        self.assert_subscribers_are(set([self.reader]))
+
+    @with_settings(USE_WILDCARD_TAGS=True, SUBSCRIBED_TAG_SELECTOR_ENABLED=False)
+    def test_index_is_updated_per_user(self):
+        self.assert_subscribers_are(set([self.hater, self.reader]))
+        with override_settings(ASKBOT_TAG_SUBSCRIBERS_INDEX_TIMEOUT=3600):
+            generation = tag_subscribers.get_generation()
+            self.fan.mark_tags(tagnames=('day',), reason='good', action='add')
+            self.hater.email_tag_filter_strategy = const.INCLUDE_INTERESTING
+            tag_subscribers.update_user(self.hater.id)
+            self.assertEqual(tag_subscribers.get_generation(), generation)
+        self.assert_subscribers_are(set([self.fan, self.reader]))
+
+    def test_unsubscribed_user_is_removed(self):
+        self.assert_subscribers_are(set([self.hater, self.reader]))
+        with override_settings(ASKBOT_TAG_SUBSCRIBERS_INDEX_TIMEOUT=3600):
+            feeds = models.EmailFeedSetting.objects.filter(subscriber=self.reader)
+            feeds.update(frequency='n')
+            tag_subscribers.update_user(self.reader.id)
+        self.assert_subscribers_are(set([self.hater]))
+
+    def test_wildcard_tree(self):
+        tree = tag_subscribers.WildcardTree()
+        tree.add('py*', 1)
+        tree.add('python*', 2)
+        tree.add('*', 3)
+        tree.add('java*', 4)
+        self.assertEqual(tree.match('python'), set([1, 2, 3]))
+        self.assertEqual(tree.match('pyramid'), set([1, 3]))
+        self.assertEqual(tree.match('ruby'), set([3]))
+
+
 class CommentTests(AskbotTestCase):
     """unfortunately, not very useful tests,
     as assertions of type "user can" are not inside
@@ -441,6 +515,139 @@ class CommentTests(AskbotTestCase):
         comment = models.Post.objects.get_comments().get(id = self.comment.id)
         self.assertEquals(comment.points, 0)
 
+class VoteReputationTests(AskbotTestCase):
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.question = self.post_question(user=self.author)
+        self.voters = [self.create_user('voter%d' % num) for num in range(4)]
+
+    @with_settings(MAX_REP_GAIN_PER_USER_PER_DAY=20,
+                   REP_GAIN_FOR_RECEIVING_UPVOTE=10)
+    def test_daily_gain_is_capped(self):
+        reputation = self.author.reputation
+        for voter in self.voters:
+            voter.upvote(self.question)
+        author = self.reload_object(self.author)
+        self.assertEqual(author.reputation, reputation + 20)
+
+        self.voters[0].upvote(self.question, cancel=True)
+        day = models.repute.get_reputation_day(timezone.now())
+        gain = models.DailyReputationGain.objects.get_gain(author, day)
+        self.assertEqual(gain, 10)
+        self.assertEqual(
+            gain, models.Repute.objects.get_reputation_by_upvoted_today(author, day)
+        )
+
+    def test_daily_gain_starts_from_history(self):
+        day = models.repute.get_reputation_day(timezone.now())
+        models.Repute(user=self.author, positive=15, reputation_type=1,
+                      question=self.question, reputed_at=timezone.now()).save()
+        models.DailyReputationGain.objects.add_gain(self.author, day, 10)
+        gain = models.DailyReputationGain.objects.get_gain(self.author, day)
+        self.assertEqual(gain, 25)
+
+    def test_receive_reputation_is_not_below_minimum(self):
+        self.author.receive_reputation(-1000)
+        author = self.reload_object(self.author)
+        self.assertEqual(author.reputation, const.MIN_REPUTATION)
+        profile = models.UserProfile.objects.get(pk=self.author.pk)
+        self.assertEqual(profile.reputation, const.MIN_REPUTATION)
+
+    def test_cached_reputation_follows_concurrent_changes(self):
+        from askbot.models.user_profile import get_profile
+        get_profile(self.author)
+        #change made by another process
+        models.UserProfile.objects.filter(pk=self.author.pk).update(reputation=100)
+        self.author.receive_reputation(10)
+        self.assertEqual(self.author.reputation, 110)
+        self.assertEqual(get_profile(self.author).reputation, 110)
+
+
+class ReputationHistoryTests(AskbotTestCase):
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.question = self.post_question(user=self.author)
+
+    def add_repute(self, reputation, reputed_at):
+        repute = models.Repute(user=self.author, positive=1, reputation_type=1,
+                               question=self.question, reputed_at=reputed_at,
+                               reputation=reputation)
+        repute.save()
+        return repute
+
+    def get_buckets(self):
+        buckets = models.ReputationBucket.objects.filter(user=self.author)
+        return list(buckets.order_by('day').values_list('day', 'reputation', 'repute_count'))
+
+    def test_buckets_follow_reputes(self):
+        now = timezone.now()
+        day = models.repute.get_reputation_day(now)
+        yesterday = models.repute.get_reputation_day(now - datetime.timedelta(1))
+        self.add_repute(11, now - datetime.timedelta(1))
+        self.add_repute(21, now - datetime.timedelta(seconds=10))
+        #older record of the day, saved later, does not change the reputation
+        self.add_repute(16, now - datetime.timedelta(seconds=20))
+        expected = [(yesterday, 11, 1), (day, 21, 2)]
+        self.assertEqual(self.get_buckets(), expected)
+
+        models.ReputationBucket.objects.all().delete()
+        models.ReputationBucket.objects.rebuild([self.author.id])
+        self.assertEqual(self.get_buckets(), expected)
+
+    def test_graph_points(self):
+        now = timezone.now()
+        for num in range(10):
+            self.add_repute(num + 1, now - datetime.timedelta(10 - num))
+        lang = self.question.thread.language_code
+        points = models.ReputationBucket.objects.get_graph_points(self.author, lang, count=5)
+        self.assertEqual(len(points), 5)
+        self.assertEqual(points[0][1], 1)
+        self.assertEqual(points[-1][1], 10)
+
+
+
+@override_settings(ASKBOT_USER_STATS_MAX_AGE=3600)
+class UserStatsSnapshotTests(AskbotTestCase):
+    def setUp(self):
+        self.old_cache = cache.cache
+        cache.cache = LocMemCache('', {})
+        self.author = self.create_user('author')
+        self.voter = self.create_user('voter', reputation=10000)
+        self.question = self.post_question(user=self.author, tags='one two')
+        self.lang = self.question.thread.language_code
+
+    def tearDown(self):
+        cache.cache = self.old_cache
+
+    def get_snapshot(self):
+        return models.UserStatsSnapshot.objects.get_for_user(self.voter, self.lang)
+
+    def test_snapshot_is_refreshed_after_votes(self):
+        self.assertEqual(self.get_snapshot().up_votes, 0)
+
+        self.voter.upvote(self.question)
+        #served from the snapshot until refreshed
+        self.assertEqual(self.get_snapshot().up_votes, 0)
+        self.assertEqual(models.user_stats.refresh(include_recent=True), 1)
+        self.assertEqual(self.get_snapshot().up_votes, 1)
+
+    def test_expired_snapshot_is_refreshed_when_read(self):
+        self.get_snapshot()
+        self.voter.upvote(self.question)
+        old_time = timezone.now() - datetime.timedelta(seconds=3601)
+        models.UserStatsSnapshot.objects.update(refreshed_at=old_time)
+        self.assertEqual(self.get_snapshot().up_votes, 1)
+
+    def test_bulk_fetch_queues_missing_snapshots(self):
+        users = [self.author, self.voter]
+        snapshots = models.UserStatsSnapshot.objects.get_for_users(users, self.lang)
+        self.assertEqual(snapshots, {})
+        models.user_stats.refresh(include_recent=True)
+        snapshots = models.UserStatsSnapshot.objects.get_for_users(users, self.lang)
+        self.assertEqual(set(snapshots.keys()), set([self.author.id, self.voter.id]))
+        tag_names = snapshots[self.author.id].get_top_tag_names(3)
+        self.assertEqual(set(tag_names), set(['one', 'two']))
+
 class GroupTests(AskbotTestCase):
     def setUp(self):
         self.u1 = self.create_user('u1')
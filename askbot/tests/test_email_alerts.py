@@ -7,14 +7,20 @@ from django.conf import settings as django_settings
 from django.core import management
 from django.core import serializers
 import django.core.mail
+from django.core import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.mail.backends.base import BaseEmailBackend
 from django.core.urlresolvers import reverse
 from django.test import TestCase
 from django.test.client import Client
+from django.test.utils import override_settings
 from django.utils import translation, timezone
 from askbot.tests import utils
 from askbot.tests.utils import with_settings
 from askbot import models
 from askbot import mail
+from askbot.mail import digests
+from askbot.mail import send_queue
 from askbot.conf import settings as askbot_settings
 from askbot import const
 from askbot.models.question import Thread
@@ -1022,6 +1028,48 @@ class EmailFeedSettingTests(utils.AskbotTestCase):
         self.assertEquals(data_before, data_after)
 
 
+class EmailDigestChunkTests(utils.AskbotTestCase):
+
+    def setUp(self):
+        now = timezone.now()
+        schedule = copy.deepcopy(models.EmailFeedSetting.NO_EMAIL_SCHEDULE)
+        schedule['q_ask'] = 'd'
+        self.other_user = self.create_user('other')
+        self.target_users = list()
+        for num in range(2):
+            user = self.create_user(
+                            'target%d' % num,
+                            notification_schedule=schedule,
+                            date_joined=now - datetime.timedelta(2)
+                        )
+            question = self.post_question(
+                            user=user,
+                            title='question %d' % num,
+                            timestamp=now - datetime.timedelta(1)
+                        )
+            self.post_answer(
+                            user=self.other_user,
+                            question=question,
+                            timestamp=now - datetime.timedelta(hours=12)
+                        )
+            self.target_users.append(user)
+
+    def test_digests_are_sent_to_chunk_of_users(self):
+        django.core.mail.outbox = list()
+        user_ids = [user.id for user in self.target_users]
+        self.assertEqual(set(digests.get_recipient_ids()) & set(user_ids), set(user_ids))
+        digests.send_digests(user_ids)
+        outbox = django.core.mail.outbox
+        recipients = set(message.recipients()[0] for message in outbox)
+        self.assertEqual(recipients, set(user.email for user in self.target_users))
+
+        #subscriptions are marked as reported
+        django.core.mail.outbox = list()
+        self.assertEqual(set(digests.get_recipient_ids()) & set(user_ids), set())
+        digests.send_digests(user_ids)
+        self.assertEqual(len(django.core.mail.outbox), 0)
+
+
 class EmailAlertTestsWithGroupsEnabled(utils.AskbotTestCase):
 
     def setUp(self):
@@ -1148,3 +1196,131 @@ class MailMessagesTests(utils.AskbotTestCase):
                             'footer_code': 'nothing'
                         }).render_body()
         self.assertTrue(user.username in message)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise IOError('connection refused')
+
+
+@override_settings(ASKBOT_MAIL_QUEUE_ENABLED=True)
+class MailQueueTests(utils.AskbotTestCase):
+    def setUp(self):
+        self.old_cache = cache.cache
+        cache.cache = LocMemCache('', {})
+
+    def tearDown(self):
+        cache.cache = self.old_cache
+
+    def test_queued_email_is_sent(self):
+        mail.send_mail('subject', '<p>body</p>', recipient_list=['user@example.com'])
+        self.assertEqual(len(django.core.mail.outbox), 0)
+        self.assertEqual(models.QueuedEmail.objects.count(), 1)
+
+        self.assertEqual(send_queue.send_queued(), (1, 0))
+        outbox = django.core.mail.outbox
+        self.assertEqual(len(outbox), 1)
+        self.assertEqual(outbox[0].recipients(), ['user@example.com'])
+        self.assertTrue(outbox[0].subject.endswith('subject'))
+        self.assertEqual(models.QueuedEmail.objects.count(), 0)
+
+    def test_failed_email_is_retried_later(self):
+        mail.send_mail('subject', 'body', recipient_list=['user@example.com'])
+        backend = 'askbot.tests.test_email_alerts.FailingEmailBackend'
+        self.assertEqual(send_queue.send_queued(backend=backend), (0, 1))
+
+        queued_email = models.QueuedEmail.objects.get()
+        self.assertEqual(queued_email.attempts, 1)
+        self.assertTrue('connection refused' in queued_email.last_error)
+        self.assertEqual(models.QueuedEmail.objects.get_due().count(), 0)
+        #not due yet
+        self.assertEqual(send_queue.send_queued(), (0, 0))
+        self.assertEqual(len(django.core.mail.outbox), 0)
+
+    def test_claimed_email_is_not_sent_twice(self):
+        mail.send_mail('subject', 'body', recipient_list=['user@example.com'])
+        queued_email = models.QueuedEmail.objects.get()
+        until = timezone.now() + datetime.timedelta(seconds=send_queue.CLAIM_TIMEOUT)
+        claimed = models.QueuedEmail.objects.claim([queued_email.id], 'other-run', until)
+        self.assertEqual(claimed, [queued_email])
+        #claimed by the other run
+        self.assertEqual(send_queue.send_queued(), (0, 0))
+        self.assertEqual(len(django.core.mail.outbox), 0)
+
+    @override_settings(ASKBOT_MAIL_QUEUE_DOMAIN_RATE=2)
+    def test_domain_rate_is_limited(self):
+        for num in range(3):
+            mail.send_mail('subject', 'body', recipient_list=['user%d@example.com' % num])
+        mail.send_mail('subject', 'body', recipient_list=['user@example.org'])
+
+        self.assertEqual(send_queue.send_queued(), (3, 0))
+        recipients = [message.recipients()[0] for message in django.core.mail.outbox]
+        self.assertEqual(recipients.count('user@example.org'), 1)
+        #third message to example.com waits for the next minute
+        self.assertEqual(models.QueuedEmail.objects.count(), 1)
+
+    @override_settings(ASKBOT_MAIL_QUEUE_DOMAIN_RATE=1)
+    def test_throttled_domain_does_not_hold_back_others(self):
+        for num in range(5):
+            mail.send_mail('subject', 'body', recipient_list=['user%d@example.com' % num])
+        mail.send_mail('subject', 'body', recipient_list=['user@example.org'])
+        #messages are read in pages of CLAIM_SIZE rows
+        claim_size = send_queue.CLAIM_SIZE
+        send_queue.CLAIM_SIZE = 2
+        try:
+            self.assertEqual(send_queue.send_queued(), (2, 0))
+        finally:
+            send_queue.CLAIM_SIZE = claim_size
+        recipients = [message.recipients()[0] for message in django.core.mail.outbox]
+        self.assertEqual(recipients, ['user0@example.com', 'user@example.org'])
+
+
+class SharedEmailFragmentTests(utils.AskbotTestCase):
+    def setUp(self):
+        self.asker = self.create_user('asker')
+        self.answerer = self.create_user('answerer')
+        self.question = self.post_question(user=self.asker)
+        self.answer = self.post_answer(user=self.answerer, question=self.question)
+        self.activity = models.Activity(
+                                user=self.answerer,
+                                content_object=self.answer,
+                                activity_type=const.TYPE_ACTIVITY_ANSWER,
+                                question=self.question
+                            )
+
+    def get_email(self, user, fragment_cache=None):
+        from askbot.mail.messages import InstantEmailAlert
+        return InstantEmailAlert({
+                        'to_user': user,
+                        'from_user': self.answerer,
+                        'post': self.answer,
+                        'update_activity': self.activity
+                    }, fragment_cache=fragment_cache)
+
+    def get_shared_bodies(self, fragment_cache):
+        return [key for key in fragment_cache if 'shared_body' in key]
+
+    def test_post_is_rendered_once_for_readers(self):
+        readers = [self.create_user('reader%d' % num) for num in range(3)]
+        fragment_cache = dict()
+        bodies = [self.get_email(reader, fragment_cache).render_body() \
+                                                    for reader in readers]
+        self.assertEqual(len(self.get_shared_bodies(fragment_cache)), 1)
+        #personalized parts are rendered for each recipient
+        self.assertEqual(bodies[0], self.get_email(readers[0]).render_body())
+        self.assertTrue('test answer text' in bodies[2])
+
+    def test_post_is_rendered_for_author(self):
+        fragment_cache = dict()
+        self.get_email(self.create_user('reader'), fragment_cache).render_body()
+        body = self.get_email(self.asker, fragment_cache).render_body()
+        self.assertEqual(len(self.get_shared_bodies(fragment_cache)), 1)
+        self.assertEqual(body, self.get_email(self.asker).render_body())
+
+    @with_settings(SHOW_ADMINS_PRIVATE_USER_DATA=True)
+    def test_admins_get_private_user_data(self):
+        fragment_cache = dict()
+        self.get_email(self.create_user('reader'), fragment_cache).render_body()
+        admin = self.create_user('admin', status='d')
+        body = self.get_email(admin, fragment_cache).render_body()
+        self.assertTrue(self.answerer.email in body)
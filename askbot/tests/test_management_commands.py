@@ -1,4 +1,6 @@
 from __future__ import print_function
+import shutil
+import tempfile
 from django.core import management, mail
 from django.contrib import auth
 from askbot.tests.utils import AskbotTestCase
@@ -150,6 +152,39 @@ class ManagementCommandTests(AskbotTestCase):
         #now they should be removed
         self.assertEqual(models.Tag.objects.count(), tag_count)
 
+    def test_fix_answer_counts(self):
+        user = self.create_user()
+        questions = [self.post_question(user=user) for _ in range(3)]
+        for question in questions:
+            self.post_answer(user=user, question=question)
+        models.Thread.objects.update(answer_count=5)
+
+        management.call_command('fix_answer_counts', batch_size=1)
+        counts = models.Thread.objects.values_list('answer_count', flat=True)
+        self.assertEqual(list(counts), [1, 1, 1])
+
+    def test_batch_command_continues_after_checkpoint(self):
+        from askbot.management.commands.fix_thread_points import Command
+        user = self.create_user()
+        questions = [self.post_question(user=user) for _ in range(3)]
+        models.Thread.objects.update(points=5)
+        checkpoint_dir = tempfile.mkdtemp()
+        command = Command()
+        command.options = {'checkpoint_dir': checkpoint_dir}
+        command.save_checkpoint(questions[0].thread_id)
+
+        management.call_command('fix_thread_points', batch_size=1,
+                                checkpoint_dir=checkpoint_dir)
+        threads = models.Thread.objects.order_by('id')
+        self.assertEqual(list(threads.values_list('points', flat=True)), [5, 0, 0])
+        self.assertEqual(command.get_checkpoint(), 0)
+
+        command.save_checkpoint(questions[2].thread_id)
+        management.call_command('fix_thread_points', restart=True,
+                                checkpoint_dir=checkpoint_dir)
+        self.assertEqual(list(threads.values_list('points', flat=True)), [0, 0, 0])
+        shutil.rmtree(checkpoint_dir)
+
     @with_settings(CONTENT_MODERATION_MODE='premoderation')
     def test_askbot_send_moderation_alerts(self):
         mod1 = self.create_user('mod1', status='m')
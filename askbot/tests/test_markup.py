@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from django.conf import settings as django_settings
+from django.core import cache
 from django.test import TestCase
+from django.test.utils import override_settings
 from askbot.utils.markup import markdown_input_converter
 from askbot.tests.utils import AskbotTestCase
 from askbot.utils import markup
@@ -131,3 +133,23 @@ replace that <a href="http://example.com">example.com</a>
         """<a href="http://example.com"><div>http://example.com</div></a>
         """
         self.assertHTMLEqual(self.conv(text), expected)
+
+
+class MarkdownCacheTest(TestCase):
+
+    def setUp(self):
+        cache.cache.clear()
+
+    def get_cache_key(self, text):
+        return markup.get_html_cache_key(text, markup.get_parser_config(), True)
+
+    def test_html_is_cached_by_text(self):
+        html = markdown_input_converter('*hello*')
+        self.assertEqual(cache.cache.get(self.get_cache_key('*hello*')), html)
+        cache.cache.set(self.get_cache_key('*hello*'), 'cached')
+        self.assertEqual(markdown_input_converter('*hello*'), 'cached')
+
+    @override_settings(ASKBOT_MARKUP_CACHE_TIMEOUT=0)
+    def test_cache_is_disabled(self):
+        markdown_input_converter('*hello*')
+        self.assertEqual(cache.cache.get(self.get_cache_key('*hello*')), None)
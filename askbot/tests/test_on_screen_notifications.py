@@ -638,3 +638,41 @@ class OnScreenUpdateNotificationTests(TestCase):
         notifs = models.ActivityAuditStatus.objects.filter(
                                                 activity__pk__in=act_ids)
         self.assertEqual(notifs.count(), 0)
+
+    def test_recount_response_counts(self):
+        self.reset_response_counts()
+        time.sleep(1)
+        models.Post.objects.create_new_answer(
+                            thread=self.thread,
+                            author=self.u31,
+                            added_at=datetime.datetime.now(),
+                            text='answer4'
+                        )
+        expected = [user.new_response_count for user in self.users]
+        for user in self.users:
+            user.new_response_count = 5
+
+        user_ids = [user.id for user in self.users]
+        corrected_ids = models.recount_response_counts(user_ids)
+        self.assertEqual(corrected_ids, set(user_ids))
+        self.assertNewResponseCountsEqual(expected)
+        #second pass finds nothing to fix
+        self.assertEqual(models.recount_response_counts(user_ids), set())
+
+    def test_create_new_mentions(self):
+        mentioned = [self.u12, self.u13, self.u14]
+        mentions = models.Activity.objects.create_new_mentions(
+                                mentioned_whom=mentioned,
+                                mentioned_in=self.answer1,
+                                mentioned_by=self.u21,
+                                mentioned_at=timezone.now()
+                            )
+        #one mention per user, each with its only recipient
+        self.assertEqual(len(mentions), 3)
+        mentioned_users = set([
+            mention.get_mentioned_user() for mention in mentions
+        ])
+        self.assertEqual(mentioned_users, set(mentioned))
+        for mention in mentions:
+            self.assertEqual(mention.content_object, self.answer1)
+            self.assertEqual(mention.question, self.question)
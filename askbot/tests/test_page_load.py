@@ -5,7 +5,11 @@ from django.conf import settings
 from django.core.urlresolvers import reverse
 from django.core import management
 from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
 from django.core import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test.utils import override_settings
 import simplejson
 from django.utils.translation import activate as activate_language
 
@@ -596,6 +600,108 @@ class QuestionViewTests(AskbotTestCase):
         meta_descr = soup.find_all('meta', attrs={'name': 'description'})[0]
         self.assertTrue(text in meta_descr.attrs['content'])
 
+    def get_post_data_query_count(self, user, answer_count):
+        question = self.post_question(user=user)
+        for _ in range(answer_count):
+            answer = self.post_answer(user=user, question=question)
+            self.post_comment(user=user, parent_post=answer)
+            answer.apply_edit(edited_by=user, text='edited answer text')
+        thread = models.Thread.objects.get(id=question.thread_id)
+        with CaptureQueriesContext(connection) as context:
+            thread.get_post_data()
+        return len(context.captured_queries)
+
+    def test_post_data_query_count_does_not_depend_on_thread_size(self):
+        user = self.create_user('user')
+        small_thread_count = self.get_post_data_query_count(user, 1)
+        large_thread_count = self.get_post_data_query_count(user, 10)
+        self.assertEqual(small_thread_count, large_thread_count)
+
+
+class MainPageTagPreferencesTests(AskbotTestCase):
+
+    def setUp(self):
+        self.old_cache = cache.cache
+        cache.cache = LocMemCache('', {})
+        self.user = self.create_user('user')
+        self.post_question(user=self.user, tags='tag1 tag2')
+        self.client.login(method='force', user_id=self.user.id)
+
+    def tearDown(self):
+        cache.cache = self.old_cache
+
+    def get_main_page_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('questions'))
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in context.captured_queries]
+
+    def test_marked_tags_are_read_once(self):
+        tag_names = ['tag%d' % num for num in range(200)]
+        self.user.mark_tags(tagnames=tag_names[:100], reason='good', action='add')
+        self.user.mark_tags(tagnames=tag_names[100:], reason='bad', action='add')
+
+        queries = self.get_main_page_queries()
+        marked_tag_queries = [sql for sql in queries if 'askbot_markedtag' in sql]
+        self.assertEqual(len(marked_tag_queries), 1)
+
+        queries = self.get_main_page_queries()
+        marked_tag_queries = [sql for sql in queries if 'askbot_markedtag' in sql]
+        self.assertEqual(len(marked_tag_queries), 0)
+
+        #marking tags invalidates the cached preferences
+        self.user.mark_tags(tagnames=['tag1'], reason='bad', action='add')
+        queries = self.get_main_page_queries()
+        marked_tag_queries = [sql for sql in queries if 'askbot_markedtag' in sql]
+        self.assertEqual(len(marked_tag_queries), 1)
+
+
+
+class UserStatsSnapshotPageTests(AskbotTestCase):
+
+    def setUp(self):
+        self.old_cache = cache.cache
+        cache.cache = LocMemCache('', {})
+        self.user = self.create_user('user', reputation=10000)
+        for num in range(5):
+            question = self.post_question(user=self.user, tags='tag%d common' % num)
+            answer = self.post_answer(user=self.user, question=question)
+            other = self.create_user('other%d' % num, reputation=10000)
+            self.user.upvote(self.post_question(user=other))
+            other.upvote(answer)
+
+    def tearDown(self):
+        cache.cache = self.old_cache
+
+    def get_profile_queries(self):
+        url = reverse('user_profile', kwargs={'id': self.user.id,
+                                              'slug': slugify(self.user.username)})
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in context.captured_queries]
+
+    def get_stats_queries(self, queries):
+        """queries aggregating votes and tags of the user"""
+        return [sql for sql in queries \
+                    if 'COUNT' in sql.upper() and 'askbot_tag' in sql \
+                        or 'CASE WHEN' in sql.upper()]
+
+    @override_settings(ASKBOT_USER_STATS_MAX_AGE=3600)
+    def test_profile_reads_saved_snapshot(self):
+        queries = self.get_profile_queries()
+        self.assertTrue(len(self.get_stats_queries(queries)) > 0)
+        self.assertEqual(models.UserStatsSnapshot.objects.count(), 1)
+
+        queries = self.get_profile_queries()
+        self.assertEqual(self.get_stats_queries(queries), [])
+        snapshot_queries = [sql for sql in queries if 'askbot_user_stats_snapshot' in sql]
+        self.assertEqual(len(snapshot_queries), 1)
+
+    def test_profile_without_snapshots(self):
+        queries = self.get_profile_queries()
+        self.assertTrue(len(self.get_stats_queries(queries)) > 0)
+        self.assertEqual(models.UserStatsSnapshot.objects.count(), 0)
 
 class QuestionPageRedirectTests(AskbotTestCase):
 
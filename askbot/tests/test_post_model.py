@@ -10,13 +10,18 @@ from django.core.cache.backends.dummy import DummyCache
 from django.core.cache.backends.locmem import LocMemCache
 
 from django.core.exceptions import ValidationError
+from django.test.utils import override_settings
 from django.template.loader import get_template
 from django.template import Context
 from askbot.tests.utils import AskbotTestCase
 from askbot.models import Post
 from askbot.models import PostRevision
 from askbot.models import Thread
+from askbot.models import ThreadListing
+from askbot.models.listing import ThreadListingResults
+from askbot.search import pagination
 from askbot.models import Tag
+from askbot.models import tag_dictionary
 from askbot.models import Group
 from askbot.search.state_manager import DummySearchState
 import simplejson
@@ -240,6 +245,46 @@ class ThreadTagModelsTests(AskbotTestCase):
         qs, meta_data = Thread.objects.run_advanced_search(request_user=self.user, search_state=ss)
         self.assertEqual(1, qs.count())
 
+    def test_run_adv_search_unknown_tag(self):
+        ss = SearchState.get_empty()
+        qs, meta_data = Thread.objects.run_advanced_search(request_user=self.user, search_state=ss.add_tag('tag1').add_tag('tag7'))
+        self.assertEqual(0, qs.count())
+
+    def test_run_adv_search_new_tag(self):
+        ss = SearchState.get_empty()
+        qs, meta_data = Thread.objects.run_advanced_search(request_user=self.user, search_state=ss.add_tag('tag1'))
+        self.assertEqual(2, qs.count())
+        question = self.post_question(tags='tag1 tag7')
+        qs, meta_data = Thread.objects.run_advanced_search(request_user=self.user, search_state=ss.add_tag('tag1').add_tag('tag7'))
+        self.assertEqual([question.thread_id], [thread.id for thread in qs])
+
+    def test_tag_dictionary(self):
+        lang = self.q1.thread.language_code
+        tag_ids = dict(Tag.objects.values_list('name', 'id'))
+        tag_ids_per_name, missing = tag_dictionary.get_tag_ids_per_name(['TAG1', 'tag2', 'tag7'], lang)
+        self.assertEqual([[tag_ids['tag2']]], tag_ids_per_name)
+        self.assertEqual(['TAG1', 'tag7'], missing)
+        tag_ids_per_name, missing = tag_dictionary.get_tag_ids_per_name(['TAG1'], lang, case_sensitive=False)
+        self.assertEqual([[tag_ids['tag1']]], tag_ids_per_name)
+        self.assertEqual(set(tag_ids.values()), tag_dictionary.get_wildcard_tag_ids(['tag*'], lang))
+        self.assertEqual(set([tag_ids['tag6']]), tag_dictionary.get_wildcard_tag_ids(['tag6*', 'x*'], lang))
+
+    def test_tag_dictionary_kept_on_tag_count_update(self):
+        tag = Tag.objects.get(name='tag1')
+        generation = tag_dictionary.get_generation()
+        tag.used_count += 1
+        tag.save()
+        self.assertEqual(generation, tag_dictionary.get_generation())
+        tag_dictionary.get_dictionary()
+        tag.used_count += 1
+        tag.save()
+        self.assertEqual(generation, tag_dictionary.get_generation())
+        tag.name = 'tag8'
+        tag.save()
+        self.assertNotEqual(generation, tag_dictionary.get_generation())
+        tag_ids_per_name, missing = tag_dictionary.get_tag_ids_per_name(['tag8'], tag.language_code)
+        self.assertEqual([[tag.id]], tag_ids_per_name)
+
     def test_run_adv_search_query_author(self):
         ss = SearchState(scope=None, sort=None, query="@user", tags=None, author=None, page=None, user_logged_in=None)
         qs, meta_data = Thread.objects.run_advanced_search(request_user=self.user, search_state=ss)
@@ -305,6 +350,63 @@ class ThreadTagModelsTests(AskbotTestCase):
             self.assertEqual(user.id, thread._last_activity_by_cache.id)
             self.assertTrue(thread.last_activity_by is thread._last_activity_by_cache)
 
+    def test_cursor_pagination(self):
+        expected = [q.thread_id for q in (self.q1, self.q2, self.q3, self.q4)]
+        for sort in ('age-asc', 'age-desc'):
+            ss = SearchState(scope='all', sort=sort)
+            qs, meta_data = Thread.objects.run_advanced_search(request_user=self.user, search_state=ss)
+            paginator = pagination.CursorPaginator(qs, sort, 3)
+            page = paginator.page()
+            self.assertEqual(3, len(page))
+            self.assertTrue(page.has_next())
+            next_page = paginator.page(page.next_cursor)
+            self.assertFalse(next_page.has_next())
+            thread_ids = [thread.id for thread in list(page) + list(next_page)]
+            if sort == 'age-desc':
+                thread_ids.reverse()
+            self.assertEqual(expected, thread_ids)
+            self.assertEqual(4, paginator.count)
+
+
+@override_settings(ASKBOT_THREAD_LISTING_ENABLED=True)
+class ThreadListingSearchTests(ThreadTagModelsTests):
+    """runs the search tests against the denormalized listing table"""
+
+    def test_listing_is_used(self):
+        ss = SearchState.get_empty()
+        qs, meta_data = Thread.objects.run_advanced_search(request_user=self.user, search_state=ss)
+        self.assertTrue(isinstance(qs, ThreadListingResults))
+
+    def test_listing_follows_deleted_question(self):
+        self.user2.delete_question(self.q3, timestamp=timezone.now())
+        listing = ThreadListing.objects.get(thread_id=self.q3.thread_id)
+        self.assertTrue(listing.deleted)
+        ss = SearchState.get_empty()
+        qs, meta_data = Thread.objects.run_advanced_search(request_user=self.user, search_state=ss)
+        self.assertEqual(3, qs.count())
+
+    def test_listing_follows_retag(self):
+        self.user2.retag_question(question=self.q3, tags="tag2 tag7")
+        ss = SearchState.get_empty()
+        qs, meta_data = Thread.objects.run_advanced_search(request_user=self.user, search_state=ss.add_tag('tag7'))
+        self.assertEqual([self.q3.thread_id], [thread.id for thread in qs])
+        qs, meta_data = Thread.objects.run_advanced_search(request_user=self.user, search_state=ss.add_tag('tag6'))
+        self.assertEqual([self.q4.thread_id], [thread.id for thread in qs])
+
+    def test_listing_sort_order(self):
+        ss = SearchState(scope='all', sort='age-asc')
+        qs, meta_data = Thread.objects.run_advanced_search(request_user=self.user, search_state=ss)
+        expected = [q.thread_id for q in (self.q1, self.q2, self.q3, self.q4)]
+        self.assertEqual(expected, [thread.id for thread in qs])
+        self.assertEqual(expected[1:3], [thread.id for thread in qs[1:3]])
+
+    def test_rebuild_matches_signal_updates(self):
+        expected = list(ThreadListing.objects.order_by('thread_id').values())
+        ThreadListing.objects.all().delete()
+        from django.core import management
+        management.call_command('build_thread_listing')
+        self.assertEqual(expected, list(ThreadListing.objects.order_by('thread_id').values()))
+
 
 class ThreadRenderLowLevelCachingTests(AskbotTestCase):
     def setUp(self):
@@ -429,6 +531,24 @@ class ThreadRenderLowLevelCachingTests(AskbotTestCase):
             thread.get_summary_html(search_state=SearchState.get_empty())
         )
 
+    def test_page_summaries_locmem_cache(self):
+        cache.cache = LocMemCache('', {})  # Enable local caching
+
+        q2 = self.post_question(title='second', tags='tag1 tag4')
+        threads = [self.q.thread, q2.thread]
+        ss = SearchState.get_empty()
+        expected = [thread.get_summary_html(search_state=ss) for thread in threads]
+        self.assertEqual(expected, Thread.objects.get_summaries_html(threads, search_state=ss))
+
+        # summaries found in cache are not rendered again
+        cache.cache.set(self.q.thread.get_summary_cache_key(), 'Test <<<tag1>>> <<<tag1>>>', timeout=100)
+        cache.cache.delete(q2.thread.get_summary_cache_key())
+        summaries = Thread.objects.get_summaries_html(threads, search_state=ss)
+        tag1_url = ss.add_tag('tag1').full_url()
+        self.assertEqual('Test %s %s' % (tag1_url, tag1_url), summaries[0])
+        self.assertEqual(expected[1], summaries[1])
+        self.assertTrue(q2.thread.summary_html_cached())
+
 
 
 class ThreadRenderCacheUpdateTests(AskbotTestCase):
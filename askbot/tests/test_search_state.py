@@ -290,3 +290,22 @@ class SearchStateTests(AskbotTestCase):
             ss.query_string()
         )
 
+
+    def test_cursor(self):
+        ss = SearchState(scope=None, sort='age-desc', page='3', cursor='1476789123000000_12')
+        self.assertEqual(
+            'scope:all/sort:age-desc/cursor:1476789123000000_12/',
+            ss.query_string()
+        )
+        self.assertEqual(
+            'scope:all/sort:age-desc/page:1/',
+            ss.change_sort('age-desc').query_string()
+        )
+        self.assertEqual(
+            'scope:all/sort:age-desc/page:2/',
+            ss.change_page(2).query_string()
+        )
+        self.assertEqual(
+            'scope:all/sort:age-desc/cursor:1_1/',
+            ss.change_page(2).change_cursor('1_1').query_string()
+        )
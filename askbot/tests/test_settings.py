@@ -1,6 +1,8 @@
 import askbot
 from askbot.tests.utils import AskbotTestCase
 from askbot.conf import settings as askbot_settings
+from askbot.conf.settings_wrapper import snapshot
+from django.core.cache import cache
 from django.conf import settings as django_settings
 from django.utils import translation
 
@@ -48,3 +50,22 @@ class SettingsTests(AskbotTestCase):
         self.assertSettingEquals('MIN_REP_TO_VOTE_UP', 500)
 
         askbot_settings.update('MIN_REP_TO_VOTE_UP', backup)
+
+    def test_snapshot_is_updated(self):
+        backup = askbot_settings.MIN_REP_TO_VOTE_UP
+        askbot_settings.update('MIN_REP_TO_VOTE_UP', 501)
+        self.assertEqual(askbot_settings.MIN_REP_TO_VOTE_UP, 501)
+        askbot_settings.update('MIN_REP_TO_VOTE_UP', backup)
+        self.assertEqual(askbot_settings.MIN_REP_TO_VOTE_UP, backup)
+
+    def test_snapshot_follows_generation(self):
+        snapshot.expire()
+        askbot_settings.MIN_REP_TO_VOTE_UP
+        values = snapshot.get_values()
+        self.assertTrue('MIN_REP_TO_VOTE_UP' in values)
+        #snapshot is used until the generation changes
+        values['MIN_REP_TO_VOTE_UP'] = -1
+        self.assertEqual(askbot_settings.MIN_REP_TO_VOTE_UP, -1)
+        cache.set(snapshot.generation_key, 'other-generation')
+        snapshot.expire()
+        self.assertNotEqual(askbot_settings.MIN_REP_TO_VOTE_UP, -1)
@@ -1,6 +1,9 @@
+from django.core import cache
+from django.test.utils import override_settings
 from django.utils import timezone
 from askbot.tests.utils import AskbotTestCase
 from askbot import models
+from askbot.models import site_visits
 from datetime import timedelta
 
 class SignalHandlerTests(AskbotTestCase):
@@ -17,3 +20,27 @@ class SignalHandlerTests(AskbotTestCase):
         models.record_user_visit(self.user, tomorrow)
         user = self.reload_object(self.user)
         self.assertEqual(user.consecutive_days_visit_count, 1)
+
+    @override_settings(ASKBOT_LAST_SEEN_UPDATE_INTERVAL=300)
+    def test_record_user_visit_coalesced(self):
+        cache.cache.clear()
+        today = timezone.now().replace(hour=12)
+        self.user.last_seen = today
+        self.user.save()
+
+        #visit within the interval is kept in cache
+        soon = today + timedelta(seconds=60)
+        models.record_user_visit(self.user, soon)
+        profile = models.UserProfile.objects.get(pk=self.user.pk)
+        self.assertEqual(profile.last_seen, today)
+
+        self.assertEqual(site_visits.flush(include_recent=True), 1)
+        profile = models.UserProfile.objects.get(pk=self.user.pk)
+        self.assertEqual(profile.last_seen, soon)
+
+        #visit next day is saved right away
+        tomorrow = today + timedelta(1)
+        models.record_user_visit(self.user, tomorrow)
+        user = self.reload_object(self.user)
+        self.assertEqual(user.last_seen, tomorrow)
+        self.assertEqual(user.consecutive_days_visit_count, 1)
@@ -1,8 +1,15 @@
 from askbot.tests.utils import AskbotTestCase
 from askbot.conf import settings as askbot_settings
 from askbot import models
+from askbot.models import thread_cache
 import django.core.mail
 from django.core.urlresolvers import reverse
+from django.core import cache, management
+from django.contrib.auth.models import AnonymousUser
+from django.test.utils import override_settings
+from django.utils import timezone
+from askbot.search import question_counts
+from askbot.search.state_manager import SearchState
 
 class ThreadModelTestsWithGroupsEnabled(AskbotTestCase):
 
@@ -126,3 +133,181 @@ class ThreadModelTestsWithGroupsEnabled(AskbotTestCase):
         answer_groups = set(answer.groups.all())
         user_groups = set(self.user.get_groups())
         self.assertEqual(len(answer_groups & user_groups), 1)
+
+    def test_cached_post_data_does_not_leak_private_answer(self):
+        question = self.post_question(self.user)
+        answer = self.post_answer(user=self.admin, question=question, is_private=True)
+        thread = question.thread
+        #warm up the cache with data visible to the admin
+        admin_answers = thread.get_cached_post_data(user=self.admin)[1]
+        self.assertEqual([a.id for a in admin_answers], [answer.id])
+        self.assertEqual(thread.get_cached_post_data(user=self.user)[1], [])
+        self.assertEqual(thread.get_cached_post_data()[1], [])
+
+        thread.update_summary_html(visitor=self.admin)
+        self.assertEqual(thread.get_cached_summary_html(visitor=self.user), None)
+        self.assertEqual(thread.get_cached_summary_html(), None)
+
+    def test_visibility_signature_is_shared(self):
+        question = self.post_question(self.user)
+        self.post_answer(user=self.admin, question=question, is_private=True)
+        thread = question.thread
+        other_user = self.create_user('other')
+        self.assertEqual(
+            thread.get_visibility_signature(self.user),
+            thread.get_visibility_signature(other_user)
+        )
+        self.assertNotEqual(
+            thread.get_visibility_signature(self.user),
+            thread.get_visibility_signature(self.admin)
+        )
+
+    def test_cached_post_data_follows_group_changes(self):
+        question = self.post_question(self.user)
+        answer = self.post_answer(user=self.admin, question=question, is_private=True)
+        thread = question.thread
+        self.assertEqual(thread.get_cached_post_data(user=self.user)[1], [])
+        self.admin.edit_group_membership(
+            group=self.group, user=self.user, action='add', force=True
+        )
+        answers = thread.get_cached_post_data(user=self.user)[1]
+        self.assertEqual([a.id for a in answers], [answer.id])
+
+        other_user = self.create_user('other')
+        self.assertEqual(thread.get_cached_post_data(user=other_user)[1], [])
+        self.admin.edit_answer(answer, is_private=False)
+        answers = thread.get_cached_post_data(user=other_user)[1]
+        self.assertEqual([a.id for a in answers], [answer.id])
+
+
+class QuestionCountsTests(AskbotTestCase):
+
+    def setUp(self):
+        cache.cache.clear()
+        self.user = self.create_user('user')
+        self.other_user = self.create_user('other_user')
+        self.q1 = self.post_question(user=self.user, tags='one two')
+        self.q2 = self.post_question(user=self.user, tags='two')
+
+    def assertCount(self, expected, scope='all', tags=None):
+        ss = SearchState(scope=scope, tags=tags)
+        threads, meta_data = models.Thread.objects.run_advanced_search(
+                                    request_user=AnonymousUser(), search_state=ss)
+        self.assertEqual(threads.count(), expected)
+        self.assertEqual(question_counts.get_count(AnonymousUser(), ss), expected)
+
+    def test_counts_follow_changes(self):
+        self.assertCount(2)
+        self.assertCount(2, tags='two')
+        self.assertCount(1, tags='one')
+        self.assertCount(2, scope='unanswered')
+
+        self.post_question(user=self.other_user, tags='one')
+        self.assertCount(3)
+        self.assertCount(2, tags='one')
+
+        answer = self.post_answer(user=self.other_user, question=self.q1)
+        self.user.accept_best_answer(answer=answer)
+        self.assertCount(2, scope='unanswered')
+        self.assertCount(0, scope='unanswered', tags='two')
+
+        self.user.delete_question(self.q2, timestamp=timezone.now())
+        self.assertCount(2)
+        self.assertCount(1, tags='two')
+
+        self.user.retag_question(question=self.q1, tags='three')
+        self.assertCount(0, tags='two')
+        self.assertCount(1, tags='three')
+
+    def test_lost_thread_buckets_drop_counts(self):
+        self.assertCount(2)
+        cache.cache.delete(question_counts.get_buckets_key(self.q1.thread_id))
+        self.user.delete_question(self.q1, timestamp=timezone.now())
+        self.assertCount(1)
+
+    def test_reconcile(self):
+        key = question_counts.get_count_key(question_counts.ANY_LANGUAGE, 'all', 'two')
+        cache.cache.set(key, 100)
+        management.call_command('reconcile_question_counts', verbosity=0)
+        self.assertCount(2, tags='two')
+
+    def test_text_search_is_not_counted(self):
+        ss = SearchState(query='hello')
+        self.assertEqual(question_counts.get_count(AnonymousUser(), ss), None)
+        ss = SearchState(tags='one,two')
+        self.assertEqual(question_counts.get_count(AnonymousUser(), ss), None)
+
+
+@override_settings(ASKBOT_THREAD_SUMMARY_REBUILD_ASYNC=True)
+class ThreadSummaryRebuildTests(AskbotTestCase):
+
+    def setUp(self):
+        cache.cache.clear()
+        self.user = self.create_user('user')
+        self.other_user = self.create_user('other_user')
+        self.question = self.post_question(user=self.user)
+        thread_cache.rebuild(include_recent=True)
+        thread_cache.reset_stats()
+
+    def test_rebuild_is_deferred_and_coalesced(self):
+        thread = self.question.thread
+        self.other_user.upvote(self.question)
+        self.other_user.upvote(self.question, cancel=True)
+        self.post_answer(user=self.other_user, question=self.question)
+        self.assertEqual(thread.get_cached_summary_html(), None)
+
+        self.assertEqual(thread_cache.rebuild(include_recent=True), 1)
+        self.assertNotEqual(thread.get_cached_summary_html(), None)
+        stats = thread_cache.get_stats()
+        self.assertEqual(stats['rebuilt'], 1)
+        self.assertEqual(stats['coalesced'], stats['marked'] - 1)
+        self.assertEqual(thread_cache.rebuild(include_recent=True), 0)
+
+    def test_rendered_summaries_are_skipped(self):
+        self.other_user.upvote(self.question)
+        thread = models.Thread.objects.get(id=self.question.thread_id)
+        thread.get_summary_html()
+        thread_cache.rebuild(include_recent=True)
+        stats = thread_cache.get_stats()
+        self.assertEqual((stats['rebuilt'], stats['skipped']), (0, 1))
+
+
+class SimilarThreadsIndexTests(AskbotTestCase):
+
+    def setUp(self):
+        cache.cache.clear()
+        self.user = self.create_user('user')
+        self.q1 = self.post_question(user=self.user, title='q1', tags='python django')
+        self.q2 = self.post_question(user=self.user, title='q2', tags='python django orm')
+        self.q3 = self.post_question(user=self.user, title='q3', tags='python')
+        self.q4 = self.post_question(user=self.user, title='q4', tags='ruby')
+        models.SimilarThread.objects.rebuild(self.q1.thread.language_code)
+
+    def get_similar_ids(self, question):
+        links = models.SimilarThread.objects.filter(
+                                thread=question.thread
+                            ).order_by('-score')
+        return list(links.values_list('similar_thread_id', flat=True))
+
+    def test_rebuild(self):
+        self.assertEqual(self.get_similar_ids(self.q1), [self.q2.thread_id, self.q3.thread_id])
+        self.assertEqual(self.get_similar_ids(self.q4), [])
+
+    @override_settings(ASKBOT_SIMILAR_THREADS_INDEX_ENABLED=True)
+    def test_index_follows_tag_changes(self):
+        self.user.retag_question(question=self.q4, tags='django')
+        self.assertIn(self.q4.thread_id, self.get_similar_ids(self.q1))
+        self.assertEqual(self.get_similar_ids(self.q4)[0], self.q1.thread_id)
+
+        self.user.retag_question(question=self.q3, tags='ruby')
+        self.assertNotIn(self.q3.thread_id, self.get_similar_ids(self.q1))
+
+    def test_disabled_index_is_not_updated(self):
+        self.user.retag_question(question=self.q4, tags='django')
+        self.assertEqual(self.get_similar_ids(self.q4), [])
+
+    @override_settings(ASKBOT_SIMILAR_THREADS_INDEX_ENABLED=True)
+    def test_get_similar_threads(self):
+        thread = models.Thread.objects.get(id=self.q1.thread_id)
+        titles = [item['title'] for item in thread.get_similar_threads().data()]
+        self.assertEqual(titles, ['q2', 'q3'])
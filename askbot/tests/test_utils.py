@@ -1,6 +1,7 @@
 import markdown2
 from django.conf import settings as django_settings
 from django.test import TestCase
+from django.test.utils import override_settings
 from askbot.tests.utils import with_settings
 from askbot.utils.url_utils import urls_equal
 from askbot.utils.html import absolutize_urls
@@ -9,6 +10,7 @@ from askbot.utils.html import get_text_from_html
 from askbot.utils.html import sanitize_html
 from askbot.utils import html as html_utils
 from askbot.utils.markup import get_parser
+from askbot.utils.timeseries import downsample_lttb
 from askbot.conf import settings as askbot_settings
 
 
@@ -131,6 +133,18 @@ class GetParserTest(TestCase):
         parser = get_parser('askbot.tests.utils.Markdown')
         self.assertIsInstance(parser, markdown2.Markdown)
 
+    def test_parser_is_created_again_upon_settings_change(self):
+        parser = get_parser()
+        self.assertIs(get_parser(), parser)
+
+        @with_settings(ENABLE_AUTO_LINKING=True,
+                       AUTO_LINK_PATTERNS='#bug(\\d+)',
+                       AUTO_LINK_URLS='http://example.com/bug/\\1')
+        def get_auto_linking_parser():
+            return get_parser()
+
+        self.assertIsNot(get_auto_linking_parser(), parser)
+
 
 class SanitizeHtml(TestCase):
     def test_sanitize_html(self):
@@ -157,3 +171,79 @@ class SanitizeHtml(TestCase):
         self.assertIn('id="foo"', new_html)
         self.assertIn('class="bar"', new_html)
         delattr(django_settings, 'ASKBOT_ALLOWED_HTML_ATTRIBUTES')
+
+
+SANITIZER_FIXTURES = (
+    u'<p>hello <b>world</b></p>',
+    u'<pre><code>\nx = 1\n</code></pre>',
+    u'<pre>\n\nleading newlines</pre>',
+    u'<table><thead><tr><th>a</th></tr></thead>\n'
+    u'<tbody><tr><td><pre>\nx</pre></td></tr></tbody></table>',
+    u'<ul><li>a</li><li>b<ul><li>c</li></ul></li></ul>',
+    u'<a href="http://example.com/?a=1&b=2" title="it\'s">link</a>',
+    u'<a href="javascript:alert(1)">x</a><script>alert(1)</script>',
+    u'<img src="a.png" alt="b" onerror="x"><br/><hr noshade>',
+    u'<p title="1" class="c" lang="en" dir="ltr" id="z">attributes</p>',
+    u'<span title=\'a"b\'>quotes</span>',
+    u'text &amp; more < less > "quoted" &copy; \xe9',
+    u'<p>a<div>b</div></p>',
+    u'<b><i>misnested</b></i>',
+    u'<ul><li>a<li>b</ul>',
+    u'<table><tr><td>implied tbody</td></tr></table>',
+    u'<table>text in table<tr><td>x</td></tr></table>',
+    u'<h1>a<h2>b</h2></h1>',
+    u'<b class="a"><b><b><b><b>x</b></b></b></b>y</b>z',
+    u'<p>unclosed',
+    u'</p><br></br>',
+)
+
+
+class SanitizeHtmlStreamTests(TestCase):
+    def test_stream_output_is_same_as_tree_output(self):
+        for html in SANITIZER_FIXTURES:
+            self.assertEqual(
+                html_utils.sanitize_html_stream(html),
+                html_utils.sanitize_html_tree(html)
+            )
+
+    def test_wellformed_html_is_not_passed_to_tree(self):
+        html = u'<p>a <a href="/b">b</a></p>\n<pre><code>\nc\n</code></pre>' \
+               u'<table><tbody><tr><td>d</td></tr></tbody></table>'
+        tokens = list(html_utils.iter_sanitized_tokens(html))
+        self.assertEqual(tokens[0]['name'], 'p')
+
+    def test_malformed_html_is_passed_to_tree(self):
+        for html in (u'<p>a<div>b</div></p>', u'<table>x</table>', u'<p>a'):
+            tokens = html_utils.iter_sanitized_tokens(html)
+            self.assertRaises(html_utils.TreeRequired, list, tokens)
+
+    @override_settings(
+        ASKBOT_ALLOWED_HTML_ELEMENTS=html_utils.ALLOWED_HTML_ELEMENTS + ('ham',),
+        ASKBOT_ALLOWED_HTML_ATTRIBUTES=html_utils.ALLOWED_HTML_ATTRIBUTES + ('id',)
+    )
+    def test_allowed_elements_and_attributes(self):
+        html = u'<p id="foo" style="x">TEXT</p><p><ham></ham></p>'
+        expected = u'<p id="foo">TEXT</p><p><ham></ham></p>'
+        self.assertEqual(html_utils.sanitize_html_stream(html), expected)
+        self.assertEqual(html_utils.sanitize_html_tree(html), expected)
+
+    @override_settings(ASKBOT_HTML_SANITIZER='askbot.utils.html.sanitize_html_tree')
+    def test_sanitizer_setting(self):
+        self.assertEqual(html_utils.get_sanitizer(), html_utils.sanitize_html_tree)
+
+
+class DownsampleLttbTests(TestCase):
+
+    def test_short_series_is_unchanged(self):
+        points = [(0, 1), (1, 5), (2, 3)]
+        self.assertEqual(downsample_lttb(points, 5), points)
+
+    def test_downsampling_keeps_ends_and_peaks(self):
+        points = [(x, 0) for x in range(1000)]
+        points[500] = (500, 100)
+        sampled = downsample_lttb(points, 20)
+        self.assertEqual(len(sampled), 20)
+        self.assertEqual(sampled[0], points[0])
+        self.assertEqual(sampled[-1], points[-1])
+        self.assertIn((500, 100), sampled)
+        self.assertEqual(sampled, sorted(sampled))
@@ -5,6 +5,7 @@ from markdown2 import Markdown
 from django.core.cache import cache
 from django.test import TestCase
 from askbot import models
+from askbot.conf.settings_wrapper import snapshot as settings_snapshot
 from askbot import signals
 
 
@@ -105,6 +106,7 @@ class AskbotTestCase(TestCase):
     @classmethod
     def setUpClass(cls):
         cache.clear()
+        settings_snapshot.clear()
         super(AskbotTestCase, cls).setUpClass()
 
     def create_user(
@@ -45,6 +45,7 @@ urlpatterns = patterns(
             r'(%s)?' % r'/tags:(?P<tags>[\w+.#,-]+)' + # Should match: const.TAG_CHARS + ','; TODO: Is `#` char decoded by the time URLs are processed ??
             r'(%s)?' % r'/author:(?P<author>\d+)' +
             r'(%s)?' % r'/page:(?P<page>\d+)' +
+            r'(%s)?' % r'/cursor:(?P<cursor>[\w\-]+)' +
             r'(%s)?' % r'/page-size:(?P<page_size>\d+)' +
             r'(%s)?' % r'/query:(?P<query>.+)' +  # INFO: query is last, b/c it can contain slash!!!
         r'/$'),
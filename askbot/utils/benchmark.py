@@ -0,0 +1,58 @@
+"""Helpers for the ``benchmark_*`` management commands"""
+from __future__ import print_function
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def time_call(func, repeat=5):
+    """calls ``func`` ``repeat`` times and returns
+    tuple (best time, average time) in seconds"""
+    timings = list()
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        timings.append(time.time() - start)
+    return min(timings), sum(timings) / len(timings)
+
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def count_queries(func, writes_only=False):
+    """returns number of db queries executed by ``func``,
+    with ``writes_only=True`` - only INSERT, UPDATE and DELETE statements"""
+    with CaptureQueriesContext(connection) as context:
+        func()
+    queries = context.captured_queries
+    if writes_only:
+        queries = [q for q in queries \
+                    if q['sql'].lstrip().upper().startswith(WRITE_STATEMENTS)]
+    return len(queries)
+
+
+def explain(queryset):
+    """returns query plan of the queryset as a list of text lines"""
+    sql, params = queryset.query.sql_with_params()
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+    cursor = connection.cursor()
+    cursor.execute(prefix + sql, params)
+    return [' '.join([unicode(v) for v in row]) for row in cursor.fetchall()]
+
+
+def print_timing(label, timing, unit='ms'):
+    """prints a line with best and average time"""
+    best, average = timing
+    print('%-40s best: %9.2f%s avg: %9.2f%s' % (
+                    label, best * 1000, unit, average * 1000, unit))
+
+
+def print_rate(label, count, seconds, item_name='items'):
+    """prints throughput line, e.g. "users/s" """
+    rate = count / seconds if seconds else float('inf')
+    print('%-40s %d %s in %.2fs, %.1f %s/s' % (
+                    label, count, item_name, seconds, rate, item_name))
@@ -0,0 +1,78 @@
+"""Simple primitives on top of the django cache, used to
+accumulate writes in cache and apply them to the database in bulk.
+
+The cache backend must support atomic ``incr`` (memcached, redis,
+database and locmem backends do), the queues are shared between
+processes only when the cache is shared.
+"""
+from django.core import cache
+
+from askbot import const
+
+
+def incr_counter(key, delta=1, timeout=const.LONG_TIME):
+    """atomically increments counter in cache by ``delta``
+    and returns the new value, missing counter starts at zero"""
+    cache.cache.add(key, 0, timeout)
+    try:
+        return cache.cache.incr(key, delta)
+    except ValueError:
+        # counter was evicted between add() and incr()
+        cache.cache.set(key, delta, timeout)
+        return delta
+
+
+class CacheQueue(object):
+    """Append-only queue of picklable values stored in cache.
+
+    Each item is stored under its own key, numbered with
+    an atomic counter, so appending is safe from concurrent processes.
+    :meth:`pop_all` returns items appended before the previous
+    call of :meth:`pop_all`, so that the items being written
+    while the queue is read are not skipped. This means that
+    items are delivered with a delay of one read cycle.
+
+    Items may be lost when the cache evicts them.
+    """
+    def __init__(self, name, timeout=const.LONG_TIME):
+        self.name = name
+        self.timeout = timeout
+
+    def get_item_key(self, number):
+        return '%s-item-%d' % (self.name, number)
+
+    def append(self, value):
+        number = incr_counter(self.name + '-tail', timeout=self.timeout)
+        cache.cache.set(self.get_item_key(number), value, self.timeout)
+
+    def pop_all(self, max_items=10000, include_recent=False):
+        """returns list of values appended before
+        the previous call of this method,
+        at most ``max_items`` of the oldest values.
+        With ``include_recent=True`` reads all the values,
+        use it only when there are no concurrent writers
+        """
+        lock_key = self.name + '-lock'
+        if not cache.cache.add(lock_key, True, 600):
+            return list() # queue is being read by another process
+
+        try:
+            head = cache.cache.get(self.name + '-head', 0)
+            # read up to the tail seen by the previous reader
+            prev_tail = cache.cache.get(self.name + '-prev-tail', head)
+            tail = cache.cache.get(self.name + '-tail', 0)
+            cache.cache.set(self.name + '-prev-tail', tail, self.timeout)
+
+            if include_recent:
+                prev_tail = tail
+            last = min(prev_tail, head + max_items)
+            if last <= head:
+                return list()
+
+            keys = [self.get_item_key(num) for num in range(head + 1, last + 1)]
+            items = cache.cache.get_many(keys)
+            cache.cache.set(self.name + '-head', last, self.timeout)
+            cache.cache.delete_many(keys)
+            return [items[key] for key in keys if key in items]
+        finally:
+            cache.cache.delete(lock_key)
@@ -210,6 +210,16 @@ def print_progress(elapsed, total, nowipe = False):
     output = '%6.2f%%' % (100 * float(elapsed)/float(total))
     print_action(output, nowipe)
 
+def print_rate_progress(done, total, seconds, item_name='rows', nowipe=False):
+    """prints progress in percent together with
+    the processing rate, e.g. "rows/s", in place"""
+    rate = done / seconds if seconds else 0
+    output = '%6.2f%% (%d of %d %s, %.1f %s/s)' % (
+                100 * float(done) / float(total or 1),
+                done, total, item_name, rate, item_name
+            )
+    print_action(output, nowipe)
+
 class ProgressBar(object):
     """A wrapper for an iterator, that prints
     a progress bar along the way of iteration
@@ -5,7 +5,7 @@ from urlparse import urlparse
 
 from bs4 import BeautifulSoup
 import html5lib
-from html5lib import sanitizer, serializer, tokenizer, treebuilders,\
+from html5lib import constants, sanitizer, serializer, tokenizer, treebuilders,\
     treewalkers
 import htmlentitydefs
 
@@ -66,21 +66,244 @@ class HTMLSanitizer(tokenizer.HTMLTokenizer, HTMLSanitizerMixin):
                 yield token
 
 
-def sanitize_html(html):
-    """Sanitizes an HTML fragment.
-    from forbidden markup
+def get_sanitizer_config():
+    """returns tuple of the settings, which affect
+    the output of :func:`sanitize_html`"""
+    return (
+        getattr(django_settings, 'ASKBOT_ALLOWED_HTML_ELEMENTS', None),
+        getattr(django_settings, 'ASKBOT_ALLOWED_HTML_ATTRIBUTES', None),
+        django_settings.ASKBOT_HTML_SANITIZER
+    )
+
+
+def get_serializer():
+    return serializer.HTMLSerializer(omit_optional_tags=False,
+                                     quote_attr_values=True)
+
+
+def sanitize_html_tree(html):
+    """Sanitizes an HTML fragment from forbidden markup,
+    by building the html5 DOM tree of the fragment.
     """
     p = html5lib.HTMLParser(tokenizer=HTMLSanitizer,
                             tree=treebuilders.getTreeBuilder("dom"))
     dom_tree = p.parseFragment(html)
     walker = treewalkers.getTreeWalker("dom")
     stream = walker(dom_tree)
-    s = serializer.HTMLSerializer(omit_optional_tags=False,
-                                  quote_attr_values=True)
-    output_generator = s.serialize(stream)
+    output_generator = get_serializer().serialize(stream)
     return u''.join(output_generator)
 
 
+class TreeRequired(Exception):
+    """raised by :func:`iter_sanitized_tokens` on the markup,
+    which the html5 tree builder would restructure"""
+
+
+START_TAG = constants.tokenTypes['StartTag']
+END_TAG = constants.tokenTypes['EndTag']
+CHARACTERS = constants.tokenTypes['Characters']
+SPACE_CHARACTERS = constants.tokenTypes['SpaceCharacters']
+PARSE_ERROR = constants.tokenTypes['ParseError']
+
+#elements with the tree construction rules not reproduced
+#by the streaming sanitizer, markup with these
+#is sanitized via the tree builder
+TREE_ONLY_ELEMENTS = frozenset((
+    'applet', 'base', 'basefont', 'bgsound', 'body', 'button', 'command',
+    'event-source', 'form', 'frame', 'frameset', 'head', 'html', 'iframe',
+    'image', 'input', 'isindex', 'link', 'marquee', 'math', 'meta', 'nobr',
+    'noembed', 'noframes', 'noscript', 'object', 'optgroup', 'option',
+    'plaintext', 'rp', 'rt', 'script', 'select', 'style', 'svg', 'textarea',
+    'title', 'xmp'
+))
+#start tags of these close an open <p>
+P_CLOSING_ELEMENTS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'center', 'dd', 'details',
+    'dir', 'div', 'dl', 'dt', 'fieldset', 'figcaption', 'figure', 'footer',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hgroup', 'hr', 'li',
+    'listing', 'main', 'menu', 'nav', 'ol', 'p', 'pre', 'section',
+    'summary', 'table', 'ul'
+))
+FORMATTING_ELEMENTS = frozenset((
+    'a', 'b', 'big', 'code', 'em', 'font', 'i', 's', 'small', 'strike',
+    'strong', 'tt', 'u'
+))
+#elements closed right after the start tag
+EMPTY_ELEMENTS = frozenset((
+    'area', 'br', 'embed', 'hr', 'img', 'keygen', 'param', 'source',
+    'track', 'wbr'
+))
+#allowed children of the table elements, which cannot
+#contain text, other content would be moved out of the table
+TABLE_CONTENT = {
+    'colgroup': frozenset(('col',)),
+    'table': frozenset(('caption', 'colgroup', 'tbody', 'tfoot', 'thead')),
+    'tbody': frozenset(('tr',)),
+    'tfoot': frozenset(('tr',)),
+    'thead': frozenset(('tr',)),
+    'tr': frozenset(('td', 'th')),
+}
+TABLE_ELEMENTS = frozenset((
+    'caption', 'col', 'colgroup', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr'
+))
+#inside these the tree builder is not in the "in body" mode
+CELL_ELEMENTS = frozenset(('caption', 'td', 'th'))
+LIST_ITEM_STOPS = {'li': ('li',), 'dd': ('dd', 'dt'), 'dt': ('dd', 'dt')}
+SPECIAL_ELEMENTS = frozenset(
+    name for namespace, name in constants.specialElements \
+    if namespace == constants.namespaces['html']
+)
+
+
+def get_tag_attributes(token):
+    """returns attributes of the start tag token in the same
+    dictionary as the html5lib tree walker over the DOM tree,
+    so that the serializer outputs them in the same order"""
+    #parser, minidom and the tree walker each copy the attributes
+    parsed = dict(token['data'][::-1])
+    dom_attrs = dict()
+    for name, value in parsed.items():
+        dom_attrs[name] = value
+    walked = dict()
+    for name in dom_attrs.keys():
+        walked[(None, name)] = dom_attrs[name]
+    return walked
+
+
+def check_start_tag(name, stack):
+    """raises :class:`TreeRequired` if the start tag
+    in the "in body" insertion mode would close or move
+    any of the open elements"""
+    if name in TREE_ONLY_ELEMENTS or name in TABLE_ELEMENTS:
+        raise TreeRequired()
+    if name in constants.voidElements and name not in EMPTY_ELEMENTS:
+        raise TreeRequired()
+    if name in P_CLOSING_ELEMENTS and 'p' in stack:
+        raise TreeRequired()
+    if name in constants.headingElements and stack \
+        and stack[-1] in constants.headingElements:
+        raise TreeRequired()
+    if name in LIST_ITEM_STOPS:
+        for open_name in reversed(stack):
+            if open_name in LIST_ITEM_STOPS[name]:
+                raise TreeRequired()
+            if open_name in SPECIAL_ELEMENTS \
+                and open_name not in ('address', 'div', 'p'):
+                break
+    if name == 'a' and 'a' in stack:
+        raise TreeRequired()
+    #the tree builder tracks at most three same formatting elements
+    if name in FORMATTING_ELEMENTS and stack.count(name) >= 3:
+        raise TreeRequired()
+
+
+def iter_sanitized_tokens(html):
+    """yields serializer tokens of the sanitized fragment,
+    directly from the tokens of :class:`HTMLSanitizer`.
+
+    Only the markup, for which the html5 tree builder
+    keeps the elements in the source order - all elements
+    closed in the right order, no misplaced table content, etc. -
+    is handled, on other markup :class:`TreeRequired`
+    is raised.
+    """
+    tokens = HTMLSanitizer(html, parseMeta=False, useChardet=True)
+    stack = list()
+    cell_depth = 0
+    drop_newline = False
+    for token in tokens:
+        token_type = token['type']
+        if token_type == PARSE_ERROR:
+            continue
+
+        if drop_newline:
+            #the tree builder drops the first newline in <pre>
+            drop_newline = False
+            if token_type == SPACE_CHARACTERS and token['data'].startswith('\n'):
+                token['data'] = token['data'][1:]
+                if token['data'] == '':
+                    continue
+
+        parent = stack[-1] if stack else None
+        if token_type == START_TAG:
+            name = token['name']
+            if parent in TABLE_CONTENT:
+                if name not in TABLE_CONTENT[parent]:
+                    raise TreeRequired()
+            else:
+                check_start_tag(name, stack)
+
+            attrs = get_tag_attributes(token)
+            if name in constants.voidElements:
+                yield {'type': 'EmptyTag', 'name': name, 'data': attrs}
+                continue
+
+            yield {'type': 'StartTag', 'name': name, 'data': dict(attrs.items())}
+            if name in EMPTY_ELEMENTS:
+                yield {'type': 'EndTag', 'name': name, 'data': {}}
+                continue
+
+            stack.append(name)
+            if name in CELL_ELEMENTS:
+                cell_depth += 1
+            elif name in ('pre', 'listing') and cell_depth == 0:
+                drop_newline = True
+
+        elif token_type == END_TAG:
+            name = token['name']
+            if name != parent:
+                raise TreeRequired()
+            stack.pop()
+            if name in CELL_ELEMENTS:
+                cell_depth -= 1
+            yield {'type': 'EndTag', 'name': name, 'data': {}}
+
+        elif token_type == CHARACTERS:
+            if parent in TABLE_CONTENT or u'\u0000' in token['data']:
+                raise TreeRequired()
+            yield {'type': 'Characters', 'data': token['data']}
+
+        elif token_type == SPACE_CHARACTERS:
+            yield {'type': 'SpaceCharacters', 'data': token['data']}
+
+        else:
+            raise TreeRequired()
+
+    if stack:
+        raise TreeRequired()
+
+
+def sanitize_html_stream(html):
+    """Sanitizes an HTML fragment from forbidden markup,
+    serializing the sanitized tokens without building
+    the DOM tree. Output is the same as of :func:`sanitize_html_tree`,
+    which is used for the markup the tree builder would restructure.
+    """
+    try:
+        return u''.join(get_serializer().serialize(iter_sanitized_tokens(html)))
+    except TreeRequired:
+        return sanitize_html_tree(html)
+
+
+_sanitizers = dict()
+
+
+def get_sanitizer():
+    """returns function selected with ``ASKBOT_HTML_SANITIZER``"""
+    path = django_settings.ASKBOT_HTML_SANITIZER
+    if path not in _sanitizers:
+        from askbot.utils.loading import load_module
+        _sanitizers[path] = load_module(path)
+    return _sanitizers[path]
+
+
+def sanitize_html(html):
+    """Sanitizes an HTML fragment.
+    from forbidden markup
+    """
+    return get_sanitizer()(html)
+
+
 def sanitized(func):
     @functools.wraps(func)
     def wrapped(*args, **kwargs):
@@ -3,15 +3,21 @@ handling of markdown and additional syntax rules -
 such as optional link patterns, video embedding and
 Twitter-style @mentions"""
 
+import hashlib
 import re
 import logging
+import threading
 
+from django.conf import settings as django_settings
+from django.core import cache
+from django.utils.encoding import smart_str
 from django.utils.html import urlize
 from django.utils.module_loading import import_string
 
 from askbot import const
 from askbot.conf import settings as askbot_settings
 from askbot.utils.functions import split_phrases
+from askbot.utils.html import get_sanitizer_config
 from askbot.utils.html import sanitize_html
 from askbot.utils.html import strip_tags
 from askbot.utils.html import urlize_html
@@ -19,32 +25,42 @@ from askbot.utils.html import urlize_html
 # URL taken from http://regexlib.com/REDetails.aspx?regexp_id=501
 URL_RE = re.compile("((?<!(href|.src|data)=['\"])((http|https|ftp)\://([a-zA-Z0-9\.\-]+(\:[a-zA-Z0-9\.&amp;%\$\-]+)*@)*((25[0-5]|2[0-4][0-9]|[0-1]{1}[0-9]{2}|[1-9]{1}[0-9]{1}|[1-9])\.(25[0-5]|2[0-4][0-9]|[0-1]{1}[0-9]{2}|[1-9]{1}[0-9]{1}|[1-9]|0)\.(25[0-5]|2[0-4][0-9]|[0-1]{1}[0-9]{2}|[1-9]{1}[0-9]{1}|[1-9]|0)\.(25[0-5]|2[0-4][0-9]|[0-1]{1}[0-9]{2}|[1-9]{1}[0-9]{1}|[0-9])|localhost|([a-zA-Z0-9\-]+\.)*[a-zA-Z0-9\-]+\.(com|edu|gov|int|mil|net|org|biz|arpa|info|name|pro|aero|coop|museum|[a-zA-Z]{2}))(\:[0-9]+)*(/($|[a-zA-Z0-9\.\,\?\'\\\+&amp;%\$#\=~_\-]+))*))")
 
+#markdown parsers per thread, see get_configured_parser()
+_parsers = threading.local()
 
-def get_parser(markdown_class_addr=None):
-    """
-    Returns an instance of configured :class:`markdown2.Markdown parser.
 
-    :param markdown_class_addr: Path to :class:`markdown2.Markdown` custom
-                                class. (default: `'markdown2.Markdown'`)
-    :type markdown_class_addr: ``str``
-    """
+def get_parser_config(markdown_class_addr=None):
+    """returns tuple of the settings, which define the markdown parser:
+    (class path, extras, auto link patterns, auto link urls)"""
     if markdown_class_addr is None:
-        from django.conf import settings as django_settings
         markdown_class_addr = getattr(django_settings, 'ASKBOT_MARKDOWN_CLASS',
                                       'markdown2.Markdown')
-    Markdown = import_string(markdown_class_addr)
     extras = ['link-patterns', 'video']
 
     if askbot_settings.ENABLE_MATHJAX or askbot_settings.MARKUP_CODE_FRIENDLY:
         extras.append('code-friendly')
 
+    if askbot_settings.ENABLE_AUTO_LINKING:
+        patterns = askbot_settings.AUTO_LINK_PATTERNS
+        urls = askbot_settings.AUTO_LINK_URLS
+    else:
+        patterns = urls = ''
+    return (markdown_class_addr, tuple(extras), patterns, urls)
+
+
+def make_parser(config):
+    """Returns new instance of the markdown parser
+    for the configuration returned by :func:`get_parser_config`"""
+    markdown_class_addr, extras, patterns, urls = config
+    Markdown = import_string(markdown_class_addr)
+
     # link_patterns = [
     #     (URL_RE, r'\1'),
     # ]
     link_patterns = []
-    if askbot_settings.ENABLE_AUTO_LINKING:
-        pattern_list = askbot_settings.AUTO_LINK_PATTERNS.split('\n')
-        url_list = askbot_settings.AUTO_LINK_URLS.split('\n')
+    if patterns or urls:
+        pattern_list = patterns.split('\n')
+        url_list = urls.split('\n')
         pairs = zip(pattern_list, url_list)  # always takes equal number of items
         for item in pairs:
             if not item[0].strip() or not item[1].strip():
@@ -67,11 +83,67 @@ def get_parser(markdown_class_addr=None):
 
     return Markdown(
         html4tags=True,
-        extras=extras,
+        extras=list(extras),
         link_patterns=link_patterns
     )
 
 
+def get_configured_parser(config):
+    """returns parser for the configuration, parsers keep state
+    during the conversion, so they are cached per thread"""
+    parsers = getattr(_parsers, 'by_config', None)
+    if parsers is None:
+        parsers = _parsers.by_config = dict()
+    parser = parsers.get(config)
+    if parser is None:
+        # settings have changed, old parsers are not needed
+        parsers.clear()
+        parser = parsers[config] = make_parser(config)
+    return parser
+
+
+def get_parser(markdown_class_addr=None):
+    """
+    Returns an instance of configured :class:`markdown2.Markdown parser.
+    The parser is created again only when the markup settings change.
+
+    :param markdown_class_addr: Path to :class:`markdown2.Markdown` custom
+                                class. (default: `'markdown2.Markdown'`)
+    :type markdown_class_addr: ``str``
+    """
+    return get_configured_parser(get_parser_config(markdown_class_addr))
+
+
+def get_html_cache_key(text, parser_config, urlize_links):
+    """key of the html rendered from the text, depends only on
+    the text and the configuration, so the same texts of different
+    posts and revisions share the cached html"""
+    config = (parser_config, get_sanitizer_config(), urlize_links)
+    data = repr(config) + smart_str(text)
+    return 'markup-html-' + hashlib.md5(data).hexdigest()
+
+
+def convert_markdown(text, urlize_links=True):
+    """markdown to sanitized html converter, optionally
+    turns urls in the text into links,
+    results are cached for ``ASKBOT_MARKUP_CACHE_TIMEOUT`` seconds"""
+    parser_config = get_parser_config()
+    timeout = django_settings.ASKBOT_MARKUP_CACHE_TIMEOUT
+    if timeout > 0:
+        key = get_html_cache_key(text, parser_config, urlize_links)
+        html = cache.cache.get(key)
+        if html is not None:
+            return html
+
+    html = sanitize_html(get_configured_parser(parser_config).convert(text))
+    if urlize_links:
+        html = sanitize_html(urlize_html(html))
+
+    if timeout > 0:
+        cache.cache.set(key, html, timeout)
+    return html
+
+
 def format_mention_in_html(mentioned_user):
     """formats mention as url to the user profile"""
     url = mentioned_user.get_profile_url()
@@ -207,10 +279,7 @@ def plain_text_input_converter(text):
 
 def markdown_input_converter(text):
     """markdown to html converter"""
-    text = get_parser().convert(text)
-    text = sanitize_html(text)
-    text = urlize_html(text)
-    return sanitize_html(text)
+    return convert_markdown(text)
 
 
 def tinymce_input_converter(text):
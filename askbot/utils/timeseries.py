@@ -0,0 +1,44 @@
+"""Utilities for the time series shown as graphs"""
+
+
+def downsample_lttb(points, threshold):
+    """returns at most ``threshold`` of the ``points``
+    - a list of (x, y) tuples sorted by x, selected with the
+    "largest triangle three buckets" algorithm, which keeps
+    the first and the last point and from each of the buckets
+    in between - the point forming the largest triangle with
+    the point selected from the previous bucket and the average
+    of the next bucket, so that peaks and dips stay visible.
+    """
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    #the first and the last points are not in the buckets
+    bucket_size = float(count - 2) / (threshold - 2)
+    selected = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        #average of the next bucket, the last point for the last bucket
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, count)
+        next_points = points[next_start:next_end] or points[-1:]
+        avg_x = sum([point[0] for point in next_points]) / float(len(next_points))
+        avg_y = sum([point[1] for point in next_points]) / float(len(next_points))
+
+        a_x, a_y = points[selected]
+        max_area = -1
+        for index in range(start, end):
+            x, y = points[index]
+            area = abs((a_x - avg_x) * (y - a_y) - (a_x - x) * (avg_y - a_y))
+            if area > max_area:
+                max_area = area
+                max_index = index
+        sampled.append(points[max_index])
+        selected = max_index
+
+    sampled.append(points[-1])
+    return sampled
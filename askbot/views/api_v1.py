@@ -1,3 +1,4 @@
+from django.conf import settings as django_settings
 from django.core.paginator import Paginator, EmptyPage, InvalidPage
 from django.shortcuts import get_object_or_404
 from django.http import HttpResponse, Http404
@@ -7,6 +8,8 @@ from django.db.models import Q
 from django.core.urlresolvers import reverse
 from askbot import models
 from askbot.conf import settings as askbot_settings
+from askbot.search import pagination
+from askbot.search import question_counts
 from askbot.search.state_manager import SearchState
 from askbot.utils.html import site_url
 from askbot.utils.functions import get_epoch_str
@@ -192,10 +195,31 @@ def questions(request):
     #qs = qs.exclude(~Q(groups__id=global_group.id))
 
     page_size = askbot_settings.DEFAULT_QUESTIONS_PAGE_SIZE
-    paginator = Paginator(qs, page_size)
-    if paginator.num_pages < search_state.page:
-        search_state.page = 1
-    page = paginator.page(search_state.page)
+    #numbered pages are served, unless the client asks for the
+    #keyset pagination with the "cursor" parameter - empty for the
+    #first page, then the "next_cursor" of the previous response
+    cursor = request.GET.get('cursor', None)
+    use_cursor = cursor is not None or \
+        (django_settings.ASKBOT_CURSOR_PAGINATION_ENABLED and not page)
+    questions_count = question_counts.get_count(request.user, search_state)
+    paginator = pagination.CachedCountPaginator(
+                                    qs, page_size, count=questions_count
+                                )
+    if use_cursor and pagination.supports_cursor(search_state.sort):
+        cursor_paginator = pagination.CursorPaginator(
+                                        qs, search_state.sort, page_size,
+                                        count=questions_count
+                                    )
+        try:
+            page = cursor_paginator.page(cursor or None)
+        except pagination.InvalidCursor:
+            raise Http404
+        next_cursor = page.next_cursor
+    else:
+        use_cursor = False
+        if paginator.num_pages < search_state.page:
+            search_state.page = 1
+        page = paginator.page(search_state.page)
 
     question_list = list()
     for thread in page.object_list:
@@ -207,5 +231,7 @@ def questions(request):
         'pages' : paginator.num_pages,
         'questions': question_list
     }
+    if use_cursor:
+        ajax_data['next_cursor'] = next_cursor
     response_data = simplejson.dumps(ajax_data)
     return HttpResponse(response_data, content_type='application/json')
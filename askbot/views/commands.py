@@ -754,6 +754,8 @@ def set_tag_filter_strategy(request):
         allowed_values_dict = dict(conf.get_tag_email_filter_strategy_choices())
         assert(filter_value in allowed_values_dict)
         request.user.email_tag_filter_strategy = filter_value
+        if models.tag_subscribers.is_enabled():
+            models.tag_subscribers.update_user(request.user.id)
     request.user.save()
     return HttpResponse('', content_type="application/json")
 
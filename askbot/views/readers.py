@@ -41,6 +41,8 @@ from askbot.forms import ShowTagsForm
 from askbot.forms import ShowQuestionForm
 from askbot.models.post import MockPost
 from askbot.models.tag import Tag
+from askbot.search import pagination
+from askbot.search import question_counts
 from askbot.search.state_manager import SearchState, DummySearchState
 from askbot.startup_procedures import domain_is_bad
 from askbot.templatetags import extra_tags
@@ -89,15 +91,36 @@ def questions(request, **kwargs):
     if meta_data['non_existing_tags']:
         search_state = search_state.remove_tags(meta_data['non_existing_tags'])
 
-    paginator = Paginator(qs, search_state.page_size)
-    if paginator.num_pages < search_state.page:
-        search_state.page = 1
-    page = paginator.page(search_state.page)
-    page.object_list = list(page.object_list) # evaluate the queryset
+    #None for the searches that cannot use the cached counts
+    questions_count = question_counts.get_count(request.user, search_state)
 
-    # INFO: Because for the time being we need question posts and thread authors
-    #       down the pipeline, we have to precache them in thread objects
-    models.Thread.objects.precache_view_data_hack(threads=page.object_list)
+    if pagination.use_cursor_pagination(search_state):
+        paginator = pagination.CursorPaginator(
+                                qs, search_state.sort, search_state.page_size,
+                                count=questions_count
+                            )
+        try:
+            page = paginator.page(search_state.cursor)
+        except pagination.InvalidCursor:
+            search_state = search_state.change_cursor(None)
+            page = paginator.page()
+    else:
+        paginator = pagination.CachedCountPaginator(
+                                qs, search_state.page_size, count=questions_count
+                            )
+        if paginator.num_pages < search_state.page:
+            search_state.page = 1
+        page = paginator.page(search_state.page)
+        page.object_list = list(page.object_list) # evaluate the queryset
+    questions_count = paginator.count
+
+    # summaries are read from cache in one request, question posts
+    # and thread authors are precached only for the summaries to render
+    thread_summaries = models.Thread.objects.get_summaries_html(
+                                    page.object_list,
+                                    search_state=search_state,
+                                    visitor=request.user
+                                )
 
     related_tags = Tag.objects.get_related_to_search(
                         threads=page.object_list,
@@ -116,14 +139,29 @@ def questions(request, **kwargs):
                                           )
                         )
 
-    paginator_context = {
-        'is_paginated' : (paginator.count > search_state.page_size),
-        'pages': paginator.num_pages,
-        'current_page_number': search_state.page,
-        'page_object': page,
-        'base_url' : search_state.query_string(),
-        'page_size' : search_state.page_size,
-    }
+    if isinstance(paginator, pagination.CursorPaginator):
+        paginator_context = {
+            'cursor_mode': True,
+            'is_paginated': page.has_next() or page.has_previous(),
+            'page_object': page,
+            'base_url' : search_state.query_string(),
+            'page_size' : search_state.page_size,
+        }
+        if page.has_next():
+            next_state = search_state.change_cursor(page.next_cursor)
+            paginator_context['next_url'] = next_state.full_url()
+        if page.has_previous():
+            first_state = search_state.change_cursor(None)
+            paginator_context['first_url'] = first_state.full_url()
+    else:
+        paginator_context = {
+            'is_paginated' : (questions_count > search_state.page_size),
+            'pages': paginator.num_pages,
+            'current_page_number': search_state.page,
+            'page_object': page,
+            'base_url' : search_state.query_string(),
+            'page_size' : search_state.page_size,
+        }
 
     #get url for the rss feed
     context_feed_url = reverse('latest_questions_feed')
@@ -147,13 +185,13 @@ def questions(request, **kwargs):
     reset_method_count = len(filter(None, [search_state.query, search_state.tags, meta_data.get('author_name', None)]))
 
     if request.is_ajax():
-        q_count = paginator.count
+        q_count = questions_count
 
         #todo: words
         question_counter = ungettext('%(q_num)s question', '%(q_num)s questions', q_count)
         question_counter = question_counter % {'q_num': humanize.intcomma(q_count),}
 
-        if q_count > search_state.page_size:
+        if paginator_context['is_paginated']:
             paginator_tpl = get_template('main_page/paginator.html')
             paginator_html = paginator_tpl.render(
                 RequestContext(
@@ -173,6 +211,7 @@ def questions(request, **kwargs):
             RequestContext(
                 request, {
                     'threads': page,
+                    'thread_summaries': thread_summaries,
                     'search_state': search_state,
                     'reset_method_count': reset_method_count,
                     'request': request
@@ -246,7 +285,8 @@ def questions(request, **kwargs):
             'page_size': search_state.page_size,
             'query': search_state.query,
             'threads' : page,
-            'questions_count' : paginator.count,
+            'thread_summaries': thread_summaries,
+            'questions_count' : questions_count,
             'reset_method_count': reset_method_count,
             'scope': search_state.scope,
             'show_sort_by_relevance': conf.should_show_sort_by_relevance(),
@@ -12,7 +12,6 @@ import collections
 import datetime
 import functools
 import logging
-import math
 import operator
 import urllib
 
@@ -218,6 +217,17 @@ def show_users(request, by_group=False, group_id=None, group_slug=None):
     except (EmptyPage, InvalidPage):
         users_page = objects_list.page(objects_list.num_pages)
 
+    #statistics of the users on the page, read with one query
+    users_page.object_list = list(users_page.object_list)
+    snapshots = models.UserStatsSnapshot.objects.get_for_users(
+                                                users_page.object_list
+                                            )
+    for listed_user in users_page.object_list:
+        snapshot = snapshots.get(listed_user.id)
+        if snapshot:
+            tag_count = models.user_stats.USER_CARD_TAG_COUNT
+            listed_user.top_tag_names = snapshot.get_top_tag_names(tag_count)
+
     paginator_data = {
         'is_paginated' : is_paginated,
         'pages': objects_list.num_pages,
@@ -489,26 +499,18 @@ def user_stats(request, user, context):
                     'base_url' : '?' #this paginator will be ajax
                 })
     #
-    # Votes
+    # Votes, tags and badges, from the snapshot when enabled
     #
-    up_votes = models.Vote.objects.get_up_vote_count_from_user(user)
-    down_votes = models.Vote.objects.get_down_vote_count_from_user(user)
+    stats = models.UserStatsSnapshot.objects.get_for_user(user)
+    up_votes = stats.up_votes
+    down_votes = stats.down_votes
     votes_today = models.Vote.objects.get_votes_count_today_from_user(user)
     votes_total = askbot_settings.MAX_VOTES_PER_USER_PER_DAY
 
-    #
-    # Tags
-    #
-    # INFO: There's bug in Django that makes the following query kind of broken (GROUP BY clause is problematic):
-    #       http://stackoverflow.com/questions/7973461/django-aggregation-does-excessive-group-by-clauses
-    #       Fortunately it looks like it returns correct results for the test data
-    user_tags = models.Tag.objects.filter(
-                                    threads__posts__author=user,
-                                    language_code=get_language()
-                                ).distinct().\
-                    annotate(user_tag_usage_count=Count('threads')).\
-                    order_by('-user_tag_usage_count')[:const.USER_VIEW_DATA_SIZE]
-    user_tags = list(user_tags) # evaluate
+    user_tags = [
+        {'name': name, 'user_tag_usage_count': count} \
+                                for name, count in stats.get_tag_usage()
+    ]
 
     when = askbot_settings.MARKED_TAGS_ARE_PUBLIC_WHEN
     if when == 'always' or \
@@ -522,63 +524,15 @@ def user_stats(request, user, context):
         ignored_tag_names = None
         subscribed_tag_names = None
 
-#    tags = models.Post.objects.filter(author=user).values('id', 'thread', 'thread__tags')
-#    post_ids = set()
-#    thread_ids = set()
-#    tag_ids = set()
-#    for t in tags:
-#        post_ids.add(t['id'])
-#        thread_ids.add(t['thread'])
-#        tag_ids.add(t['thread__tags'])
-#        if t['thread__tags'] == 11:
-#            print t['thread'], t['id']
-#    import ipdb; ipdb.set_trace()
-
-    #
-    # Badges/Awards (TODO: refactor into Managers/QuerySets when a pattern emerges; Simplify when we get rid of Question&Answer models)
-    #
-    post_type = ContentType.objects.get_for_model(models.Post)
-
-    user_awards = models.Award.objects.filter(user=user).select_related('badge')
-
-    awarded_post_ids = []
-    for award in user_awards:
-        if award.content_type_id == post_type.id:
-            awarded_post_ids.append(award.object_id)
-
-    awarded_posts = models.Post.objects.filter(id__in=awarded_post_ids)\
-                    .select_related('thread') # select related to avoid additional queries in Post.get_absolute_url()
-
-    awarded_posts_map = {}
-    for post in awarded_posts:
-        awarded_posts_map[post.id] = post
-
-    badges_dict = collections.defaultdict(list)
-
-    for award in user_awards:
-        if award.badge.is_enabled() == False:
+    award_summary = stats.get_award_summary()
+    badge_ids = [badge_id for badge_id, count, posts in award_summary]
+    badges_map = models.BadgeData.objects.in_bulk(badge_ids)
+    badges = list()
+    for badge_id, award_count, awarded_posts in award_summary:
+        badge = badges_map.get(badge_id)
+        if badge is None or badge.is_enabled() == False:
             continue
-
-        # Fetch content object
-        if award.content_type_id == post_type.id:
-            #here we go around a possibility of awards
-            #losing the content objects when the content
-            #objects are deleted for some reason
-            awarded_post = awarded_posts_map.get(award.object_id, None)
-            if awarded_post is not None:
-                #protect from awards that are associated with deleted posts
-                award.content_object = awarded_post
-                award.content_object_is_post = True
-            else:
-                award.content_object_is_post = False
-        else:
-            award.content_object_is_post = False
-
-        # "Assign" to its Badge
-        badges_dict[award.badge].append(award)
-
-    badges = badges_dict.items()
-    badges.sort(key=operator.itemgetter(1), reverse=True)
+        badges.append((badge, award_count, awarded_posts))
 
     user_groups = models.Group.objects.get_for_user(user = user)
     user_groups = user_groups.exclude_personal()
@@ -1037,35 +991,23 @@ def user_reputation(request, user, context):
                                     )
                                     
 
-    def format_graph_data(raw_data, user):
+    def format_graph_data(points, user):
         # prepare data for the graph - last values go in first
         final_rep = user.get_localized_profile().reputation + const.MIN_REPUTATION
         rep_list = ['[%s,%s]' % (calendar.timegm(datetime.datetime.now().timetuple()) * 1000, final_rep)]
-        for rep in raw_data:
-            rep_list.append('[%s,%s]' % (calendar.timegm(rep.reputed_at.timetuple()) * 1000, rep.reputation))
+        for timestamp, reputation in reversed(points):
+            rep_list.append('[%s,%s]' % (timestamp, reputation))
 
         #add initial rep point
         rep_list.append('[%s,%s]' % (calendar.timegm(user.date_joined.timetuple()) * 1000, const.MIN_REPUTATION))
         reps = ','.join(rep_list)
         return '[%s]' % reps
 
-    sample_size = 150 #number of real data points to take for teh rep graph
+    #daily reputation, downsampled to a limited number of points,
     #two extra points are added for beginning and end
-
-    rep_length = reputes.count()
-    if rep_length <= sample_size:
-        raw_graph_data = reputes
-    else:
-        #extract only a sampling of data to limit the number of data points
-        rep_qs = models.Repute.objects.filter(user=user,
-                                              language_code=get_language()
-                                             ).order_by('-reputed_at')
-        #extract 300 points
-        raw_graph_data = list()
-        step = rep_length / float(sample_size)
-        for idx in range(sample_size):
-            item_idx = int(math.ceil(idx * step))
-            raw_graph_data.append(rep_qs[item_idx])
+    graph_points = models.ReputationBucket.objects.get_graph_points(
+                                                user, get_language()
+                                            )
 
     data = {
         'active_tab':'users',
@@ -1073,7 +1015,7 @@ def user_reputation(request, user, context):
         'tab_name': 'reputation',
         'page_title': _("Profile - User's Karma"),
         'latest_rep_changes': reputes[:100],
-        'rep_graph_data': format_graph_data(raw_graph_data, user)
+        'rep_graph_data': format_graph_data(graph_points, user)
     }
     context.update(data)
     return render(request, 'user_profile/user_reputation.html', context)
@@ -1205,6 +1147,8 @@ def user_unsubscribe(request):
                     user.add_missing_askbot_subscriptions()
                     subs = models.EmailFeedSetting.objects.filter(subscriber=user)
                     subs.update(frequency='n') #set frequency to "never"
+                    if models.tag_subscribers.is_enabled():
+                        models.tag_subscribers.update_user(user.id)
                     result = 'success'
                 else:
                     result = 'ready'
@@ -1243,6 +1187,8 @@ def user_email_subscriptions(request, user, context):
             tag_filter_saved = tag_filter_form.save()
             if tag_filter_saved:
                 action_status = _('changes saved')
+                if models.tag_subscribers.is_enabled():
+                    models.tag_subscribers.update_user(user.id)
             if 'save' in request.POST:
                 feeds_saved = email_feeds_form.save(user)
                 if feeds_saved: